@@ -0,0 +1,36 @@
+"""Bar aggregation: one second of a 50,000 ticks per second feed through BarEngine."""
+from neo_api_client.bars import BarEngine
+
+from tests import data
+
+
+class Bars(object):
+    """
+    50,000 trades of 200 tokens over ten minutes of exchange time, 2% of them late, into 1s, 1m and 5m bars.
+
+    A time under one second per call means the engine keeps up with 50,000 ticks per second.
+    """
+
+    def setup(self):
+        trades = data.trades()
+        # Feed messages of 10 ticks
+        self.dicts = self.messages(data.trade_dicts(trades))
+        self.ticks = self.messages(data.trade_ticks(trades))
+
+    @staticmethod
+    def messages(ticks):
+        return [ticks[start:start + 10] for start in range(0, len(ticks), 10)]
+
+    def run(self, messages, specs=None):
+        engine = BarEngine(specs=specs)
+        for message in messages:
+            engine.on_ticks(message)
+
+    def time_dict_ticks(self):
+        self.run(self.dicts)
+
+    def time_typed_ticks(self):
+        self.run(self.ticks)
+
+    def time_typed_ticks_all_kinds(self):
+        self.run(self.ticks, specs=("1s", "1m", "5m", "5000v", "100t"))
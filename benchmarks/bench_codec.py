@@ -0,0 +1,80 @@
+"""JSON codec: order bodies, responses and websocket control messages, per backend."""
+import json
+
+from neo_api_client import codec
+from neo_api_client.HSWebSocketLib import HSWebSocket, send_json_arr_resp
+from neo_api_client.NeoWebSocket import NeoWebSocket
+
+from tests import data
+
+ORDER = {"am": "NO", "dq": "0", "es": "nse_cm", "mp": "0", "pc": "CNC", "pf": "N", "pr": "100.5", "pt": "L",
+         "qt": "1", "rt": "DAY", "tp": "0", "ts": "ITC-EQ", "tt": "B"}
+
+
+def installed_backends():
+    return [name for name, (_, module) in codec.BACKENDS.items() if module is not None]
+
+
+class Backend(object):
+    """1,000 order bodies encoded and an order book of 200 orders decoded, with each installed backend."""
+    names = installed_backends()
+
+    def setup(self):
+        self.backends = {name: codec.get_backend(name) for name in self.names}
+        self.order_book = data.order_book()
+
+    def encode_orders(self, name):
+        dumps = self.backends[name].dumps
+        for _ in range(1000):
+            dumps(ORDER)
+
+    def decode_order_book(self, name):
+        self.backends[name].loads(self.order_book)
+
+
+# One benchmark per backend and input, e.g. time_orders_json and time_orders_orjson
+for _name in Backend.names:
+    setattr(Backend, "time_orders_" + _name, lambda self, name=_name: self.encode_orders(name))
+    setattr(Backend, "time_order_book_" + _name, lambda self, name=_name: self.decode_order_book(name))
+
+
+class CaptureSocket(object):
+    """Stands in for the websocket-client connection of HSWebSocket: frames are counted, not sent."""
+
+    def __init__(self):
+        self.sent = 0
+
+    def send(self, data, opcode):
+        self.sent += 1
+
+
+class ControlMessages(object):
+    """
+    1,000 subscribe requests through HSWebSocket.hs_send and 1,000 connection responses through on_hsm_message.
+
+    The *_text benchmarks take the former route of JSON text between NeoWebSocket and HSWebSocket: requests and
+    responses are dumped by NeoWebSocket, or HSWebSocket, and parsed again on the other side.
+    """
+
+    def setup(self):
+        self.hs = HSWebSocket()
+        self.hs.ws = CaptureSocket()
+        self.request = {"type": "mws", "scrips": "nse_cm|11536&nse_cm|1594&nse_cm|2885", "channelnum": 1}
+        self.websocket = NeoWebSocket("sid", "token", "server", None)
+        self.response = {"type": "cn", "msg": "successful", "stat": "Ok", "stCode": 200}
+
+    def time_request(self):
+        for _ in range(1000):
+            self.hs.hs_send(self.request)
+
+    def time_request_text(self):
+        for _ in range(1000):
+            self.hs.hs_send(json.dumps(self.request))
+
+    def time_response(self):
+        for _ in range(1000):
+            self.websocket.on_hsm_message(send_json_arr_resp(self.response))
+
+    def time_response_text(self):
+        for _ in range(1000):
+            self.websocket.on_hsm_message(json.dumps([self.response]))
@@ -0,0 +1,200 @@
+"""HSM frame decoding: HSWrapper.parseData and TopicData.prepareData."""
+import random
+import tracemalloc
+
+import numpy as np
+
+from neo_api_client.HSWebSocketLib import HSWrapper, ResponseTypes
+from neo_api_client.parallel_decoder import ShmRing
+
+from tests import data
+
+
+def legacy_buf2long(a):
+    b = bytearray(a)
+    val = 0
+    leng = len(b)
+    for i in range(leng):
+        j = leng - 1 - i
+        val += b[j] << (i * 8)
+    return val if val < 2 ** 31 else val - 2 ** 32
+
+
+def legacy_buf2string(a):
+    return ''.join(map(chr, np.frombuffer(a, dtype=np.uint8)))
+
+
+class LegacyWrapper(HSWrapper):
+    """HSWrapper decoding packets as before the struct decoder: a bytes slice and a byte loop for every field."""
+
+    def parsePackets(self, view, pos):
+        e = view.obj
+        h = []
+        g = legacy_buf2long(e[pos: pos + 2])
+        pos += 2
+        for n in range(g):
+            pos += 2
+            c = legacy_buf2long(e[pos: pos + 1])
+            pos += 1
+            if c == ResponseTypes.get("SNAP"):
+                f = legacy_buf2long(e[pos: pos + 4])
+                pos += 4
+                name_len = legacy_buf2long(e[pos: pos + 1])
+                pos += 1
+                topic_name = legacy_buf2string(e[pos: pos + name_len])
+                pos += name_len
+                d = self.getNewTopicData(topic_name)
+                self.topic_list[f] = d
+                fcount = legacy_buf2long(e[pos: pos + 1])
+                pos += 1
+                for index in range(fcount):
+                    d.setLongValues(index, legacy_buf2long(e[pos: pos + 4]))
+                    pos += 4
+                d.setMultiplierAndPrec()
+                fcount = legacy_buf2long(e[pos: pos + 1])
+                pos += 1
+                for index in range(fcount):
+                    fid = legacy_buf2long(e[pos: pos + 1])
+                    pos += 1
+                    data_len = legacy_buf2long(e[pos: pos + 1])
+                    pos += 1
+                    d.setStringValues(fid, legacy_buf2string(e[pos: pos + data_len]))
+                    pos += data_len
+                h.append(d.prepareData("SNAP"))
+            elif c == ResponseTypes.get("UPDATE"):
+                f = legacy_buf2long(e[pos: pos + 4])
+                pos += 4
+                d = self.topic_list[f]
+                fcount = legacy_buf2long(e[pos:pos + 1])
+                pos += 1
+                for index in range(fcount):
+                    d.setLongValues(index, legacy_buf2long(e[pos:pos + 4]))
+                    pos += 4
+                h.append(d.prepareData("SUB"))
+        return h
+
+
+class ParseData(object):
+    """parseData on a 50 topic SNAP frame and on 2,000 single packet UPDATE frames."""
+
+    def setup(self):
+        self.snap = data.snap_frame()
+        self.updates = data.update_frames()
+
+    def decode(self, typed_ticks, wrapper_class=HSWrapper):
+        wrapper = wrapper_class(typed_ticks=typed_ticks)
+        wrapper.parseData(self.snap)
+        for frame in self.updates:
+            wrapper.parseData(frame)
+
+    def time_snap(self):
+        HSWrapper().parseData(self.snap)
+
+    def time_snap_legacy(self):
+        LegacyWrapper().parseData(self.snap)
+
+    def time_updates_legacy(self):
+        self.decode(False, LegacyWrapper)
+
+    def time_snap_typed(self):
+        HSWrapper(typed_ticks=True).parseData(self.snap)
+
+    def time_updates(self):
+        self.decode(False)
+
+    def time_updates_typed(self):
+        self.decode(True)
+
+
+class Allocations(object):
+    """
+    Memory allocated per UPDATE frame by parseData, legacy and struct decoders: the traced peak above the memory in
+    use before each frame, averaged over 2,000 frames, so both the temporaries and the decoded ticks are counted.
+    """
+    repeat = 3
+
+    def setup(self):
+        self.snap = data.snap_frame()
+        self.updates = data.update_frames()
+
+    def peak_per_frame(self, wrapper_class, typed_ticks=False):
+        wrapper = wrapper_class(typed_ticks=typed_ticks)
+        wrapper.parseData(self.snap)
+        total = 0
+        tracemalloc.start()
+        try:
+            for frame in self.updates:
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                wrapper.parseData(frame)
+                total += tracemalloc.get_traced_memory()[1] - before
+        finally:
+            tracemalloc.stop()
+        return total / len(self.updates)
+
+    def track_bytes_per_update_legacy(self):
+        return self.peak_per_frame(LegacyWrapper)
+
+    def track_bytes_per_update(self):
+        return self.peak_per_frame(HSWrapper)
+
+    def track_bytes_per_update_typed(self):
+        return self.peak_per_frame(HSWrapper, True)
+
+    track_bytes_per_update_legacy.unit = track_bytes_per_update.unit = track_bytes_per_update_typed.unit = "B"
+
+
+class PrepareData(object):
+    """prepareData for 1,000 updates of one topic of each type, the field values set before each call."""
+
+    def setup(self):
+        rng = random.Random(1)
+        self.topics = {}
+        for kind in data.TOPIC_TYPES:
+            for typed_ticks in (False, True):
+                wrapper = HSWrapper(typed_ticks=typed_ticks)
+                wrapper.parseData(data.snap_frame(topics=1, kinds=[kind]))
+                self.topics[kind, typed_ticks] = wrapper.topic_list[1]
+            self.topics[kind] = [list(enumerate(data.update_longs(rng, kind))) for _ in range(1000)]
+
+    def prepare(self, kind, typed_ticks=False):
+        topic = self.topics[kind, typed_ticks]
+        for values in self.topics[kind]:
+            for index, value in values:
+                topic.setLongValues(index, value)
+            topic.prepareData("SUB")
+
+    def time_scrip(self):
+        self.prepare("sf")
+
+    def time_index(self):
+        self.prepare("if")
+
+    def time_depth(self):
+        self.prepare("dp")
+
+    def time_scrip_typed(self):
+        self.prepare("sf", True)
+
+    def time_depth_typed(self):
+        self.prepare("dp", True)
+
+
+class SubmitBurst(object):
+    """Copying a burst of 2,000 UPDATE frames into a shared memory ring, the socket thread's share of parallel
+    decoding, then draining it."""
+
+    def setup(self):
+        self.frames = data.update_frames()
+        self.ring = ShmRing(size=1 << 22)
+        self.header = bytes((3,))
+
+    def teardown(self):
+        self.ring.close(unlink=True)
+
+    def time_put_burst(self):
+        ring, header = self.ring, self.header
+        for frame in self.frames:
+            ring.put(header, frame)
+        while ring.peek() is not None:
+            ring.release()
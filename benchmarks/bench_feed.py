@@ -0,0 +1,213 @@
+"""Live feed pipeline: replayed frames through HSWebSocket, and the stages after decoding."""
+import random
+import threading
+import time
+
+from neo_api_client.conflation import Conflater
+from neo_api_client.event_dispatcher import EventDispatcher
+from neo_api_client.feed_recorder import OPCODE_BINARY, FeedReplayServer
+from neo_api_client.HSWebSocketLib import HSWebSocket, HSWrapper
+from neo_api_client.order_book import OrderBooks
+from neo_api_client.parallel_decoder import WAITING_INDEX, ParallelDecoder
+from neo_api_client.tick_store import TickStore
+
+from tests import data
+
+
+class Replay(object):
+    """A SNAP frame and 2,000 UPDATE frames played as fast as possible to HSWebSocket, until the last is decoded."""
+    repeat = 3
+
+    def setup(self):
+        frames = [data.snap_frame()] + data.update_frames()
+        self.records = [(index * 1000, OPCODE_BINARY, frame) for index, frame in enumerate(frames)]
+
+    def replay(self, typed_ticks):
+        server = FeedReplayServer(records=self.records, speed=0, wait_for_request=False).start()
+        websocket = HSWebSocket()
+        received = [0]
+        done = threading.Event()
+
+        def on_message(message):
+            received[0] += 1
+            if received[0] == len(self.records):
+                done.set()
+
+        thread = threading.Thread(target=websocket.open_connection, daemon=True, kwargs={
+            "url": server.url, "token": "token", "sid": "sid", "on_open": lambda: None, "on_message": on_message,
+            "on_error": print, "on_close": lambda: None, "typed_ticks": typed_ticks})
+        thread.start()
+        try:
+            if not done.wait(60):
+                raise RuntimeError("Replay delivered %d of %d frames" % (received[0], len(self.records)))
+        finally:
+            # Not joined: run_forever may wait out its reconnect delay before the daemon thread ends
+            websocket.close()
+            server.stop()
+
+    def time_replay(self):
+        self.replay(False)
+
+    def time_replay_typed(self):
+        self.replay(True)
+
+
+class ParallelReplay(object):
+    """
+    Throughput of the whole feed path with and without decode workers: a SNAP frame of 200 topics and 500 UPDATE
+    frames of 20 packets played to HSWebSocket, timed from the connection until the last tick is delivered. The
+    workers are started beforehand, as NeoWebSocket does when it opens the socket, and timing starts once they have
+    imported the client and wait for frames.
+    """
+    repeat = 3
+    workers = 2
+
+    def setup(self):
+        rng = random.Random(1)
+        kinds = data.topic_types(200)
+        frames = [data.snap_frame(topics=200, kinds=kinds)]
+        for _ in range(500):
+            topics = [rng.randrange(len(kinds)) for _ in range(20)]
+            frames.append(data.data_frame([data.update_packet(topic + 1, data.update_longs(rng, kinds[topic]))
+                                           for topic in topics]))
+        self.records = [(index * 1000, OPCODE_BINARY, frame) for index, frame in enumerate(frames)]
+        self.ticks = 200 + 500 * 20
+
+    def replay(self, decoder):
+        server = FeedReplayServer(records=self.records, speed=0, wait_for_request=False).start()
+        websocket = HSWebSocket()
+        received = [0]
+        done = threading.Event()
+
+        def on_message(message):
+            received[0] += len(message)
+            if received[0] == self.ticks:
+                done.set()
+
+        if decoder is not None:
+            self.start(decoder, on_message)
+        thread = threading.Thread(target=websocket.open_connection, daemon=True, kwargs={
+            "url": server.url, "token": "token", "sid": "sid", "on_open": lambda: None, "on_message": on_message,
+            "on_error": print, "on_close": lambda: None, "decoder": decoder})
+        started = time.perf_counter()
+        thread.start()
+        try:
+            if not done.wait(60):
+                raise RuntimeError("Replay delivered %d of %d ticks" % (received[0], self.ticks))
+            return time.perf_counter() - started
+        finally:
+            websocket.close()
+            server.stop()
+            # The connection thread stops the workers once its socket is closed
+            thread.join(5)
+
+    @staticmethod
+    def start(decoder, on_message):
+        decoder.start(on_message)
+        while not all(inbox.index[WAITING_INDEX] for inbox in decoder.inboxes):
+            time.sleep(0.01)
+
+    def track_single_thread(self):
+        return self.replay(None)
+
+    def track_decode_workers(self):
+        return self.replay(ParallelDecoder(self.workers))
+
+    def cpu(self, workers):
+        """
+        CPU seconds of each stage of a replay with `workers` decode workers: the websocket thread in `submit`, the
+        collector thread and the busiest worker from the moment it waited for frames. On a machine with a core for
+        each, the replay takes about as long as the largest of them.
+        """
+        decoder = TimedDecoder(workers)
+        self.replay(decoder)
+        decoder.close()
+        return {"submit": decoder.submit_cpu, "collect": decoder.collect_cpu, "worker": decoder.worker_cpu}
+
+    def track_cpu_decode(self):
+        """CPU of decoding every frame on one thread, the work the decode workers share."""
+        wrapper = HSWrapper()
+        started = time.thread_time()
+        for _, _, frame in self.records:
+            wrapper.parseData(frame)
+        return time.thread_time() - started
+
+    def track_cpu_submit(self):
+        return self.cpu(self.workers)["submit"]
+
+    def track_cpu_collect(self):
+        return self.cpu(self.workers)["collect"]
+
+    def track_cpu_worker(self):
+        return self.cpu(self.workers)["worker"]
+
+    def track_cpu_worker_4(self):
+        return self.cpu(4)["worker"]
+
+
+class TimedDecoder(ParallelDecoder):
+    """ParallelDecoder keeping the CPU time of its threads and of the busiest worker, from its first frame on."""
+
+    def __init__(self, workers):
+        super(TimedDecoder, self).__init__(workers)
+        self.submit_cpu = 0.0
+        self.collect_cpu = 0.0
+        self.worker_cpu = 0.0
+        self.ready = None
+
+    def submit(self, frame, pos):
+        if self.ready is None:
+            self.ready = self.metrics()["cpu"]
+        started = time.thread_time()
+        super(TimedDecoder, self).submit(frame, pos)
+        self.submit_cpu += time.thread_time() - started
+
+    def collect(self):
+        started = time.thread_time()
+        super(TimedDecoder, self).collect()
+        self.collect_cpu = time.thread_time() - started
+
+    def close(self):
+        if self.running and self.ready is not None:
+            # Every tick was delivered: the workers have no more frames and record their CPU time when they wait
+            while not all(inbox.index[WAITING_INDEX] for inbox in self.inboxes):
+                time.sleep(0.01)
+            self.worker_cpu = max(cpu - ready for cpu, ready in zip(self.metrics()["cpu"], self.ready))
+        super(TimedDecoder, self).close()
+
+
+class Stages(object):
+    """Conflation, event dispatch, the tick store and order books over 2,000 decoded UPDATE messages."""
+
+    def setup(self):
+        wrapper = HSWrapper()
+        wrapper.parseData(data.snap_frame())
+        self.messages = [{"type": "stock_feed", "data": wrapper.parseData(frame)} for frame in data.update_frames()]
+
+    def time_conflater(self):
+        conflater = Conflater(lambda message: None, interval=0)
+        for message in self.messages:
+            conflater.put(message)
+        conflater.drain()
+
+    def time_event_dispatcher(self):
+        dispatcher = EventDispatcher(lambda message: None, maxsize=len(self.messages)).start()
+        for message in self.messages:
+            dispatcher.put(message)
+        dispatcher.stop()
+
+    def time_event_dispatcher_conflate(self):
+        dispatcher = EventDispatcher(lambda message: None, policy="conflate").start()
+        for message in self.messages:
+            dispatcher.put(message)
+        dispatcher.stop()
+
+    def time_tick_store(self):
+        store = TickStore(capacity=4096)
+        for message in self.messages:
+            store.on_ticks(message["data"])
+
+    def time_order_books(self):
+        books = OrderBooks()
+        for message in self.messages:
+            books.on_ticks(message["data"])
@@ -0,0 +1,89 @@
+"""Quotes: refreshing 2,000 tokens in one request, in concurrent chunks, from the cache, and for four strategies."""
+import http.server
+import json
+import multiprocessing
+import threading
+import time
+import urllib.parse
+
+from neo_api_client.api.quotes_neo_symbol_api import QuotesAPI
+from neo_api_client.api_client import ApiClient
+from neo_api_client.neo_utility import NeoUtility
+from neo_api_client.quotes_engine import QuotesEngine
+
+from tests import data
+
+# Simulated time per request (network round trip and gateway) and server time per token
+REQUEST_SECONDS = 0.03
+TOKEN_SECONDS = 0.00002
+
+
+class QuotesHandler(http.server.BaseHTTPRequestHandler):
+    """Answers a neosymbol quotes request with one LTP quote per token, after the simulated server time."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        symbols = urllib.parse.unquote(self.path.rstrip("/").split("/")[-2]).split(",")
+        quotes = []
+        for symbol in symbols:
+            exchange, token = symbol.split("|")
+            quotes.append({"exchange_token": token, "display_symbol": "SYM%s" % token, "exchange": exchange,
+                           "lstup_time": "1700000000", "ltp": "%.2f" % (int(token) / 100)})
+        time.sleep(REQUEST_SECONDS + TOKEN_SECONDS * len(symbols))
+        body = json.dumps(quotes).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(ready):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), QuotesHandler)
+    ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+class Refresh(object):
+    """LTP quotes of 2,000 nse_fo tokens from a local server, rate limiting disabled."""
+    repeat = 3
+
+    def setup(self):
+        # The server runs in its own process so that building its responses does not compete with the client
+        ready = multiprocessing.Queue()
+        self.server = multiprocessing.Process(target=serve, args=(ready,), daemon=True)
+        self.server.start()
+        configuration = NeoUtility(host="prod")
+        configuration.base_url = "http://127.0.0.1:%d" % ready.get(timeout=10)
+        configuration.rate_limit_enabled = False
+        self.api_client = ApiClient(configuration)
+        self.tokens = data.instrument_tokens(2000)
+        self.cached = QuotesEngine(self.api_client, ttl=3600)
+        self.cached.get_quotes(self.tokens, "ltp")
+
+    def teardown(self):
+        self.api_client.rest_client.close()
+        self.server.terminate()
+        self.server.join()
+
+    def time_single_request(self):
+        QuotesAPI(self.api_client).get_quotes(self.tokens, "ltp")
+
+    def time_chunked(self):
+        QuotesEngine(self.api_client).get_quotes(self.tokens, "ltp")
+
+    def time_cached(self):
+        self.cached.get_quotes(self.tokens, "ltp")
+
+    def time_four_strategies(self):
+        """Four threads asking for the same tokens at once: one set of requests, shared."""
+        engine = QuotesEngine(self.api_client)
+        threads = [threading.Thread(target=engine.get_quotes, args=(self.tokens, "ltp")) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
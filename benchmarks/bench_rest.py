@@ -0,0 +1,178 @@
+"""REST path: request validation, rate limiting and RESTClientObject.request against a local server."""
+import http.server
+import json
+import statistics
+import threading
+
+import requests
+
+from neo_api_client import codec
+from neo_api_client.neo_utility import NeoUtility
+from neo_api_client.rate_limiter import RequestScheduler
+from neo_api_client.req_data_validation import place_order_validation
+from neo_api_client.rest import RESTClientObject
+
+from tests.simulated_time import SimulatedTime
+
+ORDER_RESPONSE = json.dumps({"stat": "Ok", "nOrdNo": "240101000000001", "stCode": 200}).encode()
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    """Answers every request at once with a place order response, keeping the connection alive."""
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately: without this, delayed ACKs stall every response
+    disable_nagle_algorithm = True
+
+    def respond(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(ORDER_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(ORDER_RESPONSE)
+
+    do_GET = do_POST = respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Request(object):
+    """100 requests over the pooled session of a RESTClientObject, rate limiting disabled."""
+
+    def setup(self):
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = "http://127.0.0.1:%d/Orders/2.0/quick/order/rule/ms/place" % self.server.server_address[1]
+        configuration = NeoUtility(host="prod")
+        configuration.rate_limit_enabled = False
+        self.client = RESTClientObject(configuration)
+        self.order = {"es": "nse_cm", "pc": "CNC", "pr": "100.5", "pt": "L", "qt": "1", "rt": "DAY",
+                      "ts": "ITC-EQ", "tt": "B"}
+
+    def teardown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def time_get(self):
+        for _ in range(100):
+            self.client.request("GET", self.url, endpoint="positions").json()
+
+    def time_post_form(self):
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        for _ in range(100):
+            self.client.request("POST", self.url, headers=dict(headers), body=self.order,
+                                endpoint="place_order").json()
+
+
+class PlaceOrder(Request):
+    """
+    1,000 sequential place_order requests: cold, a new connection per call through module-level `requests.post` as
+    RESTClientObject did before it owned a session, against pooled, one kept-alive connection.
+    """
+    repeat = 3
+
+    def time_cold(self):
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        for _ in range(1000):
+            requests.post(url=self.url, headers=headers, data={"jData": codec.dumps(self.order)}).json()
+
+    def time_pooled(self):
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        for _ in range(1000):
+            self.client.request("POST", self.url, headers=dict(headers), body=self.order,
+                                endpoint="place_order").json()
+
+
+class Validation(object):
+    """place_order_validation of 1,000 order legs."""
+
+    def time_place_order_validation(self):
+        for _ in range(1000):
+            place_order_validation("nse_cm", "CNC", "100.5", "L", "1", "DAY", "ITC-EQ", "B", amo="NO",
+                                   disclosed_quantity="0", market_protection="0", pf="N", trigger_price="0")
+
+
+class RateLimiter(object):
+    """RequestScheduler.acquire for 1,000 requests under budgets they never exhaust."""
+
+    def setup(self):
+        lanes = {"orders": {"rate": 1e9, "burst": 1e9, "priority": 0},
+                 "reports": {"rate": 1e9, "burst": 1e9, "priority": 3}}
+        self.scheduler = RequestScheduler(lanes, {"place_order": "orders", "order_book": "reports"},
+                                          global_limit={"rate": 1e9, "burst": 1e9})
+
+    def time_acquire(self):
+        acquire = self.scheduler.acquire
+        for _ in range(500):
+            acquire("place_order")
+            acquire("order_book")
+
+
+class Saturation(object):
+    """
+    Order lane latency while four threads poll the report lane as fast as the limiter allows, in simulated time.
+
+    The report lane's budget matches the shared one, so reports alone exhaust it. Orders arrive every 0.25 s and should
+    wait for the next shared token at most (50 ms at 20/s). A burst of 40 orders takes every shared token for the
+    first second, then outruns the orders lane's own budget (10/s), and reports should get the shared tokens that
+    orders cannot take.
+    """
+    repeat = 3
+    lanes = {"orders": {"rate": 10, "burst": 10, "priority": 0},
+             "reports": {"rate": 20, "burst": 20, "priority": 3}}
+    global_limit = {"rate": 20, "burst": 20}
+    pollers = 4
+
+    def simulate(self, orders, interval):
+        """(order waits, (simulated time, wait) of every report request), in simulated seconds."""
+        clock = SimulatedTime(self.pollers + 1)
+        scheduler = RequestScheduler(self.lanes, {"place_order": "orders", "order_book": "reports"},
+                                     global_limit=self.global_limit, clock=clock)
+        scheduler._cond = clock
+        order_waits, report_waits = [], []
+        done = threading.Event()
+
+        def poll():
+            try:
+                while not done.is_set():
+                    wait = scheduler.acquire("order_book")
+                    report_waits.append((clock.now, wait))
+            finally:
+                clock.exit()
+
+        def place():
+            try:
+                # Reports drain every budget but the orders lane's first
+                clock.sleep(2.0)
+                for _ in range(orders):
+                    order_waits.append(scheduler.acquire("place_order"))
+                    if interval:
+                        clock.sleep(interval)
+            finally:
+                done.set()
+                clock.exit()
+
+        threads = [threading.Thread(target=poll) for _ in range(self.pollers)] + [threading.Thread(target=place)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return order_waits, report_waits
+
+    def track_order_wait_mean(self):
+        return statistics.mean(self.simulate(100, 0.25)[0])
+
+    def track_order_wait_max(self):
+        return max(self.simulate(100, 0.25)[0])
+
+    def track_report_gap_during_order_burst(self):
+        """Longest time without a report request served while 40 orders are placed back to back."""
+        order_waits, report_waits = self.simulate(40, 0)
+        burst_end = 2.0 + sum(order_waits)
+        served = sorted(now for now, _ in report_waits if now >= 2.0)
+        served = [now for now in served if now <= burst_end] + [now for now in served if now > burst_end][:1]
+        return max(after - before for before, after in zip(served, served[1:]))
@@ -0,0 +1,112 @@
+"""Scrip master: ScripSearch.scrip_search and the option chain over a full nse_fo file."""
+import http.server
+import io
+import json
+import shutil
+import tempfile
+import threading
+
+import pandas as pd
+import requests
+
+from neo_api_client.api.scrip_search import ScripSearch
+
+from tests import data
+from tests.data import stored_master
+
+
+class ScripFileHandler(http.server.BaseHTTPRequestHandler):
+    """Serves the scrip master listing, and the nse_fo file at /nse_fo.csv."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.path.endswith("/nse_fo.csv"):
+            body = self.server.csv
+        else:
+            url = "http://127.0.0.1:%d/nse_fo.csv" % self.server.server_address[1]
+            body = json.dumps({"data": {"filesPaths": [url]}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def legacy_scrip_search(api_client, symbol, exchange_segment, expiry, option_type):
+    """
+    scrip_search as it was before the scrip master store: the listing and the segment's CSV file are fetched and
+    parsed, and every row scanned, on each call. Only the nse_fo branches the benchmarks use are kept.
+    """
+    URL = api_client.configuration.get_url_details("scrip_master")
+    scrip_report = api_client.rest_client.request(url=URL, method='GET', headers={
+        "Authorization": api_client.configuration.consumer_key,
+        "Content-Type": "application/x-www-form-urlencoded"})
+    data = scrip_report.json()["data"]
+    exchange_segment_csv = [file for file in data["filesPaths"] if exchange_segment.lower() in file.lower()]
+    response = requests.get(exchange_segment_csv[0])
+    df = pd.read_csv(io.StringIO(response.text))
+    df = df.rename(columns=lambda x: x.strip())
+    df['pExpiryDate'] = pd.to_datetime(df['pExpiryDate'], unit='s')
+    df['pExpiryDate'] = df['pExpiryDate'] + pd.to_timedelta(315511200, unit='s')
+    df['pExpiryDate'] = df['pExpiryDate'].dt.strftime('%d%b%Y')
+    if symbol != '':
+        mask = df["pSymbolName"].str.lower().str.strip().str.contains(symbol)
+        df = df[mask]
+    if option_type:
+        df["pOptionType"] = df["pOptionType"].str.lower()
+        df = df[df["pOptionType"].isin(str(option_type).lower().split(","))]
+    if expiry:
+        df['pExpiryDate'] = pd.to_datetime(df['pExpiryDate'], format='%d%b%Y')
+        df = df[df['pExpiryDate'] == pd.to_datetime(expiry)]
+        df['pExpiryDate'] = df['pExpiryDate'].dt.strftime('%d%b%Y')
+    df = df.dropna(how='all')
+    df = df.sort_values('dStrikePrice;', ascending=True)
+    return json.loads(df.to_json(orient='records'))
+
+
+class ScripMaster(object):
+    """Searches over 96,000 option rows (120 underlyings, 4 expiries, 100 strikes, CE and PE)."""
+    repeat = 3
+
+    def setup(self):
+        self.directory = tempfile.mkdtemp()
+        self.api_client = stored_master(self.directory, data.scrip_master())
+        self.search = ScripSearch(self.api_client)
+        self.store = self.api_client.get_scrip_master_store()
+        self.expiry = data.expiry_days()[0]
+        self.store.option_chain("nse_fo")
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), ScripFileHandler)
+        self.server.csv = data.scrip_master().to_csv(index=False).encode()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.api_client.configuration.base_url = "http://127.0.0.1:%d/" % self.server.server_address[1]
+
+    def teardown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def time_load(self):
+        self.store.clear("nse_fo")
+        self.store.frame("nse_fo", symbol="nifty")
+
+    def time_scrip_search_symbol(self):
+        self.search.scrip_search("nifty", "nse_fo", None, None, None, False)
+
+    def time_scrip_search_chain(self):
+        self.search.scrip_search("nifty", "nse_fo", self.expiry.strftime("%d%b%Y"), "CE", None, False)
+
+    def time_legacy_scrip_search_symbol(self):
+        legacy_scrip_search(self.api_client, "nifty", "nse_fo", None, None)
+
+    def time_legacy_scrip_search_chain(self):
+        legacy_scrip_search(self.api_client, "nifty", "nse_fo", self.expiry.strftime("%d%b%Y"), "CE")
+
+    def time_option_chain(self):
+        self.store.option_chain("nse_fo").chain("NIFTY", self.expiry, option_type="CE")
+
+    def time_lookup(self):
+        for index in range(100):
+            self.store.lookup("nse_fo", instrument_token=35000 + index * 37)
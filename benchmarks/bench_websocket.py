@@ -0,0 +1,100 @@
+"""NeoWebSocket: quote mapping, subscriptions at the 3,000 token limit and live feed routing."""
+from neo_api_client.HSWebSocketLib import HSWrapper
+from neo_api_client.channel_allocator import ChannelAllocator
+from neo_api_client.NeoWebSocket import NeoWebSocket
+from neo_api_client.subscription_registry import SubscriptionRegistry
+
+from tests import data
+
+
+class NullSocket(object):
+    """Stands in for a connected HSWebSocket: requests are counted, not sent."""
+
+    def __init__(self):
+        self.sent = 0
+
+    def hs_send(self, request):
+        self.sent += 1
+
+
+def connected_websocket():
+    websocket = NeoWebSocket("sid", "token", "server", None)
+    websocket.hsWebsocket = NullSocket()
+    websocket.is_hsw_open = 1
+    return websocket
+
+
+class QuoteMapping(object):
+    """quote_resp_mapper and depth_resp_mapping over the SNAP ticks of 300 instruments."""
+
+    def setup(self):
+        wrapper = HSWrapper()
+        self.scrips = wrapper.parseData(data.snap_frame(topics=300, kinds=["sf"] * 300))
+        wrapper = HSWrapper()
+        self.depths = wrapper.parseData(data.snap_frame(topics=300, kinds=["dp"] * 300))
+        self.websocket = connected_websocket()
+
+    def time_quote_resp_mapper(self):
+        self.websocket.quote_resp_mapper(self.scrips)
+
+    def time_quote_resp_mapper_ltp(self):
+        self.websocket.quote_resp_mapper(self.scrips, quote_type="ltp")
+
+    def time_depth_resp_mapping(self):
+        self.websocket.depth_resp_mapping(self.depths)
+
+
+class Subscriptions(object):
+    """Subscribing and unsubscribing 3,000 tokens, the limit of one session."""
+
+    def setup(self):
+        self.tokens = data.instrument_tokens(3000)
+        self.keys = [SubscriptionRegistry.key(token["exchange_segment"], token["instrument_token"], "mws")
+                     for token in self.tokens]
+
+    def subscribed(self):
+        websocket = connected_websocket()
+        websocket.get_live_feed([dict(token) for token in self.tokens], False, False)
+        return websocket
+
+    def time_registry_allocate(self):
+        registry = SubscriptionRegistry()
+        for exchange_segment, instrument_token, subscription_type in self.keys:
+            registry.add(exchange_segment, instrument_token, subscription_type)
+        registry.allocate(self.keys)
+
+    def time_allocator_allocate_one_by_one(self):
+        registry = SubscriptionRegistry(allocator=ChannelAllocator())
+        for key in self.keys:
+            registry.add(*key)
+            registry.allocate([key])
+
+    def time_get_live_feed(self):
+        self.subscribed()
+
+    def time_get_live_feed_one_by_one(self):
+        websocket = connected_websocket()
+        for token in self.tokens:
+            websocket.get_live_feed([dict(token)], False, False)
+
+    def time_subscribe_unsubscribe(self):
+        websocket = self.subscribed()
+        websocket.un_subscribe_list([dict(token) for token in self.tokens])
+
+
+class FeedRouting(object):
+    """on_hsm_message for 2,000 decoded UPDATE frames with 3,000 tokens subscribed."""
+
+    def setup(self):
+        wrapper = HSWrapper()
+        wrapper.parseData(data.snap_frame())
+        self.messages = [wrapper.parseData(frame) for frame in data.update_frames()]
+        self.websocket = connected_websocket()
+        self.websocket.get_live_feed(data.instrument_tokens(2950), False, False)
+        self.websocket.get_live_feed(data.instrument_tokens(50, "nse_cm", 1000), False, False)
+        self.websocket.on_message = lambda message: None
+
+    def time_on_hsm_message(self):
+        on_hsm_message = self.websocket.on_hsm_message
+        for message in self.messages:
+            on_hsm_message(message)
@@ -0,0 +1,222 @@
+"""
+Run the benchmarks and compare them with the previous run.
+
+    python -m benchmarks.run [-k PATTERN] [--repeat N] [--compare RESULTS] [--threshold 1.1] [--check]
+
+Benchmarks are asv style: every public class of a `bench_*.py` module is instantiated once, `setup` is called, then
+each `time_*` method is timed and `teardown` is called. Each method is called enough times for a sample to last
+`--min-time` seconds, and `--repeat` samples are taken (or the class's `repeat` attribute). The median and best time
+per call are reported. A `track_*` method returns its own measurement, e.g. a latency in simulated time; it is
+called once per sample and the median and best of the values are reported, in seconds unless the method has a `unit`
+attribute.
+
+Results are written to `benchmarks/results/<commit>.json` (`<commit>-dirty.json` with uncommitted changes) and
+compared with the most recent earlier results file, or with `--compare` (a results file or a commit). Benchmarks
+more than `--threshold` times slower are marked REGRESSED; with `--check` the exit status is 1 when there are any.
+"""
+import argparse
+import gc
+import glob
+import importlib
+import inspect
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import traceback
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARKS_DIR)
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+
+
+def git(*args):
+    try:
+        return subprocess.run(["git"] + list(args), cwd=ROOT_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def revision():
+    """(commit, label of the results file)."""
+    commit = git("rev-parse", "--short=10", "HEAD")
+    if commit is None:
+        return None, time.strftime("%Y%m%d-%H%M%S")
+    dirty = git("status", "--porcelain", "--untracked-files=no")
+    return commit, commit + ("-dirty" if dirty else "")
+
+
+def discover(pattern=None):
+    """(name, class, method name) of every benchmark, in module order."""
+    benchmarks = []
+    for path in sorted(glob.glob(os.path.join(BENCHMARKS_DIR, "bench_*.py"))):
+        module = importlib.import_module("benchmarks." + os.path.splitext(os.path.basename(path))[0])
+        for class_name, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module.__name__ or class_name.startswith("_"):
+                continue
+            for method in sorted(name for name in vars(cls) if name.startswith(("time_", "track_"))):
+                name = "%s.%s.%s" % (module.__name__.split(".")[-1], class_name, method)
+                if pattern is None or pattern in name:
+                    benchmarks.append((name, cls, method))
+    return benchmarks
+
+
+def measure(function, repeat, min_time):
+    """Seconds per call: the calls per sample are chosen so that a sample lasts about `min_time`."""
+    started = time.perf_counter()
+    function()
+    first = time.perf_counter() - started
+    number = max(1, int(math.ceil(min_time / first))) if first > 0 else 1000
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(number):
+                function()
+            samples.append((time.perf_counter() - started) / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return {"median": statistics.median(samples), "min": min(samples), "number": number, "repeat": repeat}
+
+
+def track(function, repeat):
+    """Median and best of the values returned by `repeat` calls."""
+    samples = [function() for _ in range(repeat)]
+    result = {"median": statistics.median(samples), "min": min(samples), "number": 1, "repeat": repeat}
+    if getattr(function, "unit", None):
+        result["unit"] = function.unit
+    return result
+
+
+def run(benchmarks, repeat, min_time):
+    results = {}
+    instances = {}
+    by_class = {}
+    for name, cls, method in benchmarks:
+        by_class.setdefault(cls, []).append((name, method))
+    for cls, methods in by_class.items():
+        instance = instances[cls] = cls()
+        try:
+            if hasattr(instance, "setup"):
+                instance.setup()
+        except Exception:
+            for name, _ in methods:
+                results[name] = {"error": traceback.format_exc(limit=3)}
+                print("%-60s setup failed" % name)
+            continue
+        try:
+            for name, method in methods:
+                try:
+                    samples = getattr(cls, "repeat", repeat)
+                    if method.startswith("track_"):
+                        results[name] = track(getattr(instance, method), samples)
+                    else:
+                        results[name] = measure(getattr(instance, method), samples, min_time)
+                    print("%-60s %s" % (name, format_value(results[name], "median")))
+                except Exception:
+                    results[name] = {"error": traceback.format_exc(limit=3)}
+                    print("%-60s failed" % name)
+        finally:
+            if hasattr(instance, "teardown"):
+                instance.teardown()
+    return results
+
+
+def format_value(result, key):
+    if "unit" in result:
+        return "%8.1f %s" % (result[key], result["unit"])
+    return format_time(result[key])
+
+
+def format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return "%8.3f %-2s" % (seconds / scale, unit)
+    return "%8.3f ns" % (seconds / 1e-9)
+
+
+def previous_results(label):
+    """Most recent results file other than this run's."""
+    candidates = []
+    for path in glob.glob(os.path.join(RESULTS_DIR, "*.json")):
+        if os.path.splitext(os.path.basename(path))[0] == label:
+            continue
+        try:
+            with open(path) as f:
+                candidates.append((json.load(f).get("date", ""), path))
+        except (OSError, ValueError):
+            continue
+    return max(candidates)[1] if candidates else None
+
+
+def compare(results, path, threshold):
+    """Print the ratio to the results in `path`; returns the names of the regressed benchmarks."""
+    with open(path) as f:
+        baseline = json.load(f)
+    print("\nCompared with %s (%s)" % (baseline.get("commit") or os.path.basename(path), baseline.get("date")))
+    regressed = []
+    for name, result in results.items():
+        before = baseline["results"].get(name, {})
+        if "median" not in result or "median" not in before:
+            continue
+        ratio = result["median"] / before["median"]
+        mark = ""
+        if ratio > threshold:
+            mark = "REGRESSED"
+            regressed.append(name)
+        elif ratio < 1 / threshold:
+            mark = "improved"
+        print("%-60s %s -> %s  %5.2fx  %s" % (name, format_value(before, "median"), format_value(result, "median"),
+                                              ratio, mark))
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the neo_api_client benchmarks.")
+    parser.add_argument("-k", dest="pattern", help="only run the benchmarks whose name contains PATTERN")
+    parser.add_argument("--repeat", type=int, default=5, help="samples per benchmark (default 5)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per sample (default 0.2)")
+    parser.add_argument("--compare", help="results file, or commit, to compare with; defaults to the previous run")
+    parser.add_argument("--threshold", type=float, default=1.1,
+                        help="slowdown ratio reported as a regression (default 1.1)")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 when a benchmark regressed")
+    parser.add_argument("--no-save", action="store_true", help="do not write the results file")
+    args = parser.parse_args(argv)
+
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+    commit, label = revision()
+    results = run(discover(args.pattern), args.repeat, args.min_time)
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, label + ".json")
+        saved = {}
+        if os.path.exists(path):
+            # A run of some benchmarks (-k) updates them in the results of the commit
+            with open(path) as f:
+                saved = json.load(f)["results"]
+        saved.update(results)
+        with open(path, "w") as f:
+            json.dump({"commit": commit, "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "python": platform.python_version(), "machine": platform.machine(),
+                       "processor": platform.processor(), "cpus": os.cpu_count(), "results": saved}, f, indent=2)
+        print("\nResults written to %s" % os.path.relpath(path, ROOT_DIR))
+    baseline = args.compare or previous_results(label)
+    if baseline and not os.path.exists(baseline):
+        baseline = os.path.join(RESULTS_DIR, baseline + ".json")
+    regressed = compare(results, baseline, args.threshold) if baseline else []
+    if args.check and regressed:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,30 +2,12 @@ from broker.login import get_authenticated_client
 
 client = get_authenticated_client()
 
-x = client.scrip_master("nse_fo")
+# The segment file is downloaded at most once a day (conditional GET) into an indexed SQLite store;
+# later runs on the same day load it from disk without any network I/O.
+store = client.api_client.get_scrip_master_store()
+df = store.frame("nse_fo")
 
-import requests
-from pathlib import Path
-from urllib.parse import urlparse
-
-url = x
-
-response = requests.get(url, timeout=30)
-response.raise_for_status()
-
-# Extract filename exactly like browser
-filename = Path(urlparse(url).path).name
-file_path = Path(filename)
-
-# Delete old file if exists
-if file_path.exists():
-    file_path.unlink()
-    print(f"🗑 Deleted old file: {file_path.name}")
-
-with open(filename, "wb") as f:
-    f.write(response.content)
-
-print("✅ Downloaded:", filename)
+print("✅ Loaded:", len(df), "scrips from", store.path)
 
 exit_message = client.logout()
 print(exit_message)
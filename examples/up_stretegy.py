@@ -2,6 +2,8 @@ from broker.client import Client
 
 login = Client()
 client= login.get_client()
+client.subscribe_to_orderfeed()
+order_states = client.order_state_cache
 
 order_price = int(338015.00)
 order_no = 0
@@ -27,24 +29,19 @@ while(True):
     else:
         print("❌ Order failed:", placed_order.get("nOrdNo"))
 
-    while(order_status != "complete"):
-        print("Order Status:", order_status)
-        order_report = client.order_report()
-
-
-        for order_report in order_report.get("data", []):
-            if order_report.get("nOrdNo") == order_no:
-                print("order report: " + str(order_report))
-                order_status = order_report.get("ordSt")
-                order_rejection_reason = order_report.get("rejRsn")
-                order_status = order_report.get("ordSt")
-                order_price = int(float((order_report.get("avgPrc"))))
-                break
+    print("Order Status:", order_status)
+    order_report = order_states.wait_for_status(order_no, {"complete", "rejected"})
+    print("order report: " + str(order_report))
+    order_status = order_report.get("ordSt")
+    order_rejection_reason = order_report.get("rejRsn")
+    order_price = int(float((order_report.get("avgPrc"))))
 
     print("Order Number:", order_no)
     print("Order Status:", order_status)
     print("Order price:", order_price)
     print("Rejection Reason:", order_rejection_reason)
+    if order_status == "rejected":
+        break
 
     order_price += 300
     order_status = "open"
@@ -70,24 +67,19 @@ while(True):
     else:
         print("❌ Order failed:", placed_order.get("nOrdNo"))
 
-    while (order_status != "complete"):
-        print("Order Status:", order_status)
-
-        order_report = client.order_report()
-
-        for order_report in order_report.get("data", []):
-            if order_report.get("nOrdNo") == order_no:
-                print("order report: " + str(order_report))
-                order_status = order_report.get("ordSt")
-                order_rejection_reason = order_report.get("rejRsn")
-                order_status = order_report.get("ordSt")
-                order_price = int(float((order_report.get("avgPrc"))))
-                break
+    print("Order Status:", order_status)
+    order_report = order_states.wait_for_status(order_no, {"complete", "rejected"})
+    print("order report: " + str(order_report))
+    order_status = order_report.get("ordSt")
+    order_rejection_reason = order_report.get("rejRsn")
+    order_price = int(float((order_report.get("avgPrc"))))
 
     print("Order Number:", order_no)
     print("Order Status:", order_status)
     print("Order price:", order_price)
     print("Rejection Reason:", order_rejection_reason)
+    if order_status == "rejected":
+        break
 
     order_price -= 150
     order_status = "open"
@@ -1,16 +1,22 @@
 import datetime
-import json
+import socket
 import ssl
+import struct
+import time
 
 import websocket
 
+from neo_api_client import codec
+from neo_api_client import settings
+from neo_api_client.heartbeat import HEARTBEAT
+from neo_api_client.instrumentation import REGISTRY
+
 # from neo_api_client.logger import logger
 
 isEncyptOut = False
 isEncyptIn = True
 
 MAX_SCRIPS = 100
-topic_list = {}
 counter = 0
 FieldTypes = {
     'FLOAT32': 1,
@@ -41,6 +47,8 @@ BinRespTypes = {
     "SNAPSHOT": 9,
     "OPC_SUBSCRIBE": 10
 }
+# Frame type labels of the parse latency histograms
+FRAME_NAMES = {value: key.lower() for key, value in BinRespTypes.items()}
 # ws = None
 BinRespStat = {
     "OK": "K",
@@ -366,7 +374,110 @@ class ByteData:
             self.pos += 1
 
 
+def format_updated_fields(mapping, fields, updated, format_price):
+    """
+        JSON (string valued) representation of the fields flagged in the `updated` bitmask, in field index order.
+        `format_price` turns a raw, integer-scaled FLOAT32 field into its display value.
+    """
+    json_res = {}
+    mapping_len = len(mapping)
+    while updated:
+        lowest = updated & -updated
+        index = lowest.bit_length() - 1
+        updated ^= lowest
+        if index >= mapping_len:
+            break
+        data_type = mapping[index]
+        val = fields[index]
+        if val is not None and data_type:
+            if data_type["type"] == FieldTypes["FLOAT32"]:
+                val = format_price(val)
+            elif data_type["type"] == FieldTypes["DATE"]:
+                val = getFormatDate(val)
+            json_res[data_type["name"]] = str(val)
+    return json_res
+
+
+COMMON_FIELDS = (1 << STRING_INDEX["NAME"]) | (1 << STRING_INDEX["EXCHG"]) | (1 << STRING_INDEX["SYMBOL"])
+
+
+class Tick(object):
+    """
+        Typed market data record emitted by `HSWrapper(typed_ticks=True)` in place of the string valued dict.
+
+        Values are native numbers; prices are the raw integers sent by the exchange, to be divided by `scale`
+        (`price(name)` does it). `updated` is a bitmask of the field indexes changed by this tick, and every field
+        is also exposed as an attribute named after the dict key it would have, e.g. `tick.ltp`, `tick.tk`.
+
+        One record is allocated per topic and reused: it reads the topic's field buffer, which the next update for
+        the same topic overwrites. Use `copy()` to keep a tick, or `as_dict()` for the dict format. A topic updated
+        more than once in a frame is emitted as copies for all but its last packet.
+    """
+    __slots__ = ("fields", "updated", "request_type", "multiplier", "precision")
+    MAPPING = ()
+    FIELD_INDEX = {}
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.updated = 0
+        self.request_type = None
+        self.multiplier = None
+        self.precision = None
+
+    @property
+    def scale(self):
+        return self.multiplier * 10 ** self.precision
+
+    def is_updated(self, name):
+        return bool(self.updated >> self.FIELD_INDEX[name] & 1)
+
+    def price(self, name):
+        """FLOAT32 field `name` as a float, None when it has not been received."""
+        val = self.fields[self.FIELD_INDEX[name]]
+        return None if val is None else val / self.scale
+
+    def format_price(self, val):
+        return round(val / self.scale, self.precision)
+
+    def as_dict(self):
+        json_res = format_updated_fields(self.MAPPING, self.fields, self.updated, self.format_price)
+        if self.request_type is not None:
+            json_res["request_type"] = self.request_type
+        return json_res
+
+    def copy(self):
+        tick = self.__class__(list(self.fields))
+        tick.updated = self.updated
+        tick.request_type = self.request_type
+        tick.multiplier = self.multiplier
+        tick.precision = self.precision
+        return tick
+
+    def assign(self, tick):
+        """Take the values of `tick`, a record of the same class, without allocating; for copies kept up to date."""
+        self.fields[:] = tick.fields
+        self.updated = tick.updated
+        self.request_type = tick.request_type
+        self.multiplier = tick.multiplier
+        self.precision = tick.precision
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.as_dict())
+
+
+def add_field_properties(cls, mapping):
+    cls.MAPPING = mapping
+    cls.FIELD_INDEX = {}
+    for index, data_type in enumerate(mapping):
+        if data_type:
+            cls.FIELD_INDEX[data_type["name"]] = index
+            setattr(cls, data_type["name"], property(lambda self, i=index: self.fields[i]))
+    return cls
+
+
 class TopicData:
+    TICK_CLASS = None
+
     def __init__(self, feed_type):
         self.feedType = feed_type
         self.exchange = None
@@ -377,21 +488,34 @@ class TopicData:
         self.precisionValue = 100
         self.jsonArray = None
         self.fieldDataArray = [None] * 100
-        self.updatedFieldsArray = [None] * 100
+        # Bit i is set when fieldDataArray[i] changed since the last prepareData
+        self.updatedFields = 0
+        # Reused Tick record, only set in typed tick mode
+        self.tick = None
         self.fieldDataArray[STRING_INDEX["NAME"]] = feed_type
 
     def getKey(self):
         return f"{self.exchange}|{self.symbol}"
 
+    def enableTypedTicks(self):
+        self.tick = self.TICK_CLASS(self.fieldDataArray)
+
+    def isUpdated(self, index_val):
+        return self.updatedFields >> index_val & 1
+
     def setLongValues(self, index_val, value):
         if self.fieldDataArray[index_val] != value and value != TRASH_VAL:
             self.fieldDataArray[index_val] = value
-            self.updatedFieldsArray[index_val] = True
+            self.updatedFields |= 1 << index_val
 
     def prepareCommonData(self):
-        self.updatedFieldsArray[STRING_INDEX["NAME"]] = True
-        self.updatedFieldsArray[STRING_INDEX["EXCHG"]] = True
-        self.updatedFieldsArray[STRING_INDEX["SYMBOL"]] = True
+        self.updatedFields |= COMMON_FIELDS
+
+    def markAllUpdated(self):
+        # Every field holding a value goes in the next prepareData, e.g. for a topic restored after a reconnect
+        for index, value in enumerate(self.fieldDataArray):
+            if value is not None:
+                self.updatedFields |= 1 << index
 
     def setStringValues(self, e, d):
         if e == STRING_INDEX["SYMBOL"]:
@@ -403,42 +527,68 @@ class TopicData:
         elif e == STRING_INDEX["TSYMBOL"]:
             self.tSymbol = d
             self.fieldDataArray[STRING_INDEX["TSYMBOL"]] = d
-            self.updatedFieldsArray[STRING_INDEX["TSYMBOL"]] = True
+            self.updatedFields |= 1 << STRING_INDEX["TSYMBOL"]
+
+    def prepareTick(self, type):
+        tick = self.tick
+        tick.updated = self.updatedFields
+        tick.request_type = type
+        tick.multiplier = self.multiplier
+        tick.precision = self.precision
+        self.updatedFields = 0
+        return tick
+
+
+class ScripTick(Tick):
+    __slots__ = ()
+
+    def format_price(self, val):
+        return ("{:." + str(self.precision) + "f}").format(val / self.scale)
+
+    def as_dict(self):
+        json_res = super().as_dict()
+        if "nc" in json_res:
+            json_res["nc"] = ("{:." + str(self.precision) + "f}").format(self.fields[SCRIP_INDEX["PERCHANGE"]])
+        return json_res
+
+
+class IndexTick(Tick):
+    __slots__ = ()
+
+
+class DepthTick(Tick):
+    __slots__ = ()
 
 
 class DepthTopicData(TopicData):
+    TICK_CLASS = DepthTick
+
     def __init__(self):
         # print("INSIDE DepthTopicData")
         super().__init__(TopicTypes["DEPTH"])
-        self.updatedFieldsArray = [None] * 100
         self.multiplier = None
         self.precision = None
         self.precisionValue = None
 
     def setMultiplierAndPrec(self):
         # print("INTO setMultiplierAndPrec")
-        if self.updatedFieldsArray[DEPTH_INDEX['PRECISION']]:
+        if self.isUpdated(DEPTH_INDEX['PRECISION']):
             self.precision = self.fieldDataArray[DEPTH_INDEX['PRECISION']]
             self.precisionValue = 10 ** self.precision
-        if self.updatedFieldsArray[DEPTH_INDEX['MULTIPLIER']]:
+        if self.isUpdated(DEPTH_INDEX['MULTIPLIER']):
             self.multiplier = self.fieldDataArray[DEPTH_INDEX['MULTIPLIER']]
 
+    def formatPrice(self, val):
+        return round(val / (self.multiplier * self.precisionValue), self.precision)
+
     def prepareData(self, type=None):
         # print("INSIDE prepareData")
         self.prepareCommonData()
+        if self.tick is not None:
+            return self.prepareTick(type)
         # print("\nDepth:", self.feedType, self.exchange, self.symbol)
-        json_res = {}
-        for d in range(len(DEPTH_MAPPING)):
-            c = DEPTH_MAPPING[d]
-            e = self.fieldDataArray[d]
-            if self.updatedFieldsArray[d] and e is not None and c:
-                if c["type"] == FieldTypes.get("FLOAT32"):
-                    e = round(e / (self.multiplier * self.precisionValue), self.precision)
-                elif c["type"] == FieldTypes.get("DATE"):
-                    e = getFormatDate(e)
-                # print(d, ":", c["name"], ":", e)
-                json_res[c["name"]] = str(e)
-        self.updatedFieldsArray = [None] * 100
+        json_res = format_updated_fields(DEPTH_MAPPING, self.fieldDataArray, self.updatedFields, self.formatPrice)
+        self.updatedFields = 0
         # print("INSIDE Parse Data", json_res)
         if type is not None:
             json_res["request_type"] = type
@@ -700,77 +850,103 @@ def get_opc_chain_subs_request(d, e, a, c, f):
     return buffer
 
 
+class ControlResponse(str):
+    """
+        JSON text of a control response (connection, subscription, snapshot...), as delivered to `on_message`, that
+        also carries the decoded response in `data`, so NeoWebSocket reads it without parsing the text again.
+    """
+
+    def __new__(cls, data):
+        response = super().__new__(cls, codec.dumps(data))
+        response.data = data
+        return response
+
+    def __getnewargs__(self):
+        # Pickled (e.g. by the decode workers of ParallelDecoder) from the decoded response, not the text
+        return (self.data,)
+
+
 def send_json_arr_resp(a):
-    json_arr_res = []
-    json_arr_res.append(a)
-    return json.dumps(json_arr_res)
+    return ControlResponse([a])
 
 
 def buf2long(a):
-    b = bytearray(a)
-    val = 0
-    leng = len(b)
-    for i in range(leng):
-        j = leng - 1 - i
-        val += b[j] << (i * 8)
-    # return val
+    # Unsigned for 1 and 2 byte fields, signed for 4 byte fields
+    val = int.from_bytes(a, 'big')
     return val if val < 2 ** 31 else val - 2 ** 32
 
 
 def buf2string(a):
-    import numpy as np
-    return ''.join(map(chr, np.frombuffer(a, dtype=np.uint8)))
+    # One character per byte; accepts bytes, bytearray or memoryview slices without copying them first
+    return str(a, 'latin-1')
+
+
+UINT8 = struct.Struct('>B')
+UINT16 = struct.Struct('>H')
+INT32 = struct.Struct('>i')
+# Precompiled '>Ni' structs, keyed by N, used to decode a whole block of 4 byte fields in one call
+LONG_BLOCKS = {}
+
+
+def long_block(count):
+    block = LONG_BLOCKS.get(count)
+    if block is None:
+        block = LONG_BLOCKS[count] = struct.Struct('>%di' % count)
+    return block
 
 
 class ScripTopicData(TopicData):
+    TICK_CLASS = ScripTick
+
     def __init__(self):
         super().__init__(TopicTypes["SCRIP"])
         # print("After topic")
         self.precision = None
         self.precisionValue = None
         self.multiplier = None
+        self.precisionFormat = None
+        self.scale = None
 
     def setMultiplierAndPrec(self):
-        if self.updatedFieldsArray[SCRIP_INDEX["PRECISION"]]:
+        if self.isUpdated(SCRIP_INDEX["PRECISION"]):
             self.precision = self.fieldDataArray[SCRIP_INDEX["PRECISION"]]
             self.precisionValue = pow(10, self.precision)
-        if self.updatedFieldsArray[SCRIP_INDEX["MULTIPLIER"]]:
+        if self.isUpdated(SCRIP_INDEX["MULTIPLIER"]):
             self.multiplier = self.fieldDataArray[SCRIP_INDEX["MULTIPLIER"]]
+        # Built once per SNAP rather than on every prepareData
+        self.precisionFormat = "{:." + str(self.precision) + "f}"
+        self.scale = None
+        if self.multiplier is not None and self.precisionValue is not None:
+            self.scale = self.multiplier * self.precisionValue
+
+    def formatPrice(self, val):
+        return self.precisionFormat.format(val / self.scale)
 
     def prepareData(self,type=None):
         self.prepareCommonData()
         #hardcoded formatting is removed and made it dynamic
-        precesionFormat="{:."+str(self.precision)+"f}"
-        if self.updatedFieldsArray[SCRIP_INDEX["LTP"]] or self.updatedFieldsArray[SCRIP_INDEX["CLOSE"]]:
+        if self.isUpdated(SCRIP_INDEX["LTP"]) or self.isUpdated(SCRIP_INDEX["CLOSE"]):
             ltp = self.fieldDataArray[SCRIP_INDEX["LTP"]]
             close = self.fieldDataArray[SCRIP_INDEX["CLOSE"]]
             if ltp is not None and close is not None:
                 change = ltp - close
                 self.fieldDataArray[SCRIP_INDEX["CHANGE"]] = change
-                self.updatedFieldsArray[SCRIP_INDEX["CHANGE"]] = True
-                self.fieldDataArray[SCRIP_INDEX["PERCHANGE"]] = precesionFormat.format((change / close * 100))
-                self.updatedFieldsArray[SCRIP_INDEX["PERCHANGE"]] = True
-        if self.updatedFieldsArray[SCRIP_INDEX["VOLUME"]] or self.updatedFieldsArray[SCRIP_INDEX["VWAP"]]:
+                per_change = change / close * 100
+                # Typed ticks keep the percentage as a number
+                self.fieldDataArray[SCRIP_INDEX["PERCHANGE"]] = per_change if self.tick is not None else \
+                    self.precisionFormat.format(per_change)
+                self.updatedFields |= (1 << SCRIP_INDEX["CHANGE"]) | (1 << SCRIP_INDEX["PERCHANGE"])
+        if self.isUpdated(SCRIP_INDEX["VOLUME"]) or self.isUpdated(SCRIP_INDEX["VWAP"]):
             volume = self.fieldDataArray[SCRIP_INDEX["VOLUME"]]
             vwap = self.fieldDataArray[SCRIP_INDEX["VWAP"]]
             if volume is not None and vwap is not None:
                 self.fieldDataArray[SCRIP_INDEX["TURNOVER"]] = volume * vwap
-                self.updatedFieldsArray[SCRIP_INDEX["TURNOVER"]] = True
+                self.updatedFields |= 1 << SCRIP_INDEX["TURNOVER"]
+        if self.tick is not None:
+            return self.prepareTick(type)
         # print("\nScrip::" + self.feedType + "|" + self.exchange + "|" + self.symbol)
-        jsonRes = {}
-        for index in range(len(SCRIP_MAPPING)):
-            dataType = SCRIP_MAPPING[index]
-            val = self.fieldDataArray[index]
-            if self.updatedFieldsArray[index] and val is not None and dataType:
-                if dataType["type"] == FieldTypes["FLOAT32"]:
-                   
-                    val = precesionFormat.format(val / (self.multiplier * self.precisionValue))
-                    # val = "{:.4f}".format(val / (self.multiplier * self.precisionValue))
-                elif dataType["type"] == FieldTypes["DATE"]:
-                    val = getFormatDate(val)
-                # print(str(index) + ":" + dataType["name"] + ":" + str(val))
-                jsonRes[dataType["name"]] = str(val)
-        self.updatedFieldsArray = [None] * 100
+        jsonRes = format_updated_fields(SCRIP_MAPPING, self.fieldDataArray, self.updatedFields, self.formatPrice)
+        self.updatedFields = 0
         if type is not None:
             jsonRes["request_type"]=type
         
@@ -778,56 +954,71 @@ class ScripTopicData(TopicData):
 
 
 class IndexTopicData(TopicData):
+    TICK_CLASS = IndexTick
+
     def __init__(self):
         # print("INSIDE IndexTopicData")
         super().__init__(TopicTypes["INDEX"])
-        self.updatedFieldsArray = [None] * 100
         self.multiplier = None
         self.precision = None
         self.precisionValue = None
 
     def setMultiplierAndPrec(self):
-        if self.updatedFieldsArray[INDEX_INDEX["PRECISION"]]:
+        if self.isUpdated(INDEX_INDEX["PRECISION"]):
             self.precision = self.fieldDataArray[INDEX_INDEX["PRECISION"]]
             self.precisionValue = 10 ** self.precision
-        if self.updatedFieldsArray[INDEX_INDEX["MULTIPLIER"]]:
+        if self.isUpdated(INDEX_INDEX["MULTIPLIER"]):
             self.multiplier = self.fieldDataArray[INDEX_INDEX["MULTIPLIER"]]
 
+    def formatPrice(self, val):
+        return round(val / (self.multiplier * self.precisionValue), self.precision)
+
     def prepareData(self, type=None):
         self.prepareCommonData()
-        if self.updatedFieldsArray[INDEX_INDEX["LTP"]] or self.updatedFieldsArray[INDEX_INDEX["CLOSE"]]:
+        if self.isUpdated(INDEX_INDEX["LTP"]) or self.isUpdated(INDEX_INDEX["CLOSE"]):
             ltp = self.fieldDataArray[INDEX_INDEX["LTP"]]
             close = self.fieldDataArray[INDEX_INDEX["CLOSE"]]
             if ltp is not None and close is not None:
                 change = ltp - close
                 self.fieldDataArray[INDEX_INDEX["CHANGE"]] = change
-                self.updatedFieldsArray[INDEX_INDEX["CHANGE"]] = True
                 per_change = round(change / close * 100, self.precision)
                 self.fieldDataArray[INDEX_INDEX["PERCHANGE"]] = per_change
-                self.updatedFieldsArray[INDEX_INDEX["PERCHANGE"]] = True
+                self.updatedFields |= (1 << INDEX_INDEX["CHANGE"]) | (1 << INDEX_INDEX["PERCHANGE"])
+        if self.tick is not None:
+            return self.prepareTick(type)
         # print("\nIndex::" + self.feedType + "|" + self.exchange + "|" + self.symbol)
-        json_res = {}
-        for index in range(len(INDEX_MAPPING)):
-            data_type = INDEX_MAPPING[index]
-            val = self.fieldDataArray[index]
-            if self.updatedFieldsArray[index] and val is not None and data_type is not None:
-                if data_type["type"] == FieldTypes["FLOAT32"]:
-                    val = round(val / (self.multiplier * self.precisionValue), self.precision)
-                elif data_type["type"] == FieldTypes["DATE"]:
-                    val = getFormatDate(val)
-                # print(str(index) + ":" + data_type["name"] + ":" + str(val))
-                json_res[data_type["name"]] = str(val)
-        self.updatedFieldsArray = [None] * 100
+        json_res = format_updated_fields(INDEX_MAPPING, self.fieldDataArray, self.updatedFields, self.formatPrice)
+        self.updatedFields = 0
         if type is not None:
             json_res["request_type"] = type
 
         return json_res
 
 
+add_field_properties(ScripTick, SCRIP_MAPPING)
+add_field_properties(IndexTick, INDEX_MAPPING)
+add_field_properties(DepthTick, DEPTH_MAPPING)
+
+
 class HSWrapper:
-    def __init__(self):
+    def __init__(self, typed_ticks=False):
+        """
+        :param typed_ticks: emit reusable `Tick` records with native, integer-scaled values instead of string
+            valued dicts for SNAP and UPDATE packets
+        """
         self.counter = 0
         self.ack_num = 0
+        self.typed_ticks = typed_ticks
+        # Topics of this connection by topic id, and the socket acknowledgements are sent on
+        self.topic_list = {}
+        self.ws = None
+        # Topics of the previous connection by topic name, until a snapshot of the new connection takes them over
+        self.retained_topics = {}
+
+    def retainTopics(self):
+        """Keep the topics of the closed connection by name: their next SNAP updates them instead of new topics."""
+        self.retained_topics.update(("%s|%s" % (d.feedType, d.getKey()), d) for d in self.topic_list.values())
+        self.topic_list = {}
 
     def getNewTopicData(self, c):
         # print("INPUT ", c)
@@ -840,6 +1031,8 @@ class HSWrapper:
             topic = IndexTopicData()
         elif feed_type == TopicTypes.get("DEPTH"):
             topic = DepthTopicData()
+        if topic and self.typed_ticks:
+            topic.enableTypedTicks()
         return topic
 
     def getStatus(self, c, d):
@@ -855,6 +1048,116 @@ class HSWrapper:
             d += field_length
         return status
 
+    def acknowledge(self, e, pos):
+        """
+        Count a data frame and acknowledge it to the server every `ack_num` frames.
+
+        :param pos: position of the message number, present when the connection asked for acknowledgements
+        :return: position of the packet count
+        """
+        if self.ack_num > 0:
+            self.counter += 1
+            msg_num = INT32.unpack_from(e, pos)[0]
+            pos += 4
+            if self.counter == self.ack_num:
+                req = get_acknowledgement_req(msg_num)
+                if self.ws:
+                    self.ws.send(req, 0x2)
+                    self.counter = 0
+        return pos
+
+    @staticmethod
+    def keepEmitted(h, emitted, d):
+        """
+        Note that topic `d` is about to be decoded into h; when its reused Tick record is already in h, that entry
+        becomes a copy so that it keeps the values of its own packet.
+        """
+        index = emitted.get(d)
+        if index is not None:
+            h[index] = h[index].copy()
+        emitted[d] = len(h)
+
+    def parsePackets(self, view, pos):
+        """
+        Decode the SNAP and UPDATE packets of a data frame.
+
+        :param view: memoryview of the frame
+        :param pos: position of the packet count
+        """
+        h = []
+        timed = REGISTRY.enabled
+        g = UINT16.unpack_from(view, pos)[0]
+        pos += 2
+        # Typed ticks: position in h of each topic's record, which is copied when the topic comes again in the frame
+        emitted = {} if self.typed_ticks and g > 1 else None
+        for n in range(g):
+            pos += 2
+            c = view[pos]
+            pos += 1
+            if c == ResponseTypes.get("SNAP"):
+                f = INT32.unpack_from(view, pos)[0]
+                pos += 4
+                name_len = view[pos]
+                pos += 1
+                topic_name = str(view[pos: pos + name_len], 'latin-1')
+                pos += name_len
+                d = self.retained_topics.pop(topic_name, None) if self.retained_topics else None
+                if d:
+                    d.markAllUpdated()
+                else:
+                    d = self.getNewTopicData(topic_name)
+                if d:
+                    self.topic_list[f] = d
+                    if emitted is not None:
+                        self.keepEmitted(h, emitted, d)
+                    fcount = view[pos]
+                    pos += 1
+                    for index, fvalue in enumerate(long_block(fcount).unpack_from(view, pos)):
+                        d.setLongValues(index, fvalue)
+                    pos += 4 * fcount
+                    d.setMultiplierAndPrec()
+                    fcount = view[pos]
+                    pos += 1
+                    for index in range(fcount):
+                        fid = view[pos]
+                        data_len = view[pos + 1]
+                        pos += 2
+                        d.setStringValues(fid, str(view[pos: pos + data_len], 'latin-1'))
+                        pos += data_len
+                    if timed:
+                        started = time.perf_counter_ns()
+                        h.append(d.prepareData("SNAP"))
+                        REGISTRY.observe("hsm_prepare", d.feedType, time.perf_counter_ns() - started)
+                    else:
+                        h.append(d.prepareData("SNAP"))
+                else:
+                    print("Invalid topic feed type !")
+            else:
+                if c == ResponseTypes.get("UPDATE"):
+                    f = INT32.unpack_from(view, pos)[0]
+                    pos += 4
+                    fcount = view[pos]
+                    pos += 1
+                    d = self.topic_list.get(f)
+                    if not d:
+                        print("Topic Not Available in TopicList!")
+                    else:
+                        if emitted is not None:
+                            self.keepEmitted(h, emitted, d)
+                        # One field at a time: no tuple of every field and no slice of the frame
+                        for index in range(fcount):
+                            d.setLongValues(index, INT32.unpack_from(view, pos + 4 * index)[0])
+                        if timed:
+                            started = time.perf_counter_ns()
+                            h.append(d.prepareData("SUB"))
+                            REGISTRY.observe("hsm_prepare", d.feedType, time.perf_counter_ns() - started)
+                        else:
+                            h.append(d.prepareData("SUB"))
+                    pos += 4 * fcount
+                else:
+                    print("Invalid ResponseType: " + str(c))
+        return h
+
     def parseData(self, e):
         pos = 0
         # print("INTO Parse Data", e)
@@ -918,90 +1221,9 @@ class HSWrapper:
             return send_json_arr_resp(jsonRes)
         else:
             if type == BinRespTypes.get("DATA_TYPE"):
-                # print("IN By Datatype ")
-                # print("IN By self.ack_num ", self.ack_num)
-                msg_num = 0
-                if self.ack_num > 0:
-                    # print("ack_num", self.ack_num)
-                    self.counter += 1
-                    msg_num = buf2long(e[pos: pos + 4])
-                    pos += 4
-                    if self.counter == self.ack_num:
-                        req = get_acknowledgement_req(msg_num)
-                        if ws:
-                            ws.send(req, 0x2)
-                            self.counter = 0
-                        # print("Acknowledgement sent for message num:", msg_num)
-                h = []
-                g = buf2long(e[pos: pos + 2])
-                # print("G in ", g)
-                pos += 2
-                for n in range(g):
-                    pos += 2
-                    c = buf2long(e[pos: pos + 1])
-                    # print("ResponseType:", c)
-                    pos += 1
-                    if c == ResponseTypes.get("SNAP"):
-                        f = buf2long(e[pos: pos + 4])
-                        pos += 4
-                        # print("topic Id:", f)
-                        name_len = buf2long(e[pos: pos + 1])
-                        pos += 1
-                        topic_name = buf2string(e[pos: pos + name_len])
-                        # print("TOPIC Name ", topic_name)
-                        pos += name_len
-                        d = self.getNewTopicData(topic_name)
-                        if d:
-                            topic_list[f] = d
-                            fcount = buf2long(e[pos: pos + 1])
-                            pos += 1
-                            for index in range(fcount):
-                                fvalue = buf2long(e[pos: pos + 4])
-                                d.setLongValues(index, fvalue)
-                                pos += 4
-                            # print("Able to set ")
-                            d.setMultiplierAndPrec()
-                            fcount = buf2long(e[pos: pos + 1])
-                            pos += 1
-                            # print("fcount2:", fcount)
-                            for index in range(fcount):
-                                fid = buf2long(e[pos: pos + 1])
-                                pos += 1
-                                data_len = buf2long(e[pos: pos + 1])
-                                pos += 1
-                                str_val = buf2string(e[pos: pos + data_len])
-                                pos += data_len
-                                d.setStringValues(fid, str_val)
-                                # print(fid, ":", str_val)
-                                # print("index:", index, "fid:",fid, "val:", str_val)
-                            h.append(d.prepareData("SNAP"))
-                        else:
-                            print("Invalid topic feed type !")
-                    else:
-                        if c == ResponseTypes.get("UPDATE"):
-                            # print("updates ......")
-                            f = buf2long(e[pos: pos + 4])
-                            # print("topic Id:", f)
-                            pos += 4
-                            d = topic_list[f]
-                            if not d:
-                                print("Topic Not Available in TopicList!")
-                            else:
-                                # print("INSIDE Else COndition ")
-                                fcount = buf2long(e[pos:pos + 1])
-                                pos += 1
-                                # print("fcount1:", fcount)
-                                for index in range(fcount):
-                                    fvalue = buf2long(e[pos:pos + 4])
-                                    d.setLongValues(index, fvalue)
-                                    # d[index] = fvalue
-                                    # print("index:", index, "val:", fvalue)
-                                    pos += 4
-                            h.append(d.prepareData("SUB"))
-                        else:
-                            print("Invalid ResponseType: " + c)
-                # print("Final resoonse ",h)
-                return h
+                # Fields are read in place with precompiled structs; only topic names and string fields are copied
+                view = memoryview(e)
+                return self.parsePackets(view, self.acknowledge(view, pos))
             else:
                 if type == BinRespTypes.get("SUBSCRIBE_TYPE") or type == BinRespTypes.get("UNSUBSCRIBE_TYPE"):
                     # print("INTO SUBScirbe Condition")
@@ -1087,7 +1309,7 @@ class HSWrapper:
                             pos += 2
                             data = buf2string(e[pos:pos + field_length])
                             pos += field_length
-                            json_res["scrips"] = json.loads(data)["data"]
+                            json_res["scrips"] = codec.loads(data)["data"]
                         elif status == BinRespStat.get("NOT_OK"):
                             json_res["stat"] = STAT.get("NOT_OK")
                             json_res["type"] = RespTypeValues.get("OPC")
@@ -1100,7 +1322,8 @@ class HSWrapper:
 
 
 class StartServer:
-    def __init__(self, a, token, sid, onopen, onmessage, onerror, onclose):
+    def __init__(self, a, token, sid, onopen, onmessage, onerror, onclose, typed_ticks=False, owner=None,
+                 decoder=None):
         self.userSocket = self
         self.a = a
         self.onopen = onopen
@@ -1108,45 +1331,80 @@ class StartServer:
         self.onerror = onerror
         self.onclose = onclose
         self.token, self.sid = token, sid
-        global ws
+        # Optional ParallelDecoder: data frames are decoded by its workers instead of this thread
+        self.decoder = decoder
+        self.owner = owner
+        # Registration of the current connection with the HeartbeatService
+        self.heartbeat = None
+        ws = None
         try:
             # websocket.enableTrace(True)
             ws = websocket.WebSocketApp(a,
                                         on_open=self.on_open,
                                         on_message=self.on_message,
                                         on_error=self.on_error,
-                                        on_close=self.on_close)
+                                        on_close=self.on_close,
+                                        on_pong=self.on_pong)
         except Exception:
             print("WebSocket not supported!")
 
         if ws:
             # print("WS is a array buffer ")
-            self.hsWrapper = HSWrapper()
+            self.hsWrapper = HSWrapper(typed_ticks=typed_ticks)
+            self.hsWrapper.ws = ws
+            # Each HSWebSocket sends on its own connection, so that several sessions can run side by side
+            if owner is not None:
+                owner.ws = ws
+                owner.hsWrapper = self.hsWrapper
             # print("HS WRAPPER IS DONE ")
         else:
             print("WebSocket not initialized!")
 
-        ws.run_forever(ping_interval=0, reconnect=5,sslopt={"cert_reqs": ssl.CERT_NONE})
+        if decoder:
+            decoder.start(onmessage)
+        ws.run_forever(ping_interval=0, ping_timeout=settings.WEBSOCKET_POLL_TIMEOUT,
+                       reconnect=settings.HSM_RECONNECT_DELAY, sslopt={"cert_reqs": ssl.CERT_NONE})
+        if decoder:
+            decoder.close()
 
     def on_open(self, ws):
         # print("[OnOpen]: Function is running in HSWebscoket")
+        self.heartbeat = start_heartbeat(ws, self.heartbeat, "hsm")
         self.onopen()
 
+    def on_pong(self, ws, data):
+        self.heartbeat.beat()
+
     def on_message(self, ws, inData):
         # print("[OnMessage]: Function is running in HSWebsocket")
+        if self.heartbeat is not None:
+            self.heartbeat.beat()
         outData = None
-        if isinstance(inData, bytes):
-            jsonData = self.hsWrapper.parseData(inData)
+        recorder = self.owner.recorder if self.owner is not None else None
+        if recorder:
+            recorder.record(inData)
+        if isinstance(inData, bytes) and self.decoder and inData[2] == BinRespTypes.get("DATA_TYPE"):
+            self.decoder.submit(inData, self.hsWrapper.acknowledge(inData, 3))
+        elif isinstance(inData, bytes):
+            if REGISTRY.enabled:
+                started = time.perf_counter_ns()
+                jsonData = self.hsWrapper.parseData(inData)
+                REGISTRY.observe("hsm_parse", FRAME_NAMES.get(inData[2] if len(inData) > 2 else None, "other"),
+                                 time.perf_counter_ns() - started)
+            else:
+                jsonData = self.hsWrapper.parseData(inData)
             # print("JSON DATA in HSWEBSOCKE ON MESSAGE", jsonData)
             if jsonData:
-                outData = json.dumps(jsonData) if isEncyptOut else jsonData
+                outData = codec.dumps(jsonData) if isEncyptOut else jsonData
         else:
-            outData = inData if not isEncyptIn else json.loads(inData) if isEncyptOut else inData
+            outData = inData if not isEncyptIn else codec.loads(inData) if isEncyptOut else inData
         if outData:
             self.onmessage(outData)
 
     def on_close(self, ws, close_status_code, close_msg):
         # print("[OnClose]: Function is running HSWebsocket", close_status_code)
+        if self.heartbeat is not None:
+            self.heartbeat.cancel()
         if(self.on_close):
             self.onclose()
 
@@ -1155,6 +1413,28 @@ class StartServer:
         # print('ERROR in HSWebscoket', error)
 
 
+def abort_connection(ws):
+    """Shut the socket of WebSocketApp `ws` down without closing the app, so that websocket-client reconnects."""
+    sock = ws.sock
+    if sock is not None and sock.sock is not None:
+        try:
+            sock.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+def start_heartbeat(ws, heartbeat, name):
+    """
+        Register the connection just opened by `ws` with the HeartbeatService, in place of `heartbeat`, the
+        registration of its previous connection: websocket pings every `settings.HEARTBEAT_INTERVAL` seconds, and the
+        connection is aborted, then reconnected, when silent for `settings.HEARTBEAT_TIMEOUT` seconds after a ping.
+    """
+    if heartbeat is not None:
+        heartbeat.cancel()
+    return HEARTBEAT.register(ws.sock.ping, timeout=settings.HEARTBEAT_TIMEOUT,
+                              on_dead=lambda dead: abort_connection(ws), name=name)
+
+
 SCRIP_PREFIX = "sf"
 INDEX_PREFIX = "if"
 DEPTH_PREFIX = "dp"
@@ -1176,17 +1456,24 @@ class HSWebSocket:
         self.onopen = None
         self.onmessage = None
         self.on_error = None
+        self.ws = None
+        self.hsWrapper = None
+        # Optional FeedRecorder receiving every raw frame
+        self.recorder = None
 
-    def open_connection(self, url, token, sid, on_open, on_message, on_error, on_close):
+    def open_connection(self, url, token, sid, on_open, on_message, on_error, on_close, typed_ticks=False,
+                        decoder=None):
         self.url = url
         self.onopen = on_open
         self.onmessage = on_message
         self.on_error = on_error
         self.onclose = on_close
-        StartServer(self.url, token, sid, self.onopen, self.onmessage, self.on_error, self.onclose)
+        StartServer(self.url, token, sid, self.onopen, self.onmessage, self.on_error, self.onclose,
+                    typed_ticks=typed_ticks, owner=self, decoder=decoder)
 
     def hs_send(self, d):
-        req_json = json.loads(d)
+        """Send request `d`, a dict or its JSON text, e.g. {"type": "mws", "scrips": "nse_cm|11536", "channelnum": 1}."""
+        req_json = d if isinstance(d, dict) else codec.loads(d)
         req_type = req_json[Keys.get("TYPE")]
         # print("Req Type", req_type)
         req = {}
@@ -1197,7 +1484,7 @@ class HSWebSocket:
             # print("CHANNEL NUM ", channelnum)
         else:
             scrips = None
-            channelnum = 1
+            channelnum = req_json.get(Keys.get("CHANNEL_NUMS"), 1)
         # scrips = None
         # channelnum = req_json[Keys.get("CHANNEL_NUM")]
         if req_type == ReqTypeValues.get("CONNECTION"):
@@ -1250,13 +1537,14 @@ class HSWebSocket:
             req = prepareThrottlingIntervalRequest(scrips)
         elif req_type == ReqTypeValues.get("LOG"):
             enable_log(req.get('enable'))
-        if ws and req:
-            ws.send(req, 0x2)
+        if self.ws and req:
+            self.ws.send(req, 0x2)
         else:
             print("Unable to send request !, Reason: Connection faulty or request not valid !")
 
     def close(self):
-        ws.close()
+        if self.ws:
+            self.ws.close()
         if self.onclose:
             self.onclose()
 
@@ -1270,6 +1558,7 @@ class StartHSIServer:
         self.onmessage = onmessage
         self.onerror = onerror
         self.onclose = onclose
+        self.heartbeat = None
         # self.token, self.sid = token, sid
         global hsiWs
         try:
@@ -1278,16 +1567,24 @@ class StartHSIServer:
                                            on_open=self.on_open,
                                            on_message=self.on_message,
                                            on_error=self.on_error,
-                                           on_close=self.on_close)
-            hsiWs.run_forever(ping_interval=5,reconnect=5,sslopt={"cert_reqs": ssl.CERT_NONE})
+                                           on_close=self.on_close,
+                                           on_pong=self.on_pong)
+            # Pinged by the HeartbeatService rather than a ping thread of websocket-client
+            hsiWs.run_forever(ping_interval=0, ping_timeout=settings.WEBSOCKET_POLL_TIMEOUT,
+                              reconnect=settings.HSI_RECONNECT_DELAY, sslopt={"cert_reqs": ssl.CERT_NONE})
         except Exception:
             print("WebSocket not supported!")
         
 
     def on_message(self, ws, message):
         # print("Received message:", message)
+        if self.heartbeat is not None:
+            self.heartbeat.beat()
         self.onmessage(message)
 
+    def on_pong(self, ws, data):
+        self.heartbeat.beat()
+
     def on_error(self, ws, error):
         print("Error:", error)
         self.onerror(error)
@@ -1296,6 +1593,8 @@ class StartHSIServer:
         # print("Connection closed")
         self.OPEN = 0
         self.readyState = 0
+        if self.heartbeat is not None:
+            self.heartbeat.cancel()
         if hsiWs:
             hsiWs.close()
         self.onclose()
@@ -1304,6 +1603,7 @@ class StartHSIServer:
         # print("Connection established HSWebSocket")
         self.OPEN = 1
         self.readyState = 1
+        self.heartbeat = start_heartbeat(ws, self.heartbeat, "hsi")
         self.onopen()
 
 
@@ -1330,7 +1630,8 @@ class HSIWebSocket:
         StartHSIServer(self.url, self.onopen, self.onmessage, self.onerror, self.onclose)
 
     def send(self, d):
-        reqJson = json.loads(d)
+        """Send request `d`, a dict or its JSON text, e.g. {"type": "HB"}."""
+        reqJson = d if isinstance(d, dict) else codec.loads(d)
         req = None
         if reqJson['type'] == 'CONNECTION':
             if 'Authorization' in reqJson and 'Sid' in reqJson and 'source' in reqJson:
@@ -1364,7 +1665,7 @@ class HSIWebSocket:
             else:
                 print("Invalid Request !")
         if hsiWs and req:
-            js_obj = json.dumps(req)
+            js_obj = codec.dumps(req)
             js_obj = str(js_obj).replace('"', '').replace(' ', '')
             hsiWs.send(js_obj)
         else:
@@ -1,9 +1,18 @@
+import collections
 import copy
-import json
 import threading
 import time
 
 import neo_api_client
+from neo_api_client import codec
+from neo_api_client import settings
+from neo_api_client.channel_allocator import ChannelAllocator
+from neo_api_client.heartbeat import HEARTBEAT
+from neo_api_client.subscription_registry import SubscriptionRegistry
+from neo_api_client.HSWebSocketLib import MAX_SCRIPS, ControlResponse
+from neo_api_client.instrumentation import REGISTRY
+from neo_api_client.parallel_decoder import ParallelDecoder
+from neo_api_client.reconnect import ReconnectManager
 from neo_api_client.settings import stock_key_mapping, MarketDepthResp, QuotesChannel, \
     ReqTypeValues, index_key_mapping
 from neo_api_client.urls import ORDER_FEED_URL, ORDER_FEED_URL_ADC, \
@@ -14,7 +23,7 @@ from neo_api_client.urls import ORDER_FEED_URL, ORDER_FEED_URL_ADC, \
 
 
 class NeoWebSocket:
-    def __init__(self, sid, token, server_id, data_center):
+    def __init__(self, sid, token, server_id, data_center, typed_ticks=False, decode_workers=0):
         self.hsiWebsocket = None
         self.is_hsi_open = 0
         self.un_sub_token = False
@@ -23,42 +32,72 @@ class NeoWebSocket:
         self.server_id = server_id
         self.is_hsw_open = 0
         self.quotes_arr = []
-        self.sub_list = []
+        # Live feed subscriptions and their channels, placed on the least loaded channel
+        self.channel_allocator = ChannelAllocator()
+        self.subscriptions = SubscriptionRegistry(allocator=self.channel_allocator)
+        # Subscribes again on every connection response and measures the gaps after a reconnect
+        self.reconnect_manager = ReconnectManager(self)
+        # Unsubscribe requests awaiting their 'unsub' response, in the order sent: the tokens to drop from
+        # the registry, or None for a token moved by rebalance_channels
+        self.un_sub_pending = collections.deque()
+        # Held while the registry, the channel allocator or the pending unsubscriptions change: with decode workers
+        # the feed is handled on the collector thread of the ParallelDecoder, the responses on the websocket thread
+        self.subscriptions_lock = threading.RLock()
         self.un_sub_list = []
         self.un_sub_channel_token = {}
         # self.quotes_api_callback = None
         self.hsWebsocket = None
-        self.channel_tokens = {}
         self.live_scrip_type = None
         self.on_message = None
         self.on_error = None
         self.on_close = None
         self.on_open = None
+        # Called with (exchange_segment, instrument_token) once no subscription of the token is left
+        self.on_unsubscribed = None
         self.quotes_index = None
         self.un_sub_list_count = 0
         self.un_sub_channel = None
         self.token_limit_reached = False
         self.hsw_thread = None
         self.hsi_thread = None
+        self.hsi_heartbeat = None
         self.data_center = data_center
-
-    def start_hsi_ping_thread(self):
-        while self.hsiWebsocket and self.is_hsi_open:
-            time.sleep(30)
-            payload = {"type": "HB"}
-            self.hsiWebsocket.send(json.dumps(payload))
-
-    def start_hsm_ping_thread(self):
-        while self.hsWebsocket and self.is_hsw_open:
-            time.sleep(29)
-            payload = {"type": "hb"}
-            self.hsWebsocket.hs_send(json.dumps(payload))
+        self.order_state_cache = None
+        # Live feed messages are lists of HSWebSocketLib.Tick records instead of dicts
+        self.typed_ticks = typed_ticks
+        # Worker processes decoding the live feed (see ParallelDecoder), 0 decodes on the websocket thread
+        self.decode_workers = decode_workers
+        self.decoder = None
+        # FeedRecorder capturing the raw frames of the HSM socket
+        self.recorder = None
+        # Callables receiving every stock feed message (list of ticks), whether or not on_message is set
+        self.feed_listeners = []
+
+    def start_hsi_heartbeat(self):
+        # "HB" messages of the order feed, sent by the HeartbeatService; replaces the one of the previous connection
+        self.stop_hsi_heartbeat()
+        self.hsi_heartbeat = HEARTBEAT.register(lambda: self.hsiWebsocket.send({"type": "HB"}),
+                                                interval=settings.HSI_HEARTBEAT_INTERVAL, name="hsi_hb")
+
+    def stop_hsi_heartbeat(self):
+        heartbeat, self.hsi_heartbeat = self.hsi_heartbeat, None
+        if heartbeat is not None:
+            heartbeat.cancel()
 
     def start_websocket(self):
         self.hsWebsocket = neo_api_client.HSWebSocket()
+        self.hsWebsocket.recorder = self.recorder
+        if self.decode_workers:
+            self.decoder = ParallelDecoder(self.decode_workers, typed_ticks=self.typed_ticks)
         self.hsWebsocket.open_connection(neo_api_client.WEBSOCKET_URL, self.access_token, self.sid,
                                          self.on_hsm_open, self.on_hsm_message,
-                                         self.on_hsm_error, self.on_hsm_close)
+                                         self.on_hsm_error, self.on_hsm_close, typed_ticks=self.typed_ticks,
+                                         decoder=self.decoder)
+
+    def set_recorder(self, recorder):
+        self.recorder = recorder
+        if self.hsWebsocket:
+            self.hsWebsocket.recorder = recorder
 
     def start_websocket_thread(self):
         self.hsw_thread = threading.Thread(target=self.start_websocket)
@@ -67,7 +106,7 @@ class NeoWebSocket:
     def on_hsm_open(self):
         # print("On Open Function in Neo Websocket")
         req_params = {"type": "cn", "Authorization": self.access_token, "Sid": self.sid}
-        self.hsWebsocket.hs_send(json.dumps(req_params))
+        self.hsWebsocket.hs_send(req_params)
         if self.on_open:
             self.on_open()
 
@@ -79,88 +118,109 @@ class NeoWebSocket:
         json_d = {"type": "CONNECTION", "Authorization": self.access_token,
                   "Sid": self.sid,
                   "source": server}
-        json_d = json.dumps(json_d)
         self.hsiWebsocket.send(json_d)
 
         if self.on_open:
             self.on_open()
 
     def on_hsm_message(self, message):
+        if not REGISTRY.enabled:
+            return self.handle_hsm_message(message)
+        started = time.perf_counter_ns()
+        try:
+            self.handle_hsm_message(message)
+        finally:
+            REGISTRY.observe("ws_message", "feed" if type(message) == list else "control",
+                             time.perf_counter_ns() - started)
+
+    def handle_hsm_message(self, message):
         # print("on Message Func in NeoWebsocket", message)
         if message:
-            if type(message) == str:
-                req_type = json.loads(message)[0]["type"]
+            if isinstance(message, str):
+                # Control responses of HSWebSocket carry their decoded form, other text is parsed
+                response = message.data if isinstance(message, ControlResponse) else codec.loads(message)
+                req_type = response[0]["type"]
                 if req_type == 'cn':
                     # print("INSIDE CONNECTION")
                     self.is_hsw_open = 1
-                    # Uncomment this to start HSM ping thread
-                    # And add logic to send binary data to websocket
-                    # threading.Thread(target=self.start_hsm_ping_thread).start()
+                    # The connection is kept alive by the websocket pings of the HeartbeatService
 
                     if len(self.quotes_arr) >= 1:
                         self.call_quotes()
-                    if len(self.sub_list) >= 1:
-                        self.subscribe_scripts(self.channel_tokens)
+                    with self.subscriptions_lock:
+                        self.reconnect_manager.on_connected()
                 if req_type == "unsub":
-                    if len(self.un_sub_channel_token) > 0 and self.un_sub_channel:
-                        # remove from sub_list and sub_token
-                        self.remove_items(self.un_sub_channel_token[self.un_sub_channel])
-                        del self.un_sub_channel_token[self.un_sub_channel]
-                    if len(self.un_sub_channel_token) == 0:
-                        if self.token_limit_reached:
-                            self.sub_list = []
-                            self.channel_tokens = {}
-                            self.un_sub_channel_token = {}
-                    if self.on_message:
+                    migrated = False
+                    with self.subscriptions_lock:
+                        if self.un_sub_pending:
+                            # remove the acknowledged tokens from the subscriptions
+                            un_sub_tokens = self.un_sub_pending.popleft()
+                            migrated = un_sub_tokens is None
+                            if un_sub_tokens:
+                                self.remove_items(un_sub_tokens)
+                                self.subscribe_pending()
+                        if not self.un_sub_pending and not self.un_sub_channel_token:
+                            self.token_limit_reached = False
+                    if self.on_message and not migrated:
                         self.on_message("Un-Subscribed Successfully!")
             elif type(message) == list:
 
                     # print("raw message ",message)
 
                     # print("quotes ",self.quotes_arr)
-                    request_type=message[0].get('request_type')
+                    if self.typed_ticks:
+                        request_type = message[0].request_type
+                    else:
+                        request_type=message[0].get('request_type')
                     if request_type and request_type == "SNAP" and (len(self.quotes_arr) >= 1):
                         
-                        out_list, quote_type = self.quote_response_formatter(message)
+                        quote_items = [item.as_dict() for item in message] if self.typed_ticks else message
+                        out_list, quote_type = self.quote_response_formatter(quote_items)
                         if len(out_list)>0:
                             # print("length greater than 0 ")
                             quote_message = self.response_format(out_list, quote_type=quote_type)
                             if self.on_message:
                                 self.on_message({"type": "quotes", "data": quote_message})
                             self.quotes_arr = []
-                    if len(self.sub_list) >= 1 and self.is_message_for_subscription(message):
+                    if len(self.subscriptions) >= 1 and self.is_message_for_subscription(message):
+                        with self.subscriptions_lock:
+                            self.channel_allocator.observe(message)
+                            self.reconnect_manager.observe(message)
+                            if self.channel_allocator.rebalance_due():
+                                self.rebalance_channels()
+                        for listener in self.feed_listeners:
+                            listener(message)
                         if self.on_message:
                             self.on_message({"type": "stock_feed", "data": message})
                     
                     # If there is no other tokens in quotes_arr and sub_list. disconnect the socket
-                    # print("sublist size ",len(self.sub_list))
-                    if(len(self.sub_list)<=0):
+                    if len(self.subscriptions) <= 0:
                         self.hsWebsocket.close()
 
 
     def is_message_for_subscription(self,message):
-        # print("message ==== ",message)
-        is_for_sub = False
-        keys_in_sublist = list({outer_key for data_dict in self.sub_list for outer_key in data_dict})
-        # print("sublist keys ",keys_in_sublist)
         for item in message:
-            if 'tk' in item:
-                if item['tk'] in keys_in_sublist:
-                    is_for_sub = True
-
-            if is_for_sub:
-                break
-        return is_for_sub
+            if self.typed_ticks:
+                if self.subscriptions.has_token(item.tk):
+                    return True
+            elif 'tk' in item:
+                if self.subscriptions.has_token(item['tk']):
+                    return True
+        return False
         
 
     def on_hsi_message(self, message):
         # print("HSI on message called here")
         if message:
             if isinstance(message, str):
-                req = json.loads(message)
+                req = codec.loads(message)
                 if req["type"] == 'cn':
                     self.is_hsi_open = 1
-                    threading.Thread(target=self.start_hsi_ping_thread).start()
+                    self.start_hsi_heartbeat()
+                    if self.order_state_cache:
+                        self.order_state_cache.on_connected()
+                if self.order_state_cache:
+                    self.order_state_cache.on_order_feed(req)
 
         # print("on message callback, ", self.on_message)
         if self.on_message:
@@ -179,6 +239,9 @@ class NeoWebSocket:
         # print("On Close Function is running!")
         if self.is_hsi_open == 1:
             self.is_hsi_open = 0
+        self.stop_hsi_heartbeat()
+        if self.order_state_cache:
+            self.order_state_cache.on_disconnected()
         if self.on_close:
             self.on_close()
 
@@ -187,7 +250,10 @@ class NeoWebSocket:
             self.is_hsw_open = 0
             # if self.quotes_arr:
             #     self.quotes_api_callback(error)
-        if self.hsWebsocket:
+        if self.reconnect_manager.is_dropped(error):
+            # Left open: websocket-client reconnects, and the subscriptions are restored on 'cn'
+            self.reconnect_manager.on_disconnected()
+        elif self.hsWebsocket:
             self.hsWebsocket.close()
         if self.on_error:
             self.on_error(error)
@@ -199,6 +265,9 @@ class NeoWebSocket:
 
         if self.is_hsi_open == 1:
             self.is_hsi_open = 0
+        self.stop_hsi_heartbeat()
+        if self.order_state_cache:
+            self.order_state_cache.on_disconnected()
 
         if self.on_error:
             self.on_error(error)
@@ -208,24 +277,11 @@ class NeoWebSocket:
 
     def remove_items(self, un_sub_json):
         for unsubscribe_token in un_sub_json:
-            token_value = unsubscribe_token[list(unsubscribe_token.keys())[0]]['instrument_token']
-            segment_value = unsubscribe_token[list(unsubscribe_token.keys())[0]]['exchange_segment']
-            sub_type_value = unsubscribe_token[list(unsubscribe_token.keys())[0]]['subscription_type']
-
-            # self.sub_list = [token for token in self.sub_list if str(list(token.keys())[0]) != str(token_value)]
-            self.sub_list = [token for token in self.sub_list if token != unsubscribe_token]
-
-            for channel_token_list in self.channel_tokens.values():
-                for channel_token_dict in channel_token_list:
-                    for channel_token_key, channel_token_value in channel_token_dict.items():
-
-                        if token_value == channel_token_value['instrument_token'] and segment_value == \
-                                channel_token_value['exchange_segment'] and sub_type_value == \
-                                channel_token_value['subscription_type']:
-                            channel_token_list.remove(channel_token_dict)
-                            break
-
-        return
+            value = list(unsubscribe_token.values())[0]
+            self.subscriptions.remove(self.subscriptions.key(value['exchange_segment'], value['instrument_token'],
+                                                             value['subscription_type']))
+            if self.on_unsubscribed and not self.subscriptions.has_token(value['instrument_token']):
+                self.on_unsubscribed(value['exchange_segment'], value['instrument_token'])
 
     def input_validation(self, instrument_tokens):
         valid_params = ["instrument_token", "exchange_segment"]
@@ -288,7 +344,7 @@ class NeoWebSocket:
                 if quote_type.strip().lower() == 'market_depth':
                     scrip_type = ReqTypeValues.get("SNAP_DP")
         
-        req_params = json.dumps({"type": scrip_type, "scrips": scrips, "channelnum": QuotesChannel})
+        req_params = {"type": scrip_type, "scrips": scrips, "channelnum": QuotesChannel}
         self.hsWebsocket.hs_send(req_params)
 
     def quote_type_validation(self, quote_type):
@@ -300,27 +356,61 @@ class NeoWebSocket:
         return Q_type
 
     def subscribe_scripts(self, channel_tokens):
-        # print("self.channel_tokens.items()", self.channel_tokens)
         for channel, token_list in channel_tokens.items():
-            for tokens in token_list:
-                tokens = list(tokens.values())
-                scrips = self.format_tokens_live(tokens[0])
-                req_params1 = json.dumps(
-                    {"type": tokens[0]["subscription_type"], "scrips": scrips, "channelnum": channel})
+            for token in token_list:
+                scrips = self.format_tokens_live(token)
+                req_params1 = {"type": token["subscription_type"], "scrips": scrips, "channelnum": channel}
                 self.hsWebsocket.hs_send(req_params1)
 
-    def prepare_un_sub(self):
+    def rebalance_channels(self):
+        """
+        Move subscriptions between channels so that their message rates are spread evenly.
+
+        The source channels are paused while every moved token is unsubscribed there, then subscribed on its new
+        channel, and resumed. Unsubscribing them all first keeps a full channel within its capacity when one of its
+        tokens is swapped with a token of another channel. Runs under `subscriptions_lock`.
+
+        :return: list of (key, from_channel, to_channel) moves applied
+        """
+        with self.subscriptions_lock:
+            self.channel_allocator.last_rebalance = self.channel_allocator.clock()
+            if not (self.hsWebsocket and self.is_hsw_open == 1):
+                return []
+            moves = self.channel_allocator.plan_rebalance(self.subscriptions)
+            if not moves:
+                return moves
+            sources = list(dict.fromkeys(source for _, source, _ in moves))
+            self.hsWebsocket.hs_send({"type": ReqTypeValues.get("CHANNEL_PAUSE"), "channelnums": sources})
+            requests = []
+            for key, source, target in moves:
+                entry = self.subscriptions.get(key)
+                scrips = self.format_tokens_live(entry)
+                self.un_sub_pending.append(None)
+                self.hsWebsocket.hs_send(
+                    {"type": entry["subscription_type"].replace('s', 'u'), "scrips": scrips, "channelnum": source})
+                requests.append((key, {"type": entry["subscription_type"], "scrips": scrips, "channelnum": target}))
+            for key, request in requests:
+                self.subscriptions.move(key, request["channelnum"])
+                self.hsWebsocket.hs_send(request)
+            self.hsWebsocket.hs_send({"type": ReqTypeValues.get("CHANNEL_RESUME"), "channelnums": sources})
+            return moves
+
+    def prepare_un_sub(self, keep=()):
         # print("IN Prepare UNSUB")
-        for key, value in self.channel_tokens.items():
+        for key, value in self.subscriptions.channel_map().items():
             # Loop through each item in the value list
             for item in value:
+                if self.subscriptions.key(item["exchange_segment"], item["instrument_token"],
+                                          item["subscription_type"]) in keep:
+                    # Asked for again, so it stays subscribed
+                    continue
                 # Extract the subscription_type from the item
-                subscription_type = list(item.values())[0]["subscription_type"]
+                subscription_type = item["subscription_type"]
                 subscription_type = subscription_type.replace('s', 'u')
                 # Create a new key by appending the subscription_type to the original key
                 new_key = f"{key}-{subscription_type}"
                 # Create a list to store the items as the value
-                new_value = [{list(item.values())[0]["instrument_token"]: list(item.values())[0]}]
+                new_value = [{item["instrument_token"]: item}]
                 # Add the item to the new_value list
                 # Add the new key-value pair to un_sub_channel_token
                 if new_key in self.un_sub_channel_token:
@@ -330,54 +420,74 @@ class NeoWebSocket:
 
 
     def get_live_feed(self, instrument_tokens, isIndex, isDepth):
-        if len(self.sub_list) + len(instrument_tokens) > 3000:
-            self.token_limit_reached = True
-            self.prepare_un_sub()
-            self.un_subscription()
-
-        tmp_token_list = []
+        """
+        Subscribe `instrument_tokens`. Past the 3,000 subscription limit every other subscription is unsubscribed
+        first, and the new tokens that then have no free channel are subscribed as the unsubscriptions are
+        acknowledged. Tokens beyond the limit even then are not subscribed: on_error is called and
+        {"Error": message, "instrument_tokens": [their subscriptions]} returned.
+        """
+        new_keys = []
         subscription_type = ReqTypeValues.get("SCRIP_SUBS")
         if isIndex:
             subscription_type = ReqTypeValues.get("INDEX_SUBS")
         if isDepth:
             subscription_type = ReqTypeValues.get("DEPTH_SUBS")
 
-        if self.input_validation(instrument_tokens):
-            for item in instrument_tokens:
-                key = item['instrument_token']
-                value = {'instrument_token': item['instrument_token'],
-                         'exchange_segment': item['exchange_segment'],
-                         'subscription_type': subscription_type}
-                if 'subscription_type' not in item:
-                    item['subscription_type'] = subscription_type
-                # if key not in [list(x.keys())[0] for x in self.sub_list]:
-                if {key: value} not in self.sub_list:
-                    self.sub_list.append({key: value})
-                    tmp_token_list.append({key: value})
-                # else:
-                #     index = [list(x.keys())[0] for x in self.sub_list].index(key)
-                #     print("index, key === ", index, key)
-                #     print("sub list item === ", self.sub_list[index][key], item)
-                #     if self.sub_list[index][key]['exchange_segment'] != item['exchange_segment'] or \
-                #             self.sub_list[index][key]['subscription_type'] != item['subscription_type']:
-                #         self.sub_list.append({key: value})
-                #         tmp_token_list.append({key: value})
-                #         print("here 2")
-                #
-                #     else:
-                #         self.sub_list[index][key].update(value)
-                #         print("here 3 ")
-
-            channel_tokens = self.channel_segregation(tmp_token_list)
+        with self.subscriptions_lock:
+            if len(self.subscriptions) + len(instrument_tokens) > self.subscriptions.capacity:
+                self.token_limit_reached = True
+                self.prepare_un_sub({self.subscriptions.key(item.get('exchange_segment'), item.get('instrument_token'),
+                                                            subscription_type) for item in instrument_tokens})
+                self.un_subscription()
+
+            if self.input_validation(instrument_tokens):
+                for item in instrument_tokens:
+                    if 'subscription_type' not in item:
+                        item['subscription_type'] = subscription_type
+                    key = self.subscriptions.add(item['exchange_segment'], item['instrument_token'], subscription_type)
+                    if key is not None:
+                        new_keys.append(key)
+
+                channel_tokens = self.subscriptions.allocate(new_keys)
+                if self.hsWebsocket and self.is_hsw_open == 1:
+                    self.subscribe_scripts(channel_tokens)
+
+                elif not (self.hsw_thread and self.hsw_thread.is_alive()):
+                    # Tokens added while the connection is being set up are subscribed on 'cn'
+                    self.start_websocket_thread()
+
+                rejected = self.reject_overflow()
+                if rejected:
+                    error = "Subscription limit of %d tokens reached, %d tokens not subscribed" % (
+                        self.subscriptions.capacity, len(rejected))
+                    if self.on_error:
+                        self.on_error(Exception(error))
+                    return {"Error": error, "instrument_tokens": rejected}
+
+            else:
+                if self.on_error:
+                    self.on_error(Exception("Invalid Inputs"))
+
+    def subscribe_pending(self):
+        """Subscribe the tokens that found no free channel, once unsubscriptions have freed some."""
+        pending = self.subscriptions.pending()
+        if pending:
+            channel_tokens = self.subscriptions.allocate(pending)
             if self.hsWebsocket and self.is_hsw_open == 1:
                 self.subscribe_scripts(channel_tokens)
 
-            else:
-                self.start_websocket_thread()
+    def reject_overflow(self):
+        """
+        Drop the newest subscriptions that will find no channel even once every unsubscription sent is acknowledged.
 
-        else:
-            if self.on_error:
-                self.on_error(Exception("Invalid Inputs"))
+        :return: their entries
+        """
+        releasing = sum(len(chunk) for chunk in self.un_sub_pending if chunk)
+        overflow = len(self.subscriptions) - releasing - self.subscriptions.capacity
+        if overflow <= 0:
+            return []
+        pending = self.subscriptions.pending()
+        return [self.subscriptions.remove(key) for key in pending[len(pending) - overflow:]]
 
     def append_ohlc_data(self, new_dict):
         new_dict["ohlc"] = {}
@@ -533,45 +643,18 @@ class NeoWebSocket:
                 out_resp = self.quote_resp_mapper(response_data, quote_type)
         return out_resp
 
-    def channel_segregation(self, tmp_token_list):
-        # print("****** tmp_token_list", tmp_token_list)
-        out_channel_list = {}
-        for channel_num in range(2, 17):
-            # Check if there is an existing channel array for this channel number
-            if channel_num not in self.channel_tokens:
-                self.channel_tokens[channel_num] = []
-            if channel_num not in out_channel_list:
-                out_channel_list[channel_num] = []
-
-            # Check if there is space to add all the input JSON objects to this channel
-            if len(self.channel_tokens[channel_num]) + len(tmp_token_list) <= 200:
-                # Add all the input JSON objects to this channel
-                self.channel_tokens[channel_num].extend(tmp_token_list)
-                if out_channel_list[channel_num]:
-                    out_channel_list[channel_num].extend(tmp_token_list)
-                else:
-                    out_channel_list[channel_num] = tmp_token_list
-                # Exit the loop since all objects have been added to a channel
-                break
-
-            # Otherwise, add as many input JSON objects as possible to this channel
-            num_to_add = 200 - len(self.channel_tokens[channel_num])
-            self.channel_tokens[channel_num].extend(tmp_token_list[:num_to_add])
-            out_channel_list[channel_num].extend(tmp_token_list[:num_to_add])
-            # Remove the added objects from the input array
-            tmp_token_list = tmp_token_list[num_to_add:]
-
-        return out_channel_list
-
     def un_subscription(self):
-        for channels, token_list in self.un_sub_channel_token.items():
-            tokens_list = [list(tokens.values())[0] for tokens in token_list]
-            scrips = self.format_un_sub_list(tokens_list)
-            self.un_sub_channel = channels
+        # A request carries at most MAX_SCRIPS scrips; every request sent is answered by one 'unsub' response
+        while self.un_sub_channel_token:
+            channels, token_list = self.un_sub_channel_token.popitem()
             channel, sub_type = channels.split('-')
-            req_params1 = json.dumps(
-                {"type": sub_type, "scrips": scrips, "channelnum": channel})
-            self.hsWebsocket.hs_send(req_params1)
+            for start in range(0, len(token_list), MAX_SCRIPS):
+                chunk = token_list[start:start + MAX_SCRIPS]
+                scrips = self.format_un_sub_list([list(tokens.values())[0] for tokens in chunk])
+                self.un_sub_channel = channels
+                self.un_sub_pending.append(chunk)
+                req_params1 = {"type": sub_type, "scrips": scrips, "channelnum": channel}
+                self.hsWebsocket.hs_send(req_params1)
 
     def un_subscribe_list(self, instrument_tokens, isIndex=False, isDepth=False):
         # print("INTO UNSUBSCRIBE", instrument_tokens)
@@ -584,34 +667,26 @@ class NeoWebSocket:
             un_subscription_type = ReqTypeValues.get("DEPTH_UNSUBS")
             subscription_type = ReqTypeValues.get("DEPTH_SUBS")
 
-        if self.input_validation(instrument_tokens):
-            extracted_tokens = [{'instrument_token': item[key]['instrument_token'],
-                                 'exchange_segment': item[key]['exchange_segment'],
-                                 'subscription_type': item[key]['subscription_type']}
-                                for item in self.sub_list for key in item]
-
-            for token in instrument_tokens:
-                token["subscription_type"] = subscription_type
-                if token in extracted_tokens:
-                    for key, value in self.channel_tokens.items():
-                        for obj in value:
-                            if list(obj.values())[0] == token:
-                                in_key = token['instrument_token']
-                                value = {'instrument_token': token['instrument_token'],
-                                         'exchange_segment': token['exchange_segment'],
-                                         'subscription_type': subscription_type}
-                                key = str(key) + '-' + un_subscription_type
-                                if key not in self.un_sub_channel_token:
-                                    self.un_sub_channel_token[key] = []
-                                self.un_sub_channel_token[key].append({in_key: value})
+        with self.subscriptions_lock:
+            if self.input_validation(instrument_tokens):
+                for token in instrument_tokens:
+                    token["subscription_type"] = subscription_type
+                    key = self.subscriptions.key(token['exchange_segment'], token['instrument_token'],
+                                                 subscription_type)
+                    channel = self.subscriptions.channel_of(key)
+                    if channel is not None:
+                        un_sub_key = str(channel) + '-' + un_subscription_type
+                        if un_sub_key not in self.un_sub_channel_token:
+                            self.un_sub_channel_token[un_sub_key] = []
+                        self.un_sub_channel_token[un_sub_key].append(
+                            {token['instrument_token']: self.subscriptions.get(key)})
+                    else:
+                        print("The Given Token is not in Subscription list")
+                if self.hsWebsocket and self.is_hsw_open == 1:
+                    self.un_subscription()
 
                 else:
-                    print("The Given Token is not in Subscription list")
-            if self.hsWebsocket and self.is_hsw_open == 1:
-                self.un_subscription()
-
-            else:
-                print("Socket Connection has been closed, So! The scripts are already un-subscribed!")
+                    print("Socket Connection has been closed, So! The scripts are already un-subscribed!")
 
             # else:
             #     self.un_sub_token = True
@@ -10,6 +10,7 @@ from neo_api_client.exceptions import ApiException
 
 from neo_api_client.api.login_api import LoginAPI
 from neo_api_client.api.order_api import OrderAPI
+from neo_api_client.api.batch_order_api import BatchOrderAPI
 from neo_api_client.api.order_history_api import OrderHistoryAPI
 from neo_api_client.api.trade_report_api import TradeReportAPI
 from neo_api_client.api.order_report_api import OrderReportAPI
@@ -22,12 +23,25 @@ from neo_api_client.api.limits_api import LimitsAPI
 from neo_api_client.api.logout_api import LogoutAPI
 from .settings import stock_key_mapping
 from neo_api_client.NeoWebSocket import NeoWebSocket
+from neo_api_client.order_state_cache import OrderStateCache
+from neo_api_client.tick_store import TickStore
+from neo_api_client.order_book import OrderBook, OrderBooks
+from neo_api_client.bars import BarEngine, BarSeries
 from neo_api_client.HSWebSocketLib import HSWebSocket
+from neo_api_client.feed_pool import FeedPool
+from neo_api_client.event_dispatcher import EventDispatcher
+from neo_api_client.conflation import Conflater
+from neo_api_client.feed_recorder import FeedRecorder, FeedReader, FeedReplayServer
+from neo_api_client.instrumentation import Instrumentation, REGISTRY
+from neo_api_client.reconnect import ReconnectManager
+from neo_api_client.heartbeat import HeartbeatService, HEARTBEAT
 from neo_api_client.HSWebSocketLib import HSIWebSocket
 from neo_api_client.urls import (WEBSOCKET_URL, PROD_BASE_URL, SESSION_PROD_BASE_URL, SESSION_UAT_BASE_URL, UAT_BASE_URL,
                                  SESSION_PROD_BASE_URL_ADC, PROD_BASE_URL_ADC)
 from neo_api_client.neo_api import NeoAPI
+from neo_api_client.async_neo_api import AsyncNeoAPI
 from neo_api_client.api.modify_order_api import ModifyOrder
 from neo_api_client.api.scrip_search import ScripSearch
 from neo_api_client.api.totp_api import TotpAPI
 from neo_api_client.api.quotes_neo_symbol_api import QuotesAPI
+from neo_api_client.quotes_engine import QuotesEngine
@@ -2,6 +2,7 @@ from __future__ import absolute_import
 
 from neo_api_client.api.login_api import LoginAPI
 from neo_api_client.api.order_api import OrderAPI
+from neo_api_client.api.batch_order_api import BatchOrderAPI
 from neo_api_client.api.order_report_api import OrderReportAPI
 from neo_api_client.api.order_history_api import OrderHistoryAPI
 from neo_api_client.api.trade_report_api import TradeReportAPI
@@ -0,0 +1,44 @@
+import time
+
+import neo_api_client
+from neo_api_client.concurrent_dispatch import dispatch
+
+
+class BatchOrderAPI(object):
+    def __init__(self, api_client):
+        self.api_client = api_client
+        self.rest_client = api_client.rest_client
+
+    def _max_workers(self, max_workers):
+        # One worker per pooled connection keeps every in-flight leg on a warm socket
+        return max_workers or self.api_client.configuration.pool_maxsize
+
+    def place_orders(self, order_legs, max_workers=None):
+        order_api = neo_api_client.OrderAPI(self.api_client)
+        start = time.perf_counter()
+        legs = dispatch(lambda leg: order_api.order_placing(**leg), order_legs, self._max_workers(max_workers))
+        return {"data": legs, "elapsed_ms": (time.perf_counter() - start) * 1000}
+
+    def cancel_orders(self, order_ids, amo=None, isVerify=False, max_workers=None):
+        start = time.perf_counter()
+        closed_orders = {}
+        if isVerify:
+            # A single order book fetch replaces the per-order lookup done by OrderAPI.order_cancelling
+            order_book_resp = neo_api_client.OrderReportAPI(self.api_client).ordered_books()
+            if order_book_resp and "data" in order_book_resp:
+                wanted = {order_id.strip() for order_id in order_ids}
+                for item in order_book_resp["data"]:
+                    if item["nOrdNo"] in wanted and item["ordSt"] in ["rejected", "cancelled", "complete", "traded"]:
+                        status = 'Traded' if item["ordSt"] == 'complete' else item["ordSt"]
+                        closed_orders[item["nOrdNo"]] = {"Error": "The Given Order Status is " + str(status),
+                                                         "Reason": item["rejRsn"]}
+
+        order_api = neo_api_client.OrderAPI(self.api_client)
+
+        def cancel(order_id):
+            if order_id.strip() in closed_orders:
+                return closed_orders[order_id.strip()]
+            return order_api.order_cancelling(order_id=order_id, isVerify=False, amo=amo)
+
+        legs = dispatch(cancel, order_ids, self._max_workers(max_workers))
+        return {"data": legs, "elapsed_ms": (time.perf_counter() - start) * 1000}
@@ -1,4 +1,6 @@
 from neo_api_client.exceptions import ApiException
+from neo_api_client.instrumentation import REGISTRY
+from neo_api_client import codec
 
 
 class LimitsAPI(object):
@@ -6,6 +8,7 @@ class LimitsAPI(object):
         self.api_client = api_client
         self.rest_client = api_client.rest_client
 
+    @REGISTRY.timed("api_call", "limits")
     def limit_init(self, segment=None, exchange=None, product=None):
         header_params = {
             "Sid": self.api_client.configuration.edit_sid,
@@ -23,8 +26,9 @@ class LimitsAPI(object):
                 url=URL, method='POST',
                 query_params=query_params,
                 headers=header_params,
-                body=body_params
+                body=body_params,
+                endpoint="limits"
             )
-            return limits_report.json()
+            return codec.response_json(limits_report)
         except ApiException as ex:
             return {"error": ex}
@@ -1,4 +1,6 @@
 import json
+from neo_api_client.instrumentation import REGISTRY
+from neo_api_client import codec
 
 
 class LoginAPI(object):
@@ -8,6 +10,7 @@ class LoginAPI(object):
         self.base64_token = api_client.configuration.base64_token
         self.rest_client = api_client.rest_client
 
+    @REGISTRY.timed("api_call", "login")
     def session_init(self):
         """
         Initialize a session by sending a POST request to the specified URL with OAuth2 token.
@@ -32,7 +35,7 @@ class LoginAPI(object):
             body=body_params
         )
         if session_init.ok:
-            json_resp = json.loads(session_init.text)
+            json_resp = codec.loads(session_init.content)
             self.api_client.configuration.bearer_token = json_resp.get("access_token")
             return json_resp
         else:
@@ -1,4 +1,5 @@
 from neo_api_client.exceptions import ApiException
+from neo_api_client.instrumentation import REGISTRY
 
 
 class LogoutAPI(object):
@@ -6,6 +7,7 @@ class LogoutAPI(object):
         self.api_client = api_client
         self.rest_client = api_client.rest_client
 
+    @REGISTRY.timed("api_call", "logout")
     def logging_out(self):
         header_params = {
             "Authorization": "Bearer " + self.api_client.configuration.bearer_token,
@@ -20,7 +22,8 @@ class LogoutAPI(object):
         try:
             logout_report = self.rest_client.request(
                 url=URL, method='POST',
-                headers=header_params
+                headers=header_params,
+                endpoint="logout"
             )
             return {"data": logout_report.text}
         except ApiException as ex:
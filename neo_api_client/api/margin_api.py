@@ -1,5 +1,6 @@
-import json
 from neo_api_client.exceptions import ApiException
+from neo_api_client.instrumentation import REGISTRY
+from neo_api_client import codec
 
 
 class MarginAPI(object):
@@ -7,6 +8,7 @@ class MarginAPI(object):
         self.api_client = api_client
         self.rest_client = api_client.rest_client
 
+    @REGISTRY.timed("api_call", "margin")
     def margin_init(self, exchange_segment, price, order_type, product, quantity, instrument_token, transaction_type,
                     trigger_price, broker_name, branch_id, stop_loss_type, stop_loss_value,
                     square_off_type, square_off_value, trailing_stop_loss, trailing_sl_value):
@@ -44,10 +46,11 @@ class MarginAPI(object):
                 url=URL, method='POST',
                 query_params=query_params,
                 headers=header_params,
-                body=body_params
+                body=body_params,
+                endpoint="margin"
             )
 
-            return {"data": json.loads(margin_resp.text)}
+            return {"data": codec.loads(margin_resp.content)}
 
         except ApiException as ex:
             return {"error": ex}
@@ -1,6 +1,8 @@
 import neo_api_client
 from neo_api_client.exceptions import ApiException
 from neo_api_client.settings import ORDER_SOURCE
+from neo_api_client.instrumentation import REGISTRY
+from neo_api_client import codec
 
 
 class ModifyOrder(object):
@@ -9,6 +11,7 @@ class ModifyOrder(object):
         self.rest_client = api_client.rest_client
         self.order_source = ORDER_SOURCE
 
+    @REGISTRY.timed("api_call", "modify_order")
     def quick_modification(self, order_id, price, order_type, quantity, validity, instrument_token,
                            exchange_segment, product, trading_symbol, transaction_type, trigger_price,
                            dd, market_protection, disclosed_quantity, filled_quantity, amo):
@@ -31,14 +34,16 @@ class ModifyOrder(object):
                 url=URL, method='POST',
                 query_params=query_params,
                 headers=header_params,
-                body=body_params
+                body=body_params,
+                endpoint="modify_order"
             )
 
-            return orders_resp.json()
+            return codec.response_json(orders_resp)
 
         except ApiException as ex:
             return {"error": ex}
 
+    @REGISTRY.timed("api_call", "modify_order")
     def modification_with_orderid(self, order_id, price, order_type, quantity, validity, instrument_token,
                                   exchange_segment, product, trading_symbol, transaction_type, trigger_price,
                                   dd, market_protection, disclosed_quantity, filled_quantity, amo):
@@ -97,9 +102,10 @@ class ModifyOrder(object):
                                 url=URL, method='POST',
                                 query_params=query_params,
                                 headers=header_params,
-                                body=body_params
+                                body=body_params,
+                                endpoint="modify_order"
                             )
-                            return orders_resp.json()
+                            return codec.response_json(orders_resp)
 
                         except ApiException as ex:
                             return {"error": ex}
@@ -1,6 +1,8 @@
 import neo_api_client
 from neo_api_client.exceptions import ApiException
 from neo_api_client.settings import ORDER_SOURCE
+from neo_api_client.instrumentation import REGISTRY
+from neo_api_client import codec
 
 
 class OrderAPI(object):
@@ -9,6 +11,7 @@ class OrderAPI(object):
         self.rest_client = api_client.rest_client
         self.order_source = ORDER_SOURCE
 
+    @REGISTRY.timed("api_call", "place_order")
     def order_placing(
             self,
             exchange_segment,
@@ -73,13 +76,15 @@ class OrderAPI(object):
                 url=URL, method='POST',
                 query_params=query_params,
                 headers=header_params,
-                body=body_params
+                body=body_params,
+                endpoint="place_order"
             )
 
-            return orders_resp.json()
+            return codec.response_json(orders_resp)
         except ApiException as ex:
             return {"error": ex}
 
+    @REGISTRY.timed("api_call", "cancel_order")
     def order_cancelling(self, order_id, isVerify, amo=None):
         if isVerify:
             order_book_resp = neo_api_client.OrderReportAPI(self.api_client).ordered_books()
@@ -106,12 +111,14 @@ class OrderAPI(object):
                 url=URL, method='POST',
                 query_params=query_params,
                 headers=header_params,
-                body=body_params
+                body=body_params,
+                endpoint="cancel_order"
             )
-            return cancel_resp.json()
+            return codec.response_json(cancel_resp)
         except ApiException as ex:
             return {"error": ex}
 
+    @REGISTRY.timed("api_call", "cancel_cover_order")
     def cover_order_cancelling(self, order_id, isVerify, amo=None):
         if isVerify:
             order_book_resp = neo_api_client.OrderReportAPI(self.api_client).ordered_books()
@@ -139,12 +146,14 @@ class OrderAPI(object):
                 url=URL, method='POST',
                 query_params=query_params,
                 headers=header_params,
-                body=body_params
+                body=body_params,
+                endpoint="cancel_cover_order"
             )
-            return cancel_resp.json()
+            return codec.response_json(cancel_resp)
         except ApiException as ex:
             return {"error": ex}
 
+    @REGISTRY.timed("api_call", "cancel_bracket_order")
     def bracket_order_cancelling(self, order_id, isVerify, amo=None):
         if isVerify:
             order_book_resp = neo_api_client.OrderReportAPI(self.api_client).ordered_books()
@@ -171,9 +180,10 @@ class OrderAPI(object):
                 url=URL, method='POST',
                 query_params=query_params,
                 headers=header_params,
-                body=body_params
+                body=body_params,
+                endpoint="cancel_bracket_order"
             )
-            return cancel_resp.json()
+            return codec.response_json(cancel_resp)
         except ApiException as ex:
             return {"error": ex}
 
@@ -1,6 +1,6 @@
-import json
-
 from neo_api_client.exceptions import ApiException
+from neo_api_client.instrumentation import REGISTRY
+from neo_api_client import codec
 
 
 class OrderHistoryAPI(object):
@@ -8,6 +8,7 @@ class OrderHistoryAPI(object):
         self.api_client = api_client
         self.rest_client = api_client.rest_client
 
+    @REGISTRY.timed("api_call", "order_history")
     def ordered_history(self, order_id):
         header_params = {
             "Sid": self.api_client.configuration.edit_sid,
@@ -23,8 +24,9 @@ class OrderHistoryAPI(object):
                 url=URL, method='POST',
                 query_params=query_params,
                 headers=header_params,
-                body=body_params
+                body=body_params,
+                endpoint="order_history"
             )
-            return {"data": json.loads(history_report.text)}
+            return {"data": codec.loads(history_report.content)}
         except ApiException as ex:
             return {"error": ex}
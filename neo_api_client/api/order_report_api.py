@@ -1,4 +1,6 @@
 import requests
+from neo_api_client.instrumentation import REGISTRY
+from neo_api_client import codec
 
 
 class OrderReportAPI(object):
@@ -6,6 +8,7 @@ class OrderReportAPI(object):
         self.api_client = api_client
         self.rest_client = api_client.rest_client
 
+    @REGISTRY.timed("api_call", "order_book")
     def ordered_books(self):
         header_params = {
             "Sid": self.api_client.configuration.edit_sid,
@@ -20,9 +23,10 @@ class OrderReportAPI(object):
             order_report = self.rest_client.request(
                 url=URL, method='GET',
                 query_params=query_params,
-                headers=header_params
+                headers=header_params,
+                endpoint="order_book"
             )
-            return order_report.json()
+            return codec.response_json(order_report)
         except requests.exceptions.RequestException as e:
             # handle any exceptions that might be raised here
             print(f"Error occurred: {e}")
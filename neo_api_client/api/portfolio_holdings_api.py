@@ -1,4 +1,6 @@
 import requests
+from neo_api_client.instrumentation import REGISTRY
+from neo_api_client import codec
 
 
 class PortfolioAPI(object):
@@ -6,6 +8,7 @@ class PortfolioAPI(object):
         self.api_client = api_client
         self.rest_client = api_client.rest_client
 
+    @REGISTRY.timed("api_call", "holdings")
     def portfolio_holdings(self):
         header_params = {
             "Sid": self.api_client.configuration.edit_sid,
@@ -19,9 +22,10 @@ class PortfolioAPI(object):
             portfolio_report = self.rest_client.request(
                 url=URL, method='GET',
                 query_params=params,
-                headers=header_params
+                headers=header_params,
+                endpoint="holdings"
             )
-            return portfolio_report.json()
+            return codec.response_json(portfolio_report)
         except requests.exceptions.RequestException as e:
             # handle any exceptions that might be raised here
             print(f"Error occurred: {e}")
@@ -1,4 +1,6 @@
 import requests
+from neo_api_client.instrumentation import REGISTRY
+from neo_api_client import codec
 
 
 class PositionsAPI(object):
@@ -6,6 +8,7 @@ class PositionsAPI(object):
         self.api_client = api_client
         self.rest_client = api_client.rest_client
 
+    @REGISTRY.timed("api_call", "positions")
     def position_init(self):
         header_params = {
             "Sid": self.api_client.configuration.edit_sid,
@@ -19,9 +22,10 @@ class PositionsAPI(object):
             position_report = self.rest_client.request(
                 url=URL, method='GET',
                 query_params=query_params,
-                headers=header_params
+                headers=header_params,
+                endpoint="positions"
             )
-            return position_report.json()
+            return codec.response_json(position_report)
         except requests.exceptions.RequestException as e:
             # handle any exceptions that might be raised here
             print(f"Error occurred: {e}")
@@ -1,5 +1,7 @@
 import urllib.parse
 from json import JSONDecodeError
+from neo_api_client.instrumentation import REGISTRY
+from neo_api_client import codec
 
 
 class QuotesAPI(object):
@@ -8,6 +10,7 @@ class QuotesAPI(object):
         self.api_client = api_client
         self.rest_client = api_client.rest_client
 
+    @REGISTRY.timed("api_call", "quotes_neo_symbol")
     def get_quotes(self, instrument_tokens=None, quote_type=None):
         if not quote_type:
             quote_type = 'all'
@@ -22,10 +25,11 @@ class QuotesAPI(object):
         URL = URL.format(neo_symbols=encoded_neo_symbol_str, quote_type=quote_type)
         quotes = self.rest_client.request(
             url=URL, method='GET',
-            headers=header_params
+            headers=header_params,
+            endpoint="quotes_neo_symbol"
         )
         try:
-            quotes_data = quotes.json()
+            quotes_data = codec.response_json(quotes)
         except JSONDecodeError:
             return {
                 "Error": "Unexpected response format. Expected JSON but received something else."
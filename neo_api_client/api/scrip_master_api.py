@@ -1,6 +1,8 @@
 from neo_api_client import rest
 from neo_api_client import settings
 from neo_api_client.exceptions import ApiException
+from neo_api_client.instrumentation import REGISTRY
+from neo_api_client import codec
 
 
 class ScripMasterAPI(object):
@@ -8,6 +10,7 @@ class ScripMasterAPI(object):
         self.api_client = api_client
         self.rest_client = api_client.rest_client
 
+    @REGISTRY.timed("api_call", "scrip_master")
     def scrip_master_init(self, exchange_segment=None):
 
         header_params = {
@@ -18,10 +21,11 @@ class ScripMasterAPI(object):
         URL = self.api_client.configuration.get_url_details("scrip_master")
 
         try:
-            scrip_report = self.rest_client.request(url=URL, method='GET', headers=header_params)
+            scrip_report = self.rest_client.request(url=URL, method='GET', headers=header_params,
+                                                    endpoint="scrip_master")
             if scrip_report.status_code != 200:
-                return scrip_report.json()
-            scrip_report = scrip_report.json()["data"]
+                return codec.response_json(scrip_report)
+            scrip_report = codec.response_json(scrip_report)["data"]
 
             if exchange_segment:
                 exchange_segment = settings.exchange_segment[exchange_segment]
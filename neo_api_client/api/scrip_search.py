@@ -1,11 +1,17 @@
-import io
-import json
+import datetime
 
-import requests
 from neo_api_client.exceptions import ApiException
 import pandas as pd
 
 
+def parse_expiry(expiry):
+    """Date of an expiry like 28JUN2023, or in any other format pandas reads."""
+    try:
+        return datetime.datetime.strptime(expiry, '%d%b%Y')
+    except ValueError:
+        return pd.to_datetime(expiry)
+
+
 class ScripSearch(object):
     def __init__(self, api_client):
         self.api_client = api_client
@@ -14,57 +20,17 @@ class ScripSearch(object):
     def scrip_search(self, symbol, exchange_segment, expiry, option_type, strike_price,
                      ignore_50multiple):
 
-        header_params = {
-            "Authorization": self.api_client.configuration.consumer_key,
-            "Content-Type": "application/x-www-form-urlencoded",
-        }
-
-        URL = self.api_client.configuration.get_url_details("scrip_master")
-
         try:
-            scrip_report = self.rest_client.request(
-                url=URL, method='GET',
-                headers=header_params
-            )
-            if scrip_report.status_code != 200:
-                return scrip_report.json()
-
-            data = scrip_report.json()["data"]
             if exchange_segment is not None:
-                exchange_segment_csv = [file for file in data["filesPaths"] if exchange_segment.lower() in file.lower()]
-                response = requests.get(exchange_segment_csv[0])
-                csv_text = response.text
-                df = pd.read_csv(io.StringIO(csv_text))
-                df = df.rename(columns=lambda x: x.strip())
                 if expiry and strike_price and not exchange_segment.endswith('fo') and exchange_segment != 'mcx':
                     return {'error': [
                         {'code': '10300', 'message': "The given segment doesn't have expire and strike price"}]}
 
-                if exchange_segment.endswith('fo'):
-                    if not (exchange_segment == 'mcx' or exchange_segment == 'mcx_fo' or exchange_segment == 'bse' or exchange_segment == 'bse_fo'):
-                        df['pExpiryDate'] = pd.to_datetime(df['pExpiryDate'], unit='s')
-                        # df['pExpiryDate'] = df['pExpiryDate'] + pd.DateOffset(years=10)
-                        df['pExpiryDate'] = df['pExpiryDate'] + pd.to_timedelta(315511200, unit='s')
-                        df['pExpiryDate'] = df['pExpiryDate'].dt.strftime('%d%b%Y')
-                    else:
-                        df['pExpiryDate'] = pd.to_datetime(df['pExpiryDate'], unit='s')
-                        df['pExpiryDate'] = df['pExpiryDate'].dt.strftime('%d%b%Y')
-                else:
-                    if exchange_segment == 'mcx' or exchange_segment == 'mcx_fo':
-                        df['pExpiryDate'] = pd.to_datetime(df['pExpiryDate'], unit='s')
-                        df['pExpiryDate'] = df['pExpiryDate'].dt.strftime('%d%b%Y')
-
-                if symbol != '':
-                    mask = df["pSymbolName"].str.lower().str.strip().str.contains(symbol)
-                    df = df[mask]
-
+                option_types = None
                 if option_type:
-                    option_type = str(option_type).lower()
-                    option_type = option_type.split(",")
-                    df["pOptionType"] = df["pOptionType"].str.lower()
-                    mask = df["pOptionType"].isin(option_type)
-                    df = df[mask]
+                    option_types = str(option_type).lower().split(",")
 
+                expiry_range = None
                 if expiry:
                     list_expiry = expiry.split('-')
                     if len(list_expiry) > 2:
@@ -72,26 +38,16 @@ class ScripSearch(object):
                             'error': [
                                 {'message': "Format of expiry date is not proper. Kindly pass DDMMYYYY(01MAY2023)"}]}
                         return error
-                    elif len(list_expiry) == 2:
-                        df['pExpiryDate'] = pd.to_datetime(df['pExpiryDate'], format='%d%b%Y')
-                        df = df[(df['pExpiryDate'] >= pd.to_datetime(list_expiry[0])) & (
-                                df['pExpiryDate'] <= pd.to_datetime(list_expiry[1]))]
-                        df['pExpiryDate'] = df['pExpiryDate'].dt.strftime('%d%b%Y')
-                    else:
-                        df['pExpiryDate'] = pd.to_datetime(df['pExpiryDate'], format='%d%b%Y')
-                        df = df[df['pExpiryDate'] == pd.to_datetime(list_expiry[0])]
-                        df['pExpiryDate'] = df['pExpiryDate'].dt.strftime('%d%b%Y')
+                    expiry_range = (parse_expiry(list_expiry[0]), parse_expiry(list_expiry[-1]))
 
+                strike_range = None
                 if strike_price:
-                    df['dStrikePrice;'] = df['dStrikePrice;'].astype(float)
                     if '>' in strike_price:
                         strike_price = strike_price.split('>')
-                        min_strike_price = float(str(strike_price[1]) + str('00.0'))
-                        df = df[df['dStrikePrice;'] >= min_strike_price]
+                        strike_range = (float(str(strike_price[1]) + str('00.0')), None)
                     elif '<' in strike_price:
                         strike_price = strike_price.split('<')
-                        max_strike_price = float(str(strike_price[1]) + str('00.0'))
-                        df = df[df['dStrikePrice;'] <= max_strike_price]
+                        strike_range = (None, float(str(strike_price[1]) + str('00.0')))
                     else:
                         list_strike_price = strike_price.split('-')
                         if len(list_strike_price) == 2:
@@ -104,9 +60,7 @@ class ScripSearch(object):
                                                                      'the maximum strike price.'}]
                                 }
                                 return error
-                            else:
-                                df = df[(df['dStrikePrice;'] >= min_strike_price) & (
-                                        df['dStrikePrice;'] <= max_strike_price)]
+                            strike_range = (min_strike_price, max_strike_price)
                         elif len(list_strike_price) == 1:
                             if (float(list_strike_price[0]) * 100) <= 0:
                                 error = {
@@ -116,8 +70,7 @@ class ScripSearch(object):
                                                        "value."}]
                                 }
                                 return error
-                            else:
-                                df = df[df['dStrikePrice;'] == float(list_strike_price[0]) * 100]
+                            strike_range = (float(list_strike_price[0]) * 100, float(list_strike_price[0]) * 100)
                         else:
                             error = {
                                 'error': [
@@ -126,12 +79,18 @@ class ScripSearch(object):
                             }
                             return error
 
-                df = df.dropna(how='all')
-                if len(df) > 0:
-                    df = df.sort_values('dStrikePrice;', ascending=True)  # Add sorting step here
-                    df = df.to_json(orient='records')
-                    df = json.loads(df)
-                    return df
+                # Served from the local store: the segment file is downloaded at most once a day, and the rows
+                # are filtered on its in-memory columns, sorted by strike price
+                rows = self.api_client.get_scrip_master_store().search(
+                    exchange_segment, symbol=symbol, option_types=option_types, expiry_range=expiry_range,
+                    strike_range=strike_range)
+                if len(rows) > 0:
+                    if option_types:
+                        # Filtered rows have always carried their option type lower-cased
+                        for row in rows:
+                            if isinstance(row.get("pOptionType"), str):
+                                row["pOptionType"] = row["pOptionType"].lower()
+                    return rows
                 else:
                     return {"message": "No data found with the given search information."
                                        "Please try with other combinations."}
@@ -3,6 +3,8 @@ from json import JSONDecodeError
 from requests import session
 
 from neo_api_client.settings import PROD_URL
+from neo_api_client.instrumentation import REGISTRY
+from neo_api_client import codec
 
 
 class TotpAPI(object):
@@ -12,6 +14,7 @@ class TotpAPI(object):
         self.rest_client = api_client.rest_client
         self.totp_session = None
 
+    @REGISTRY.timed("api_call", "totp_login")
     def totp_login(self, mobile_number=None, ucc=None, totp=None):
         header_params = {'Authorization': self.api_client.configuration.consumer_key,
                          'neo-fin-key': self.api_client.configuration.get_neo_fin_key(),
@@ -29,7 +32,7 @@ class TotpAPI(object):
             body=body_params
         )
         try:
-            totp_login_data = totp_login.json()
+            totp_login_data = codec.response_json(totp_login)
         except JSONDecodeError:
             return {
                 "Error": "Unexpected response format. Expected JSON but received something else."
@@ -39,6 +42,7 @@ class TotpAPI(object):
             self.api_client.configuration.sid = totp_login_data.get("data").get("sid")
         return totp_login_data
 
+    @REGISTRY.timed("api_call", "totp_validate")
     def totp_validate(self, mpin=None):
         header_params = {'Authorization': self.api_client.configuration.consumer_key,
                          "sid": self.api_client.configuration.sid,
@@ -55,7 +59,7 @@ class TotpAPI(object):
             body=body_params
         )
         try:
-            totp_validate_data = totp_validate.json()
+            totp_validate_data = codec.response_json(totp_validate)
         except JSONDecodeError:
             return {
                 "Error": "Unexpected response format. Expected JSON but received something else."
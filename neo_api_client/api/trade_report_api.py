@@ -1,4 +1,6 @@
 import requests
+from neo_api_client import codec
+from neo_api_client.instrumentation import REGISTRY
 
 
 class TradeReportAPI(object):
@@ -6,6 +8,7 @@ class TradeReportAPI(object):
         self.api_client = api_client
         self.rest_client = api_client.rest_client
 
+    @REGISTRY.timed("api_call", "trade_report")
     def trading_report(self, order_id):
         header_params = {
             "Sid": self.api_client.configuration.edit_sid,
@@ -15,11 +18,12 @@ class TradeReportAPI(object):
         query_params = {"sId": self.api_client.configuration.serverId}
         URL = self.api_client.configuration.get_url_details("trade_report")
         try:
-            trade_report = self.rest_client.request(
+            trade_report = codec.response_json(self.rest_client.request(
                 url=URL, method='GET',
                 query_params=query_params,
-                headers=header_params
-            ).json()
+                headers=header_params,
+                endpoint="trade_report"
+            ))
 
             if order_id:
                 output_json = {}
@@ -1,5 +1,6 @@
 from __future__ import absolute_import
 from neo_api_client import rest
+from neo_api_client.scrip_master_store import ScripMasterStore
 
 
 class ApiClient(object):
@@ -17,6 +18,7 @@ class ApiClient(object):
         if header_name is not None:
             self.default_headers[header_name] = header_value
         self.user_agent = 'NeoTradeApi-python/1.0.0/python'
+        self.scrip_master_store = None
 
     @property
     def user_agent(self):
@@ -28,4 +30,14 @@ class ApiClient(object):
         self.default_headers['User-Agent'] = value
 
     def set_default_header(self, header_name, header_value):
-        self.default_headers[header_name] = header_value
\ No newline at end of file
+        self.default_headers[header_name] = header_value
+
+    def get_scrip_master_store(self):
+        """Local scrip master store shared by every scrip search made through this client."""
+        if self.scrip_master_store is None:
+            self.scrip_master_store = ScripMasterStore(self)
+        return self.scrip_master_store
+
+    def close(self):
+        """Release the pooled HTTP connections held by the REST client."""
+        self.rest_client.close()
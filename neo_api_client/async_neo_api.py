@@ -0,0 +1,89 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from neo_api_client.neo_api import NeoAPI
+
+
+def _awaitable(name):
+    """Build an awaitable method that runs `NeoAPI.<name>` on the shared executor."""
+    sync_method = getattr(NeoAPI, name)
+
+    @functools.wraps(sync_method)
+    async def method(self, *args, **kwargs):
+        return await self._run(getattr(self.neo_api, name), *args, **kwargs)
+
+    return method
+
+
+class AsyncNeoAPI:
+    """
+        An asyncio facade over `NeoAPI`.
+
+        Every method is an awaitable equivalent of the `NeoAPI` method with the same name and arguments, so
+        validation, request building and response parsing stay in `NeoAPI` and the `api/*` endpoint classes.
+        Calls are dispatched on an executor sized to the HTTP connection pool of the shared `ApiClient`, which
+        lets one event loop keep many requests in flight over the same set of warm connections, e.g.
+
+            quotes, positions, limits = await asyncio.gather(client.quotes(tokens), client.positions(),
+                                                             client.limits())
+
+        Attributes:
+            neo_api (NeoAPI): The wrapped synchronous client, useful for websocket subscriptions.
+            configuration (neo_api_client.NeoUtility): The configuration shared with `neo_api`.
+            api_client (ApiClient): The API client (and its pooled REST client) shared with `neo_api`.
+    """
+
+    def __init__(self, environment="uat", access_token=None, neo_fin_key=None, consumer_key=None, neo_api=None,
+                 max_workers=None):
+        """
+    Initializes the async client.
+
+    Parameters:
+    environment (str): The environment has to pass by user to connect 'UAT' or 'PROD'.
+    access_token (str, optional): The access token used for authentication. Defaults to None.
+    neo_fin_key (str, optional): Finkey for tracking purpose
+    consumer_key (str, optional): The consumer key used for authentication. Defaults to None.
+    neo_api (NeoAPI, optional): An existing, possibly already logged in, client to wrap. When given the
+        other session arguments are ignored.
+    max_workers (int, optional): Number of requests that may be in flight at once. Defaults to the
+        configured HTTP pool size so that every in-flight request has a pooled connection.
+    """
+        if neo_api is None:
+            neo_api = NeoAPI(environment=environment, access_token=access_token, neo_fin_key=neo_fin_key,
+                             consumer_key=consumer_key)
+        self.neo_api = neo_api
+        self.configuration = neo_api.configuration
+        self.api_client = neo_api.api_client
+        if max_workers is None:
+            max_workers = self.configuration.pool_maxsize
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="neo-async")
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    totp_login = _awaitable("totp_login")
+    totp_validate = _awaitable("totp_validate")
+    place_order = _awaitable("place_order")
+    cancel_order = _awaitable("cancel_order")
+    modify_order = _awaitable("modify_order")
+    order_report = _awaitable("order_report")
+    order_history = _awaitable("order_history")
+    trade_report = _awaitable("trade_report")
+    positions = _awaitable("positions")
+    holdings = _awaitable("holdings")
+    limits = _awaitable("limits")
+    margin_required = _awaitable("margin_required")
+    quotes = _awaitable("quotes")
+
+    async def close(self):
+        """Wait for in-flight calls, stop the executor and release the pooled HTTP connections."""
+        await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+        self.api_client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
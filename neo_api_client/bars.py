@@ -0,0 +1,321 @@
+import math
+import threading
+import time
+
+import numpy as np
+
+from neo_api_client import settings
+from neo_api_client.HSWebSocketLib import IndexTick, ScripTick
+from neo_api_client.tick_store import TickRing, instrument_key
+
+# Column name, dtype and missing value of every bar
+BAR_COLUMNS = (
+    ("start", np.int64, 0),     # time bars: start of the interval, others: exchange time of the first tick
+    ("end", np.int64, 0),       # exchange time of the last tick
+    ("open", np.float64, np.nan),
+    ("high", np.float64, np.nan),
+    ("low", np.float64, np.nan),
+    ("close", np.float64, np.nan),
+    ("volume", np.int64, 0),
+    ("ticks", np.int64, 0),
+)
+BAR_NAMES = tuple(name for name, _, _ in BAR_COLUMNS)
+START, END, OPEN, HIGH, LOW, CLOSE, VOLUME, TICKS = range(len(BAR_COLUMNS))
+
+TIME_BARS, VOLUME_BARS, TICK_BARS = "time", "volume", "tick"
+SPEC_UNITS = {"s": (TIME_BARS, 1), "m": (TIME_BARS, 60), "h": (TIME_BARS, 3600), "v": (VOLUME_BARS, 1),
+              "t": (TICK_BARS, 1)}
+
+# Field indexes of the trade fields of typed ticks
+SCRIP_LTT, SCRIP_VOLUME, SCRIP_LTP = (ScripTick.FIELD_INDEX[name] for name in ("ltt", "v", "ltp"))
+INDEX_TIME, INDEX_VALUE = (IndexTick.FIELD_INDEX[name] for name in ("tvalue", "iv"))
+
+
+def parse_spec(spec):
+    """(kind, size) of a bar spec: "1s", "1m", "5m" or "1h" time bars, "<n>v" volume bars, "<n>t" tick bars."""
+    unit = SPEC_UNITS.get(spec[-1:])
+    try:
+        count = int(spec[:-1])
+    except ValueError:
+        count = 0
+    if unit is None or count <= 0:
+        raise ValueError("Invalid bar spec %r, expected e.g. \"1s\", \"5m\", \"1h\", \"5000v\" or \"100t\"" % spec)
+    return unit[0], count * unit[1]
+
+
+_midnights = {}
+
+
+def feed_time(value):
+    """
+    Seconds since the epoch of a DATE field of the dict feed, "dd/mm/yyyy HH:MM:SS" in local time.
+
+    The epoch of midnight is computed once per date, so a day with a DST change is off by an hour after it.
+    """
+    midnight = _midnights.get(value[:10])
+    if midnight is None:
+        midnight = _midnights[value[:10]] = int(time.mktime(
+            (int(value[6:10]), int(value[3:5]), int(value[:2]), 0, 0, 0, 0, 0, -1)))
+    return midnight + int(value[11:13]) * 3600 + int(value[14:16]) * 60 + int(value[17:19])
+
+
+class BarSeries(object):
+    """
+        OHLC bars of one instrument for one spec, the closed ones in a preallocated TickRing of BAR_COLUMNS.
+
+        The bar being built is a list of BAR_COLUMNS values, closed and appended to the ring by the first tick
+        after its interval for time bars, and by the tick reaching `size` volume or ticks for volume and tick bars.
+        A tick of an interval that has already closed (an out-of-order update older than the open time bar, or
+        than the end of the last closed one when `close_until` left no bar open) is merged into the closed bar of
+        its interval when the ring still holds one: high, low, volume and tick count are revised in place. Such
+        ticks are counted in `late`, and in `dropped` when there is no bar of their interval to revise.
+    """
+
+    def __init__(self, token, spec, capacity=None, listeners=None, revision_listeners=None, exchange=None):
+        self.token = token
+        self.exchange = exchange
+        self.spec = spec
+        self.kind, self.size = parse_spec(spec)
+        if capacity is None:
+            if self.kind == TIME_BARS:
+                capacity = int(math.ceil(settings.BAR_SESSION_SECONDS / self.size)) + 1
+            else:
+                capacity = settings.BAR_CAPACITY
+        self.ring = TickRing(capacity, spec=BAR_COLUMNS)
+        self.bar = None
+        # Start of the last closed bar: time bar ticks of its interval or earlier ones are late
+        self.closed_start = -1
+        self.late = 0
+        self.dropped = 0
+        self.listeners = [] if listeners is None else listeners
+        self.revision_listeners = [] if revision_listeners is None else revision_listeners
+
+    def update(self, ltt, price, volume):
+        """Add one tick: exchange time in seconds, price and the volume traded since the previous tick."""
+        bar = self.bar
+        kind = self.kind
+        if kind == TIME_BARS:
+            start = ltt - ltt % self.size
+            if start <= self.closed_start or bar is not None and start < bar[START]:
+                self._revise(start, price, volume)
+                return
+            if bar is not None and start != bar[START]:
+                self._close()
+                bar = None
+        else:
+            start = ltt
+        if bar is None:
+            self.bar = bar = [start, ltt, price, price, price, price, volume, 1]
+        else:
+            if ltt >= bar[END]:
+                bar[END] = ltt
+                bar[CLOSE] = price
+            if price > bar[HIGH]:
+                bar[HIGH] = price
+            elif price < bar[LOW]:
+                bar[LOW] = price
+            bar[VOLUME] += volume
+            bar[TICKS] += 1
+        if kind == VOLUME_BARS and bar[VOLUME] >= self.size or kind == TICK_BARS and bar[TICKS] >= self.size:
+            self._close()
+
+    def close_until(self, now):
+        """Close the open time bar when its interval ended before exchange time `now`, e.g. for a quiet token."""
+        bar = self.bar
+        if bar is not None and self.kind == TIME_BARS and bar[START] + self.size <= now:
+            self._close()
+
+    def _close(self):
+        bar = self.bar
+        self.bar = None
+        self.closed_start = bar[START]
+        self.ring.append(bar)
+        if self.listeners:
+            closed = dict(zip(BAR_NAMES, bar))
+            for listener in self.listeners:
+                listener(self, closed)
+
+    def _revise(self, start, price, volume):
+        self.late += 1
+        starts = self.ring.columns["start"]
+        end = self.ring.end
+        begin = end - len(self.ring)
+        row = begin + int(np.searchsorted(starts[begin:end], start))
+        if row == end or starts[row] != start:
+            self.dropped += 1
+            return
+        columns = self.ring.columns
+        if price > columns["high"][row]:
+            columns["high"][row] = price
+        if price < columns["low"][row]:
+            columns["low"][row] = price
+        columns["volume"][row] += volume
+        columns["ticks"][row] += 1
+        if self.revision_listeners:
+            revised = {name: columns[name][row].item() for name in BAR_NAMES}
+            for listener in self.revision_listeners:
+                listener(self, revised)
+
+    def window(self, n=None):
+        """Views over the last `n` closed bars (all retained bars by default), oldest first."""
+        return self.ring.window(n)
+
+    def current(self):
+        """The bar being built as a dict, None between bars."""
+        return None if self.bar is None else dict(zip(BAR_NAMES, self.bar))
+
+    def __len__(self):
+        return len(self.ring)
+
+
+class BarEngine(object):
+    """
+        Streaming OHLC bars of every subscribed instrument, built from the live feed.
+
+        Register `on_ticks` as a feed listener (`client.add_feed_listener(engine.on_ticks)`). Each scrip tick
+        carrying a new LTP or volume, and each index tick carrying a new value, updates one BarSeries per spec of
+        its instrument, created on the instrument's first tick. Bars are timed by the exchange time of the tick
+        (LTT, or the index time), the last one received being used for ticks without it, and their volume is the
+        increase of the traded volume of the day. Both the dict feed and typed ticks (`configuration.typed_ticks`)
+        are accepted.
+
+        Instruments are keyed by exchange segment and token; readers take the token and, when the same token is
+        subscribed in several segments, its `exchange_segment`. Closed bars are passed to the listeners of
+        `add_listener` on the websocket thread, with `lock` held.
+    """
+
+    def __init__(self, specs=None, capacity=None):
+        """
+        :param specs: bar specs of every token, defaults to `settings.BAR_SPECS` (see `parse_spec`)
+        :param capacity: closed bars retained per series, by default a session of time bars (see settings)
+        """
+        self.specs = tuple(specs or settings.BAR_SPECS)
+        for spec in self.specs:
+            parse_spec(spec)
+        self.capacity = capacity
+        # Series, and last exchange time, price and day volume, by (exchange_segment, token); segments of each token
+        self.series = {}
+        self.last_values = {}
+        self.segments = {}
+        self.now = 0
+        self.listeners = []
+        self.revision_listeners = []
+        self.lock = threading.Lock()
+
+    def on_ticks(self, message):
+        """Feed listener: update the bars of the scrip/index ticks in `message` (a list of dicts or Tick records)."""
+        with self.lock:
+            for tick in message:
+                if isinstance(tick, dict):
+                    name = tick.get("name")
+                    if name == "sf":
+                        ltp, volume, ltt = tick.get("ltp"), tick.get("v"), tick.get("ltt")
+                    elif name == "if":
+                        ltp, volume, ltt = tick.get("iv"), None, tick.get("tvalue")
+                    else:
+                        continue
+                    if ltp is None and volume is None:
+                        continue
+                    self._trade(tick.get("tk"), tick.get("e"), None if ltt is None else feed_time(ltt),
+                                None if ltp is None else float(ltp), None if volume is None else int(volume))
+                elif isinstance(tick, ScripTick):
+                    updated, fields = tick.updated, tick.fields
+                    if not updated >> SCRIP_LTP & 1 and not updated >> SCRIP_VOLUME & 1:
+                        continue
+                    ltp = fields[SCRIP_LTP]
+                    self._trade(tick.tk, tick.e, fields[SCRIP_LTT] if updated >> SCRIP_LTT & 1 else None,
+                                None if ltp is None else ltp / tick.scale,
+                                fields[SCRIP_VOLUME] if updated >> SCRIP_VOLUME & 1 else None)
+                elif isinstance(tick, IndexTick):
+                    updated, fields = tick.updated, tick.fields
+                    value = fields[INDEX_VALUE]
+                    if not updated >> INDEX_VALUE & 1 or value is None:
+                        continue
+                    self._trade(tick.tk, tick.e, fields[INDEX_TIME] if updated >> INDEX_TIME & 1 else None,
+                                value / tick.scale, None)
+
+    def _trade(self, token, exchange, ltt, price, volume):
+        key = exchange, str(token)
+        last = self.last_values.get(key)
+        if last is None:
+            # The day volume of the first tick is not traded in the first bar
+            last = self.last_values[key] = [ltt, price, volume]
+            series = self.series[key] = [
+                BarSeries(token, spec, self.capacity, self.listeners, self.revision_listeners, exchange)
+                for spec in self.specs]
+            self.segments.setdefault(key[1], []).append(exchange)
+            traded = 0
+        else:
+            series = self.series[key]
+            traded = 0
+            if volume is not None:
+                if last[2] is not None and volume > last[2]:
+                    traded = volume - last[2]
+                last[2] = volume
+            if ltt is None:
+                ltt = last[0]
+            elif last[0] is None or ltt > last[0]:
+                last[0] = ltt
+            if price is None:
+                price = last[1]
+            else:
+                last[1] = price
+        if ltt is None or price is None:
+            return
+        if ltt > self.now:
+            self.now = ltt
+        for bars in series:
+            bars.update(ltt, price, traded)
+
+    def advance(self, now=None):
+        """Close the time bars whose interval ended before exchange time `now`, the latest tick time by default."""
+        with self.lock:
+            now = self.now if now is None else now
+            for series in self.series.values():
+                for bars in series:
+                    bars.close_until(now)
+
+    def add_listener(self, listener, revisions=False):
+        """
+        Call `listener(series, bar)` for every bar closed, `bar` being a dict of BAR_COLUMNS; with `revisions`,
+        call it instead for every closed bar revised by a late tick.
+        """
+        listeners = self.revision_listeners if revisions else self.listeners
+        if listener not in listeners:
+            listeners.append(listener)
+
+    def remove_listener(self, listener):
+        for listeners in (self.listeners, self.revision_listeners):
+            if listener in listeners:
+                listeners.remove(listener)
+
+    def get(self, token, spec, exchange_segment=None):
+        """BarSeries of `token` for `spec`, None before the instrument's first tick."""
+        series = self.series.get(instrument_key(token, exchange_segment, self.segments))
+        if series is None:
+            return None
+        return series[self.specs.index(spec)]
+
+    def bars(self, token, spec, n=None, exchange_segment=None):
+        """
+        Zero-copy views over the last `n` closed bars of `token` for `spec`, as {column: ndarray}, oldest first.
+
+        As with TickStore windows, copy them if they must survive more bars than a quarter of the capacity.
+        """
+        with self.lock:
+            series = self.get(token, spec, exchange_segment)
+            if series is None:
+                return {name: np.empty(0, dtype=dtype) for name, dtype, _ in BAR_COLUMNS}
+            return series.window(n)
+
+    def current(self, token, spec, exchange_segment=None):
+        with self.lock:
+            series = self.get(token, spec, exchange_segment)
+            return None if series is None else series.current()
+
+    def tokens(self):
+        return list(self.segments)
+
+    def keys(self):
+        """(exchange_segment, token) of every instrument."""
+        return list(self.series)
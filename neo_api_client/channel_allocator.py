@@ -0,0 +1,177 @@
+import math
+import time
+
+from neo_api_client import settings
+
+
+class ChannelAllocator(object):
+    """
+        Chooses the HSM channel of each live feed subscription from the load of every channel.
+
+        The load of a channel is the sum of the message rates of its tokens, each rate being an exponentially
+        weighted moving average of the ticks counted by `observe`. New subscriptions go to the least loaded channel
+        with free capacity (fewest tokens first while no rates are known). `plan_rebalance` computes the moves,
+        or swaps when channels are full, that bring the busiest and the quietest channels within `tolerance` of
+        the mean load; `NeoWebSocket.rebalance_channels` applies them.
+
+        The rate total of every channel is kept up to date as subscriptions are placed, released and moved (the
+        SubscriptionRegistry reports them) and recomputed with the rates, so placing a subscription does not sum
+        the rates of every other one.
+    """
+
+    def __init__(self, half_life=None, rebalance_interval=None, tolerance=None, sample_interval=1.0,
+                 clock=time.monotonic):
+        """
+        :param half_life: seconds after which an observed rate counts for half, defaults to
+            `settings.CHANNEL_RATE_HALF_LIFE`
+        :param rebalance_interval: seconds between automatic rebalances, None (the default,
+            `settings.CHANNEL_REBALANCE_INTERVAL`) only rebalances on request
+        :param tolerance: accepted spread between the busiest and quietest channel, as a fraction of the mean load
+        :param sample_interval: seconds between rate updates
+        """
+        self.half_life = half_life or settings.CHANNEL_RATE_HALF_LIFE
+        self.rebalance_interval = rebalance_interval or settings.CHANNEL_REBALANCE_INTERVAL
+        self.tolerance = settings.CHANNEL_REBALANCE_TOLERANCE if tolerance is None else tolerance
+        self.sample_interval = sample_interval
+        self.clock = clock
+        self.rates = {}
+        self.counts = {}
+        # Sum of the rates of the subscriptions of each channel, and {channel: subscriptions} of each token
+        self.channel_rates = {}
+        self.token_channels = {}
+        self.updated = clock()
+        self.last_rebalance = self.updated
+
+    def observe(self, message):
+        """Count the ticks of one live feed message (a list of dicts or Tick records)."""
+        counts = self.counts
+        for item in message:
+            token = item.get('tk') if isinstance(item, dict) else item.tk
+            if token is not None:
+                counts[token] = counts.get(token, 0) + 1
+        now = self.clock()
+        if now - self.updated >= self.sample_interval:
+            self._update_rates(now)
+
+    def _update_rates(self, now):
+        elapsed = now - self.updated
+        alpha = 1 - math.exp(-elapsed * math.log(2) / self.half_life)
+        counts, self.counts = self.counts, {}
+        for token in set(self.rates).union(counts):
+            rate = self.rates.get(token, 0.0)
+            self.rates[token] = rate + alpha * (counts.get(token, 0) / elapsed - rate)
+        self.updated = now
+        channel_rates = dict.fromkeys(self.channel_rates, 0.0)
+        for token, channels in self.token_channels.items():
+            rate = self.rates.get(token, 0.0)
+            for channel, count in channels.items():
+                channel_rates[channel] += rate * count
+        self.channel_rates = channel_rates
+
+    def rate(self, instrument_token):
+        """Smoothed messages per second of `instrument_token`."""
+        return self.rates.get(str(instrument_token), 0.0)
+
+    def _loads(self, registry):
+        return {channel: [self.channel_rates.get(channel, 0.0), len(entries)]
+                for channel, entries in registry.channel_entries.items()}
+
+    def assigned(self, key, channel):
+        """Count the subscription `key` in the load of `channel`."""
+        channels = self.token_channels.setdefault(key[1], {})
+        channels[channel] = channels.get(channel, 0) + 1
+        self.channel_rates[channel] = self.channel_rates.get(channel, 0.0) + self.rates.get(key[1], 0.0)
+
+    def released(self, key, channel):
+        """Remove the subscription `key` from the load of `channel`."""
+        channels = self.token_channels[key[1]]
+        if channels[channel] == 1:
+            del channels[channel]
+            if not channels:
+                del self.token_channels[key[1]]
+        else:
+            channels[channel] -= 1
+        self.channel_rates[channel] -= self.rates.get(key[1], 0.0)
+
+    def moved(self, key, from_channel, to_channel):
+        self.released(key, from_channel)
+        self.assigned(key, to_channel)
+
+    def reset(self):
+        """Forget every subscription, e.g. when the registry is cleared."""
+        self.channel_rates = {}
+        self.token_channels = {}
+
+    def place(self, registry, keys):
+        """
+        Least loaded channel with free capacity for each of `keys`, counted in that channel's load.
+
+        :return: list of (key, channel); keys that fit in no channel are left out
+        """
+        placements = []
+        counts = {channel: len(registry.channel_entries[channel]) for channel in registry.channels}
+        for key in keys:
+            free = [channel for channel in registry.channels if counts[channel] < registry.channel_capacity]
+            if not free:
+                break
+            channel = min(free, key=lambda c: (self.channel_rates.get(c, 0.0), counts[c]))
+            self.assigned(key, channel)
+            counts[channel] += 1
+            placements.append((key, channel))
+        return placements
+
+    def plan_rebalance(self, registry, max_moves=200):
+        """
+        Moves that even out the channel loads, without applying them.
+
+        :return: list of (key, from_channel, to_channel)
+        """
+        members = {channel: {key: self.rates.get(key[1], 0.0) for key in entries}
+                   for channel, entries in registry.channel_entries.items()}
+        loads = {channel: sum(rates.values()) for channel, rates in members.items()}
+        total = sum(loads.values())
+        if not members or total <= 0:
+            return []
+        mean = total / len(members)
+        # Channel each moved key started from, and the channel it is in now
+        origins, positions = {}, {}
+        for _ in range(max_moves):
+            source = max(loads, key=loads.get)
+            target = min(loads, key=loads.get)
+            gap = loads[source] - loads[target]
+            if gap <= self.tolerance * mean:
+                break
+            if len(members[target]) < registry.channel_capacity:
+                # Move the token whose rate is closest to half the gap
+                candidates = [(abs(rate - gap / 2), key) for key, rate in members[source].items() if 0 < rate < gap]
+                if not candidates:
+                    break
+                key = min(candidates)[1]
+                swaps = [(key, source, target)]
+            else:
+                # Target is full: swap one of the source tokens with its quietest token
+                cold = min(members[target], key=members[target].get)
+                cold_rate = members[target][cold]
+                candidates = [(abs(rate - cold_rate - gap / 2), key) for key, rate in members[source].items()
+                              if 0 < rate - cold_rate < gap]
+                if not candidates:
+                    break
+                key = min(candidates)[1]
+                swaps = [(key, source, target), (cold, target, source)]
+            for key, from_channel, to_channel in swaps:
+                rate = members[from_channel].pop(key)
+                members[to_channel][key] = rate
+                loads[from_channel] -= rate
+                loads[to_channel] += rate
+                origins.setdefault(key, from_channel)
+                positions[key] = to_channel
+        return [(key, origin, positions[key]) for key, origin in origins.items() if positions[key] != origin]
+
+    def rebalance_due(self):
+        if not self.rebalance_interval:
+            return False
+        return self.clock() - self.last_rebalance >= self.rebalance_interval
+
+    def metrics(self, registry):
+        """Tokens and smoothed messages per second of every channel."""
+        return {channel: {"tokens": count, "rate": rate} for channel, (rate, count) in self._loads(registry).items()}
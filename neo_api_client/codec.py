@@ -0,0 +1,113 @@
+import json
+
+from neo_api_client import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+# Raised by `loads` on invalid JSON whatever the backend, like requests' Response.json()
+JSONDecodeError = json.JSONDecodeError
+
+
+class JsonBackend(object):
+    """The standard library json module, always available."""
+    name = "json"
+
+    def dumps(self, obj):
+        """Compact JSON text of `obj`."""
+        return json.dumps(obj, separators=(",", ":"))
+
+    def dumpb(self, obj):
+        """Compact JSON of `obj` as UTF-8 bytes."""
+        return self.dumps(obj).encode("utf-8")
+
+    def loads(self, data):
+        """Decode JSON from str, bytes, bytearray or memoryview."""
+        if isinstance(data, memoryview):
+            data = bytes(data)
+        return json.loads(data)
+
+
+class UjsonBackend(JsonBackend):
+    name = "ujson"
+
+    def dumps(self, obj):
+        try:
+            return ujson.dumps(obj, escape_forward_slashes=False)
+        except (TypeError, OverflowError):
+            return JsonBackend.dumps(self, obj)
+
+    def loads(self, data):
+        if isinstance(data, (bytearray, memoryview)):
+            data = bytes(data)
+        try:
+            return ujson.loads(data)
+        except ValueError as e:
+            raise JSONDecodeError(str(e), data if isinstance(data, str) else data.decode("utf-8", "replace"), 0)
+
+
+class OrjsonBackend(JsonBackend):
+    name = "orjson"
+
+    def dumps(self, obj):
+        return self.dumpb(obj).decode("utf-8")
+
+    def dumpb(self, obj):
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            # Types orjson refuses (e.g. integers beyond 64 bits, non-str keys): the standard library copes
+            return JsonBackend.dumps(self, obj).encode("utf-8")
+
+    def loads(self, data):
+        # orjson.JSONDecodeError is a subclass of json.JSONDecodeError
+        return orjson.loads(data)
+
+
+BACKENDS = {"orjson": (OrjsonBackend, orjson), "ujson": (UjsonBackend, ujson), "json": (JsonBackend, json)}
+
+
+def get_backend(name=None):
+    """
+    Backend `name`: "orjson", "ujson", "json", or "auto" for the fastest one installed.
+
+    :param name: defaults to `settings.JSON_CODEC`
+    """
+    name = name or settings.JSON_CODEC
+    if name == "auto":
+        name = next(candidate for candidate, (_, module) in BACKENDS.items() if module is not None)
+    if name not in BACKENDS:
+        raise ValueError("Invalid JSON codec %r, expected \"auto\" or one of %s" % (name, ", ".join(BACKENDS)))
+    backend_class, module = BACKENDS[name]
+    if module is None:
+        raise ImportError("The %s JSON codec is not installed" % name)
+    return backend_class()
+
+
+def use(name=None):
+    """
+    Encode and decode with backend `name` from now on (see `get_backend`); returns the backend.
+
+    The module level `dumps`, `dumpb` and `loads` are rebound, so call them through the module (`codec.loads`)
+    rather than importing the functions.
+    """
+    global backend, dumps, dumpb, loads
+    backend = get_backend(name)
+    dumps, dumpb, loads = backend.dumps, backend.dumpb, backend.loads
+    return backend
+
+
+def response_json(response):
+    """Decoded JSON body of a requests Response, like `response.json()`."""
+    return loads(response.content)
+
+
+backend = dumps = dumpb = loads = None
+use()
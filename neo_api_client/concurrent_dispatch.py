@@ -0,0 +1,41 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def dispatch(func, items, max_workers):
+    """
+        Call `func(item)` for every item on a bounded pool of worker threads.
+
+        Parameters:
+        func (callable): Function invoked once per item.
+        items (list): Inputs, one per call.
+        max_workers (int): Upper bound on the number of calls in flight at once.
+
+        Returns:
+        A list with one entry per item, in input order, of the form
+        {"leg": index, "response": <return value of func>, "elapsed_ms": float}. When `func` raises, the
+        entry carries {"Error": exception} in place of "response".
+    """
+    results = [None] * len(items)
+    if not items:
+        return results
+
+    def run(index, item):
+        start = time.perf_counter()
+        try:
+            result = {"leg": index, "response": func(item)}
+        except Exception as e:
+            result = {"leg": index, "Error": e}
+        result["elapsed_ms"] = (time.perf_counter() - start) * 1000
+        results[index] = result
+
+    max_workers = max(1, min(max_workers, len(items)))
+    if max_workers == 1:
+        for index, item in enumerate(items):
+            run(index, item)
+        return results
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="neo-dispatch") as executor:
+        for index, item in enumerate(items):
+            executor.submit(run, index, item)
+    return results
@@ -0,0 +1,122 @@
+import threading
+import time
+
+from neo_api_client import settings
+from neo_api_client.event_dispatcher import tick_key
+
+
+class Conflater(object):
+    """
+        Delivers at most one update per instrument per interval instead of every tick of the live feed.
+
+        `put` merges the ticks of each `stock_feed` message into a snapshot per (exchange_segment, token) and marks
+        the token dirty; every `interval` seconds `drain` hands the snapshots of the dirty tokens to `handler` as
+        one `stock_feed` message. Only the tokens that changed are visited, so a drain costs O(changed tokens)
+        however many tokens are subscribed. Dict snapshots carry every field received so far. Typed snapshots are
+        private records into which `put` copies each tick on the websocket thread, before its record is reused;
+        `drain` delivers copies of them with `updated` covering all the fields changed since the previous delivery.
+    """
+
+    def __init__(self, handler, interval=None):
+        """
+        :param handler: called with each conflated `stock_feed` message
+        :param interval: seconds between deliveries, defaults to `settings.CONFLATION_INTERVAL`; with 0 nothing
+            is delivered until `drain` is called
+        """
+        self.handler = handler
+        self.interval = settings.CONFLATION_INTERVAL if interval is None else interval
+        self.snapshots = {}
+        # Tokens changed since the last drain, in the order they first changed, with the fields they changed
+        self.dirty = {}
+        self.lock = threading.Lock()
+        self.thread = None
+        self.running = False
+        self.received = 0
+        self.delivered = 0
+
+    def put(self, message):
+        """Absorb a `stock_feed` message; returns False, leaving it to the caller, for any other message."""
+        if not (isinstance(message, dict) and message.get("type") == "stock_feed"):
+            return False
+        with self.lock:
+            snapshots, dirty = self.snapshots, self.dirty
+            for tick in message["data"]:
+                key = tick_key(tick)
+                if isinstance(tick, dict):
+                    snapshot = snapshots.get(key)
+                    if snapshot is None:
+                        snapshots[key] = dict(tick)
+                    else:
+                        snapshot.update(tick)
+                    dirty[key] = 0
+                else:
+                    snapshot = snapshots.get(key)
+                    if snapshot is None:
+                        snapshots[key] = tick.copy()
+                    else:
+                        snapshot.assign(tick)
+                    dirty[key] = dirty.get(key, 0) | tick.updated
+            self.received += len(message["data"])
+        return True
+
+    def drain(self):
+        """Deliver the snapshot of every token changed since the last drain; returns the number delivered."""
+        with self.lock:
+            dirty, self.dirty = self.dirty, {}
+            ticks = []
+            for key, updated in dirty.items():
+                snapshot = self.snapshots[key]
+                if isinstance(snapshot, dict):
+                    ticks.append(dict(snapshot))
+                else:
+                    tick = snapshot.copy()
+                    tick.updated = updated
+                    ticks.append(tick)
+            self.delivered += len(ticks)
+        if ticks:
+            self.handler({"type": "stock_feed", "data": ticks})
+        return len(ticks)
+
+    def discard(self, exchange_segment, instrument_token):
+        """Forget the snapshot of an unsubscribed token."""
+        with self.lock:
+            key = exchange_segment, str(instrument_token)
+            self.snapshots.pop(key, None)
+            self.dirty.pop(key, None)
+
+    def start(self):
+        """Drain every `interval` seconds on a background thread."""
+        if self.running or not self.interval:
+            return self
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="neo-conflation", daemon=True)
+        self.thread.start()
+        return self
+
+    def run(self):
+        next_drain = time.monotonic()
+        while self.running:
+            next_drain += self.interval
+            delay = next_drain - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Behind schedule: restart the cadence rather than draining back to back
+                next_drain = time.monotonic()
+            try:
+                self.drain()
+            except Exception as e:
+                print("Error in conflated message handler: %s" % e)
+
+    def stop(self):
+        """Stop the background thread after a last drain."""
+        self.running = False
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.drain()
+
+    def metrics(self):
+        with self.lock:
+            return {"tokens": len(self.snapshots), "dirty": len(self.dirty), "received": self.received,
+                    "delivered": self.delivered,
+                    "ratio": self.received / self.delivered if self.delivered else None}
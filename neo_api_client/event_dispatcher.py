@@ -0,0 +1,222 @@
+import asyncio
+import collections
+import inspect
+import threading
+import time
+
+from neo_api_client import settings
+
+POLICIES = ("block", "drop_oldest", "conflate")
+# Queue entry standing for the conflated live feed, replaced by its ticks when it is delivered
+CONFLATED_FEED = object()
+# Handler latencies kept for the percentiles of `metrics`
+LATENCY_SAMPLES = 1024
+
+
+def tick_key(tick):
+    if isinstance(tick, dict):
+        return tick.get('e'), tick.get('tk')
+    return tick.e, tick.tk
+
+
+def detached(message):
+    """
+    `message` safe to hand to another thread: typed ticks of a `stock_feed` message are reused records, which the
+    websocket thread overwrites with the next update of their topic, so they are replaced by copies.
+    """
+    if isinstance(message, dict) and message.get("type") == "stock_feed":
+        ticks = message["data"]
+        if ticks and not isinstance(ticks[0], dict):
+            return dict(message, data=[tick.copy() for tick in ticks])
+    return message
+
+
+class EventDispatcher(object):
+    """
+        Bounded queue between the websocket thread and the user's `on_message`.
+
+        `put` only queues the message, so a slow handler no longer holds up the socket (frame acknowledgements,
+        heartbeats); the handler runs on a consumer thread (`start`) or an asyncio task (`serve`). When
+        `maxsize` messages are waiting, the `policy` decides:
+
+        - "block": `put` waits for the consumer, pushing back on the socket as before but with a buffer;
+        - "drop_oldest": the oldest waiting message is discarded;
+        - "conflate": live feed ticks are merged per instrument while they wait, so the handler receives the
+          latest state of each token in one `stock_feed` message, however far behind it is. Other messages block.
+    """
+
+    def __init__(self, handler, maxsize=None, policy=None):
+        """
+        :param handler: called with every message, a coroutine function when the dispatcher runs with `serve`
+        :param maxsize: messages waiting at most, defaults to `settings.EVENT_QUEUE_SIZE`
+        :param policy: one of POLICIES, defaults to `settings.EVENT_QUEUE_POLICY`
+        """
+        self.handler = handler
+        self.maxsize = maxsize or settings.EVENT_QUEUE_SIZE
+        self.policy = policy or settings.EVENT_QUEUE_POLICY
+        if self.policy not in POLICIES:
+            raise ValueError("Invalid policy %r, expected one of %s" % (self.policy, ", ".join(POLICIES)))
+        self.queue = collections.deque()
+        # Conflated ticks by (exchange_segment, token), waiting behind the CONFLATED_FEED entry of the queue; typed
+        # ticks are copies whose `updated` covers every conflated update
+        self.conflated = {}
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+        self.loop = None
+        self.wakeup = None
+        self.received = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.merged = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def put(self, message):
+        """
+        Queue `message` for the handler, applying the overflow policy; called by the websocket thread.
+
+        Typed ticks are queued as copies, since the websocket thread reuses their records.
+        """
+        with self.condition:
+            self.received += 1
+            if self.policy == "conflate" and isinstance(message, dict) and message.get("type") == "stock_feed":
+                self.conflate(message["data"])
+            else:
+                message = detached(message)
+                while len(self.queue) >= self.maxsize:
+                    # Without a consumer, waiting would stall the socket for good
+                    if self.policy == "drop_oldest" or not self.running:
+                        self.drop_oldest()
+                    else:
+                        self.condition.wait()
+                self.queue.append(message)
+            self.max_depth = max(self.max_depth, len(self.queue))
+            self.condition.notify_all()
+        loop = self.loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self.wakeup.set)
+
+    def conflate(self, ticks):
+        if not self.conflated:
+            self.queue.append(CONFLATED_FEED)
+        for tick in ticks:
+            key = tick_key(tick)
+            pending = self.conflated.get(key)
+            if pending is None:
+                self.conflated[key] = tick if isinstance(tick, dict) else tick.copy()
+                continue
+            self.merged += 1
+            if isinstance(tick, dict):
+                # Ticks only carry the fields that changed: keep the older values of the others
+                self.conflated[key] = {**pending, **tick}
+            else:
+                updated = pending.updated
+                pending.assign(tick)
+                pending.updated |= updated
+
+    def drop_oldest(self):
+        message = self.queue.popleft()
+        if message is CONFLATED_FEED:
+            self.dropped += len(self.conflated)
+            self.conflated = {}
+        else:
+            self.dropped += 1
+
+    def take(self):
+        """Next message, or None when the queue is empty; the caller holds the condition."""
+        if not self.queue:
+            return None
+        message = self.queue.popleft()
+        if message is CONFLATED_FEED:
+            message = {"type": "stock_feed", "data": list(self.conflated.values())}
+            self.conflated = {}
+        self.condition.notify_all()
+        return message
+
+    def record(self, started):
+        latency = time.perf_counter() - started
+        self.delivered += 1
+        self.latencies.append(latency)
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    def start(self):
+        """Deliver the messages on a dedicated consumer thread."""
+        if self.running:
+            return self
+        self.running = True
+        self.thread = threading.Thread(target=self.consume, name="neo-event-dispatch", daemon=True)
+        self.thread.start()
+        return self
+
+    def consume(self):
+        while True:
+            with self.condition:
+                while self.running and not self.queue:
+                    self.condition.wait()
+                message = self.take()
+            if message is None:
+                return
+            started = time.perf_counter()
+            try:
+                self.handler(message)
+            except Exception as e:
+                self.errors += 1
+                print("Error in event handler: %s" % e)
+            self.record(started)
+
+    async def serve(self):
+        """Deliver the messages from the running event loop, until `stop`; the handler may be a coroutine."""
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        self.running = True
+        try:
+            while True:
+                with self.condition:
+                    message = self.take()
+                    if message is None:
+                        if not self.running:
+                            return
+                        self.wakeup.clear()
+                if message is None:
+                    await self.wakeup.wait()
+                    continue
+                started = time.perf_counter()
+                try:
+                    result = self.handler(message)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as e:
+                    self.errors += 1
+                    print("Error in event handler: %s" % e)
+                self.record(started)
+        finally:
+            self.loop = None
+
+    def stop(self, timeout=None):
+        """Deliver the messages still queued, then stop the consumer."""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        loop = self.loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self.wakeup.set)
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    def metrics(self):
+        with self.condition:
+            depth = len(self.queue) + max(len(self.conflated) - 1, 0)
+        latencies = sorted(self.latencies)
+        return {
+            "policy": self.policy, "depth": depth, "max_depth": self.max_depth, "received": self.received,
+            "delivered": self.delivered, "dropped": self.dropped, "conflated": self.merged, "errors": self.errors,
+            "latency_avg": self.latency_total / self.delivered if self.delivered else None,
+            "latency_p50": latencies[len(latencies) // 2] if latencies else None,
+            "latency_p99": latencies[int(len(latencies) * 0.99)] if latencies else None,
+            "latency_max": self.latency_max if self.delivered else None,
+        }
@@ -0,0 +1,207 @@
+import queue
+import threading
+
+from neo_api_client import settings
+from neo_api_client.NeoWebSocket import NeoWebSocket
+from neo_api_client.event_dispatcher import detached
+from neo_api_client.reconnect import ReconnectManager
+from neo_api_client.settings import ReqTypeValues
+from neo_api_client.subscription_registry import SubscriptionRegistry
+
+
+class FeedPool(object):
+    """
+        Live feed spread over several HSM websocket sessions.
+
+        A single session carries at most 3,000 subscriptions; `NeoWebSocket.get_live_feed` unsubscribes everything
+        when a request would go beyond that. The pool keeps every session under `max_tokens`, opening a new one
+        when all are full, and merges the messages of all sessions into one stream: `on_message` (and the feed
+        listeners) are called under a lock, one message at a time, and with `use_queue` every message is also put
+        on `queue` as (sequence, message). When a session closes or loses its connection, the pool retires it and
+        subscribes its tokens on the remaining sessions, opening a new one if needed. Other errors of a session are
+        passed on to `on_error`.
+    """
+
+    def __init__(self, sid, token, server_id, data_center=None, typed_ticks=False, max_tokens=None,
+                 max_sessions=None, use_queue=False, session_factory=None, decode_workers=0):
+        """
+        :param max_tokens: subscriptions per session, defaults to `settings.FEED_POOL_SESSION_TOKENS`
+        :param max_sessions: sessions opened at most, defaults to `settings.FEED_POOL_MAX_SESSIONS`
+        :param use_queue: also put every (sequence, message) on `self.queue`
+        :param session_factory: callable returning a new `NeoWebSocket`, for custom sessions
+        :param decode_workers: decoding processes of each session, see `ParallelDecoder`
+        """
+        self.max_tokens = max_tokens or settings.FEED_POOL_SESSION_TOKENS
+        self.max_sessions = max_sessions or settings.FEED_POOL_MAX_SESSIONS
+        self.session_factory = session_factory or (
+            lambda: NeoWebSocket(sid, token, server_id, data_center, typed_ticks=typed_ticks,
+                                 decode_workers=decode_workers))
+        self.sessions = []
+        # Keys (see SubscriptionRegistry.key) held by every session, the session of each key and the request
+        # that subscribed it, kept to subscribe it again elsewhere when its session drops
+        self.session_keys = {}
+        self.key_sessions = {}
+        self.requests = {}
+        self.on_message = None
+        self.on_error = None
+        self.on_open = None
+        self.on_close = None
+        self.on_unsubscribed = None
+        self.feed_listeners = []
+        self.queue = queue.Queue() if use_queue else None
+        self.sequence = 0
+        self.failovers = 0
+        self.closed = False
+        self._lock = threading.RLock()
+        self._dispatch_lock = threading.Lock()
+
+    @staticmethod
+    def subscription_type(isIndex=False, isDepth=False):
+        if isDepth:
+            return ReqTypeValues.get("DEPTH_SUBS")
+        if isIndex:
+            return ReqTypeValues.get("INDEX_SUBS")
+        return ReqTypeValues.get("SCRIP_SUBS")
+
+    def _new_session(self):
+        session = self.session_factory()
+        session.on_message = lambda message: self._dispatch(session, message)
+        session.on_error = lambda error: self._on_session_error(session, error)
+        session.on_close = lambda: self._on_session_down(session)
+        session.on_open = self.on_open
+        session.on_unsubscribed = self._on_unsubscribed
+        self.sessions.append(session)
+        self.session_keys[id(session)] = set()
+        return session
+
+    def _place(self, items, isIndex, isDepth):
+        """Subscribe `items` on the least loaded sessions, opening sessions as they fill up."""
+        subscription_type = self.subscription_type(isIndex, isDepth)
+        pending, seen = [], set()
+        for item in items:
+            key = SubscriptionRegistry.key(item['exchange_segment'], item['instrument_token'], subscription_type)
+            if key not in self.key_sessions and key not in seen:
+                seen.add(key)
+                pending.append((key, item))
+        batches = []
+        while pending:
+            candidates = [s for s in self.sessions if len(self.session_keys[id(s)]) < self.max_tokens]
+            if candidates:
+                session = min(candidates, key=lambda s: len(self.session_keys[id(s)]))
+            elif len(self.sessions) < self.max_sessions:
+                session = self._new_session()
+            else:
+                if self.on_error:
+                    self.on_error(Exception("Feed pool is full: %d tokens could not be subscribed" % len(pending)))
+                break
+            free = self.max_tokens - len(self.session_keys[id(session)])
+            chunk, pending = pending[:free], pending[free:]
+            for key, item in chunk:
+                self.session_keys[id(session)].add(key)
+                self.key_sessions[key] = session
+                self.requests[key] = (item, isIndex, isDepth)
+            batches.append((session, [dict(item) for _, item in chunk]))
+        return batches
+
+    def subscribe(self, instrument_tokens, isIndex=False, isDepth=False):
+        """Subscribe to the live feed of `instrument_tokens` (same format as `NeoAPI.subscribe`)."""
+        for item in instrument_tokens:
+            if 'instrument_token' not in item or 'exchange_segment' not in item:
+                if self.on_error:
+                    self.on_error(Exception("Invalid Inputs"))
+                return
+        with self._lock:
+            self.closed = False
+            batches = self._place(instrument_tokens, isIndex, isDepth)
+        for session, tokens in batches:
+            session.get_live_feed(instrument_tokens=tokens, isIndex=isIndex, isDepth=isDepth)
+
+    def un_subscribe(self, instrument_tokens, isIndex=False, isDepth=False):
+        subscription_type = self.subscription_type(isIndex, isDepth)
+        by_session = {}
+        with self._lock:
+            for item in instrument_tokens:
+                key = SubscriptionRegistry.key(item['exchange_segment'], item['instrument_token'], subscription_type)
+                session = self.key_sessions.pop(key, None)
+                if session is None:
+                    continue
+                self.session_keys[id(session)].discard(key)
+                self.requests.pop(key, None)
+                by_session.setdefault(id(session), (session, []))[1].append(
+                    {'instrument_token': item['instrument_token'], 'exchange_segment': item['exchange_segment']})
+        for session, tokens in by_session.values():
+            session.un_subscribe_list(instrument_tokens=tokens, isIndex=isIndex, isDepth=isDepth)
+
+    def _dispatch(self, session, message):
+        with self._dispatch_lock:
+            self.sequence += 1
+            if isinstance(message, dict) and message.get("type") == "stock_feed":
+                for listener in self.feed_listeners:
+                    listener(message["data"])
+            if self.queue is not None:
+                # Read later by another thread, after the session has reused its typed tick records
+                self.queue.put((self.sequence, detached(message)))
+            if self.on_message:
+                self.on_message(message)
+
+    def _on_unsubscribed(self, exchange_segment, instrument_token):
+        """Pass on the end of a token's feed, unless another subscription type of it is pooled."""
+        with self._lock:
+            if any(SubscriptionRegistry.key(exchange_segment, instrument_token, self.subscription_type(*flags))
+                   in self.key_sessions for flags in ((False, False), (True, False), (False, True))):
+                return
+        if self.on_unsubscribed:
+            self.on_unsubscribed(exchange_segment, instrument_token)
+
+    def _on_session_error(self, session, error):
+        """Fail over when `session` lost its connection; other errors (such as invalid inputs) are passed on."""
+        if ReconnectManager.is_dropped(error):
+            self._on_session_down(session, error)
+        elif self.on_error:
+            self.on_error(error)
+
+    def _on_session_down(self, session, error=None):
+        """Retire a dropped session and move its subscriptions to the other sessions."""
+        with self._lock:
+            if session not in self.sessions or self.closed:
+                return
+            self.sessions.remove(session)
+            keys = self.session_keys.pop(id(session), set())
+            requests = [self.requests.pop(key) for key in keys if key in self.requests]
+            for key in keys:
+                self.key_sessions.pop(key, None)
+            self.failovers += 1
+            batches = []
+            for isIndex, isDepth in {(r[1], r[2]) for r in requests}:
+                items = [r[0] for r in requests if (r[1], r[2]) == (isIndex, isDepth)]
+                batches.extend((session_, tokens, isIndex, isDepth)
+                               for session_, tokens in self._place(items, isIndex, isDepth))
+        # Stop the retired session from reconnecting on its own
+        session.on_close = session.on_error = session.on_message = None
+        if session.hsWebsocket:
+            try:
+                session.hsWebsocket.close()
+            except Exception:
+                pass
+        for target, tokens, isIndex, isDepth in batches:
+            target.get_live_feed(instrument_tokens=tokens, isIndex=isIndex, isDepth=isDepth)
+        if error is not None and self.on_error:
+            self.on_error(error)
+
+    def close(self):
+        """Close every session."""
+        with self._lock:
+            self.closed = True
+            sessions, self.sessions = self.sessions, []
+            self.session_keys, self.key_sessions, self.requests = {}, {}, {}
+        for session in sessions:
+            session.on_close = session.on_error = None
+            if session.hsWebsocket:
+                session.hsWebsocket.close()
+        if self.on_close:
+            self.on_close()
+
+    def metrics(self):
+        with self._lock:
+            return {"sessions": len(self.sessions), "tokens": len(self.key_sessions), "failovers": self.failovers,
+                    "tokens_per_session": [len(self.session_keys[id(s)]) for s in self.sessions]}
@@ -0,0 +1,280 @@
+import base64
+import hashlib
+import os
+import socket
+import struct
+import threading
+import time
+
+FILE_MAGIC = b"NEOFEED1"
+# Receive time (ns since the epoch), websocket opcode and payload length of every recorded frame
+RECORD_HEADER = struct.Struct("<qBI")
+OPCODE_TEXT = 0x1
+OPCODE_BINARY = 0x2
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class FeedRecorder(object):
+    """
+        Appends the raw frames received by an HSM websocket to a file, with their receive time.
+
+        The file starts with FILE_MAGIC, followed by one record per frame: the RECORD_HEADER (receive time in
+        nanoseconds, opcode, length) and the frame as received, before any decoding. Records are only ever
+        appended, so a file cut short by a crash stays readable up to its last complete record.
+    """
+
+    def __init__(self, path, buffer_size=1 << 16):
+        """
+        :param path: file to append to, created with its header when missing
+        :param buffer_size: bytes buffered before they are written to the file
+        """
+        self.path = path
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "ab", buffering=buffer_size)
+        if new_file:
+            self.file.write(FILE_MAGIC)
+        self.lock = threading.Lock()
+        self.frames = 0
+        self.bytes = 0
+
+    def record(self, frame, received_at=None):
+        """Append one frame (bytes for binary frames, str for text frames)."""
+        if isinstance(frame, str):
+            opcode, frame = OPCODE_TEXT, frame.encode("utf-8")
+        else:
+            opcode = OPCODE_BINARY
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(RECORD_HEADER.pack(received_at or time.time_ns(), opcode, len(frame)))
+            self.file.write(frame)
+            self.frames += 1
+            self.bytes += len(frame)
+
+    def flush(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class FeedReader(object):
+    """Reads the frames of a file written by `FeedRecorder`, as (receive time in ns, opcode, payload)."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __iter__(self):
+        with open(self.path, "rb") as f:
+            if f.read(len(FILE_MAGIC)) != FILE_MAGIC:
+                raise ValueError("%s is not a recorded feed" % self.path)
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    return
+                received_at, opcode, length = RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length:
+                    return
+                yield received_at, opcode, payload
+
+    def frames(self):
+        """Payloads of every frame: bytes for binary frames and str for text frames, as the socket delivers them."""
+        return [payload if opcode == OPCODE_BINARY else payload.decode("utf-8") for _, opcode, payload in self]
+
+
+def recv_exact(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed")
+        data += chunk
+    return data
+
+
+def read_frame(sock):
+    """Read one (unfragmented) websocket frame sent by a client; returns (opcode, payload)."""
+    head = recv_exact(sock, 2)
+    opcode = head[0] & 0x0F
+    length = head[1] & 0x7F
+    if length == 126:
+        length = struct.unpack(">H", recv_exact(sock, 2))[0]
+    elif length == 127:
+        length = struct.unpack(">Q", recv_exact(sock, 8))[0]
+    mask = recv_exact(sock, 4) if head[1] & 0x80 else None
+    payload = recv_exact(sock, length)
+    if mask:
+        payload = bytes(b ^ mask[i & 3] for i, b in enumerate(payload))
+    return opcode, payload
+
+
+def frame_header(opcode, length):
+    if length < 126:
+        return bytes((0x80 | opcode, length))
+    if length < 1 << 16:
+        return bytes((0x80 | opcode, 126)) + struct.pack(">H", length)
+    return bytes((0x80 | opcode, 127)) + struct.pack(">Q", length)
+
+
+class ReplayConnection(object):
+    def __init__(self, server, sock):
+        self.server = server
+        self.sock = sock
+        self.send_lock = threading.Lock()
+        self.requested = threading.Event()
+        self.closed = False
+
+    def send(self, opcode, payload):
+        with self.send_lock:
+            self.sock.sendall(frame_header(opcode, len(payload)) + payload)
+
+    def handshake(self):
+        request = b""
+        while b"\r\n\r\n" not in request:
+            chunk = self.sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("Connection closed during the handshake")
+            request += chunk
+        key = None
+        for line in request.decode("latin-1").split("\r\n"):
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "sec-websocket-key":
+                key = value.strip()
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+        self.sock.sendall(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                           "Sec-WebSocket-Accept: %s\r\n\r\n" % accept).encode())
+
+    def receive(self):
+        """Read the client's frames: requests, acknowledgements, pings and close."""
+        try:
+            while not self.closed:
+                opcode, payload = read_frame(self.sock)
+                if opcode == OPCODE_CLOSE:
+                    break
+                if opcode == OPCODE_PING:
+                    self.send(OPCODE_PONG, payload)
+                    continue
+                self.server.requests += 1
+                self.requested.set()
+        except (ConnectionError, OSError):
+            pass
+        self.close()
+
+    def play(self):
+        server = self.server
+        if server.wait_for_request:
+            self.requested.wait()
+        started = time.perf_counter()
+        first = None
+        try:
+            for received_at, opcode, payload in server.records:
+                if self.closed or not server.running:
+                    return
+                if server.speed:
+                    if first is None:
+                        first = received_at
+                    delay = (received_at - first) / 1e9 / server.speed - (time.perf_counter() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+                self.send(opcode, payload)
+                server.sent += 1
+        except OSError:
+            return
+        finally:
+            server.elapsed = time.perf_counter() - started
+            server.done.set()
+
+    def run(self):
+        try:
+            self.handshake()
+        except (ConnectionError, OSError):
+            self.close()
+            return
+        threading.Thread(target=self.receive, daemon=True).start()
+        self.play()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class FeedReplayServer(object):
+    """
+        Local websocket server playing a recorded feed back to every client that connects.
+
+        Point `HSWebSocket.open_connection` (or `neo_api_client.WEBSOCKET_URL`) at `url`. Once the client sends its
+        first request (the connection request), the recorded frames are sent in order, the server's own responses
+        to the recorded session included, so the client decodes exactly what it received when recording. Requests
+        of the client are read and otherwise ignored.
+    """
+
+    def __init__(self, path=None, records=None, speed=1.0, host="127.0.0.1", port=0, wait_for_request=True):
+        """
+        :param path: file written by `FeedRecorder`
+        :param records: (receive time in ns, opcode, payload) tuples to play instead of a file
+        :param speed: 1.0 replays at the recorded pace, 10.0 ten times faster, 0 or None as fast as possible
+        :param wait_for_request: wait for the client's first request before playing
+        """
+        self.records = list(FeedReader(path)) if records is None else list(records)
+        self.speed = speed
+        self.wait_for_request = wait_for_request
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.host, self.port = self.sock.getsockname()
+        self.connections = []
+        self.running = False
+        self.done = threading.Event()
+        self.requests = 0
+        self.sent = 0
+        self.elapsed = None
+
+    @property
+    def url(self):
+        return "ws://%s:%d" % (self.host, self.port)
+
+    def start(self):
+        self.running = True
+        self.sock.listen(8)
+        threading.Thread(target=self.accept, daemon=True).start()
+        return self
+
+    def accept(self):
+        while self.running:
+            try:
+                sock, _ = self.sock.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connection = ReplayConnection(self, sock)
+            self.connections.append(connection)
+            threading.Thread(target=connection.run, daemon=True).start()
+
+    def wait(self, timeout=None):
+        """Wait until a client has been sent the whole recording; returns False on timeout."""
+        return self.done.wait(timeout)
+
+    def stop(self):
+        self.running = False
+        self.sock.close()
+        for connection in self.connections:
+            connection.close()
+
+    def metrics(self):
+        return {"frames": len(self.records), "sent": self.sent, "requests": self.requests, "elapsed": self.elapsed,
+                "frames_per_second": self.sent / self.elapsed if self.elapsed else None}
@@ -0,0 +1,161 @@
+import heapq
+import itertools
+import threading
+import time
+
+from neo_api_client import settings
+
+
+class Heartbeat(object):
+    """
+        A connection registered with a HeartbeatService: what to send, how often, and whether it answered.
+
+        `beat` is called for every pong or frame received; a connection with a `timeout` that stays silent for that
+        long after a ping is declared dead.
+    """
+
+    def __init__(self, service, ping, interval, timeout=None, on_dead=None, name=None):
+        self.service = service
+        self.ping = ping
+        self.interval = interval
+        self.timeout = timeout
+        self.on_dead = on_dead
+        self.name = name
+        self.active = True
+        # True from a ping until the next pong or frame, and the time of the first unanswered ping
+        self.awaiting = False
+        self.awaiting_since = None
+        self.pings = 0
+
+    def beat(self):
+        self.awaiting = False
+
+    def cancel(self):
+        self.service.unregister(self)
+
+
+class HeartbeatService(object):
+    """
+        Sends the heartbeats of every websocket connection from a single thread.
+
+        Each registered connection is pinged every `interval` seconds. Pings, and the liveness checks `timeout`
+        seconds after them, are kept in one heap ordered by due time: the thread sleeps until the earliest one,
+        and registering an earlier one wakes it. Connections that cancel are skipped when due, and the thread ends
+        when no connection is registered, so idle sessions and reconnects cost no threads.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        # (due, sequence, heartbeat, is_check)
+        self.queue = []
+        self.sequence = itertools.count()
+        self.heartbeats = set()
+        self.thread = None
+        self.sent = 0
+        self.errors = 0
+        self.dead = 0
+
+    def register(self, ping, interval=None, timeout=None, on_dead=None, name=None):
+        """
+        Call `ping` every `interval` seconds from the heartbeat thread.
+
+        :param ping: sends one heartbeat; exceptions are counted and the connection stays registered
+        :param interval: seconds between pings, defaults to `settings.HEARTBEAT_INTERVAL`
+        :param timeout: with a value, `on_dead(heartbeat)` is called, once, when neither a pong nor any frame
+            (see `Heartbeat.beat`) arrived within `timeout` seconds of a ping, and the connection is unregistered
+        :param name: label in `metrics`
+        :return: Heartbeat, whose `cancel` unregisters the connection
+        """
+        heartbeat = Heartbeat(self, ping, interval or settings.HEARTBEAT_INTERVAL, timeout, on_dead, name)
+        with self.lock:
+            self.heartbeats.add(heartbeat)
+            self._schedule(self.clock() + heartbeat.interval, heartbeat, False)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="neo-heartbeat", daemon=True)
+                self.thread.start()
+        return heartbeat
+
+    def unregister(self, heartbeat):
+        with self.lock:
+            heartbeat.active = False
+            self.heartbeats.discard(heartbeat)
+            self.wakeup.notify()
+
+    def _schedule(self, due, heartbeat, is_check):
+        # Called with the lock held
+        if not self.queue or due < self.queue[0][0]:
+            self.wakeup.notify()
+        heapq.heappush(self.queue, (due, next(self.sequence), heartbeat, is_check))
+
+    def _next(self):
+        """Wait for the next due ping or check; None, once the thread has been released, when nothing is left."""
+        with self.lock:
+            while True:
+                while self.queue and not self.queue[0][2].active:
+                    heapq.heappop(self.queue)
+                if not self.heartbeats:
+                    self.queue = []
+                    self.thread = None
+                    return None
+                wait = self.queue[0][0] - self.clock()
+                if wait > 0:
+                    self.wakeup.wait(wait)
+                    continue
+                _, _, heartbeat, is_check = heapq.heappop(self.queue)
+                return heartbeat, is_check
+
+    def run(self):
+        while True:
+            task = self._next()
+            if task is None:
+                return
+            heartbeat, is_check = task
+            if is_check:
+                self._check(heartbeat)
+            else:
+                self._ping(heartbeat)
+
+    def _ping(self, heartbeat):
+        now = self.clock()
+        if heartbeat.timeout is not None and not heartbeat.awaiting:
+            heartbeat.awaiting = True
+            heartbeat.awaiting_since = now
+            with self.lock:
+                if heartbeat.active:
+                    self._schedule(now + heartbeat.timeout, heartbeat, True)
+        try:
+            heartbeat.ping()
+            heartbeat.pings += 1
+            self.sent += 1
+        except Exception:
+            # The socket is closing: its own error and close handling reports it
+            self.errors += 1
+        with self.lock:
+            if heartbeat.active:
+                self._schedule(now + heartbeat.interval, heartbeat, False)
+
+    def _check(self, heartbeat):
+        if not (heartbeat.awaiting and self.clock() - heartbeat.awaiting_since >= heartbeat.timeout):
+            return
+        with self.lock:
+            if not heartbeat.active:
+                return
+            heartbeat.active = False
+            self.heartbeats.discard(heartbeat)
+            self.dead += 1
+        if heartbeat.on_dead:
+            heartbeat.on_dead(heartbeat)
+
+    def metrics(self):
+        with self.lock:
+            names = {}
+            for heartbeat in self.heartbeats:
+                names[heartbeat.name] = names.get(heartbeat.name, 0) + 1
+            return {"connections": len(self.heartbeats), "by_name": names, "pings": self.sent, "errors": self.errors,
+                    "dead": self.dead, "thread": self.thread is not None}
+
+
+# Heartbeats of every connection of this process
+HEARTBEAT = HeartbeatService()
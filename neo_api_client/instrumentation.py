@@ -0,0 +1,223 @@
+import functools
+import json
+import os
+import threading
+import time
+
+from neo_api_client import settings
+
+# Metric families: label name and help text. Timings are recorded in nanoseconds and exported in seconds.
+METRICS = {
+    "rest_wait": ("endpoint", "Time spent waiting for the client-side rate limiter"),
+    "rest_request": ("endpoint", "HTTP round trip of RESTClientObject.request, response body included"),
+    "api_call": ("endpoint", "api/* endpoint call: rate limiting, HTTP round trip and JSON decoding"),
+    "hsm_parse": ("frame", "HSWrapper.parseData per websocket frame, by frame type"),
+    "hsm_prepare": ("feed", "prepareData per SNAP or UPDATE packet, by feed type"),
+    "ws_message": ("type", "NeoWebSocket.on_hsm_message per message, callbacks included"),
+    "callback": ("type", "User on_message callback, by message type"),
+}
+# Bucket i counts the timings in (2 ** (i - 1), 2 ** i] ns, so that its bound is a Prometheus "le"; the last one
+# everything above about 9 minutes
+BUCKETS = 40
+SUM = BUCKETS + 1
+MAX = BUCKETS + 2
+
+
+class Histogram(object):
+    """
+        Latency histogram with power of two buckets, written without locks.
+
+        Every thread records into its own shard (bucket counts, sum and max in one list), so concurrent `observe`
+        calls never update the same counter and lose no increments; `snapshot` adds the shards up, reading values
+        at most one observation old. The shards of threads that have ended are folded into `base` when a thread
+        records its first timing and on `snapshot`, so short-lived pool threads do not accumulate.
+    """
+
+    def __init__(self):
+        self.base = [0] * (MAX + 1)
+        # (thread, shard) of every thread that has recorded since the last fold
+        self.shards = []
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def observe(self, ns):
+        try:
+            shard = self.local.shard
+        except AttributeError:
+            shard = self.local.shard = [0] * (MAX + 1)
+            with self.lock:
+                self._fold()
+                self.shards.append((threading.current_thread(), shard))
+        shard[min((ns - 1).bit_length(), BUCKETS)] += 1
+        shard[SUM] += ns
+        if ns > shard[MAX]:
+            shard[MAX] = ns
+
+    def _fold(self):
+        """Add the shards of the threads that have ended to `base`, with the lock held."""
+        live = []
+        base = self.base
+        for thread, shard in self.shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+                continue
+            for index in range(MAX):
+                base[index] += shard[index]
+            base[MAX] = max(base[MAX], shard[MAX])
+        self.shards = live
+
+    def snapshot(self):
+        """[bucket counts..., sum, max] over every thread."""
+        with self.lock:
+            self._fold()
+            total = list(self.base)
+            shards = [shard for _, shard in self.shards]
+        base_max = total[MAX]
+        for shard in shards:
+            for index, value in enumerate(list(shard)):
+                total[index] += value
+        total[MAX] = max([base_max] + [shard[MAX] for shard in shards])
+        return total
+
+
+def bucket_bound(index):
+    """Upper bound of bucket `index`, in seconds, inclusive."""
+    return 2 ** index / 1e9
+
+
+def quantile(counts, count, q):
+    """Upper bound, in seconds, of the bucket holding the `q` quantile."""
+    rank = q * count
+    seen = 0
+    for index, bucket_count in enumerate(counts):
+        seen += bucket_count
+        if seen >= rank:
+            return bucket_bound(index)
+    return bucket_bound(BUCKETS)
+
+
+class Instrumentation(object):
+    """
+        Registry of the latency histograms recorded on the REST and websocket hot paths.
+
+        Instrumented code checks `enabled` before reading the clock, so when instrumentation is off (the default,
+        `settings.INSTRUMENTATION_ENABLED`) each hook costs one attribute lookup. Histograms are created on first
+        use per (metric, label), see METRICS, and exported as Prometheus text (`prometheus`) or a dict
+        (`to_json`), also written to a file periodically by `start_json_dump`.
+    """
+
+    def __init__(self, enabled=None):
+        self.enabled = settings.INSTRUMENTATION_ENABLED if enabled is None else enabled
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.dump_thread = None
+        self.dump_stop = threading.Event()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def observe(self, metric, label, ns):
+        """Record a timing of `ns` nanoseconds."""
+        histogram = self.histograms.get((metric, label))
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault((metric, label), Histogram())
+        histogram.observe(ns)
+
+    def timed(self, metric, label):
+        """Decorator recording the duration of every call of the decorated function while enabled."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                started = time.perf_counter_ns()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(metric, label, time.perf_counter_ns() - started)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+
+    def to_json(self):
+        """{metric: {label: {"count", "mean", "p50", "p90", "p99", "max"}}}, in seconds."""
+        report = {}
+        for (metric, label), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+            snapshot = histogram.snapshot()
+            counts = snapshot[:BUCKETS + 1]
+            count = sum(counts)
+            if not count:
+                continue
+            report.setdefault(metric, {})[label] = {
+                "count": count,
+                "mean": snapshot[SUM] / count / 1e9,
+                "p50": quantile(counts, count, 0.5),
+                "p90": quantile(counts, count, 0.9),
+                "p99": quantile(counts, count, 0.99),
+                "max": snapshot[MAX] / 1e9,
+            }
+        return report
+
+    def prometheus(self, prefix="neo_"):
+        """Histograms in the Prometheus text exposition format."""
+        lines = []
+        families = {}
+        for (metric, label), histogram in self.histograms.items():
+            families.setdefault(metric, []).append((label, histogram))
+        for metric in sorted(families):
+            name = prefix + metric + "_seconds"
+            label_name, help_text = METRICS.get(metric, ("label", metric))
+            lines.append("# HELP %s %s" % (name, help_text))
+            lines.append("# TYPE %s histogram" % name)
+            for label, histogram in sorted(families[metric], key=lambda item: str(item[0])):
+                snapshot = histogram.snapshot()
+                label_value = str(label).replace("\\", "\\\\").replace('"', '\\"')
+                cumulative = 0
+                for index in range(BUCKETS):
+                    cumulative += snapshot[index]
+                    lines.append('%s_bucket{%s="%s",le="%.9g"} %d'
+                                 % (name, label_name, label_value, bucket_bound(index), cumulative))
+                cumulative += snapshot[BUCKETS]
+                lines.append('%s_bucket{%s="%s",le="+Inf"} %d' % (name, label_name, label_value, cumulative))
+                lines.append('%s_sum{%s="%s"} %.9f' % (name, label_name, label_value, snapshot[SUM] / 1e9))
+                lines.append('%s_count{%s="%s"} %d' % (name, label_name, label_value, cumulative))
+        return "\n".join(lines) + "\n"
+
+    def dump_json(self, path):
+        """Write `to_json` to `path`, replacing the previous dump atomically."""
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"time": time.time(), "metrics": self.to_json()}, f, indent=2)
+        os.replace(temp_path, path)
+
+    def start_json_dump(self, path, interval=60):
+        """Dump the histograms to `path` every `interval` seconds on a background thread."""
+        self.stop_json_dump()
+        self.dump_stop.clear()
+
+        def run():
+            while not self.dump_stop.wait(interval):
+                try:
+                    self.dump_json(path)
+                except OSError as e:
+                    print("Unable to write the latency metrics to %s: %s" % (path, e))
+
+        self.dump_thread = threading.Thread(target=run, name="neo-metrics-dump", daemon=True)
+        self.dump_thread.start()
+
+    def stop_json_dump(self):
+        if self.dump_thread is not None:
+            self.dump_stop.set()
+            self.dump_thread.join()
+            self.dump_thread = None
+
+
+# Process wide registry used by the instrumented code
+REGISTRY = Instrumentation()
@@ -1,8 +1,11 @@
 import inspect
+import time
 
 import neo_api_client
+from neo_api_client import codec
 from neo_api_client import req_data_validation
 from neo_api_client.api_client import ApiClient
+from neo_api_client.instrumentation import REGISTRY
 
 
 class NeoAPI:
@@ -79,6 +82,13 @@ class NeoAPI:
             self.api_client = ApiClient(self.configuration)
 
         self.NeoWebSocket = None
+        self.feed_pool = None
+        self.event_dispatcher = None
+        self.conflater = None
+        self.feed_recorder = None
+        self.order_state_cache = neo_api_client.OrderStateCache(self.order_report)
+        self.quotes_engine = neo_api_client.QuotesEngine(self.api_client)
+        self.feed_listeners = []
         self.configuration.neo_fin_key = neo_fin_key
         self.configuration.consumer_key = consumer_key
 
@@ -171,6 +181,99 @@ class NeoAPI:
         else:
             return {"Error Message": "Complete the 2fa process before accessing this application"}
 
+    def place_orders(self, order_specs, max_workers=None):
+        """
+            Places a basket of orders concurrently.
+
+            Every leg is validated before anything is sent, so a basket with an invalid leg is rejected as a whole.
+            Valid baskets are dispatched over a bounded pool of workers sharing the pooled HTTP connections.
+
+            Parameters:
+            order_specs (list): One dict per leg with the keyword arguments accepted by `place_order`,
+                e.g. {"exchange_segment": "nse_fo", "product": "NRML", "price": "0", "order_type": "MKT",
+                "quantity": "50", "validity": "DAY", "trading_symbol": "", "transaction_type": "B"}
+            max_workers (int, optional): Maximum number of legs in flight at once. Defaults to the HTTP pool size.
+
+            Returns:
+            {"data": [{"leg": 0, "response": {...}, "elapsed_ms": 12.3}, ...], "elapsed_ms": 25.1}
+            with one entry per leg in input order, or {"Error": [{"leg": index, "Error": ...}]} when validation
+            fails for any leg.
+        """
+        if self.configuration.edit_token and self.configuration.edit_sid:
+            if not order_specs:
+                return {"Error": "order_specs must contain at least one order"}
+            order_legs = []
+            errors = []
+            leg_params = inspect.signature(NeoAPI.place_order).parameters
+            for index, spec in enumerate(order_specs):
+                try:
+                    unknown = [key for key in spec if key == "self" or key not in leg_params]
+                    if unknown:
+                        raise ValueError("Unknown order parameters: " + ", ".join(unknown))
+                    leg = dict(neo_api_client.settings.order_leg_defaults)
+                    leg.update(spec)
+                    req_data_validation.place_order_validation(leg["exchange_segment"], leg["product"], leg["price"],
+                                                               leg["order_type"], leg["quantity"], leg["validity"],
+                                                               leg["trading_symbol"], leg["transaction_type"],
+                                                               amo=leg["amo"],
+                                                               disclosed_quantity=leg["disclosed_quantity"],
+                                                               market_protection=leg["market_protection"],
+                                                               pf=leg["pf"], trigger_price=leg["trigger_price"],
+                                                               tag=leg.get("tag"))
+                    leg["exchange_segment"] = neo_api_client.settings.exchange_segment[leg["exchange_segment"]]
+                    leg["product"] = neo_api_client.settings.product[leg["product"]]
+                    leg["order_type"] = neo_api_client.settings.order_type[leg["order_type"]]
+                    order_legs.append(leg)
+                except Exception as e:
+                    errors.append({"leg": index, "Error": e})
+            if errors:
+                return {"Error": errors}
+            try:
+                return neo_api_client.BatchOrderAPI(self.api_client).place_orders(order_legs,
+                                                                                  max_workers=max_workers)
+            except Exception as e:
+                return {'Error': e}
+        else:
+            return {"Error Message": "Complete the 2fa process before accessing this application"}
+
+    def cancel_orders(self, order_ids, amo="NO", isVerify=False, max_workers=None):
+        """
+            Cancels several orders concurrently.
+
+            Args:
+                order_ids (list): The IDs of the orders to cancel.
+                amo (str, optional): Default is "NO" for no amount specified.
+                isVerify (bool, optional): Whether to verify the cancellation. Default is False.
+                    If True, the order book is fetched once and orders that are already 'rejected', 'cancelled',
+                    'traded' or 'completed' are reported instead of being cancelled.
+                max_workers (int, optional): Maximum number of cancellations in flight at once.
+                    Defaults to the HTTP pool size.
+
+            Returns:
+                {"data": [{"leg": 0, "response": {...}, "elapsed_ms": 12.3}, ...], "elapsed_ms": 25.1}
+                with one entry per order id in input order, or {"Error": [{"leg": index, "Error": ...}]} when
+                validation fails for any order id.
+        """
+        if self.configuration.edit_token and self.configuration.edit_sid:
+            if not order_ids:
+                return {"Error": "order_ids must contain at least one order id"}
+            errors = []
+            for index, order_id in enumerate(order_ids):
+                try:
+                    req_data_validation.cancel_order_validation(order_id, amo)
+                except Exception as e:
+                    errors.append({"leg": index, "Error": e})
+            if errors:
+                return {"Error": errors}
+            try:
+                return neo_api_client.BatchOrderAPI(self.api_client).cancel_orders(order_ids, amo=amo,
+                                                                                   isVerify=isVerify,
+                                                                                   max_workers=max_workers)
+            except Exception as e:
+                return {'Error': e}
+        else:
+            return {"Error Message": "Complete the 2fa process before accessing this application"}
+
     def cancel_order(self, order_id, amo="NO", isVerify=False):
         """
             Cancels an order with the given `order_id` using the NEO API.
@@ -582,6 +685,35 @@ class NeoAPI:
         else:
             return {"Error Message": "Complete the 2fa process before accessing this application"}
 
+    def option_chain(self, underlying, expiry=None, strike_range=None, option_type=None, exchange_segment="nse_fo"):
+        """
+            Option contracts of an underlying, from the local scrip master store.
+
+            Args:
+                underlying (str): The underlying name, e.g. "NIFTY". This argument is mandatory.
+                expiry (str): The expiry date, "26DEC2024" or "2024-12-26". This argument is optional.
+                strike_range: A strike price, or a (min, max) tuple of strike prices in rupees. This argument is optional.
+                option_type (str): "CE" or "PE". This argument is optional.
+                exchange_segment (str): The exchange segment, Default value is "nse_fo".
+
+            Returns:
+                list: The scrip details of the matching contracts ordered by expiry, strike price and option type, in
+                the same format as search_scrip.
+        """
+        if self.configuration.edit_token and self.configuration.edit_sid:
+            try:
+                exchange_segment = neo_api_client.settings.exchange_segment[exchange_segment]
+                chain = self.api_client.get_scrip_master_store().option_chain(exchange_segment)
+                df = chain.chain(underlying, expiry=expiry, strike_range=strike_range, option_type=option_type)
+                if len(df) > 0:
+                    return codec.loads(df.to_json(orient='records'))
+                return {"message": "No data found with the given search information."
+                                   "Please try with other combinations."}
+            except Exception as e:
+                return {"Error": e, "message": 'Exchange Segment is not available'}
+        else:
+            return {"Error Message": "Complete the 2fa process before accessing this application"}
+
     def __on_open(self):
         if self.on_open:
             self.on_open("The Session has been Opened!")
@@ -598,8 +730,33 @@ class NeoAPI:
 
     def __on_message(self, message):
         # print('[NEO_API]: "In-side NeoAPI Class')
-        if self.on_message:
-            self.on_message(message)
+        conflater = self.conflater
+        if conflater is None or not conflater.put(message):
+            self.__deliver_message(message)
+
+    def __on_unsubscribed(self, exchange_segment, instrument_token):
+        conflater = self.conflater
+        if conflater is not None:
+            conflater.discard(exchange_segment, instrument_token)
+
+    def __deliver_message(self, message):
+        dispatcher = self.event_dispatcher
+        if dispatcher is not None:
+            dispatcher.put(message)
+        else:
+            self.__dispatch_message(message)
+
+    def __dispatch_message(self, message):
+        if not self.on_message:
+            return None
+        if not REGISTRY.enabled:
+            return self.on_message(message)
+        started = time.perf_counter_ns()
+        try:
+            return self.on_message(message)
+        finally:
+            REGISTRY.observe("callback", message.get("type", "other") if isinstance(message, dict) else "text",
+                             time.perf_counter_ns() - started)
 
     def check_callbacks(self):
         show_warning = not self.on_close or not self.on_open or not self.on_message or not self.on_error
@@ -623,6 +780,236 @@ class NeoAPI:
             self.NeoWebSocket.on_error = self.__on_error
             self.NeoWebSocket.on_open = self.__on_open
             self.NeoWebSocket.on_close = self.__on_close
+            self.NeoWebSocket.on_unsubscribed = self.__on_unsubscribed
+            self.NeoWebSocket.order_state_cache = self.order_state_cache
+            self.NeoWebSocket.feed_listeners = self.feed_listeners
+            self.NeoWebSocket.set_recorder(self.feed_recorder)
+
+    def add_feed_listener(self, listener):
+        """
+            Register a callable that receives every live feed message (the list of ticks of a `stock_feed`
+            message), in addition to `on_message`. Listeners run on the websocket thread and must return quickly.
+
+            Example:
+                store = neo_api_client.TickStore()
+                client.add_feed_listener(store.on_ticks)
+        """
+        if listener not in self.feed_listeners:
+            self.feed_listeners.append(listener)
+
+    def remove_feed_listener(self, listener):
+        if listener in self.feed_listeners:
+            self.feed_listeners.remove(listener)
+
+    def enable_event_dispatch(self, maxsize=None, policy=None, start=True):
+        """
+            Deliver websocket messages to `on_message` from a bounded queue instead of the websocket thread, so a
+            slow handler does not delay frame acknowledgements and heartbeats.
+
+            Parameters:
+                maxsize (int, optional): Messages waiting at most. Defaults to `settings.EVENT_QUEUE_SIZE`.
+                policy (str, optional): What to do when the queue is full: "block" waits for the handler,
+                    "drop_oldest" discards the oldest message and "conflate" merges the waiting live feed ticks of
+                    each token. Defaults to `settings.EVENT_QUEUE_POLICY`.
+                start (bool): Start the consumer thread. Pass False to run the consumer as an asyncio task instead,
+                    where `on_message` may be a coroutine function:
+                        asyncio.create_task(client.enable_event_dispatch(start=False).serve())
+
+            Example:
+                dispatcher = client.enable_event_dispatch(policy="conflate")
+                dispatcher.metrics()
+                # {"policy": "conflate", "depth": 0, "max_depth": 35, "delivered": 10211, "latency_p99": 0.004, ...}
+
+            Returns:
+                EventDispatcher
+        """
+        if self.event_dispatcher is None:
+            self.event_dispatcher = neo_api_client.EventDispatcher(self.__dispatch_message, maxsize=maxsize,
+                                                                   policy=policy)
+            if start:
+                self.event_dispatcher.start()
+        return self.event_dispatcher
+
+    def enable_conflation(self, interval=None):
+        """
+            Deliver at most one live feed update per token per interval to `on_message`, instead of every tick.
+
+            Ticks received in between are merged into the latest state of each token, so a strategy that only needs
+            the current values can subscribe to whole option chains with a bounded callback load. Other messages
+            (quotes, order feed, acknowledgements) are delivered as they arrive. Feed listeners still receive every
+            tick.
+
+            Parameters:
+                interval (float, optional): Seconds between deliveries. Defaults to `settings.CONFLATION_INTERVAL`.
+
+            Example:
+                conflater = client.enable_conflation(interval=0.5)
+                conflater.metrics()
+                # {"tokens": 812, "dirty": 96, "received": 120560, "delivered": 18211, "ratio": 6.6}
+
+            Returns:
+                Conflater
+        """
+        if self.conflater is None:
+            self.conflater = neo_api_client.Conflater(self.__deliver_message, interval=interval).start()
+        return self.conflater
+
+    def disable_conflation(self):
+        """Deliver the pending updates, then every tick again."""
+        conflater, self.conflater = self.conflater, None
+        if conflater is not None:
+            conflater.stop()
+
+    def disable_event_dispatch(self):
+        """Deliver the messages still queued, then call `on_message` from the websocket thread again."""
+        dispatcher, self.event_dispatcher = self.event_dispatcher, None
+        if dispatcher is not None:
+            dispatcher.stop()
+
+    def record_feed(self, path):
+        """
+            Record the raw frames of the live feed socket, with their receive time, to `path`.
+
+            The recording can be played back without a connection by a `FeedReplayServer`, for tests and benchmarks:
+                server = neo_api_client.FeedReplayServer("feed.rec", speed=10).start()
+                neo_api_client.WEBSOCKET_URL = server.url
+
+            Returns:
+                FeedRecorder
+        """
+        self.stop_feed_recording()
+        self.feed_recorder = neo_api_client.FeedRecorder(path)
+        if self.NeoWebSocket:
+            self.NeoWebSocket.set_recorder(self.feed_recorder)
+        return self.feed_recorder
+
+    def stop_feed_recording(self):
+        recorder, self.feed_recorder = self.feed_recorder, None
+        if self.NeoWebSocket:
+            self.NeoWebSocket.set_recorder(None)
+        if recorder is not None:
+            recorder.close()
+
+    def enable_instrumentation(self, dump_path=None, interval=60):
+        """
+            Record latency histograms of the REST calls and of the live feed pipeline, for this process.
+
+            Timings are kept per endpoint for the REST path (rate limiter wait, HTTP round trip, whole api call) and
+            per frame, feed and message type for the websocket path (frame parsing, tick preparation, message
+            handling, `on_message`). While disabled, the default, every hook costs one flag check.
+
+            Parameters:
+                dump_path (str, optional): Also write the histograms as JSON to this file every `interval` seconds.
+                interval (float): Seconds between JSON dumps.
+
+            Example:
+                client.enable_instrumentation()
+                client.positions()
+                client.latency_report()["api_call"]["positions"]
+                # {"count": 1, "mean": 0.0712, "p50": 0.134, "p90": 0.134, "p99": 0.134, "max": 0.0712}
+
+            Returns:
+                Instrumentation
+        """
+        REGISTRY.enable()
+        if dump_path:
+            REGISTRY.start_json_dump(dump_path, interval)
+        return REGISTRY
+
+    def disable_instrumentation(self):
+        """Stop recording latencies and the periodic JSON dump; the histograms recorded so far are kept."""
+        REGISTRY.disable()
+        REGISTRY.stop_json_dump()
+
+    def latency_report(self, fmt="json"):
+        """
+            Latency histograms recorded since instrumentation was enabled.
+
+            Parameters:
+                fmt (str): "json" for a dict of count, mean, p50, p90, p99 and max (seconds) per metric and label,
+                    "prometheus" for the Prometheus text exposition format, to serve on a /metrics endpoint.
+
+            Returns:
+                dict or str
+        """
+        if fmt == "prometheus":
+            return REGISTRY.prometheus()
+        if fmt == "json":
+            return REGISTRY.to_json()
+        raise ValueError("Invalid format %r, expected \"json\" or \"prometheus\"" % fmt)
+
+    def reconnect_report(self):
+        """
+            How the live feed recovered from its reconnects: the websocket reconnects by itself after a drop, then
+            subscribes again to every token in a few batched requests and requests their snapshots.
+
+            Example:
+                client.reconnect_report()
+                # {"connections": 2, "disconnects": 1, "reconnects": 1, "subscribe_requests": 60,
+                #  "snapshot_requests": 30, "awaiting_tick": 0, "time_to_first_tick": 1.11, "max_gap": 2.64,
+                #  "mean_gap": 1.96, "gaps": {"11536": 1.83, "1594": 2.01, ...}}
+
+            Returns:
+                dict, with the gap in seconds of each token from its last tick before the drop to its first tick after
+        """
+        if not self.NeoWebSocket:
+            return {"Error Message": "Subscribe to the live feed before asking for its reconnects"}
+        manager = self.NeoWebSocket.reconnect_manager
+        report = manager.metrics()
+        report["gaps"] = manager.gaps()
+        return report
+
+    def get_feed_pool(self):
+        """
+            Live feed spread over several websocket sessions, for more than the 3,000 tokens a single session carries.
+
+            The pool delivers to the same on_message / on_error / on_open / on_close callbacks and feed listeners as
+            `subscribe`, one message at a time. When a session drops its tokens are subscribed on the others.
+
+            Example:
+                pool = client.get_feed_pool()
+                pool.subscribe(instrument_tokens=option_chain_tokens)
+                pool.un_subscribe(instrument_tokens=option_chain_tokens[:100])
+
+            Returns:
+                FeedPool, or an error dict when the login flow is not completed
+        """
+        if not (self.configuration.edit_token and self.configuration.edit_sid):
+            return {"Error Message": "Complete the 2fa process before accessing this application"}
+        if self.feed_pool is None:
+            self.check_callbacks()
+            self.feed_pool = neo_api_client.FeedPool(self.configuration.edit_sid, self.configuration.edit_token,
+                                                     self.configuration.serverId, data_center=None,
+                                                     typed_ticks=self.configuration.typed_ticks,
+                                                     decode_workers=self.configuration.decode_workers)
+            self.feed_pool.on_message = self.__on_message
+            self.feed_pool.on_error = self.__on_error
+            self.feed_pool.on_open = self.__on_open
+            self.feed_pool.on_close = self.__on_close
+            self.feed_pool.on_unsubscribed = self.__on_unsubscribed
+            self.feed_pool.feed_listeners = self.feed_listeners
+        return self.feed_pool
+
+    def rebalance_channels(self):
+        """
+            Spread the live feed subscriptions over the websocket channels by observed message rate.
+
+            New subscriptions are already placed on the least loaded channel; this moves existing ones after the
+            rates have changed or tokens were unsubscribed. Set `settings.CHANNEL_REBALANCE_INTERVAL` to do it
+            periodically.
+
+            Returns:
+                {"moves": number of subscriptions moved, "channels": {channel: {"tokens": n, "rate": msgs/sec}}}
+        """
+        if not self.NeoWebSocket:
+            return {"Error Message": "Subscribe to the live feed before rebalancing its channels"}
+        try:
+            websocket = self.NeoWebSocket
+            with websocket.subscriptions_lock:
+                moves = websocket.rebalance_channels()
+                return {"moves": len(moves), "channels": websocket.channel_allocator.metrics(websocket.subscriptions)}
+        except Exception as e:
+            return {'Error': e}
 
     def subscribe(self, instrument_tokens, isIndex=False, isDepth=False):
 
@@ -638,7 +1025,8 @@ class NeoAPI:
                 ValueError: If the login flow is not completed.
 
             Returns:
-                Live Feed from the socket
+                Live Feed from the socket; {"Error": message, "instrument_tokens": [...]} listing the tokens not
+                subscribed when they exceed the limit of 3,000 subscriptions of the session
 
             The function establishes a WebSocket connection to the trading platform and subscribes to live feeds for the specified instrument tokens. When a new feed is received, the function's internal callback functions are called with the feed data as their arguments. If an error occurs, the on_error function is called with the error message as its argument.
         """
@@ -650,9 +1038,12 @@ class NeoAPI:
                 self.NeoWebSocket = neo_api_client.NeoWebSocket(self.configuration.edit_sid,
                                                                 self.configuration.edit_token,
                                                                 self.configuration.serverId,
-                                                                data_center=None)
+                                                                data_center=None,
+                                                                typed_ticks=self.configuration.typed_ticks,
+                                                                decode_workers=self.configuration.decode_workers)
                 self.set_neowebsocket_callbacks()
-            self.NeoWebSocket.get_live_feed(instrument_tokens=instrument_tokens, isIndex=isIndex, isDepth=isDepth)
+            return self.NeoWebSocket.get_live_feed(instrument_tokens=instrument_tokens, isIndex=isIndex,
+                                                   isDepth=isDepth)
         else:
             print("Please complete the Login Flow to Subscribe the Scrips")
 
@@ -676,7 +1067,9 @@ class NeoAPI:
                 self.NeoWebSocket = neo_api_client.NeoWebSocket(self.configuration.edit_sid,
                                                                 self.configuration.edit_token,
                                                                 self.configuration.serverId,
-                                                                data_center=None)
+                                                                data_center=None,
+                                                                typed_ticks=self.configuration.typed_ticks,
+                                                                decode_workers=self.configuration.decode_workers)
 
             self.set_neowebsocket_callbacks()
             self.NeoWebSocket.un_subscribe_list(instrument_tokens=instrument_tokens,
@@ -731,6 +1124,10 @@ class NeoAPI:
         """
             Subscribe To OrderFeed
 
+            The order feed also keeps `self.order_state_cache` current, so that
+            `self.order_state_cache.wait_for_status(order_no, {"complete", "rejected"}, timeout)` can be used in
+            place of polling `order_report()`.
+
             Raises:
                 Exception: If the user hasn't completes his 2FA.
 
@@ -743,7 +1140,9 @@ class NeoAPI:
                 self.NeoWebSocket = neo_api_client.NeoWebSocket(self.configuration.edit_sid,
                                                                 self.configuration.edit_token,
                                                                 self.configuration.serverId,
-                                                                self.configuration.data_center)
+                                                                self.configuration.data_center,
+                                                                typed_ticks=self.configuration.typed_ticks,
+                                                                decode_workers=self.configuration.decode_workers)
             self.set_neowebsocket_callbacks()
             self.NeoWebSocket.get_order_feed()
                                             
@@ -806,6 +1205,10 @@ class NeoAPI:
         """
             Retrieves quotes for the given instrument tokens.
 
+            Large token lists are split into requests of at most `settings.QUOTES_CHUNK_SIZE` tokens, fetched
+            concurrently and merged in the order of the tokens; quotes can be cached for a short time with
+            `client.quotes_engine.ttl` (see QuotesEngine).
+
             Args:
                 instrument_tokens (List): A JSON-encoded list of instrument tokens to subscribe to.
                 quote_type (str): The type of quote to subscribe to.
@@ -820,5 +1223,5 @@ class NeoAPI:
             error = {
                 'error': [{'message': 'Validation Errors! instrument_tokens are missing'}]}
             return error
-        quotes_response = neo_api_client.QuotesAPI(self.api_client).get_quotes(instrument_tokens=instrument_tokens, quote_type=quote_type)
+        quotes_response = self.quotes_engine.get_quotes(instrument_tokens=instrument_tokens, quote_type=quote_type)
         return quotes_response
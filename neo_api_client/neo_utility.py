@@ -4,7 +4,9 @@ import six
 import jwt
 from neo_api_client.exceptions import ApiValueError
 from neo_api_client.urls import UAT_BASE_URL, BASE_URL
-from neo_api_client.settings import UAT_URL, PROD_URL
+from neo_api_client.settings import UAT_URL, PROD_URL, HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, HTTP_POOL_BLOCK, \
+    HTTP_KEEP_ALIVE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, RATE_LIMIT_ENABLED, RATE_LIMIT_GLOBAL, RATE_LIMITS, \
+    ENDPOINT_LANES, SCRIP_MASTER_DIR, TYPED_TICKS, PARALLEL_DECODER_WORKERS
 
 
 class NeoUtility:
@@ -40,6 +42,24 @@ class NeoUtility:
         self.base_url = None
         self.totp_session_id = None
         self.consumer_key = consumer_key
+        # HTTP transport tuning, read by RESTClientObject when its session is first created
+        self.pool_connections = HTTP_POOL_CONNECTIONS
+        self.pool_maxsize = HTTP_POOL_MAXSIZE
+        self.pool_block = HTTP_POOL_BLOCK
+        self.keep_alive = HTTP_KEEP_ALIVE
+        self.connect_timeout = HTTP_CONNECT_TIMEOUT
+        self.read_timeout = HTTP_READ_TIMEOUT
+        # Client-side rate limiting, read by RESTClientObject when its scheduler is first created
+        self.rate_limit_enabled = RATE_LIMIT_ENABLED
+        self.rate_limit_global = dict(RATE_LIMIT_GLOBAL) if RATE_LIMIT_GLOBAL else None
+        self.rate_limits = {lane: dict(spec) for lane, spec in RATE_LIMITS.items()}
+        self.endpoint_lanes = dict(ENDPOINT_LANES)
+        # Directory of the local scrip master store used by search_scrip
+        self.scrip_master_dir = SCRIP_MASTER_DIR
+        # Deliver live feed ticks as typed records, read when the websocket is created
+        self.typed_ticks = TYPED_TICKS
+        # Worker processes decoding the live feed, read when the websocket is created
+        self.decode_workers = PARALLEL_DECODER_WORKERS
 
     # def convert_base64(self):
     #     """The Base64 Token Generation.
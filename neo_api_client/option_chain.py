@@ -0,0 +1,149 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+OPTION_TYPES = {"CE": 1, "PE": 2}
+EPOCH = datetime.date(1970, 1, 1)
+# Bits of the composite sort key used by the expiry day and the option type
+_DAY_BITS = 20
+_TYPE_BITS = 2
+
+
+def _to_days(expiry):
+    """Days since 1970-01-01 for an int, a date/datetime, or a DDMMMYYYY / YYYY-MM-DD string."""
+    if isinstance(expiry, (int, np.integer)):
+        return int(expiry)
+    if isinstance(expiry, datetime.datetime):
+        expiry = expiry.date()
+    if isinstance(expiry, datetime.date):
+        return (expiry - EPOCH).days
+    expiry = str(expiry).strip()
+    try:
+        day = datetime.datetime.strptime(expiry.upper(), '%d%b%Y').date()
+    except ValueError:
+        day = datetime.date.fromisoformat(expiry)
+    return (day - EPOCH).days
+
+
+def _to_paise(price):
+    return int(round(float(price) * 100))
+
+
+class OptionChain(object):
+    """
+        Option chain lookups over the rows of one scrip master segment.
+
+        Only option rows (`pOptionType` CE/PE) are indexed. Each row is reduced to NumPy columns: a categorical code
+        for the underlying, the expiry as integer days since 1970-01-01, the strike in integer paise and the option
+        type. Rows are sorted by (underlying, expiry, option type, strike), so a chain is a couple of binary searches
+        over those arrays and no string or date parsing happens per query.
+    """
+
+    def __init__(self, frame, expiry_seconds, expiry_offset=0):
+        """
+        :param frame: scrip master rows, as held by `ScripMasterStore`
+        :param expiry_seconds: unconverted `pExpiryDate` values, aligned with `frame`
+        :param expiry_offset: seconds to add to `expiry_seconds` to get a Unix timestamp
+        """
+        self.frame = frame
+        types = frame["pOptionType"].astype(str).str.strip().str.upper().map(OPTION_TYPES)
+        types = types.fillna(0).to_numpy(dtype=np.int64)
+        rows = np.flatnonzero(types)
+
+        names = frame["pSymbolName"].astype(str).str.strip().str.upper().to_numpy()[rows]
+        codes, self.underlyings = pd.factorize(names)
+        self.underlying_codes = {name: code for code, name in enumerate(self.underlyings)}
+
+        seconds = pd.to_numeric(pd.Series(expiry_seconds[rows]), errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+        days = np.maximum((seconds + expiry_offset) // 86400, 0)
+        strikes = pd.to_numeric(frame["dStrikePrice;"].iloc[rows], errors='coerce').fillna(-1).to_numpy()
+        strikes = np.rint(strikes).astype(np.int64)
+        types = types[rows]
+        keys = self._key(codes.astype(np.int64), days, types)
+
+        order = np.lexsort((strikes, keys))
+        self.rows = rows[order]
+        self.sort_keys = keys[order]
+        self.expiry_days = days[order]
+        self.strike_paise = strikes[order]
+        self.option_types = types[order]
+
+    @staticmethod
+    def _key(code, day, option_type):
+        return (((code << _DAY_BITS) | day) << _TYPE_BITS) | option_type
+
+    def _block(self, code, day_from, day_to, option_type_from, option_type_to):
+        """[lo, hi) of the sorted rows with keys between the two (inclusive) bounds."""
+        lo = np.searchsorted(self.sort_keys, self._key(code, day_from, option_type_from), side='left')
+        hi = np.searchsorted(self.sort_keys, self._key(code, day_to, option_type_to), side='right')
+        return int(lo), int(hi)
+
+    def _select(self, underlying, expiry=None, strike_range=None, option_type=None):
+        code = self.underlying_codes.get(str(underlying).strip().upper())
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+
+        if option_type:
+            option_types = [OPTION_TYPES[str(option_type).strip().upper()]]
+        else:
+            option_types = sorted(OPTION_TYPES.values())
+
+        min_strike, max_strike = None, None
+        if strike_range is not None:
+            if isinstance(strike_range, (tuple, list)):
+                min_strike, max_strike = strike_range
+            else:
+                min_strike = max_strike = strike_range
+            min_strike = _to_paise(min_strike) if min_strike is not None else None
+            max_strike = _to_paise(max_strike) if max_strike is not None else None
+
+        selected = []
+        if expiry is not None:
+            day = _to_days(expiry)
+            # Within one (underlying, expiry, option type) block the rows are sorted by strike
+            for value in option_types:
+                lo, hi = self._block(code, day, day, value, value)
+                if min_strike is not None:
+                    lo += int(np.searchsorted(self.strike_paise[lo:hi], min_strike, side='left'))
+                if max_strike is not None:
+                    hi = lo + int(np.searchsorted(self.strike_paise[lo:hi], max_strike, side='right'))
+                selected.append(np.arange(lo, hi))
+        else:
+            lo, hi = self._block(code, 0, (1 << _DAY_BITS) - 1, 0, (1 << _TYPE_BITS) - 1)
+            mask = np.isin(self.option_types[lo:hi], option_types)
+            if min_strike is not None:
+                mask &= self.strike_paise[lo:hi] >= min_strike
+            if max_strike is not None:
+                mask &= self.strike_paise[lo:hi] <= max_strike
+            selected.append(lo + np.flatnonzero(mask))
+
+        selected = np.concatenate(selected)
+        # Chain order: expiry, then strike, then CE before PE
+        order = np.lexsort((self.option_types[selected], self.strike_paise[selected], self.expiry_days[selected]))
+        return selected[order]
+
+    def chain(self, underlying, expiry=None, strike_range=None, option_type=None):
+        """
+        Option contracts of `underlying`.
+
+        :param underlying: underlying name (`pSymbolName`), e.g. "NIFTY"; case-insensitive
+        :param expiry: optional expiry, as a date, days since 1970-01-01, "26DEC2024" or "2024-12-26"
+        :param strike_range: optional strike in rupees, or (min, max) tuple where either bound may be None
+        :param option_type: optional "CE" or "PE"
+        :return: DataFrame of scrip master rows ordered by expiry, strike and option type
+        """
+        return self.frame.take(self.rows[self._select(underlying, expiry, strike_range, option_type)])
+
+    def expiries(self, underlying):
+        """Sorted expiry dates of the options on `underlying`."""
+        code = self.underlying_codes.get(str(underlying).strip().upper())
+        if code is None:
+            return []
+        lo, hi = self._block(code, 0, (1 << _DAY_BITS) - 1, 0, (1 << _TYPE_BITS) - 1)
+        return [EPOCH + datetime.timedelta(days=int(day)) for day in np.unique(self.expiry_days[lo:hi])]
+
+    def strikes(self, underlying, expiry):
+        """Sorted strikes, in rupees, listed for `underlying` and `expiry`."""
+        selected = self._select(underlying, expiry)
+        return [int(strike) / 100 for strike in np.unique(self.strike_paise[selected])]
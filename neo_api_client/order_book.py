@@ -0,0 +1,267 @@
+import threading
+from array import array
+
+from neo_api_client.HSWebSocketLib import DEPTH_MAPPING, DepthTick
+from neo_api_client.tick_store import instrument_key
+
+# Levels of market depth sent on each side
+DEPTH_LEVELS = 5
+# The depth fields are DEPTH_MAPPING[2:32]: bid prices, ask prices, bid quantities, ask quantities, bid orders and
+# ask orders, DEPTH_LEVELS of each. An OrderBook keeps them in one array in the same order, so the field at index i
+# of a tick is at position i - FIRST_FIELD of the book.
+FIRST_FIELD = 2
+BOOK_SIZE = 6 * DEPTH_LEVELS
+BID_PRICE, ASK_PRICE, BID_QTY, ASK_QTY, BID_ORDERS, ASK_ORDERS = range(0, BOOK_SIZE, DEPTH_LEVELS)
+# Book position of each depth field of the dict feed, e.g. "bq2" -> BID_QTY + 2
+FIELD_POSITIONS = {DEPTH_MAPPING[FIRST_FIELD + position]["name"]: position for position in range(BOOK_SIZE)}
+# Tick field bits of the depth fields, and book position bits of the quantities
+FIELDS_MASK = ((1 << BOOK_SIZE) - 1) << FIRST_FIELD
+QTY_MASK = ((1 << 2 * DEPTH_LEVELS) - 1) << BID_QTY
+LEVELS_MASK = (1 << DEPTH_LEVELS) - 1
+SIDES = ("bid", "ask")
+
+
+class OrderBook(object):
+    """
+        Market depth of one instrument, updated in place from depth ticks.
+
+        Prices, quantities and order counts of the DEPTH_LEVELS levels of both sides are held in one fixed-size array
+        of 64-bit integers, prices as the raw integers of the feed (divide by `scale`). A depth UPDATE carries only
+        the fields that changed and `apply` writes just those, so the book always holds the full depth. Cumulative
+        quantities are recomputed when a quantity changes, which makes best bid/ask, spread, microprice, cumulative
+        depth and imbalance O(1) reads; nothing is allocated per tick unless diff listeners are registered.
+
+        A level without orders has price and quantity 0. Listeners are called with `(book, changes)` after each tick
+        that changed the book, `changes` being the `(side, level, price, quantity, orders)` of every changed level,
+        side "bid" or "ask", level 0 for the best price and quantity 0 for a level that emptied.
+    """
+
+    def __init__(self, token=None, exchange=None, listeners=None):
+        self.token = token
+        self.exchange = exchange
+        self.data = array("q", bytes(8 * BOOK_SIZE))
+        # Quantity of the first n + 1 levels of each side at index n
+        self.cum_bid = array("q", bytes(8 * DEPTH_LEVELS))
+        self.cum_ask = array("q", bytes(8 * DEPTH_LEVELS))
+        self.multiplier = 1
+        self.precision = 2
+        self.scale = 100
+        self.updates = 0
+        self.listeners = [] if listeners is None else listeners
+
+    def apply(self, tick):
+        """Merge one depth tick, a dict of the live feed or a DepthTick; returns True when the book changed."""
+        if isinstance(tick, dict):
+            return self.apply_dict(tick)
+        return self.apply_tick(tick)
+
+    def apply_tick(self, tick):
+        self._set_scale(tick.multiplier, tick.precision)
+        updated = tick.updated & FIELDS_MASK
+        fields = tick.fields
+        data = self.data
+        changed = 0
+        while updated:
+            lowest = updated & -updated
+            index = lowest.bit_length() - 1
+            updated ^= lowest
+            value = fields[index]
+            position = index - FIRST_FIELD
+            if value is not None and data[position] != value:
+                data[position] = value
+                changed |= 1 << position
+        return self._changed(changed)
+
+    def apply_dict(self, tick):
+        # The multiplier and precision of a SNAP come after the prices in the dict, so they are read first
+        multiplier, precision = tick.get("mul"), tick.get("prec")
+        if multiplier is not None or precision is not None:
+            self._set_scale(self.multiplier if multiplier is None else int(multiplier),
+                            self.precision if precision is None else int(precision))
+        scale = self.scale
+        data = self.data
+        changed = 0
+        for key, value in tick.items():
+            position = FIELD_POSITIONS.get(key)
+            if position is None:
+                continue
+            value = round(float(value) * scale) if position < BID_QTY else int(value)
+            if data[position] != value:
+                data[position] = value
+                changed |= 1 << position
+        return self._changed(changed)
+
+    def _set_scale(self, multiplier, precision):
+        if multiplier != self.multiplier or precision != self.precision:
+            self.multiplier = multiplier
+            self.precision = precision
+            self.scale = multiplier * 10 ** precision
+
+    def _changed(self, changed):
+        if not changed:
+            return False
+        self.updates += 1
+        if changed & QTY_MASK:
+            self._accumulate()
+        if self.listeners:
+            changes = self.changes(changed)
+            for listener in self.listeners:
+                listener(self, changes)
+        return True
+
+    def _accumulate(self):
+        data, cum_bid, cum_ask = self.data, self.cum_bid, self.cum_ask
+        bid_total = ask_total = 0
+        for level in range(DEPTH_LEVELS):
+            bid_total += data[BID_QTY + level]
+            ask_total += data[ASK_QTY + level]
+            cum_bid[level] = bid_total
+            cum_ask[level] = ask_total
+
+    def changes(self, changed):
+        """(side, level, price, quantity, orders) of the levels with a bit set in `changed`, by book position."""
+        levels = [0, 0]
+        for column in range(6):
+            levels[column & 1] |= changed >> column * DEPTH_LEVELS & LEVELS_MASK
+        changes = []
+        for side in (0, 1):
+            side_levels = levels[side]
+            level = 0
+            while side_levels:
+                if side_levels & 1:
+                    changes.append((SIDES[side], level) + self.level(side, level))
+                side_levels >>= 1
+                level += 1
+        return changes
+
+    def level(self, side, level):
+        """(price, quantity, orders) of `level` of `side`, 0 or "bid" for bids and 1 or "ask" for asks."""
+        offset = DEPTH_LEVELS if side in (1, "ask") else 0
+        data = self.data
+        return (data[BID_PRICE + offset + level] / self.scale, data[BID_QTY + offset + level],
+                data[BID_ORDERS + offset + level])
+
+    def bids(self):
+        return [self.level(0, level) for level in range(DEPTH_LEVELS)]
+
+    def asks(self):
+        return [self.level(1, level) for level in range(DEPTH_LEVELS)]
+
+    @property
+    def best_bid(self):
+        """Best bid price, None when there is no bid."""
+        price = self.data[BID_PRICE]
+        return price / self.scale if price else None
+
+    @property
+    def best_ask(self):
+        price = self.data[ASK_PRICE]
+        return price / self.scale if price else None
+
+    @property
+    def spread(self):
+        """Best ask minus best bid, None unless both sides have a price."""
+        bid, ask = self.data[BID_PRICE], self.data[ASK_PRICE]
+        return (ask - bid) / self.scale if bid and ask else None
+
+    @property
+    def mid(self):
+        bid, ask = self.data[BID_PRICE], self.data[ASK_PRICE]
+        return (bid + ask) / (2 * self.scale) if bid and ask else None
+
+    @property
+    def microprice(self):
+        """Best bid and ask weighted by the quantity on the opposite side, None unless both have quantity."""
+        data = self.data
+        bid_qty, ask_qty = data[BID_QTY], data[ASK_QTY]
+        if not (bid_qty and ask_qty and data[BID_PRICE] and data[ASK_PRICE]):
+            return None
+        return (data[BID_PRICE] * ask_qty + data[ASK_PRICE] * bid_qty) / ((bid_qty + ask_qty) * self.scale)
+
+    def depth(self, side, levels=DEPTH_LEVELS):
+        """Total quantity of the best `levels` levels of `side` ("bid" or "ask")."""
+        cumulative = self.cum_ask if side in (1, "ask") else self.cum_bid
+        return cumulative[min(levels, DEPTH_LEVELS) - 1]
+
+    def imbalance(self, levels=1):
+        """(bid quantity - ask quantity) / (bid quantity + ask quantity) over the best `levels` levels, in [-1, 1]."""
+        level = min(levels, DEPTH_LEVELS) - 1
+        bid_qty, ask_qty = self.cum_bid[level], self.cum_ask[level]
+        total = bid_qty + ask_qty
+        return (bid_qty - ask_qty) / total if total else None
+
+    def as_dict(self):
+        """Depth in the format of the market_depth quotes: {"buy": [...], "sell": [...]} of price/quantity/orders."""
+        return {key: [{"price": price, "quantity": quantity, "orders": orders} for price, quantity, orders in levels]
+                for key, levels in (("buy", self.bids()), ("sell", self.asks()))}
+
+    def __repr__(self):
+        return "OrderBook(%s|%s bid=%s ask=%s)" % (self.exchange, self.token, self.best_bid, self.best_ask)
+
+
+class OrderBooks(object):
+    """
+        An OrderBook per instrument, keyed by exchange segment and token, kept up to date from the depth ticks of the
+        live feed.
+
+        Register `on_ticks` as a feed listener (`client.add_feed_listener(books.on_ticks)`) and subscribe with
+        `isDepth=True`; scrip and index ticks are ignored. Both the dict feed and typed ticks
+        (`configuration.typed_ticks`) are accepted. A book is created on the first tick of its instrument. Readers
+        take the token and, when the same token is subscribed in several segments, its `exchange_segment`.
+
+        Books are updated on the websocket thread under `lock`: listeners run with it held, and other threads read
+        a consistent book with `snapshot`, or take the lock themselves around several reads.
+    """
+
+    def __init__(self):
+        # Books by (exchange_segment, token), and the segments of each token
+        self.books = {}
+        self.segments = {}
+        # Diff listeners, shared by every book
+        self.listeners = []
+        self.lock = threading.Lock()
+
+    def on_ticks(self, message):
+        """Feed listener: apply the depth ticks of `message` (a list of dicts or Tick records) to their books."""
+        with self.lock:
+            for tick in message:
+                if isinstance(tick, dict):
+                    if tick.get("name") != "dp":
+                        continue
+                    self._book(tick.get("tk"), tick.get("e")).apply_dict(tick)
+                elif isinstance(tick, DepthTick):
+                    self._book(tick.tk, tick.e).apply_tick(tick)
+
+    def _book(self, token, exchange):
+        key = exchange, str(token)
+        book = self.books.get(key)
+        if book is None:
+            book = self.books[key] = OrderBook(token, exchange, self.listeners)
+            self.segments.setdefault(key[1], []).append(exchange)
+        return book
+
+    def add_listener(self, listener):
+        """Call `listener(book, changes)` after every tick that changed a book, see OrderBook."""
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def book(self, token, exchange_segment=None):
+        """OrderBook of `token`, None before its first depth tick."""
+        return self.books.get(instrument_key(token, exchange_segment, self.segments))
+
+    def snapshot(self, token, exchange_segment=None):
+        """Depth of `token` as `OrderBook.as_dict`, taken under the lock; None before its first depth tick."""
+        with self.lock:
+            book = self.books.get(instrument_key(token, exchange_segment, self.segments))
+            return None if book is None else book.as_dict()
+
+    def tokens(self):
+        return list(self.segments)
+
+    def keys(self):
+        """(exchange_segment, token) of every book."""
+        return list(self.books)
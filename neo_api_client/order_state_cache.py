@@ -0,0 +1,165 @@
+import threading
+import time
+
+from neo_api_client import codec
+
+
+class OrderStateCache(object):
+    """
+        Latest known state of every order, keyed by order number (`nOrdNo`) and kept current by the HSI order feed.
+
+        Threads that need to react to an order reaching a given status block in `wait_for_status` until the feed
+        delivers that status, instead of polling `order_report()` and scanning the whole book. The order book is
+        fetched only to reconcile: when the feed (re)connects after a gap, on a worker thread so that the feed's
+        receive thread is not held up by the REST call, and when a wait starts while the feed is down. Orders
+        that the feed updated while the order book was being fetched keep their newer state.
+    """
+
+    def __init__(self, order_report=None):
+        """
+        :param order_report: callable returning the order book in the shape of `NeoAPI.order_report()`
+        """
+        self.order_report = order_report
+        self.orders = {}
+        self.connected = False
+        # True until the order book has been looked at since the feed last (re)connected or went down
+        self.stale = True
+        self.reconciliations = 0
+        # Feed updates applied so far, and the count when each order was last updated by the feed
+        self.updates = 0
+        self.updated_at = {}
+        self.reconcile_thread = None
+        # A (re)connection happened while the worker was fetching the order book, so it fetches it again
+        self.reconcile_pending = False
+        self._cond = threading.Condition()
+
+    def on_order_feed(self, message):
+        """Apply one raw message received on the HSI order feed."""
+        if isinstance(message, str):
+            try:
+                message = codec.loads(message)
+            except ValueError:
+                return
+        if not isinstance(message, dict):
+            return
+        data = message.get("data")
+        if isinstance(data, dict) and data.get("nOrdNo"):
+            self.update(data)
+
+    def update(self, order):
+        """Store `order` as the latest state of `order['nOrdNo']` and wake up the waiting threads."""
+        with self._cond:
+            order_no = str(order["nOrdNo"])
+            if order_no in self.orders:
+                self.orders[order_no].update(order)
+            else:
+                self.orders[order_no] = dict(order)
+            self.updates += 1
+            self.updated_at[order_no] = self.updates
+            self._cond.notify_all()
+
+    def on_connected(self):
+        """
+        Called when the order feed is (re)connected; reconciles once since updates may have been missed.
+
+        The order book is fetched on a worker thread, and this returns at once.
+        """
+        with self._cond:
+            self.connected = True
+            self.stale = True
+            if self.reconcile_thread is not None:
+                self.reconcile_pending = True
+                return
+            self.reconcile_thread = threading.Thread(target=self._reconcile_worker, name="neo-order-reconcile",
+                                                     daemon=True)
+            self.reconcile_thread.start()
+
+    def _reconcile_worker(self):
+        while True:
+            try:
+                self.reconcile()
+            except Exception as e:
+                print("Order book reconciliation failed: %s" % e)
+            with self._cond:
+                if not self.reconcile_pending:
+                    self.reconcile_thread = None
+                    return
+                self.reconcile_pending = False
+
+    def on_disconnected(self):
+        """Called when the order feed is closed or fails; waiting threads reconcile once while it is down."""
+        with self._cond:
+            self.connected = False
+            self.stale = True
+            self._cond.notify_all()
+
+    def reconcile(self):
+        """
+        Refresh every order from a single `order_report()` call.
+
+        :return: True when the order book could be fetched
+        """
+        if self.order_report is None:
+            return False
+        with self._cond:
+            updates = self.updates
+        order_book = self.order_report()
+        if not isinstance(order_book, dict) or not isinstance(order_book.get("data"), list):
+            return False
+        with self._cond:
+            for order in order_book["data"]:
+                if order.get("nOrdNo"):
+                    order_no = str(order["nOrdNo"])
+                    if self.updated_at.get(order_no, 0) > updates:
+                        # The feed delivered this order after the order book was requested
+                        continue
+                    if order_no in self.orders:
+                        self.orders[order_no].update(order)
+                    else:
+                        self.orders[order_no] = dict(order)
+            self.stale = False
+            self.reconciliations += 1
+            self._cond.notify_all()
+        return True
+
+    def get(self, order_no):
+        """Latest known state of `order_no`, or None."""
+        with self._cond:
+            order = self.orders.get(str(order_no))
+            return dict(order) if order is not None else None
+
+    def status(self, order_no):
+        order = self.get(order_no)
+        return order.get("ordSt") if order else None
+
+    def wait_for_status(self, order_no, statuses, timeout=None):
+        """
+        Block until `order_no` reaches one of `statuses` (e.g. {"complete", "rejected"}).
+
+        :param order_no: order number returned by `place_order`
+        :param statuses: iterable of `ordSt` values, compared case-insensitively
+        :param timeout: seconds to wait, None waits indefinitely
+        :return: the order in the shape of an `order_report()` entry, or None on timeout
+        """
+        order_no = str(order_no)
+        statuses = {str(status).lower() for status in statuses}
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self.stale and not self.connected:
+                # Feed gap: nothing will be pushed until it reconnects, so look at the order book once
+                if not self.reconcile():
+                    with self._cond:
+                        self.stale = False
+            with self._cond:
+                order = self.orders.get(order_no)
+                if order is not None and str(order.get("ordSt", "")).lower() in statuses:
+                    return dict(order)
+                if self.stale and not self.connected:
+                    continue
+                if deadline is None:
+                    self._cond.wait()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    self._cond.wait(remaining)
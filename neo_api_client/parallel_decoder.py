@@ -0,0 +1,374 @@
+import os
+import pickle
+import struct
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+from neo_api_client import settings
+from neo_api_client.HSWebSocketLib import HSWrapper, INT32, UINT16, ResponseTypes
+
+RECORD_HEADER = struct.Struct("<I")
+# Length written where a record does not fit before the end of the buffer: the reader goes back to the start
+WRAP = 0xFFFFFFFF
+# Write and read positions live on separate cache lines in front of the data, followed by the stop flag, the flag
+# the consumer sets while it is blocked waiting for records and the CPU time of a worker, in ns, when it last blocked
+INDEX_NBYTES = 192
+WRITE_INDEX = 0
+READ_INDEX = 8
+STOP_INDEX = 16
+WAITING_INDEX = 17
+CPU_INDEX = 18
+# Times an idle consumer yields before it blocks until the producer signals a record
+SPINS = 64
+# Entry point of the worker processes, run with the arguments of decode_worker
+WORKER_MAIN = ("import sys; from neo_api_client.parallel_decoder import decode_worker; "
+               "decode_worker(sys.argv[1], sys.argv[2], bool(int(sys.argv[3])))")
+SNAP = ResponseTypes["SNAP"]
+UPDATE = ResponseTypes["UPDATE"]
+
+
+def backoff(idle):
+    """Yield to other threads while a ring stays full, then sleep; returns the next idle count."""
+    if idle < SPINS:
+        time.sleep(0)
+    else:
+        time.sleep(0.0005)
+    return idle + 1
+
+
+def wait_for_records(rings, wake):
+    """
+    Block the consumer of `rings` until one of their producers signals a record by writing to the pipe `wake`.
+
+    :param wake: file descriptor of the read end of the pipe
+    :returns: False when the pipe was closed by all of its writers
+    """
+    for ring in rings:
+        ring.index[WAITING_INDEX] = 1
+    try:
+        # A record put before the flag was set is not signalled
+        if any(ring.index[READ_INDEX] != ring.index[WRITE_INDEX] for ring in rings):
+            return True
+        return bool(os.read(wake, 4096))
+    finally:
+        for ring in rings:
+            ring.index[WAITING_INDEX] = 0
+
+
+def split_packets(view, pos, shards):
+    """
+    Packets of a data frame for each of `shards` decoders, by topic id modulo `shards`, so that a topic is always
+    decoded by the same one. The packets are only walked, not decoded.
+
+    :param pos: position of the packet count
+    :returns: the packet count and a list of (start, end) spans for each decoder, adjacent packets in one span
+    """
+    counts = [0] * shards
+    spans = [[] for _ in range(shards)]
+    count = UINT16.unpack_from(view, pos)[0]
+    pos += 2
+    for n in range(count):
+        start = pos
+        kind = view[pos + 2]
+        topic = INT32.unpack_from(view, pos + 3)[0]
+        pos += 7
+        if kind == SNAP:
+            pos += 1 + view[pos]
+            pos += 1 + 4 * view[pos]
+            fcount = view[pos]
+            pos += 1
+            for index in range(fcount):
+                pos += 2 + view[pos + 1]
+        elif kind == UPDATE:
+            pos += 1 + 4 * view[pos]
+        else:
+            # The end of an unknown packet is not known: the rest of the frame goes to one decoder, which reports it
+            counts[0] += 1
+            spans[0].append((start, len(view)))
+            break
+        counts[topic % shards] += 1
+        shard = spans[topic % shards]
+        if shard and shard[-1][1] == start:
+            shard[-1] = (shard[-1][0], pos)
+        else:
+            shard.append((start, pos))
+    return counts, spans
+
+
+class ShmRing(object):
+    """
+        Single producer, single consumer ring of byte records in shared memory.
+
+        Records are a 4 byte length followed by the payload, padded to 8 bytes, so a wrap marker always fits at the
+        end of the buffer. The producer only advances the write position and the consumer the read position, both
+        monotonic byte counters stored as aligned 8 byte words, so neither side needs a lock.
+    """
+
+    def __init__(self, name=None, size=None):
+        """
+        :param name: attach to the existing ring `name`, or create a new one when None
+        :param size: data bytes of a new ring, defaults to `settings.PARALLEL_DECODER_RING_BYTES`
+        """
+        if name is None:
+            size = (size or settings.PARALLEL_DECODER_RING_BYTES) + 7 & ~7
+            self.shm = shared_memory.SharedMemory(create=True, size=INDEX_NBYTES + size)
+            self.shm.buf[:INDEX_NBYTES] = bytes(INDEX_NBYTES)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # The creating process owns the segment: keep the resource tracker of this one from unlinking it
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+        self.name = self.shm.name
+        self.index = self.shm.buf[:INDEX_NBYTES].cast("Q")
+        self.data = self.shm.buf[INDEX_NBYTES:]
+        self.capacity = len(self.data) & ~7
+
+    def signal(self, wake):
+        """Wake the consumer if it is blocked in `wait_for_records`, writing one byte to the pipe file `wake`."""
+        if self.index[WAITING_INDEX]:
+            try:
+                wake.write(b"\0")
+            except OSError:
+                pass
+
+    def put(self, *parts):
+        """Append one record made of `parts`; returns False, writing nothing, when the ring is full."""
+        length = sum(len(part) for part in parts)
+        size = RECORD_HEADER.size + length + 7 & ~7
+        if size > self.capacity:
+            raise ValueError("Record of %d bytes does not fit a ring of %d bytes" % (length, self.capacity))
+        write = self.index[WRITE_INDEX]
+        pos = write % self.capacity
+        skip = self.capacity - pos if size > self.capacity - pos else 0
+        if write + skip + size - self.index[READ_INDEX] > self.capacity:
+            return False
+        if skip:
+            RECORD_HEADER.pack_into(self.data, pos, WRAP)
+            write += skip
+            pos = 0
+        RECORD_HEADER.pack_into(self.data, pos, length)
+        pos += RECORD_HEADER.size
+        for part in parts:
+            self.data[pos:pos + len(part)] = part
+            pos += len(part)
+        self.index[WRITE_INDEX] = write + size
+        return True
+
+    def peek(self):
+        """Memoryview of the oldest record, valid until `release`, or None when the ring is empty."""
+        read = self.index[READ_INDEX]
+        if read == self.index[WRITE_INDEX]:
+            return None
+        pos = read % self.capacity
+        length = RECORD_HEADER.unpack_from(self.data, pos)[0]
+        if length == WRAP:
+            self.index[READ_INDEX] = read + self.capacity - pos
+            pos = 0
+            length = RECORD_HEADER.unpack_from(self.data, pos)[0]
+        return self.data[pos + RECORD_HEADER.size:pos + RECORD_HEADER.size + length]
+
+    def release(self):
+        """Drop the record returned by `peek`."""
+        read = self.index[READ_INDEX]
+        pos = read % self.capacity
+        length = RECORD_HEADER.unpack_from(self.data, pos)[0]
+        self.index[READ_INDEX] = read + (RECORD_HEADER.size + length + 7 & ~7)
+
+    def get(self):
+        """Copy of the oldest record, removed from the ring, or None when the ring is empty."""
+        record = self.peek()
+        if record is None:
+            return None
+        record = bytes(record)
+        self.release()
+        return record
+
+    def close(self, unlink=False):
+        self.index.release()
+        self.data.release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def decode_worker(inbox_name, outbox_name, typed_ticks):
+    """
+    Worker process: decode every record of the inbox and put the ticks of each, pickled, on the outbox, until the
+    stop flag of the inbox is set or the parent process exits. Inbox records are a packet count followed by the
+    packets of the worker's topics, see `split_packets`. The parent signals new records on the worker's stdin, and the
+    worker signals its ticks on stdout, the parent's wake-up pipe.
+    """
+    inbox = ShmRing(inbox_name)
+    outbox = ShmRing(outbox_name)
+    # Keep stdout for signalling and send anything printed to stderr
+    wake = os.fdopen(os.dup(1), "wb", buffering=0)
+    os.dup2(2, 1)
+    wrapper = HSWrapper(typed_ticks=typed_ticks)
+    idle = 0
+    try:
+        while not inbox.index[STOP_INDEX]:
+            record = inbox.peek()
+            if record is None:
+                if idle < SPINS:
+                    idle = backoff(idle)
+                    continue
+                inbox.index[CPU_INDEX] = time.process_time_ns()
+                if not wait_for_records([inbox], sys.stdin.fileno()):
+                    # End of file: the parent process closed the pipe or exited
+                    break
+                continue
+            idle = 0
+            ticks = wrapper.parsePackets(record, 0)
+            del record
+            inbox.release()
+            if not ticks:
+                continue
+            payload = pickle.dumps(ticks, pickle.HIGHEST_PROTOCOL)
+            while not outbox.put(payload):
+                if inbox.index[STOP_INDEX]:
+                    return
+                idle = backoff(idle)
+            outbox.signal(wake)
+    finally:
+        wake.close()
+        inbox.close()
+        outbox.close()
+
+
+class ParallelDecoder(object):
+    """
+        Decodes live feed data frames in worker processes, away from the websocket thread.
+
+        The websocket thread only acknowledges each data frame, walks its packets and copies them, with `submit`, into
+        the shared memory rings of the workers: each worker gets the packets of the topics whose id modulo `workers`
+        is its own, so a topic's state stays in one process and its ticks keep their order. Ticks come back pickled on
+        one ring per worker; a collector thread unpickles them and calls `on_message` with each list, the same lists
+        `HSWrapper.parseData` returns. Ticks of one instrument are delivered in order, ticks of different instruments
+        may be reordered. Typed ticks arrive as copies, not as reused records.
+
+        Idle workers and the idle collector block on pipes, written to by the other side only while they wait.
+    """
+
+    def __init__(self, workers=None, typed_ticks=False, ring_bytes=None):
+        """
+        :param workers: decoding processes, defaults to `settings.PARALLEL_DECODER_WORKERS`
+        :param ring_bytes: size of each ring, defaults to `settings.PARALLEL_DECODER_RING_BYTES`
+        """
+        self.workers = workers or settings.PARALLEL_DECODER_WORKERS
+        self.typed_ticks = typed_ticks
+        self.ring_bytes = ring_bytes or settings.PARALLEL_DECODER_RING_BYTES
+        self.inboxes = []
+        self.outboxes = []
+        self.processes = []
+        self.collector = None
+        # Pipe the workers signal their ticks on, read by the collector
+        self.wakeup = None
+        self.wake = None
+        self.on_message = None
+        self.running = False
+        self.frames = 0
+        self.messages = 0
+        self.stalls = 0
+
+    def start(self, on_message):
+        """Start the workers and the collector thread calling `on_message(ticks)`."""
+        if self.running:
+            return
+        self.on_message = on_message
+        # Workers run in fresh interpreters: forking would copy the running websocket thread's locks, and
+        # multiprocessing's spawn would import the user's __main__ again
+        env = dict(os.environ)
+        package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [package_root, env.get("PYTHONPATH")]))
+        self.wakeup, wake = os.pipe()
+        self.wake = os.fdopen(wake, "wb", buffering=0)
+        for shard in range(self.workers):
+            inbox = ShmRing(size=self.ring_bytes)
+            outbox = ShmRing(size=self.ring_bytes)
+            process = subprocess.Popen([sys.executable, "-c", WORKER_MAIN, inbox.name, outbox.name,
+                                        str(int(self.typed_ticks))],
+                                       env=env, bufsize=0, stdin=subprocess.PIPE, stdout=self.wake)
+            self.inboxes.append(inbox)
+            self.outboxes.append(outbox)
+            self.processes.append(process)
+        self.running = True
+        self.collector = threading.Thread(target=self.collect, daemon=True)
+        self.collector.start()
+
+    def submit(self, frame, pos):
+        """
+        Queue the packets of a data frame for the workers decoding their topics, waiting while a worker's ring is
+        full.
+
+        :param pos: position of the packet count in `frame`, see `HSWrapper.acknowledge`
+        """
+        self.frames += 1
+        view = memoryview(frame)
+        counts, spans = split_packets(view, pos, self.workers)
+        for inbox, process, count, shard in zip(self.inboxes, self.processes, counts, spans):
+            if not count:
+                continue
+            parts = [UINT16.pack(count)] + [view[start:end] for start, end in shard]
+            idle = 0
+            while not inbox.put(*parts):
+                if not self.running:
+                    return
+                if not idle:
+                    self.stalls += 1
+                elif idle % 1000 == 0 and process.poll() is not None:
+                    raise RuntimeError("Decoder worker exited with code %s" % process.returncode)
+                idle = backoff(idle)
+            inbox.signal(process.stdin)
+
+    def collect(self):
+        idle = 0
+        while self.running:
+            delivered = False
+            for outbox in self.outboxes:
+                payload = outbox.get()
+                if payload is None:
+                    continue
+                delivered = True
+                self.messages += 1
+                if self.on_message:
+                    self.on_message(pickle.loads(payload))
+            if delivered:
+                idle = 0
+            elif idle < SPINS:
+                idle = backoff(idle)
+            else:
+                wait_for_records(self.outboxes, self.wakeup)
+                idle = 0
+
+    def close(self):
+        """Stop the workers and the collector and free the shared memory."""
+        if not self.running:
+            return
+        self.running = False
+        for inbox, process in zip(self.inboxes, self.processes):
+            inbox.index[STOP_INDEX] = 1
+            # End of file on stdin wakes a blocked worker
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+        for process in self.processes:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.terminate()
+        self.wake.write(b"\0")
+        if self.collector is not threading.current_thread():
+            self.collector.join(timeout=5)
+        for ring in self.inboxes + self.outboxes:
+            ring.close(unlink=True)
+        self.wake.close()
+        os.close(self.wakeup)
+        self.inboxes, self.outboxes, self.processes = [], [], []
+
+    def metrics(self):
+        return {"workers": self.workers, "frames": self.frames, "messages": self.messages, "stalls": self.stalls,
+                "backlog": [ring.index[WRITE_INDEX] - ring.index[READ_INDEX] for ring in self.inboxes],
+                "cpu": [ring.index[CPU_INDEX] / 1e9 for ring in self.inboxes]}
@@ -0,0 +1,212 @@
+import re
+import threading
+import time
+import urllib.parse
+
+import neo_api_client
+from neo_api_client import settings
+from neo_api_client.concurrent_dispatch import dispatch
+
+# Characters urllib.parse.quote leaves as they are
+URL_SAFE = re.compile(r"[A-Za-z0-9_.~-]*\Z").match
+
+
+class QuotesFlight(object):
+    """Quotes being fetched by one call; concurrent calls for the same tokens wait for it instead of asking again."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        # Quote of every key fetched, once done
+        self.items = {}
+
+
+class QuotesEngine(object):
+    """
+        Fetches the quotes of any number of instruments in concurrent, size-bounded requests.
+
+        The tokens are split into chunks of at most `chunk_size` tokens whose URL stays under `max_url_length`, the
+        chunks are fetched on up to `max_workers` threads over the pooled session (the "quotes" lane of the rate
+        limiter still applies), and the quotes are merged in the order of the tokens. Quotes are matched to their
+        tokens by their "exchange" and "exchange_token" fields.
+
+        With a `ttl`, each quote is cached for that many seconds, so strategies asking for the same tokens within it
+        share one request. Tokens that another thread is already fetching are waited for rather than requested
+        again, with or without a cache.
+    """
+
+    def __init__(self, api_client, chunk_size=None, max_url_length=None, max_workers=None, ttl=None,
+                 clock=time.monotonic):
+        """
+        :param api_client: ApiClient whose configuration and pooled session are used
+        :param chunk_size: tokens per request at most, defaults to `settings.QUOTES_CHUNK_SIZE`
+        :param max_url_length: characters per request URL at most, defaults to `settings.QUOTES_MAX_URL_LENGTH`
+        :param max_workers: requests in flight at once, defaults to `settings.QUOTES_MAX_WORKERS`, or to the size of
+            the connection pool when that is 0
+        :param ttl: seconds a quote is reused, defaults to `settings.QUOTES_CACHE_TTL`; 0 disables the cache
+        :param clock: time source, in seconds
+        """
+        self.api_client = api_client
+        self.chunk_size = chunk_size or settings.QUOTES_CHUNK_SIZE
+        self.max_url_length = max_url_length or settings.QUOTES_MAX_URL_LENGTH
+        self.max_workers = max_workers or settings.QUOTES_MAX_WORKERS
+        self.ttl = settings.QUOTES_CACHE_TTL if ttl is None else ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        # (exchange_segment, instrument_token, quote_type) -> (expiry, quote)
+        self.cache = {}
+        self.next_purge = 0
+        self.inflight = {}
+        self.calls = 0
+        self.requests = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def chunks(self, keys, quote_type):
+        """Split `keys` into the token lists of the requests."""
+        url = self.api_client.configuration.get_url_details("quotes_neo_symbol")
+        budget = self.max_url_length - len(url) - len(quote_type)
+        chunks = []
+        chunk, length = [], 0
+        for key in keys:
+            # Encoded "segment|token", plus the encoded comma separating it from the previous one
+            if URL_SAFE(key[0]) and URL_SAFE(key[1]):
+                size = len(key[0]) + len(key[1]) + 6
+            else:
+                size = len(urllib.parse.quote(key[0] + "|" + key[1])) + 3
+            if chunk and (len(chunk) == self.chunk_size or length + size > budget):
+                chunks.append(chunk)
+                chunk, length = [], 0
+            chunk.append(key)
+            length += size
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def get_quotes(self, instrument_tokens, quote_type=None):
+        """
+        Quotes of `instrument_tokens`, like `QuotesAPI.get_quotes`.
+
+        A single request answered without the cache returns its response unchanged. Otherwise the result is the list
+        of quotes, in the order of the tokens, followed by any quote that matched none; when some requests failed it
+        is {"data": quotes, "Error": [responses or exceptions of the failed requests]}, or the first failure when
+        none succeeded.
+        """
+        quote_type = quote_type or 'all'
+        keys = list(dict.fromkeys((item['exchange_segment'], str(item['instrument_token']), quote_type)
+                                  for item in instrument_tokens))
+        found = {}
+        waiting = {}
+        missing = []
+        now = self.clock()
+        with self.lock:
+            self.calls += 1
+            for key in keys:
+                cached = self.cache.get(key)
+                if cached is not None and cached[0] > now:
+                    found[key] = cached[1]
+                    self.cache_hits += 1
+                    continue
+                flight = self.inflight.get(key)
+                if flight is not None:
+                    waiting.setdefault(flight, []).append(key)
+                    self.coalesced += 1
+                else:
+                    missing.append(key)
+            flight = QuotesFlight()
+            for key in missing:
+                self.inflight[key] = flight
+
+        unmatched, errors = [], []
+        if missing:
+            chunks = self.chunks(missing, quote_type)
+            legs, items, fetched_unmatched, fetched_errors = self._fetch(chunks, quote_type, flight)
+            if len(chunks) == 1 and not found and not waiting:
+                if "Error" in legs[0]:
+                    raise legs[0]["Error"]
+                return legs[0]["response"]
+            found.update(items)
+            unmatched += fetched_unmatched
+            errors += fetched_errors
+        retry = []
+        for other, other_keys in waiting.items():
+            other.done.wait()
+            for key in other_keys:
+                if key in other.items:
+                    found[key] = other.items[key]
+                else:
+                    retry.append(key)
+        if retry:
+            # Tokens whose shared request failed or did not return them are asked for once more
+            _, items, fetched_unmatched, fetched_errors = self._fetch(self.chunks(retry, quote_type), quote_type,
+                                                                      QuotesFlight())
+            found.update(items)
+            unmatched += fetched_unmatched
+            errors += fetched_errors
+
+        quotes = [found[key] for key in keys if key in found] + unmatched
+        if errors:
+            if not quotes:
+                if isinstance(errors[0], Exception):
+                    raise errors[0]
+                return errors[0]
+            return {"data": quotes, "Error": errors}
+        return quotes
+
+    def _fetch(self, chunks, quote_type, flight):
+        """
+        Request every chunk and complete `flight`.
+
+        :return: (legs of `concurrent_dispatch.dispatch`, {key: quote}, quotes matching no key, failed responses)
+        """
+        api = neo_api_client.QuotesAPI(self.api_client)
+        max_workers = self.max_workers or self.api_client.configuration.pool_maxsize
+        items, unmatched, errors = {}, [], []
+        try:
+            legs = dispatch(lambda chunk: api.get_quotes(
+                [{"exchange_segment": key[0], "instrument_token": key[1]} for key in chunk], quote_type),
+                chunks, max_workers)
+            for chunk, leg in zip(chunks, legs):
+                response = leg.get("response")
+                if not isinstance(response, list):
+                    errors.append(leg["Error"] if "Error" in leg else response)
+                    continue
+                wanted = set(chunk)
+                for quote in response:
+                    key = None
+                    if isinstance(quote, dict):
+                        key = (quote.get("exchange"), str(quote.get("exchange_token")), quote_type)
+                    if key in wanted:
+                        items[key] = quote
+                    else:
+                        unmatched.append(quote)
+        finally:
+            now = self.clock()
+            with self.lock:
+                self.requests += len(chunks)
+                self.errors += len(errors)
+                flight.items = items
+                for chunk in chunks:
+                    for key in chunk:
+                        if self.inflight.get(key) is flight:
+                            del self.inflight[key]
+                if self.ttl:
+                    if now >= self.next_purge:
+                        self.cache = {key: value for key, value in self.cache.items() if value[0] > now}
+                        self.next_purge = now + self.ttl
+                    expiry = now + self.ttl
+                    for key, quote in items.items():
+                        self.cache[key] = (expiry, quote)
+            flight.done.set()
+        return legs, items, unmatched, errors
+
+    def clear(self):
+        """Forget every cached quote."""
+        with self.lock:
+            self.cache = {}
+
+    def metrics(self):
+        with self.lock:
+            return {"calls": self.calls, "requests": self.requests, "cache_hits": self.cache_hits,
+                    "coalesced": self.coalesced, "errors": self.errors, "cached": len(self.cache),
+                    "inflight": len(self.inflight)}
@@ -0,0 +1,148 @@
+import threading
+import time
+
+
+class TokenBucket(object):
+    """
+        Classic token bucket: `rate` tokens per second are added up to a maximum of `burst` tokens, and every
+        request consumes one token.
+    """
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def time_until_available(self, now):
+        """Seconds until one token can be taken, 0 if one is available now."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+
+class RequestLane(object):
+    def __init__(self, name, bucket, priority):
+        self.name = name
+        self.bucket = bucket
+        self.priority = priority
+        self.waiting = 0
+        self.max_waiting = 0
+        self.requests = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, waited, throttled):
+        self.requests += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        if throttled:
+            self.throttled += 1
+
+    def metrics(self):
+        return {
+            "priority": self.priority,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "avg_wait_ms": (self.total_wait / self.requests * 1000) if self.requests else 0.0,
+            "max_wait_ms": self.max_wait * 1000,
+            "tokens": self.bucket.tokens,
+        }
+
+
+class RequestScheduler(object):
+    """
+        Client-side request scheduler with one token bucket per lane and an optional shared bucket.
+
+        Each endpoint name (the keys of `settings.PROD_URL`, e.g. "place_order") maps to a lane with its own
+        budget. When a shared (account wide) budget is configured, lanes compete for it by priority: while a
+        higher priority lane has callers waiting and a token of its own, lower priority lanes do not take shared
+        tokens, so order placement and cancellation are served before report polling. A higher priority lane
+        waiting for its own budget does not block the lanes below it. Endpoints without a lane are never
+        throttled.
+    """
+
+    def __init__(self, lanes, endpoint_lanes, global_limit=None, clock=time.monotonic):
+        """
+        :param lanes: {lane_name: {"rate": per_second, "burst": tokens, "priority": int}}, lower priority wins
+        :param endpoint_lanes: {endpoint_name: lane_name}
+        :param global_limit: optional {"rate": per_second, "burst": tokens} shared by all lanes
+        :param clock: monotonic clock, replaceable for simulations
+        """
+        self.clock = clock
+        self.lanes = {name: RequestLane(name, TokenBucket(spec["rate"], spec["burst"], clock), spec["priority"])
+                      for name, spec in lanes.items()}
+        self.endpoint_lanes = dict(endpoint_lanes)
+        self.global_bucket = None
+        if global_limit:
+            self.global_bucket = TokenBucket(global_limit["rate"], global_limit["burst"], clock)
+        self._cond = threading.Condition()
+
+    def lane_for(self, endpoint):
+        return self.lanes.get(self.endpoint_lanes.get(endpoint))
+
+    def _higher_priority_ready(self, lane, now):
+        """Whether a higher priority lane has callers waiting that its own bucket would let through now."""
+        for other in self.lanes.values():
+            if other.priority < lane.priority and other.waiting and other.bucket.time_until_available(now) <= 0:
+                return True
+        return False
+
+    def acquire(self, endpoint):
+        """
+        Block until a request to `endpoint` may be sent.
+
+        :return: seconds spent waiting
+        """
+        lane = self.lane_for(endpoint)
+        if lane is None:
+            return 0.0
+        start = self.clock()
+        throttled = False
+        with self._cond:
+            lane.waiting += 1
+            lane.max_waiting = max(lane.max_waiting, lane.waiting)
+            try:
+                while True:
+                    now = self.clock()
+                    if self.global_bucket is not None and self._higher_priority_ready(lane, now):
+                        # Yield the shared budget; the higher priority caller notifies when it is done. A lane
+                        # throttled by its own bucket cannot use the shared tokens, so it does not hold others back
+                        throttled = True
+                        self._cond.wait()
+                        continue
+                    wait = lane.bucket.time_until_available(now)
+                    if self.global_bucket is not None:
+                        wait = max(wait, self.global_bucket.time_until_available(now))
+                    if wait <= 0:
+                        lane.bucket.take(now)
+                        if self.global_bucket is not None:
+                            self.global_bucket.take(now)
+                        break
+                    throttled = True
+                    self._cond.wait(wait)
+            finally:
+                lane.waiting -= 1
+                self._cond.notify_all()
+            waited = self.clock() - start
+            lane.record(waited, throttled)
+        return waited
+
+    def metrics(self):
+        """Queue depth and wait-time statistics per lane."""
+        with self._cond:
+            return {name: lane.metrics() for name, lane in self.lanes.items()}
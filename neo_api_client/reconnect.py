@@ -0,0 +1,157 @@
+import time
+
+from websocket import WebSocketConnectionClosedException, WebSocketTimeoutException
+
+from neo_api_client import settings
+from neo_api_client.HSWebSocketLib import MAX_SCRIPS
+from neo_api_client.settings import ReqTypeValues
+
+# Snapshot request type of each subscription type
+SNAPSHOT_TYPES = {
+    ReqTypeValues["SCRIP_SUBS"]: ReqTypeValues["SNAP_MW"],
+    ReqTypeValues["INDEX_SUBS"]: ReqTypeValues["SNAP_IF"],
+    ReqTypeValues["DEPTH_SUBS"]: ReqTypeValues["SNAP_DP"],
+}
+
+# Errors of a lost connection, which websocket-client reconnects
+DROPPED_ERRORS = (WebSocketConnectionClosedException, WebSocketTimeoutException, ConnectionError)
+
+
+class ReconnectManager(object):
+    """
+        Restores the live feed subscriptions of a NeoWebSocket each time its HSM socket (re)connects.
+
+        websocket-client reconnects a dropped socket by itself, every `settings.HSM_RECONNECT_DELAY` seconds (see
+        `is_dropped` for the errors that count as a drop rather than closing the socket). Once the connection is
+        acknowledged, `on_connected` sends the subscriptions back to back, one request per channel and subscription
+        type of up to MAX_SCRIPS tokens, instead of one request per token. After a reconnect it
+        also requests snapshots of the subscribed tokens, and the HSWrapper of the socket keeps the topics of the
+        previous connection so that the first snapshot of a token updates its last state instead of starting from
+        an empty one (not with decode workers, which keep their own topics).
+
+        The gap of each token, from its last tick before the drop to its first tick after the reconnect, and the
+        time from the drop to the first tick are measured by `observe` and reported by `gaps` and `metrics`.
+    """
+
+    def __init__(self, websocket, snapshots=None, clock=time.monotonic):
+        """
+        :param websocket: the NeoWebSocket whose subscriptions are restored
+        :param snapshots: request snapshots after a reconnect, defaults to `settings.RECONNECT_SNAPSHOTS`
+        :param clock: time source, in seconds
+        """
+        self.websocket = websocket
+        self.snapshots = settings.RECONNECT_SNAPSHOTS if snapshots is None else snapshots
+        self.clock = clock
+        self.connections = 0
+        self.disconnects = 0
+        self.subscribe_requests = 0
+        self.snapshot_requests = 0
+        # Time of the last tick of each token
+        self.last_tick = {}
+        # Tokens without a tick since the last reconnect: the time their gap started
+        self.pending = {}
+        # Seconds of the last gap of each token
+        self.gap_seconds = {}
+        self.disconnected_at = None
+        # Time of the drop before the last reconnect, or of the reconnect when the drop was not reported
+        self.dropped_at = None
+        self.first_tick_seconds = None
+
+    @staticmethod
+    def is_dropped(error):
+        """True when `error` reports a lost connection."""
+        return isinstance(error, DROPPED_ERRORS)
+
+    @property
+    def reconnects(self):
+        return max(self.connections - 1, 0)
+
+    def on_disconnected(self):
+        """Note the time of a drop, reported by the error callback of the socket."""
+        self.disconnects += 1
+        self.disconnected_at = self.clock()
+
+    def requests(self, registry):
+        """(channel, subscription type, scrips) of the subscription requests restoring `registry`."""
+        requests = []
+        for channel, entries in registry.channel_map().items():
+            by_type = {}
+            for entry in entries:
+                by_type.setdefault(entry["subscription_type"], []).append(
+                    entry["exchange_segment"] + "|" + str(entry["instrument_token"]))
+            for subscription_type, scrips in by_type.items():
+                for start in range(0, len(scrips), MAX_SCRIPS):
+                    requests.append((channel, subscription_type, "&".join(scrips[start:start + MAX_SCRIPS])))
+        return requests
+
+    def on_connected(self):
+        """
+        Subscribe again to everything in the registry of the websocket, called on the connection response.
+
+        After a reconnect, snapshots are requested too and the gap of every subscribed token starts.
+        """
+        websocket = self.websocket
+        hs = websocket.hsWebsocket
+        self.connections += 1
+        reconnect = self.connections > 1
+        if reconnect:
+            self.dropped_at = self.disconnected_at or self.clock()
+            self.disconnected_at = None
+            self.first_tick_seconds = None
+            wrapper = getattr(hs, "hsWrapper", None)
+            if wrapper is not None:
+                wrapper.retainTopics()
+            last_tick = self.last_tick
+            self.pending = {token: last_tick.get(token, self.dropped_at)
+                            for token in websocket.subscriptions.token_counts}
+        requests = self.requests(websocket.subscriptions)
+        for channel, subscription_type, scrips in requests:
+            hs.hs_send({"type": subscription_type, "scrips": scrips, "channelnum": channel})
+        self.subscribe_requests += len(requests)
+        if reconnect and self.snapshots:
+            for channel, subscription_type, scrips in requests:
+                snapshot_type = SNAPSHOT_TYPES.get(subscription_type)
+                if snapshot_type:
+                    hs.hs_send({"type": snapshot_type, "scrips": scrips, "channelnum": channel})
+                    self.snapshot_requests += 1
+
+    def observe(self, message):
+        """Note the time of the ticks of one live feed message (a list of dicts or Tick records)."""
+        now = self.clock()
+        if self.pending:
+            self._end_gaps(message, now)
+        last_tick = self.last_tick
+        if self.websocket.typed_ticks:
+            for item in message:
+                last_tick[item.tk] = now
+        else:
+            for item in message:
+                last_tick[item.get('tk')] = now
+
+    def _end_gaps(self, message, now):
+        pending = self.pending
+        for item in message:
+            token = item.get('tk') if isinstance(item, dict) else item.tk
+            started = pending.pop(token, None)
+            if started is not None:
+                self.gap_seconds[token] = now - started
+                if self.first_tick_seconds is None:
+                    self.first_tick_seconds = now - self.dropped_at
+
+    def gaps(self):
+        """{token: seconds} of the last gap of each token that ticked again after a reconnect."""
+        return dict(self.gap_seconds)
+
+    def metrics(self):
+        gaps = list(self.gap_seconds.values())
+        return {
+            "connections": self.connections,
+            "disconnects": self.disconnects,
+            "reconnects": self.reconnects,
+            "subscribe_requests": self.subscribe_requests,
+            "snapshot_requests": self.snapshot_requests,
+            "awaiting_tick": len(self.pending),
+            "time_to_first_tick": self.first_tick_seconds,
+            "max_gap": max(gaps) if gaps else None,
+            "mean_gap": sum(gaps) / len(gaps) if gaps else None,
+        }
@@ -1,11 +1,18 @@
 from __future__ import absolute_import
 
-import json
 import logging
 import re
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
 from six.moves.urllib.parse import urlencode
 from neo_api_client.exceptions import ApiException
+from neo_api_client import codec
+from neo_api_client import settings
+from neo_api_client.instrumentation import REGISTRY
+from neo_api_client.rate_limiter import RequestScheduler
 
 
 class RESTClientObject(object):
@@ -13,8 +20,13 @@ class RESTClientObject(object):
 
     This class is a client to perform requests to a REST API.
 
+    All requests go through one persistent `requests.Session` owned by this object, so connections to the
+    gateway are kept alive and reused between calls instead of paying a TCP+TLS handshake per request.
+
     Attributes:
         configuration (dict): configuration for the API client
+        pool_manager (requests.Session): pooled keep-alive session, created on first use
+        scheduler (RequestScheduler): client-side rate limiter, created on first use when enabled
     """
 
     def __init__(self, configuration):
@@ -24,9 +36,61 @@ class RESTClientObject(object):
         :param configuration: dictionary of configuration parameters
         """
         self.configuration = configuration
+        self.pool_manager = None
+        self.scheduler = None
+        self._pool_lock = threading.Lock()
+
+    def _config_value(self, name, default):
+        value = getattr(self.configuration, name, None)
+        return default if value is None else value
+
+    def _get_pool_manager(self):
+        """Return the pooled session, creating it from the configuration on first use."""
+        if self.pool_manager is None:
+            with self._pool_lock:
+                if self.pool_manager is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=self._config_value("pool_connections", settings.HTTP_POOL_CONNECTIONS),
+                        pool_maxsize=self._config_value("pool_maxsize", settings.HTTP_POOL_MAXSIZE),
+                        pool_block=self._config_value("pool_block", settings.HTTP_POOL_BLOCK))
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    if not self._config_value("keep_alive", settings.HTTP_KEEP_ALIVE):
+                        session.headers["Connection"] = "close"
+                    self.pool_manager = session
+        return self.pool_manager
+
+    def _get_scheduler(self):
+        """Return the request scheduler, or None when rate limiting is disabled."""
+        if self.scheduler is None and self._config_value("rate_limit_enabled", settings.RATE_LIMIT_ENABLED):
+            with self._pool_lock:
+                if self.scheduler is None:
+                    self.scheduler = RequestScheduler(
+                        lanes=self._config_value("rate_limits", settings.RATE_LIMITS),
+                        endpoint_lanes=self._config_value("endpoint_lanes", settings.ENDPOINT_LANES),
+                        global_limit=self._config_value("rate_limit_global", settings.RATE_LIMIT_GLOBAL))
+        return self.scheduler
+
+    def scheduler_metrics(self):
+        """Queue depth and wait-time metrics per rate limiting lane ({} when rate limiting is disabled)."""
+        scheduler = self._get_scheduler()
+        return scheduler.metrics() if scheduler else {}
+
+    def get_timeout(self):
+        """(connect, read) timeout tuple passed to every request."""
+        return (self._config_value("connect_timeout", settings.HTTP_CONNECT_TIMEOUT),
+                self._config_value("read_timeout", settings.HTTP_READ_TIMEOUT))
+
+    def close(self):
+        """Close the pooled session and drop all kept-alive connections."""
+        with self._pool_lock:
+            if self.pool_manager is not None:
+                self.pool_manager.close()
+                self.pool_manager = None
 
     def request(self, method, url, query_params=None, headers=None,
-                body=None):
+                body=None, endpoint=None):
         """Perform a request to the REST API
 
         This method performs a request to the REST API using the provided parameters.
@@ -36,6 +100,7 @@ class RESTClientObject(object):
         :param query_params: (optional) query parameters for the API endpoint
         :param headers: (optional) headers for the API request
         :param body: (optional) request body for the API request
+        :param endpoint: (optional) endpoint name (key of settings.PROD_URL) used to pick the rate limiting lane
         :return: response from the API
         :raises: ApiException in case of a request error
         """
@@ -48,6 +113,18 @@ class RESTClientObject(object):
         if 'Content-Type' not in headers:
             headers['Content-Type'] = 'application/json'
 
+        timed = REGISTRY.enabled
+        if timed:
+            started = time.perf_counter_ns()
+        scheduler = self._get_scheduler()
+        if scheduler is not None and endpoint:
+            scheduler.acquire(endpoint)
+        if timed:
+            sent = time.perf_counter_ns()
+            REGISTRY.observe("rest_wait", endpoint or "other", sent - started)
+
+        pool_manager = self._get_pool_manager()
+        timeout = self.get_timeout()
         try:
             if method in ['POST', 'PUT', 'PATCH', 'DELETE']:
                 if query_params:
@@ -55,26 +132,29 @@ class RESTClientObject(object):
                 if re.search('json', headers['Content-Type'], re.IGNORECASE):
                     request_body = None
                     if body is not None:
-                        request_body = json.dumps(body)
-                    response = requests.post(url=url, headers=headers, data=request_body)
+                        request_body = codec.dumpb(body)
+                    response = pool_manager.post(url=url, headers=headers, data=request_body, timeout=timeout)
                 elif re.search('x-www-form-urlencoded', headers['Content-Type'], re.IGNORECASE):
                     request_body = {}
                     if body is not None:
-                        request_body["jData"] = json.dumps(body)
-                    response = requests.post(url=url, headers=headers, data=request_body)
+                        request_body["jData"] = codec.dumps(body)
+                    response = pool_manager.post(url=url, headers=headers, data=request_body, timeout=timeout)
                 else:
                     msg = """In-Valid Content-Type in the Header Parameters"""
                     raise ApiException(status=0, reason=msg)
             elif method in ['GET']:
                 if query_params:
                     url += '?' + urlencode(query_params)
-                response = requests.get(url=url, headers=headers)
+                response = pool_manager.get(url=url, headers=headers, timeout=timeout)
             else:
                 msg = """Cannot call the API with the provided HTTP Method"""
                 raise ApiException(status=0, reason=msg)
         except Exception as e:
             msg = "{0}\n{1}".format(type(e).__name__, str(e))
             raise ApiException(status=0, reason=msg)
+        finally:
+            if timed:
+                REGISTRY.observe("rest_request", endpoint or "other", time.perf_counter_ns() - sent)
 
         # if not 200 <= response.status_code <= 299:
         #     raise ApiException(status=response.status_code, reason=response.reason, body=response.text)
@@ -0,0 +1,294 @@
+import datetime
+import hashlib
+import io
+import os
+import re
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from neo_api_client import codec
+from neo_api_client import settings
+from neo_api_client.exceptions import ApiException
+from neo_api_client.option_chain import OptionChain
+
+# Symbol patterns whose matching rows are remembered per loaded segment
+SYMBOL_CACHE_SIZE = 256
+
+
+class ScripMasterStore(object):
+    """
+        Local, indexed copy of the scrip master files.
+
+        Each segment's CSV is downloaded at most once per day. The download is a conditional GET (ETag /
+        Last-Modified); when the server does not support it, an unchanged file is detected by its SHA-256 and
+        not re-imported. The rows are persisted in SQLite so that another process (or the same one after a restart)
+        loads the current day's copy without touching the network; SQLite is only read whole, so it has no
+        indexes. Loaded segments are kept in memory together with dictionary indexes by underlying, trading symbol
+        and instrument token, and the NumPy columns `search` filters on.
+    """
+
+    def __init__(self, api_client, path=None):
+        """
+        :param api_client: ApiClient used to download the scrip master files
+        :param path: SQLite database file, defaults to `scrip_master.db` in `configuration.scrip_master_dir`
+        """
+        self.api_client = api_client
+        self.rest_client = api_client.rest_client
+        if path is None:
+            directory = getattr(api_client.configuration, "scrip_master_dir", None) or settings.SCRIP_MASTER_DIR
+            path = os.path.join(directory, "scrip_master.db")
+        self.path = path
+        self.segments = {}
+        self._lock = threading.RLock()
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path)
+        connection.execute('CREATE TABLE IF NOT EXISTS scrip_files (segment TEXT PRIMARY KEY, url TEXT, etag TEXT, '
+                           'last_modified TEXT, sha256 TEXT, refreshed_on TEXT)')
+        return connection
+
+    @staticmethod
+    def _table_name(segment):
+        return "scrips_" + re.sub(r"\W", "_", segment)
+
+    def _file_urls(self):
+        header_params = {
+            "Authorization": self.api_client.configuration.consumer_key,
+            "Content-Type": "application/x-www-form-urlencoded",
+        }
+        URL = self.api_client.configuration.get_url_details("scrip_master")
+        scrip_report = self.rest_client.request(url=URL, method='GET', headers=header_params,
+                                                endpoint="scrip_master")
+        if scrip_report.status_code != 200:
+            raise ApiException(status=scrip_report.status_code, reason=scrip_report.reason,
+                               body=scrip_report.text)
+        return codec.response_json(scrip_report)["data"]["filesPaths"]
+
+    def _download(self, connection, segment, url):
+        """Refresh the stored copy of `segment` from `url`, re-importing it only when its content changed."""
+        table = self._table_name(segment)
+        stored = connection.execute("SELECT url, etag, last_modified, sha256 FROM scrip_files WHERE segment = ?",
+                                    (segment,)).fetchone()
+        has_table = connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                       (table,)).fetchone() is not None
+        headers = {}
+        if stored and has_table and stored[0] == url:
+            if stored[1]:
+                headers["If-None-Match"] = stored[1]
+            if stored[2]:
+                headers["If-Modified-Since"] = stored[2]
+
+        response = self.rest_client.request(url=url, method='GET', headers=headers)
+        today = datetime.date.today().isoformat()
+        if response.status_code == 304:
+            connection.execute("UPDATE scrip_files SET refreshed_on = ? WHERE segment = ?", (today, segment))
+            connection.commit()
+            return
+        if response.status_code != 200:
+            raise ApiException(status=response.status_code, reason=response.reason, body=response.text)
+
+        sha256 = hashlib.sha256(response.content).hexdigest()
+        if not (stored and has_table and stored[3] == sha256):
+            df = pd.read_csv(io.BytesIO(response.content))
+            df = df.rename(columns=lambda x: x.strip())
+            df.to_sql(table, connection, if_exists="replace", index=False)
+        connection.execute("INSERT OR REPLACE INTO scrip_files VALUES (?, ?, ?, ?, ?, ?)",
+                           (segment, url, response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                            sha256, today))
+        connection.commit()
+
+    @staticmethod
+    def expiry_offset(exchange_segment):
+        """
+        Seconds to add to `pExpiryDate` to get a Unix timestamp, the conversion ScripSearch has always applied:
+        nse/cde style F&O expiries count from 1980-01-01, mcx and bse ones from 1970-01-01.
+        """
+        if exchange_segment.endswith('fo') and exchange_segment not in ('mcx', 'mcx_fo', 'bse', 'bse_fo'):
+            return 315511200
+        return 0
+
+    def _format_expiry(self, df, exchange_segment):
+        if 'pExpiryDate' not in df.columns:
+            return df
+        if exchange_segment.endswith('fo') or exchange_segment == 'mcx':
+            expiry = pd.to_datetime(df['pExpiryDate'], unit='s')
+            offset = self.expiry_offset(exchange_segment)
+            if offset:
+                expiry = expiry + pd.to_timedelta(offset, unit='s')
+            df['pExpiryDate'] = expiry.dt.strftime('%d%b%Y')
+        return df
+
+    def _load(self, exchange_segment):
+        today = datetime.date.today().isoformat()
+        connection = self._connect()
+        try:
+            rows = connection.execute("SELECT segment, url, refreshed_on FROM scrip_files").fetchall()
+            fresh = [row[0] for row in rows if row[2] == today and exchange_segment.lower() in row[1].lower()]
+            if fresh:
+                segment = fresh[0]
+            else:
+                file_urls = [url for url in self._file_urls() if exchange_segment.lower() in url.lower()]
+                if not file_urls:
+                    raise ApiException(status=0, reason="Exchange segment not found")
+                segment = os.path.splitext(os.path.basename(file_urls[0].split('?')[0]))[0]
+                self._download(connection, segment, file_urls[0])
+            df = pd.read_sql_query('SELECT * FROM "{0}"'.format(self._table_name(segment)), connection)
+        finally:
+            connection.close()
+
+        # Unconverted expiries are kept for the option chain, which works on integer days
+        expiry_seconds = df["pExpiryDate"].to_numpy(copy=True) if "pExpiryDate" in df.columns else None
+        df = self._format_expiry(df, exchange_segment)
+        underlying = df["pSymbolName"].str.lower().str.strip() if "pSymbolName" in df.columns else None
+        entry = {
+            "frame": df,
+            "refreshed_on": today,
+            "expiry_seconds": expiry_seconds,
+            "underlying": underlying.groupby(underlying).indices if underlying is not None else {},
+            "trading_symbols": df.groupby("pTrdSymbol").indices if "pTrdSymbol" in df.columns else {},
+            "tokens": df.groupby(df["pSymbol"].astype(str)).indices if "pSymbol" in df.columns else {},
+        }
+        entry["underlying_names"] = pd.Series(list(entry["underlying"].keys()), dtype=object)
+        return entry
+
+    def _entry(self, exchange_segment):
+        with self._lock:
+            entry = self.segments.get(exchange_segment)
+            if entry is None or entry["refreshed_on"] != datetime.date.today().isoformat():
+                entry = self._load(exchange_segment)
+                self.segments[exchange_segment] = entry
+            return entry
+
+    def frame(self, exchange_segment, symbol=''):
+        """
+        Rows of `exchange_segment`, with `pExpiryDate` formatted like `ScripSearch` results.
+
+        Without `symbol` the store's own DataFrame is returned, not a copy: copy it before modifying it.
+
+        :param exchange_segment: exchange segment, as mapped by `settings.exchange_segment`
+        :param symbol: when given, only rows whose lower-cased underlying (`pSymbolName`) contains this pattern
+        """
+        entry = self._entry(exchange_segment)
+        if symbol == '':
+            return entry["frame"]
+        return entry["frame"].take(self._symbol_positions(entry, symbol))
+
+    def _symbol_positions(self, entry, symbol):
+        """Sorted positions of the rows whose underlying contains `symbol`, remembered for the next searches."""
+        with self._lock:
+            cache = entry.setdefault("symbols", {})
+            positions = cache.get(symbol)
+        if positions is None:
+            if symbol == '':
+                positions = np.arange(len(entry["frame"]))
+            else:
+                names = entry["underlying_names"]
+                matched = [entry["underlying"][name] for name in names[names.str.contains(symbol)]]
+                positions = np.sort(np.concatenate(matched)) if matched else np.empty(0, dtype=np.intp)
+            with self._lock:
+                if len(cache) >= SYMBOL_CACHE_SIZE:
+                    cache.clear()
+                cache[symbol] = positions
+        return positions
+
+    def _dicts(self, entry, positions):
+        """
+        Rows at `positions` as new dicts, missing values as None. They are read from a row-major copy of the frame,
+        built once, so that results skip pandas.
+        """
+        if "rows" not in entry:
+            with self._lock:
+                if "rows" not in entry:
+                    df = entry["frame"]
+                    entry["rows"] = df.astype(object).where(df.notna(), None).to_numpy(dtype=object)
+                    entry["names"] = tuple(df.columns)
+        names = entry["names"]
+        return [dict(zip(names, row)) for row in entry["rows"][np.asarray(positions, dtype=np.intp)].tolist()]
+
+    def _columns(self, entry):
+        """NumPy columns the searches filter on, built on the first search of a loaded segment."""
+        if "columns" not in entry:
+            with self._lock:
+                if "columns" not in entry:
+                    df = entry["frame"]
+                    columns = {"empty": df.isna().all(axis=1).to_numpy()}
+                    if "pOptionType" in df.columns:
+                        columns["option_type"] = df["pOptionType"].str.lower().to_numpy(dtype=object)
+                    if "pExpiryDate" in df.columns:
+                        columns["expiry"] = pd.to_datetime(df["pExpiryDate"], format='%d%b%Y',
+                                                           errors='coerce').to_numpy()
+                    if "dStrikePrice;" in df.columns:
+                        columns["strike"] = df["dStrikePrice;"].astype(float).to_numpy()
+                    entry["columns"] = columns
+        return entry["columns"]
+
+    def search(self, exchange_segment, symbol='', option_types=None, expiry_range=None, strike_range=None):
+        """
+        Rows matching every given filter, sorted by strike price, as `scrip_search` returns them.
+
+        :param symbol: pattern contained in the lower-cased underlying (`pSymbolName`)
+        :param option_types: lower-cased option types (`pOptionType`) to keep
+        :param expiry_range: (first, last) expiry dates, inclusive
+        :param strike_range: (min, max) strike prices in paise, inclusive; None leaves that side open
+        :return: list of rows as dicts, new on every call
+        """
+        entry = self._entry(exchange_segment)
+        columns = self._columns(entry)
+        positions = self._symbol_positions(entry, symbol)
+        positions = positions[~columns["empty"][positions]]
+        if option_types:
+            values = columns["option_type"][positions]
+            positions = positions[np.array([value in option_types for value in values], dtype=bool)]
+        if expiry_range:
+            expiry = columns["expiry"][positions]
+            positions = positions[(expiry >= np.datetime64(expiry_range[0])) &
+                                  (expiry <= np.datetime64(expiry_range[1]))]
+        if strike_range:
+            strike = columns["strike"][positions]
+            mask = np.ones(len(positions), dtype=bool)
+            if strike_range[0] is not None:
+                mask &= strike >= strike_range[0]
+            if strike_range[1] is not None:
+                mask &= strike <= strike_range[1]
+            positions = positions[mask]
+        if "strike" in columns:
+            positions = positions[np.argsort(columns["strike"][positions], kind="stable")]
+        return self._dicts(entry, positions)
+
+    def lookup(self, exchange_segment, trading_symbol=None, instrument_token=None):
+        """
+        Exact match on trading symbol (`pTrdSymbol`) or instrument token (`pSymbol`).
+
+        :return: list of matching rows as dicts, missing values as None
+        """
+        entry = self._entry(exchange_segment)
+        if trading_symbol is not None:
+            positions = entry["trading_symbols"].get(trading_symbol, [])
+        elif instrument_token is not None:
+            positions = entry["tokens"].get(str(instrument_token), [])
+        else:
+            positions = []
+        return self._dicts(entry, positions)
+
+    def option_chain(self, exchange_segment="nse_fo"):
+        """`OptionChain` over the options of `exchange_segment`, built once per load of the segment."""
+        entry = self._entry(exchange_segment)
+        with self._lock:
+            if "option_chain" not in entry:
+                entry["option_chain"] = OptionChain(entry["frame"], entry["expiry_seconds"],
+                                                    self.expiry_offset(exchange_segment))
+            return entry["option_chain"]
+
+    def clear(self, exchange_segment=None):
+        """Drop the in-memory copy of one (or every) segment so that it is reloaded on next use."""
+        with self._lock:
+            if exchange_segment is None:
+                self.segments = {}
+            else:
+                self.segments.pop(exchange_segment, None)
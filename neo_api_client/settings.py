@@ -1,6 +1,7 @@
 """
     Add the settings related information in the given file
 """
+import os
 
 UAT_URL = {
     "view_token": "api/1.0/login/v2/validate",
@@ -100,6 +101,10 @@ order_type = {"Limit": "L", "L": "L", "l": "L", "MKT": "MKT", "mkt": "MKT", "Mar
               "SP": "SP", "sp": "SP", "2L": "2L", "2l": "2L", "Two Leg": "2L", "3L": "3L", "3l": "3L",
               "Three leg": "3L"}
 
+# Defaults applied to every leg passed to NeoAPI.place_orders, matching the defaults of NeoAPI.place_order
+order_leg_defaults = {"amo": "NO", "disclosed_quantity": "0", "market_protection": "0", "pf": "N",
+                      "trigger_price": "0"}
+
 segment_limits = ["CASH", "CUR", "FO", "ALL"]
 exchange_limits = ["NSE", "BSE", "ALL"]
 product_limits = ["CNC", "MIS", "NRML", "ALL"]
@@ -189,6 +194,117 @@ ReqTypeValues = {
 market_protection = 0
 QuotesChannel = 1
 
+# HTTP transport used by RESTClientObject. A single keep-alive session is kept per ApiClient so that
+# repeated order/report calls reuse warm TCP+TLS connections instead of handshaking on every request.
+HTTP_POOL_CONNECTIONS = 4      # number of distinct hosts for which a connection pool is cached
+HTTP_POOL_MAXSIZE = 10         # maximum number of connections kept alive per host
+HTTP_POOL_BLOCK = False        # block instead of opening an extra (non-pooled) connection when the pool is busy
+HTTP_KEEP_ALIVE = True
+HTTP_CONNECT_TIMEOUT = 5       # seconds
+HTTP_READ_TIMEOUT = 30         # seconds
+
+# Client-side rate limiting applied by RESTClientObject. Every endpoint below is mapped to a lane with its own
+# token bucket (rate = requests per second, burst = bucket size). All lanes also share RATE_LIMIT_GLOBAL, which
+# is handed out by priority (lower value first) so orders and cancellations are never queued behind report polling.
+# The budgets below are conservative guesses, not limits published for the API, so rate limiting is off by default:
+# set RATE_LIMIT_ENABLED (or configuration.rate_limit_enabled) and the budgets to the limits of your account.
+RATE_LIMIT_ENABLED = False
+RATE_LIMIT_GLOBAL = {"rate": 20, "burst": 20}
+RATE_LIMITS = {
+    "orders": {"rate": 10, "burst": 20, "priority": 0},
+    "modifications": {"rate": 10, "burst": 10, "priority": 1},
+    "quotes": {"rate": 10, "burst": 10, "priority": 2},
+    "reports": {"rate": 5, "burst": 5, "priority": 3},
+}
+ENDPOINT_LANES = {
+    "place_order": "orders",
+    "cancel_order": "orders",
+    "cancel_cover_order": "orders",
+    "cancel_bracket_order": "orders",
+    "modify_order": "modifications",
+    "quotes_neo_symbol": "quotes",
+    "order_book": "reports",
+    "order_history": "reports",
+    "trade_report": "reports",
+    "positions": "reports",
+    "holdings": "reports",
+    "limits": "reports",
+    "margin": "reports",
+    "scrip_master": "reports",
+}
+
+# Live feed format: False delivers dicts of formatted strings, True delivers reusable HSWebSocketLib.Tick records
+# holding native numbers and integer-scaled prices (see Tick.price / Tick.as_dict)
+TYPED_TICKS = False
+
+# Local scrip master store (see ScripMasterStore): segment files are kept in a SQLite database here and downloaded
+# again at most once a day
+SCRIP_MASTER_DIR = os.path.join(os.path.expanduser("~"), ".neo_api_client", "scrip_master")
+
+# Live feed channel allocation (see ChannelAllocator): half-life in seconds of the per-token message rates, seconds
+# between automatic rebalances (None: only NeoAPI.rebalance_channels) and the accepted spread between the busiest
+# and the quietest channel, as a fraction of the mean channel load
+CHANNEL_RATE_HALF_LIFE = 30.0
+CHANNEL_REBALANCE_INTERVAL = None
+CHANNEL_REBALANCE_TOLERANCE = 0.25
+
+# FeedPool: subscriptions per HSM websocket session (the server accepts 3,000) and sessions opened at most
+FEED_POOL_SESSION_TOKENS = 3000
+FEED_POOL_MAX_SESSIONS = 4
+
+# Live feed decoding in worker processes (see ParallelDecoder): 0 decodes on the websocket thread; shared memory
+# bytes of each worker's frame and tick rings
+PARALLEL_DECODER_WORKERS = 0
+PARALLEL_DECODER_RING_BYTES = 1 << 22
+
+# Event dispatch (see NeoAPI.enable_event_dispatch): messages waiting for on_message at most, and what happens when
+# the queue is full: "block", "drop_oldest" or "conflate"
+EVENT_QUEUE_SIZE = 10000
+EVENT_QUEUE_POLICY = "block"
+
+# Seconds between the deliveries of conflated live feed updates (see NeoAPI.enable_conflation)
+CONFLATION_INTERVAL = 0.25
+
+# Record latency histograms of the REST and websocket paths from start up (see neo_api_client.instrumentation)
+INSTRUMENTATION_ENABLED = False
+
+# JSON library used for request bodies, responses and websocket messages: "auto" picks orjson, then ujson, then
+# the standard library json, whichever is installed first (see neo_api_client.codec)
+JSON_CODEC = "auto"
+
+# Live feed reconnection (see ReconnectManager): seconds websocket-client waits before reconnecting a dropped HSM
+# socket, and whether snapshots of the subscribed tokens are requested once they are subscribed again
+HSM_RECONNECT_DELAY = 1
+RECONNECT_SNAPSHOTS = True
+
+# Heartbeats of the websocket connections (see HeartbeatService): seconds between websocket pings, seconds without a
+# pong or any frame after a ping before the connection is aborted and reconnected, seconds between the "HB"
+# messages of the order feed, and seconds before a dropped order feed socket reconnects
+HEARTBEAT_INTERVAL = 5
+HEARTBEAT_TIMEOUT = 10
+HSI_HEARTBEAT_INTERVAL = 30
+HSI_RECONNECT_DELAY = 5
+
+# Seconds the receive loop of a websocket waits for a frame before checking whether the socket was closed: closing it
+# from another thread can otherwise leave the loop (and its non-daemon thread) waiting for good
+WEBSOCKET_POLL_TIMEOUT = 1
+
+# Quotes (see QuotesEngine): tokens per request, characters per request URL, requests in flight at once (0: one per
+# pooled connection), and seconds a quote is reused (0: not cached; concurrent requests still share in-flight tokens)
+QUOTES_CHUNK_SIZE = 200
+QUOTES_MAX_URL_LENGTH = 4096
+QUOTES_MAX_WORKERS = 0
+QUOTES_CACHE_TTL = 0
+
+# Bars built per instrument token by BarEngine: "1s"/"1m"/"5m"/"1h" time bars, "<n>v" volume and "<n>t" tick bars.
+# Time bars are kept for BAR_SESSION_SECONDS of the session, volume and tick bars BAR_CAPACITY at a time
+BAR_SPECS = ("1s", "1m", "5m")
+BAR_SESSION_SECONDS = 22500
+BAR_CAPACITY = 4096
+
+# Rows kept per instrument token by TickStore: a 09:15-15:30 session at one tick per second
+TICK_STORE_CAPACITY = 22500
+
 help_functions = {
     1: 'help("place_order")',
     2: 'help("modify_order")',
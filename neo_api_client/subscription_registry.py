@@ -0,0 +1,144 @@
+class SubscriptionRegistry(object):
+    """
+        Live feed subscriptions of one HSM websocket, indexed for constant time lookups.
+
+        A subscription is identified by its key, (exchange_segment, instrument_token, subscription_type), with the
+        token as a string. Entries are the dicts sent to the socket ({'instrument_token', 'exchange_segment',
+        'subscription_type'}). Besides the key index the registry keeps, per channel, an insertion ordered dict of
+        its entries and a reference count per token, so membership, channel lookup, removal and the per tick "is
+        this token subscribed" check do not scan the subscription list.
+    """
+
+    def __init__(self, channels=range(2, 17), channel_capacity=200, allocator=None):
+        """
+        :param channels: channel numbers available for subscriptions, filled in this order
+        :param channel_capacity: maximum number of subscriptions per channel
+        :param allocator: optional `ChannelAllocator` choosing the channel of new subscriptions, told of every
+            subscription released or moved so that it keeps the channel loads current
+        """
+        self.channels = list(channels)
+        self.channel_capacity = channel_capacity
+        self.allocator = allocator
+        self.entries = {}
+        self.entry_channels = {}
+        self.channel_entries = {channel: {} for channel in self.channels}
+        self.token_counts = {}
+        # Keys registered but not yet assigned a channel, in the order they were added
+        self.unallocated = {}
+
+    @property
+    def capacity(self):
+        """Subscriptions that fit in the channels."""
+        return len(self.channels) * self.channel_capacity
+
+    @staticmethod
+    def key(exchange_segment, instrument_token, subscription_type):
+        return exchange_segment, str(instrument_token), subscription_type
+
+    def add(self, exchange_segment, instrument_token, subscription_type):
+        """
+        Register a subscription, without a channel until `allocate` assigns one.
+
+        :return: its key, or None when it is already registered
+        """
+        key = self.key(exchange_segment, instrument_token, subscription_type)
+        if key in self.entries:
+            return None
+        self.entries[key] = {'instrument_token': instrument_token, 'exchange_segment': exchange_segment,
+                             'subscription_type': subscription_type}
+        self.token_counts[key[1]] = self.token_counts.get(key[1], 0) + 1
+        self.unallocated[key] = None
+        return key
+
+    def allocate(self, keys):
+        """
+        Assign channels to `keys`: the least loaded channel when an allocator is set, otherwise the channels are
+        filled in order up to `channel_capacity`.
+
+        :return: {channel: [entry, ...]} of the newly assigned subscriptions
+        """
+        allocated = {}
+        keys = [key for key in keys if key in self.unallocated]
+        if self.allocator is not None:
+            for key, channel in self.allocator.place(self, keys):
+                self.channel_entries[channel][key] = self.entries[key]
+                self.entry_channels[key] = channel
+                del self.unallocated[key]
+                allocated.setdefault(channel, []).append(self.entries[key])
+            return allocated
+        position = 0
+        for channel in self.channels:
+            if position == len(keys):
+                break
+            entries = self.channel_entries[channel]
+            free = self.channel_capacity - len(entries)
+            if free <= 0:
+                continue
+            for key in keys[position:position + free]:
+                entries[key] = self.entries[key]
+                self.entry_channels[key] = channel
+                del self.unallocated[key]
+                allocated.setdefault(channel, []).append(self.entries[key])
+            position += free
+        return allocated
+
+    def remove(self, key):
+        """Drop the subscription `key` and free its channel slot; returns its entry, or None."""
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return None
+        channel = self.entry_channels.pop(key, None)
+        if channel is not None:
+            del self.channel_entries[channel][key]
+            if self.allocator is not None:
+                self.allocator.released(key, channel)
+        else:
+            del self.unallocated[key]
+        count = self.token_counts[key[1]] - 1
+        if count:
+            self.token_counts[key[1]] = count
+        else:
+            del self.token_counts[key[1]]
+        return entry
+
+    def move(self, key, channel):
+        """Reassign the subscription `key` to `channel`."""
+        source = self.entry_channels[key]
+        del self.channel_entries[source][key]
+        self.channel_entries[channel][key] = self.entries[key]
+        self.entry_channels[key] = channel
+        if self.allocator is not None:
+            self.allocator.moved(key, source, channel)
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def pending(self):
+        """Keys still waiting for a channel, oldest first."""
+        return list(self.unallocated)
+
+    def channel_of(self, key):
+        return self.entry_channels.get(key)
+
+    def has_token(self, instrument_token):
+        """True when any subscription (of any segment or type) is for `instrument_token`."""
+        return str(instrument_token) in self.token_counts
+
+    def channel_map(self):
+        """{channel: [entry, ...]} of every channel that has subscriptions."""
+        return {channel: list(entries.values()) for channel, entries in self.channel_entries.items() if entries}
+
+    def clear(self):
+        self.entries = {}
+        self.entry_channels = {}
+        self.channel_entries = {channel: {} for channel in self.channels}
+        self.token_counts = {}
+        self.unallocated = {}
+        if self.allocator is not None:
+            self.allocator.reset()
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
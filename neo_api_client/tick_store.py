@@ -0,0 +1,230 @@
+import threading
+import time
+
+import numpy as np
+
+from neo_api_client import settings
+
+# Column name, dtype and missing value of every row appended to a TickRing
+TICK_COLUMNS = (
+    ("ts", np.float64, np.nan),     # local receive time, seconds since the epoch
+    ("ltt", np.int64, 0),           # exchange last traded time, seconds since the epoch
+    ("ltp", np.float64, np.nan),
+    ("ltq", np.int64, 0),
+    ("volume", np.int64, 0),
+    ("oi", np.int64, 0),
+    ("bid", np.float64, np.nan),
+    ("ask", np.float64, np.nan),
+)
+ROW_NBYTES = sum(np.dtype(dtype).itemsize for _, dtype, _ in TICK_COLUMNS)
+
+
+def instrument_key(token, exchange_segment, segments):
+    """
+    (exchange_segment, token) key of an instrument. Tokens are only unique within an exchange segment: without
+    `exchange_segment` the one segment `token` was seen in is used, from `segments` ({token: [segment, ...]}).
+    """
+    token = str(token)
+    if exchange_segment is not None:
+        return exchange_segment, token
+    seen = segments.get(token)
+    if not seen:
+        return None, token
+    if len(seen) > 1:
+        raise ValueError("Token %s is in several exchange segments (%s), give its exchange_segment"
+                         % (token, ", ".join(str(segment) for segment in seen)))
+    return seen[0], token
+
+
+class TickRing(object):
+    """
+        Fixed-capacity columnar history of one instrument.
+
+        Each column is one NumPy array of `capacity + slack` rows. Rows are appended at `end`; when the arrays are
+        full the newest `capacity` rows are moved back to the front in one block copy, so appends are amortized O(1)
+        and the latest `capacity` rows are always contiguous, which lets `window` return views instead of copies.
+    """
+
+    def __init__(self, capacity, slack=None, spec=TICK_COLUMNS):
+        """
+        :param spec: (name, dtype, missing value) of each column, TICK_COLUMNS by default
+        """
+        self.capacity = capacity
+        self.slack = slack or max(1, capacity // 4)
+        self.spec = spec
+        size = capacity + self.slack
+        self.columns = {name: np.empty(size, dtype=dtype) for name, dtype, _ in spec}
+        # The columns in spec order, for append
+        self.arrays = list(self.columns.values())
+        self.end = 0
+        self.total = 0
+
+    def append(self, row):
+        if self.end == self.capacity + self.slack:
+            start = self.end - self.capacity
+            for column in self.arrays:
+                column[:self.capacity] = column[start:self.end]
+            self.end = self.capacity
+        end = self.end
+        for column, value in zip(self.arrays, row):
+            column[end] = value
+        self.end = end + 1
+        self.total += 1
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def window(self, n=None):
+        """Views over the last `n` rows (all retained rows by default), oldest first."""
+        count = len(self)
+        if n is not None:
+            count = min(n, count)
+        return {name: column[self.end - count:self.end] for name, column in self.columns.items()}
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns.values())
+
+
+class TickStore(object):
+    """
+        In-memory tick history for every subscribed instrument, keyed by exchange segment and instrument token.
+
+        Register `on_ticks` as a feed listener (`client.add_feed_listener(store.on_ticks)`). Every scrip or index
+        tick appends one row: receive time, last traded time, LTP, LTQ, volume, OI and best bid/ask, with fields the
+        tick did not carry filled forward from the previous one. Both the dict feed and typed ticks
+        (`configuration.typed_ticks`) are accepted.
+
+        A ring of `capacity` rows is created for an instrument on its first tick. Memory is bounded by
+        `capacity * 1.25 * ROW_NBYTES` per instrument and is only committed as rows are actually written, so a
+        default ring sized for a full session at one tick per second costs nothing for quiet instruments.
+
+        Readers take the token and, when the same token is subscribed in several segments, its `exchange_segment`.
+    """
+
+    def __init__(self, capacity=None):
+        """
+        :param capacity: rows retained per instrument, defaults to `settings.TICK_STORE_CAPACITY`
+        """
+        self.capacity = capacity or settings.TICK_STORE_CAPACITY
+        # Rings and last rows by (exchange_segment, token), and the segments of each token
+        self.rings = {}
+        self.last_values = {}
+        self.segments = {}
+        self._lock = threading.Lock()
+
+    def _ring(self, key):
+        ring = self.rings.get(key)
+        if ring is None:
+            ring = self.rings[key] = TickRing(self.capacity)
+            self.last_values[key] = [missing for _, _, missing in TICK_COLUMNS]
+            self.segments.setdefault(key[1], []).append(key[0])
+        return ring
+
+    @staticmethod
+    def _parse_dict(tick):
+        name = tick.get("name")
+        if name == "sf":
+            fields = (("ltt", "ltt"), ("ltp", "ltp"), ("ltq", "ltq"), ("volume", "v"), ("oi", "oi"),
+                      ("bid", "bp"), ("ask", "sp"))
+        elif name == "if":
+            fields = (("ltt", "tvalue"), ("ltp", "iv"))
+        else:
+            return None
+        values = {}
+        for column, key in fields:
+            value = tick.get(key)
+            if value is None:
+                continue
+            if column == "ltt":
+                values[column] = int(time.mktime(time.strptime(value, "%d/%m/%Y %H:%M:%S")))
+            elif column in ("ltp", "bid", "ask"):
+                values[column] = float(value)
+            else:
+                values[column] = int(value)
+        return values
+
+    @staticmethod
+    def _parse_typed(tick):
+        name = tick.name
+        if name == "sf":
+            fields = (("ltt", "ltt", False), ("ltp", "ltp", True), ("ltq", "ltq", False), ("volume", "v", False),
+                      ("oi", "oi", False), ("bid", "bp", True), ("ask", "sp", True))
+        elif name == "if":
+            fields = (("ltt", "tvalue", False), ("ltp", "iv", True))
+        else:
+            return None
+        values = {}
+        for column, key, is_price in fields:
+            index = tick.FIELD_INDEX[key]
+            value = tick.fields[index]
+            if value is not None and tick.updated >> index & 1:
+                values[column] = tick.format_price(value) if is_price else value
+        return values
+
+    def on_ticks(self, message):
+        """Feed listener: append one row per scrip/index tick in `message` (a list of dicts or Tick records)."""
+        now = time.time()
+        with self._lock:
+            for tick in message:
+                if isinstance(tick, dict):
+                    token, exchange_segment, values = tick.get("tk"), tick.get("e"), self._parse_dict(tick)
+                else:
+                    token, exchange_segment, values = tick.tk, tick.e, self._parse_typed(tick)
+                if token is None or not values:
+                    continue
+                key = exchange_segment, str(token)
+                ring = self._ring(key)
+                row = self.last_values[key]
+                row[0] = now
+                for index, (name, _, _) in enumerate(TICK_COLUMNS):
+                    if name in values:
+                        row[index] = values[name]
+                ring.append(row)
+
+    def append(self, token, ltp, ltq=0, volume=0, oi=0, bid=np.nan, ask=np.nan, ltt=0, ts=None,
+               exchange_segment=None):
+        """Append one row for `token` directly, e.g. when replaying recorded data."""
+        row = [time.time() if ts is None else ts, ltt, ltp, ltq, volume, oi, bid, ask]
+        key = exchange_segment, str(token)
+        with self._lock:
+            self._ring(key).append(row)
+            self.last_values[key] = row
+
+    def window(self, token, n=None, exchange_segment=None):
+        """
+        Zero-copy views over the last `n` rows of `token`, as {column: ndarray}, oldest first.
+
+        The views share memory with the ring; copy them if they must survive the next `capacity // 4` appends.
+        """
+        with self._lock:
+            ring = self.rings.get(instrument_key(token, exchange_segment, self.segments))
+            if ring is None:
+                return {name: np.empty(0, dtype=dtype) for name, dtype, _ in TICK_COLUMNS}
+            return ring.window(n)
+
+    def column(self, token, name, n=None, exchange_segment=None):
+        return self.window(token, n, exchange_segment)[name]
+
+    def latest(self, token, exchange_segment=None):
+        """Last row of `token` as a dict, None before its first tick."""
+        with self._lock:
+            row = self.last_values.get(instrument_key(token, exchange_segment, self.segments))
+            return None if row is None else {name: value for (name, _, _), value in zip(TICK_COLUMNS, row)}
+
+    def tokens(self):
+        return list(self.segments)
+
+    def keys(self):
+        """(exchange_segment, token) of every instrument."""
+        return list(self.rings)
+
+    def count(self, token, exchange_segment=None):
+        with self._lock:
+            ring = self.rings.get(instrument_key(token, exchange_segment, self.segments))
+        return len(ring) if ring else 0
+
+    @property
+    def nbytes(self):
+        """Bytes allocated (not necessarily committed) by all rings."""
+        return sum(ring.nbytes for ring in self.rings.values())
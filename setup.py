@@ -19,7 +19,9 @@ setup(
     url="",
     keywords=["Neo-Trade API", "Neo Trade API's"],
     install_requires=REQUIRES,
-    packages=find_packages(exclude=["test", "tests"]),
+    # orjson is used for JSON encoding and decoding when installed (see neo_api_client.codec)
+    extras_require={"fast-json": ["orjson>=3.8"]},
+    packages=find_packages(exclude=["test", "tests", "benchmarks"]),
     include_package_data=True,
     long_description="""\
     """
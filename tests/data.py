@@ -0,0 +1,218 @@
+"""
+Synthetic inputs shared by the tests and the benchmarks: HSM frames, decoded ticks, scrip master rows, subscription
+lists and order books.
+"""
+import datetime
+import json
+import os
+import random
+import struct
+
+import numpy as np
+import pandas as pd
+
+from neo_api_client.api_client import ApiClient
+from neo_api_client.HSWebSocketLib import BinRespTypes, ResponseTypes, ScripTick, TRASH_VAL, getFormatDate
+from neo_api_client.neo_utility import NeoUtility
+from neo_api_client.scrip_master_store import ScripMasterStore
+
+TOPIC_TYPES = ("sf", "dp", "if")
+
+
+def snap_packet(topic_id, name, longs, strings):
+    body = bytes([ResponseTypes["SNAP"]]) + struct.pack(">i", topic_id) + bytes([len(name)]) + name.encode()
+    body += bytes([len(longs)]) + b"".join(struct.pack(">i", value) for value in longs)
+    body += bytes([len(strings)]) + b"".join(bytes([fid, len(value)]) + value.encode() for fid, value in strings)
+    return struct.pack(">H", len(body)) + body
+
+
+def update_packet(topic_id, longs):
+    body = bytes([ResponseTypes["UPDATE"]]) + struct.pack(">i", topic_id) + bytes([len(longs)])
+    body += b"".join(struct.pack(">i", value) for value in longs)
+    return struct.pack(">H", len(body)) + body
+
+
+def data_frame(packets, msg_num=None):
+    """DATA_TYPE frame; `msg_num` is only present on connections that acknowledge frames."""
+    body = bytes([BinRespTypes["DATA_TYPE"]])
+    if msg_num is not None:
+        body += struct.pack(">i", msg_num)
+    body += struct.pack(">H", len(packets)) + b"".join(packets)
+    return struct.pack(">H", len(body)) + body
+
+
+def scrip_longs(rng):
+    longs = [rng.randint(1700000000, 1700100000) for _ in range(4)] + [rng.randint(0, 10 ** 7)]
+    longs += [rng.randint(10000, 30000) * 100] + [rng.randint(1, 500) for _ in range(3)]
+    longs += [rng.randint(10000, 30000) * 100 for _ in range(2)] + [rng.randint(1, 500) for _ in range(2)]
+    longs += [rng.randint(10000, 30000) * 100 for _ in range(10)] + [rng.randint(0, 10 ** 6), 1, 2]
+    return longs
+
+
+def depth_longs(rng):
+    longs = [rng.randint(1700000000, 1700100000) for _ in range(2)]
+    longs += [rng.randint(10000, 30000) * 100 for _ in range(10)] + [rng.randint(1, 900) for _ in range(20)]
+    return longs + [1, 2]
+
+
+def index_longs(rng):
+    longs = [rng.randint(1700000000, 1700100000) for _ in range(2)]
+    longs += [rng.randint(10 ** 6, 3 * 10 ** 6), rng.randint(10 ** 6, 3 * 10 ** 6), rng.randint(1700000000, 1700100000)]
+    return longs + [rng.randint(10 ** 6, 3 * 10 ** 6) for _ in range(3)] + [1, 2]
+
+
+LONGS = {"sf": scrip_longs, "dp": depth_longs, "if": index_longs}
+
+
+def topic_types(topics):
+    return [TOPIC_TYPES[topic % len(TOPIC_TYPES)] for topic in range(topics)]
+
+
+def snap_frame(topics=50, seed=1, kinds=None):
+    """One frame with the SNAP packet of every topic, scrip, depth and index topics in turn unless `kinds`."""
+    rng = random.Random(seed)
+    kinds = kinds or topic_types(topics)
+    packets = []
+    for topic, kind in enumerate(kinds):
+        token = str(1000 + topic)
+        packets.append(snap_packet(topic + 1, "%s|nse_cm|%s" % (kind, token), LONGS[kind](rng),
+                                   [(52, token), (53, "nse_cm"), (54, "SYM%d-EQ" % topic)]))
+    return data_frame(packets)
+
+
+def update_longs(rng, kind):
+    """Field values of one UPDATE packet: about 30% of the fields changed, the others TRASH_VAL."""
+    longs = [value if rng.random() < 0.3 else TRASH_VAL for value in LONGS[kind](rng)]
+    return longs[:rng.randint(6, len(longs))]
+
+
+def update_frames(count=2000, topics=50, seed=1, kinds=None):
+    """`count` frames of one UPDATE packet each, for random topics of `snap_frame(topics)`."""
+    rng = random.Random(seed)
+    kinds = kinds or topic_types(topics)
+    frames = []
+    for _ in range(count):
+        topic = rng.randrange(len(kinds))
+        frames.append(data_frame([update_packet(topic + 1, update_longs(rng, kinds[topic]))]))
+    return frames
+
+
+def trades(count=50000, tokens=200, seconds=600, late=0.02, seed=1):
+    """
+    (token, ltt, raw ltp, day volume) of `count` trades of `tokens` instruments over `seconds` of exchange time,
+    a `late` fraction of them timed up to 5 seconds in the past.
+    """
+    rng = random.Random(seed)
+    start = 1700000000
+    prices = [rng.randint(10000, 300000) for _ in range(tokens)]
+    volumes = [0] * tokens
+    result = []
+    for index in range(count):
+        topic = rng.randrange(tokens)
+        ltt = start + index * seconds // count
+        if rng.random() < late:
+            ltt -= rng.randint(1, 5)
+        prices[topic] = max(100, prices[topic] + rng.randint(-20, 20) * 5)
+        volumes[topic] += rng.randint(1, 50) * 10
+        result.append((str(1000 + topic), ltt, prices[topic], volumes[topic]))
+    return result
+
+
+def trade_dicts(trades):
+    """The trades as scrip ticks of the dict feed."""
+    return [{"ltt": getFormatDate(ltt), "v": str(volume), "ltp": "%.2f" % (ltp / 100), "name": "sf", "tk": token,
+             "e": "nse_cm"} for token, ltt, ltp, volume in trades]
+
+
+def trade_ticks(trades):
+    """The trades as typed ScripTick records, one per trade."""
+    ticks = []
+    indexes = [ScripTick.FIELD_INDEX[name] for name in ("ltt", "v", "ltp", "name", "tk", "e")]
+    updated = sum(1 << index for index in indexes)
+    for token, ltt, ltp, volume in trades:
+        fields = [None] * 100
+        for index, value in zip(indexes, (ltt, volume, ltp, "sf", token, "nse_cm")):
+            fields[index] = value
+        tick = ScripTick(fields)
+        tick.updated = updated
+        tick.multiplier = 1
+        tick.precision = 2
+        ticks.append(tick)
+    return ticks
+
+
+def instrument_tokens(count=3000, exchange_segment="nse_fo", start=40000):
+    return [{"instrument_token": str(start + index), "exchange_segment": exchange_segment} for index in range(count)]
+
+
+def scrip_master(underlyings=120, expiries=4, strikes=100, seed=1):
+    """
+    nse_fo scrip master rows, options only: underlyings x expiries x strikes x (CE, PE) rows.
+
+    `pExpiryDate` counts seconds from 1980-01-01 like the nse_fo file; `expiry_dates` returns the DDMMMYYYY
+    expiries used.
+    """
+    rng = np.random.default_rng(seed)
+    names = ["UND%03d" % index for index in range(underlyings)]
+    names[0] = "NIFTY"
+    days = expiry_days(expiries)
+    underlying, expiry, strike, option_type = (column.ravel() for column in np.meshgrid(
+        np.arange(underlyings), np.arange(expiries), np.arange(strikes), np.arange(2), indexing="ij"))
+    base = rng.integers(100, 2000, underlyings) * 10
+    strike_paise = (base[underlying] + strike * 50) * 100
+    expiry_seconds = np.array([(day - datetime.date(1980, 1, 1)).days * 86400 + 52200 for day in days])[expiry]
+    types = np.array(["CE", "PE"])[option_type]
+    symbols = np.array(names)[underlying]
+    labels = np.array([day.strftime("%d%b%y").upper() for day in days])[expiry]
+    trading_symbols = pd.Series(symbols).str.cat([pd.Series(labels), pd.Series((strike_paise // 100).astype(str)),
+                                                  pd.Series(types)])
+    return pd.DataFrame({
+        "pSymbol": np.arange(35000, 35000 + len(underlying)).astype(str),
+        "pExchSeg": "nse_fo",
+        "pTrdSymbol": trading_symbols,
+        "pOptionType": types,
+        "pSymbolName": symbols,
+        "pInstType": "OPTIDX",
+        "pExpiryDate": expiry_seconds,
+        "dStrikePrice;": strike_paise.astype(float),
+        "lLotSize": 50,
+    })
+
+
+def expiry_days(expiries=4):
+    first = datetime.date(2024, 12, 26)
+    return [first + datetime.timedelta(days=7 * index) for index in range(expiries)]
+
+
+def stored_master(directory, frame, segment="nse_fo"):
+    """ScripMasterStore holding `frame` as today's copy of `segment`, so nothing is downloaded."""
+    api_client = ApiClient(NeoUtility(host="prod"))
+    store = api_client.scrip_master_store = ScripMasterStore(api_client, os.path.join(directory, "scrip_master.db"))
+    connection = store._connect()
+    try:
+        frame.to_sql(store._table_name(segment), connection, if_exists="replace", index=False)
+        connection.execute("INSERT OR REPLACE INTO scrip_files VALUES (?, ?, ?, ?, ?, ?)",
+                           (segment, "https://localhost/scrip_master/%s.csv" % segment, None, None, "",
+                            datetime.date.today().isoformat()))
+        connection.commit()
+    finally:
+        connection.close()
+    return api_client
+
+
+def order_book(count=200, seed=1):
+    """Order book response body of `count` orders, as the order report endpoint returns it (bytes)."""
+    rng = random.Random(seed)
+    orders = []
+    for index in range(count):
+        price = "%.2f" % rng.uniform(100, 3000)
+        quantity = rng.choice((1, 10, 50, 100))
+        orders.append({
+            "nOrdNo": str(240101000000000 + index), "exOrdId": str(1100000000000000 + index), "exSeg": "nse_cm",
+            "trdSym": "SYM%03d-EQ" % (index % 500), "tok": str(1000 + index % 500), "prod": "CNC", "prcTp": "L",
+            "trnsTp": rng.choice("BS"), "vldt": "DAY", "ordSt": rng.choice(("complete", "open", "rejected")),
+            "prc": price, "avgPrc": price, "qty": quantity, "fldQty": quantity, "unFldSz": 0, "trgPrc": "0.00",
+            "dscQty": 0, "mktPro": "0", "ordDtTm": "01-Jan-2024 09:15:%02d" % (index % 60), "algId": "NA",
+            "rejRsn": "--", "rmk": "--", "GuiOrdId": "XDF%08d" % index, "brdLtQty": 1, "lotSz": 1, "multiplier": 1,
+        })
+    return json.dumps({"stat": "Ok", "stCode": 200, "data": orders}).encode()
@@ -0,0 +1,76 @@
+"""Simulated time for RequestScheduler tests and benchmarks."""
+import math
+import threading
+
+
+class SimulatedTime(object):
+    """
+    Clock and condition of a RequestScheduler under simulation: time stands still while any of the `threads` runs,
+    and jumps to the earliest wait deadline once all of them wait, so minutes of rate limiting take milliseconds.
+    """
+
+    def __init__(self, threads):
+        self.now = 0.0
+        self.running = threads
+        # [deadline or None, woken] of every waiting thread
+        self.sleepers = []
+        self.cond = threading.Condition()
+
+    def __call__(self):
+        return self.now
+
+    def __enter__(self):
+        return self.cond.__enter__()
+
+    def __exit__(self, *exc_info):
+        return self.cond.__exit__(*exc_info)
+
+    def wait(self, timeout=None):
+        if timeout is None:
+            self._wait_until(None)
+        else:
+            self._wait_until(self.now + timeout)
+        return True
+
+    def notify_all(self):
+        self._wake(self.sleepers)
+
+    def sleep(self, seconds):
+        with self.cond:
+            until = self.now + seconds
+            while self.now < until:
+                self._wait_until(until)
+
+    def exit(self):
+        """Called by a simulated thread as it ends."""
+        with self.cond:
+            self.running -= 1
+            self._advance()
+
+    def _wait_until(self, deadline):
+        if deadline is not None and deadline <= self.now:
+            # A wait too short to move the clock would spin forever
+            deadline = math.nextafter(self.now, math.inf)
+        sleeper = [deadline, False]
+        self.sleepers.append(sleeper)
+        self.running -= 1
+        self._advance()
+        while not sleeper[1]:
+            self.cond.wait()
+
+    def _wake(self, sleepers):
+        sleepers = list(sleepers)
+        for sleeper in sleepers:
+            sleeper[1] = True
+            self.sleepers.remove(sleeper)
+        self.running += len(sleepers)
+        self.cond.notify_all()
+
+    def _advance(self):
+        if self.running or not self.sleepers:
+            return
+        deadlines = [sleeper[0] for sleeper in self.sleepers if sleeper[0] is not None]
+        if not deadlines:
+            raise RuntimeError("every simulated thread waits without a timeout")
+        self.now = max(self.now, min(deadlines))
+        self._wake([sleeper for sleeper in self.sleepers if sleeper[0] is not None and sleeper[0] <= self.now])
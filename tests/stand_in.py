@@ -0,0 +1,261 @@
+"""Local stand-ins of the HSM and HSI websocket servers and of a connected HSWebSocket, shared by the tests."""
+import base64
+import hashlib
+import json
+import random
+import socket
+import struct
+import threading
+import time
+
+from neo_api_client.NeoWebSocket import NeoWebSocket
+
+from tests import data
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+# Binary request types of the HSM socket
+CONNECTION, SUBSCRIBE, UNSUBSCRIBE, SNAPSHOT = 1, 4, 5, 9
+
+
+def receive(sock, size):
+    chunks = b""
+    while len(chunks) < size:
+        chunk = sock.recv(size - len(chunks))
+        if not chunk:
+            raise ConnectionError("closed")
+        chunks += chunk
+    return chunks
+
+
+class Connection(object):
+    """One websocket connection of a StandInServer, read on a thread of its own."""
+
+    def __init__(self, server, sock):
+        self.server = server
+        self.sock = sock
+        self.lock = threading.Lock()
+        self.requests = []
+        self.open = True
+        # A frozen connection neither answers pings nor handles requests, as if the server hung
+        self.frozen = False
+        self.pings = 0
+        threading.Thread(target=self.run, name="stand-in-connection", daemon=True).start()
+
+    def run(self):
+        try:
+            request = b""
+            while b"\r\n\r\n" not in request:
+                request += receive(self.sock, 1)
+            key = [line.split(":", 1)[1].strip() for line in request.decode().split("\r\n")
+                   if line.lower().startswith("sec-websocket-key")][0]
+            accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+            self.sock.sendall(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                               "Sec-WebSocket-Accept: %s\r\n\r\n" % accept).encode())
+            while True:
+                opcode, payload = self.read_frame()
+                if opcode == 8:
+                    self.send(payload, 8)
+                    self.drop()
+                    break
+                if self.frozen:
+                    continue
+                if opcode == 9:
+                    self.pings += 1
+                    self.send(payload, 10)
+                elif opcode in (1, 2):
+                    self.server.handle(self, payload)
+        except OSError:
+            self.open = False
+
+    def read_frame(self):
+        head = receive(self.sock, 2)
+        size = head[1] & 127
+        if size == 126:
+            size = struct.unpack(">H", receive(self.sock, 2))[0]
+        elif size == 127:
+            size = struct.unpack(">Q", receive(self.sock, 8))[0]
+        mask = receive(self.sock, 4) if head[1] & 128 else b"\0\0\0\0"
+        payload = receive(self.sock, size)
+        return head[0] & 15, bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+
+    def send(self, payload, opcode=2):
+        size = len(payload)
+        if size < 126:
+            head = bytes([0x80 | opcode, size])
+        else:
+            head = bytes([0x80 | opcode, 126]) + struct.pack(">H", size)
+        with self.lock:
+            self.sock.sendall(head + payload)
+
+    def drop(self):
+        self.open = False
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class StandInServer(object):
+    """Accepts websocket connections on localhost; `handle` answers the requests of a connection."""
+
+    def __init__(self):
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(16)
+        self.url = "ws://127.0.0.1:%d" % self.sock.getsockname()[1]
+        self.connections = []
+        threading.Thread(target=self.accept, name="stand-in-server", daemon=True).start()
+
+    def accept(self):
+        while True:
+            try:
+                sock, _ = self.sock.accept()
+            except OSError:
+                return
+            self.connections.append(Connection(self, sock))
+
+    def handle(self, connection, payload):
+        connection.requests.append(payload)
+
+    def close(self):
+        self.sock.close()
+        for connection in self.connections:
+            connection.drop()
+
+
+class HsmServer(StandInServer):
+    """
+    Acknowledges the connection request of the HSM socket and keeps the scrips of its other requests.
+
+    With a `limit`, like the real server it holds at most that many subscriptions per connection: a subscribe
+    request going beyond it is noted in `rejected` and the connection dropped.
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.rejected = []
+        super(HsmServer, self).__init__()
+
+    def handle(self, connection, payload):
+        if payload[2] == CONNECTION:
+            connection.subscribed = set()
+            connection.send(b"\0\0" + bytes([CONNECTION, 1, 1]) + (1).to_bytes(2, "big") + b"K")
+            return
+        if payload[2] in (SUBSCRIBE, UNSUBSCRIBE, SNAPSHOT):
+            position = 7
+            scrips = []
+            for _ in range(struct.unpack(">H", payload[position:position + 2])[0]):
+                size = payload[position + 2]
+                scrips.append(payload[position + 3:position + 3 + size].decode())
+                position += 1 + size
+            connection.requests.append((payload[2], scrips))
+            if payload[2] == UNSUBSCRIBE:
+                connection.subscribed.difference_update(scrips)
+            elif payload[2] == SUBSCRIBE:
+                connection.subscribed.update(scrips)
+                if self.limit is not None and len(connection.subscribed) > self.limit:
+                    self.rejected.append(connection)
+                    connection.drop()
+
+    def subscribed(self):
+        """Scrips subscribed on the connections still open, one set per connection."""
+        return [connection.subscribed for connection in self.connections
+                if connection.open and hasattr(connection, "subscribed")]
+
+
+class TickingHsmServer(HsmServer):
+    """
+    HsmServer streaming the live feed like a quiet market.
+
+    Every `tick_seconds` from its connection request, each subscribed scrip of a connection gets a tick (its SNAP),
+    while a snapshot request is answered at once with the SNAP of each of its scrips. Requests of a connection are handled one after the other,
+    each taking `request_seconds`, which stands for the server's cost per request.
+    """
+
+    def __init__(self, request_seconds=0.0, tick_seconds=0.5, limit=None):
+        self.request_seconds = request_seconds
+        self.tick_seconds = tick_seconds
+        self.rng = random.Random(1)
+        self.closed = threading.Event()
+        super(TickingHsmServer, self).__init__(limit)
+
+    def handle(self, connection, payload):
+        super(TickingHsmServer, self).handle(connection, payload)
+        if payload[2] == CONNECTION:
+            threading.Thread(target=self.tick, args=(connection,), name="stand-in-ticker", daemon=True).start()
+        if payload[2] in (SUBSCRIBE, UNSUBSCRIBE, SNAPSHOT) and self.request_seconds:
+            time.sleep(self.request_seconds)
+        if payload[2] == SNAPSHOT:
+            self.send_snaps(connection, connection.requests[-1][1])
+
+    def send_snaps(self, connection, scrips):
+        topics = connection.__dict__.setdefault("topics", {})
+        for start in range(0, len(scrips), 100):
+            packets = []
+            for scrip in scrips[start:start + 100]:
+                kind, segment, token = scrip.split("|")
+                topic = topics.setdefault(scrip, len(topics) + 1)
+                packets.append(data.snap_packet(topic, scrip, data.LONGS[kind](self.rng),
+                                                [(52, token), (53, segment), (54, "SYM%s" % token)]))
+            try:
+                connection.send(data.data_frame(packets))
+            except OSError:
+                return
+
+    def tick(self, connection):
+        while not self.closed.wait(self.tick_seconds) and connection.open:
+            self.send_snaps(connection, sorted(connection.subscribed))
+
+    def close(self):
+        self.closed.set()
+        super(TickingHsmServer, self).close()
+
+
+class HsiServer(StandInServer):
+    """Acknowledges the connection request of the order feed socket."""
+
+    def handle(self, connection, payload):
+        connection.requests.append(payload)
+        if b"cn" in payload.lower():
+            connection.send(json.dumps({"type": "cn", "stat": "Ok"}).encode(), 1)
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def client_threads():
+    return [thread for thread in threading.enumerate() if not thread.name.startswith("stand-in")]
+
+
+class RecordingSocket(object):
+    """Stands in for a connected HSWebSocket, keeping the requests sent."""
+
+    def __init__(self):
+        self.requests = []
+
+    def hs_send(self, request):
+        self.requests.append(request)
+
+    def sent(self, request_type):
+        return [request for request in self.requests if request["type"] == request_type]
+
+
+def connected_websocket():
+    websocket = NeoWebSocket("sid", "token", "server", None)
+    websocket.hsWebsocket = RecordingSocket()
+    websocket.is_hsw_open = 1
+    websocket.errors = []
+    websocket.on_error = websocket.errors.append
+    return websocket
+
+
+def acknowledge_unsubscriptions(websocket):
+    while websocket.un_sub_pending:
+        websocket.handle_hsm_message('[{"type": "unsub"}]')
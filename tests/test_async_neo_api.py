@@ -0,0 +1,125 @@
+"""AsyncNeoAPI against a local HTTP server that answers every request after a fixed delay."""
+import asyncio
+import http.server
+import json
+import threading
+import time
+import urllib.parse
+
+import pytest
+
+from neo_api_client import NeoAPI
+from neo_api_client.async_neo_api import AsyncNeoAPI
+
+# Seconds every stub response takes
+DELAY = 0.2
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    """Answers positions, limits, holdings and quotes, recording the peak number of requests in flight."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def respond(self):
+        server = self.server
+        with server.lock:
+            server.inflight += 1
+            server.peak = max(server.peak, server.inflight)
+            server.paths.append(self.path)
+            server.connections.add(self.client_address)
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                self.rfile.read(length)
+            time.sleep(DELAY)
+            path = urllib.parse.urlsplit(self.path).path
+            if "quotes" in path:
+                segment, token = urllib.parse.unquote(path.split("/")[-2]).split("|")
+                body = [{"exchange": segment, "exchange_token": token, "ltp": "100.00"}]
+            else:
+                body = {"stat": "Ok", "stCode": 200, "data": [], "path": path}
+            payload = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        finally:
+            with server.lock:
+                server.inflight -= 1
+
+    do_GET = do_POST = respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.lock = threading.Lock()
+    server.inflight = server.peak = 0
+    server.paths = []
+    server.connections = set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(server):
+    neo_api = NeoAPI(environment="prod", access_token="token")
+    configuration = neo_api.configuration
+    configuration.base_url = "http://127.0.0.1:%d/" % server.server_address[1]
+    configuration.edit_token = "edit-token"
+    configuration.edit_sid = "edit-sid"
+    configuration.serverId = "server"
+    configuration.rate_limit_enabled = False
+    neo_api.quotes_engine.ttl = 0
+    client = AsyncNeoAPI(neo_api=neo_api)
+    yield client
+    asyncio.run(client.close())
+
+
+def test_gather_runs_calls_concurrently(server, client):
+    async def calls():
+        return await asyncio.gather(
+            client.quotes([{"instrument_token": "11536", "exchange_segment": "nse_cm"}]),
+            client.positions(), client.limits(), client.holdings())
+
+    start = time.perf_counter()
+    quotes, positions, limits, holdings = asyncio.run(calls())
+    elapsed = time.perf_counter() - start
+
+    assert quotes == [{"exchange": "nse_cm", "exchange_token": "11536", "ltp": "100.00"}]
+    for response in (positions, limits, holdings):
+        assert response["stat"] == "Ok"
+    assert server.peak == 4
+    # Four sequential calls take 4 * DELAY
+    assert elapsed < 3 * DELAY
+
+
+def test_many_calls_share_the_pool(server, client):
+    calls = 3 * client.configuration.pool_maxsize
+
+    async def positions():
+        return await asyncio.gather(*(client.positions() for _ in range(calls)))
+
+    responses = asyncio.run(positions())
+
+    assert [response["stat"] for response in responses] == ["Ok"] * calls
+    assert len(server.paths) == calls
+    # The executor is sized to the pool: no more requests in flight, nor connections, than pooled connections
+    assert server.peak <= client.configuration.pool_maxsize
+    assert len(server.connections) <= client.configuration.pool_maxsize
+
+
+def test_validation_error_does_not_fail_the_gather(server, client):
+    async def calls():
+        return await asyncio.gather(client.quotes([]), client.positions())
+
+    quotes, positions = asyncio.run(calls())
+
+    assert quotes == {"error": [{"message": "Validation Errors! instrument_tokens are missing"}]}
+    assert positions["stat"] == "Ok"
@@ -0,0 +1,116 @@
+"""BarSeries and BarEngine: late and out-of-order ticks revising closed bars, dropped ticks, quiet bars closed."""
+import pytest
+
+from neo_api_client.bars import BarEngine, BarSeries, feed_time
+
+
+def test_out_of_order_ticks_in_the_open_bar_keep_its_close():
+    bars = BarSeries("11536", "1m")
+    bars.update(0, 100.0, 0)
+    bars.update(30, 101.0, 5)
+    bars.update(20, 99.0, 3)
+
+    assert bars.current() == {"start": 0, "end": 30, "open": 100.0, "high": 101.0, "low": 99.0, "close": 101.0,
+                              "volume": 8, "ticks": 3}
+    assert bars.late == 0 and len(bars) == 0
+
+
+def test_late_ticks_revise_the_closed_bar_of_their_interval():
+    bars = BarSeries("11536", "1m")
+    revised = []
+    bars.revision_listeners.append(lambda series, bar: revised.append(bar))
+    for ltt, price in ((0, 100.0), (10, 101.0), (60, 102.0), (70, 103.0), (125, 104.0)):
+        bars.update(ltt, price, 1)
+    assert bars.window()["close"].tolist() == [101.0, 103.0]
+
+    bars.update(50, 105.0, 4)
+    bars.update(61, 90.0, 2)
+    bars.update(65, 102.5, 1)
+
+    window = bars.window()
+    assert window["high"].tolist() == [105.0, 103.0] and window["low"].tolist() == [100.0, 90.0]
+    assert window["close"].tolist() == [101.0, 103.0] and window["end"].tolist() == [10, 70]
+    assert window["volume"].tolist() == [6, 5] and window["ticks"].tolist() == [3, 4]
+    assert bars.late == 3 and bars.dropped == 0
+    assert revised[0] == {"start": 0, "end": 10, "open": 100.0, "high": 105.0, "low": 100.0, "close": 101.0,
+                          "volume": 6, "ticks": 3}
+    assert [bar["start"] for bar in revised] == [0, 60, 60]
+    assert bars.current()["ticks"] == 1
+
+
+def test_late_ticks_without_a_bar_to_revise_are_dropped():
+    bars = BarSeries("11536", "1m", capacity=2)
+    for ltt in (0, 60, 240, 300):
+        bars.update(ltt, 100.0, 1)
+    assert bars.window()["start"].tolist() == [60, 240]
+
+    # No tick in 120-179, and the bar of 0-59 has left the ring
+    bars.update(130, 200.0, 1)
+    bars.update(5, 200.0, 1)
+    bars.update(61, 200.0, 1)
+
+    assert bars.late == 3 and bars.dropped == 2
+    assert bars.window()["high"].tolist() == [200.0, 100.0] and bars.window()["ticks"].tolist() == [2, 1]
+
+
+def scrip(token, ltt, ltp, volume, segment="nse_cm"):
+    return {"name": "sf", "tk": token, "e": segment, "ltt": "01/01/2024 09:%s" % ltt, "ltp": ltp, "v": volume}
+
+
+def test_advance_closes_the_bars_of_quiet_tokens():
+    engine = BarEngine(specs=("1m", "10t"))
+    closed = []
+    engine.add_listener(lambda series, bar: closed.append((series.token, series.spec, bar["start"], bar["volume"])))
+    engine.on_ticks([scrip("1", "15:00", "10.0", "100"), scrip("2", "15:10", "20.0", "50")])
+    engine.on_ticks([scrip("1", "15:20", "10.5", "130"), {"name": "dp", "tk": "1", "e": "nse_cm", "bp": "1.0"}])
+    engine.on_ticks([scrip("2", "16:05", "20.5", "80")])
+    minute = feed_time("01/01/2024 09:15:00")
+
+    # Token 2's tick closed its own bar only
+    assert closed == [("2", "1m", minute, 0)]
+    assert engine.current("1", "1m")["volume"] == 30 and engine.current("1", "1m")["close"] == 10.5
+
+    engine.advance()
+    assert closed[1:] == [("1", "1m", minute, 30)]
+    assert engine.current("1", "1m") is None and engine.current("1", "10t")["ticks"] == 2
+    assert engine.current("2", "1m")["start"] == minute + 60
+
+    engine.advance(minute + 119)
+    assert len(closed) == 2
+    engine.advance(minute + 120)
+    assert closed[2:] == [("2", "1m", minute + 60, 30)]
+    assert engine.bars("1", "1m")["close"].tolist() == [10.5] and len(engine.bars("3", "1m")["close"]) == 0
+
+    # A late tick of a bar closed by advance revises it, even with no bar open
+    engine.on_ticks([scrip("1", "15:50", "11.0", "140"), scrip("1", "17:10", "10.8", "150")])
+    bars = engine.get("1", "1m")
+    assert bars.window()["start"].tolist() == [minute] and bars.window()["high"].tolist() == [11.0]
+    assert bars.window()["volume"].tolist() == [40] and bars.late == 1 and bars.dropped == 0
+    assert bars.current()["start"] == minute + 120
+
+
+def test_ticks_of_intervals_before_the_last_closed_bar_are_not_appended():
+    bars = BarSeries("11536", "1m")
+    bars.update(60, 100.0, 1)
+    bars.update(70, 101.0, 1)
+    bars.close_until(125)
+    bars.update(119, 102.0, 1)
+    bars.update(5, 99.0, 1)
+    bars.update(130, 103.0, 1)
+
+    assert bars.window()["start"].tolist() == [60] and bars.window()["high"].tolist() == [102.0]
+    assert bars.late == 2 and bars.dropped == 1 and bars.current()["start"] == 120
+
+
+def test_the_same_token_in_two_segments_has_two_series():
+    engine = BarEngine(specs=("1m",))
+    engine.on_ticks([scrip("500", "15:00", "10.0", "100"), scrip("500", "15:05", "20.0", "7", "bse_cm"),
+                     scrip("500", "15:10", "11.0", "130"), scrip("500", "15:20", "21.0", "9", "bse_cm")])
+
+    nse, bse = engine.current("500", "1m", "nse_cm"), engine.current("500", "1m", "bse_cm")
+    assert (nse["open"], nse["close"], nse["volume"]) == (10.0, 11.0, 30)
+    assert (bse["open"], bse["close"], bse["volume"]) == (20.0, 21.0, 2)
+    assert engine.get("500", "1m", "bse_cm").exchange == "bse_cm" and engine.get("500", "1m", "nse_fo") is None
+    assert engine.tokens() == ["500"] and engine.keys() == [("nse_cm", "500"), ("bse_cm", "500")]
+    with pytest.raises(ValueError, match="Token 500 is in several exchange segments"):
+        engine.bars("500", "1m")
@@ -0,0 +1,150 @@
+"""NeoAPI.place_orders and cancel_orders against a stub transport: upfront validation, input order, partial failures."""
+import json
+import threading
+
+import pytest
+
+from neo_api_client import NeoAPI
+from neo_api_client.exceptions import ApiException
+
+
+class StubResponse(object):
+    def __init__(self, body):
+        self.status_code = 200
+        self.content = json.dumps(body).encode()
+        self.headers = {}
+
+
+class StubTransport(object):
+    """
+    Stands in for RESTClientObject. Orders and cancellations, keyed by trading symbol or order id, are answered in
+    `answer_order` when it is given, or fail with the exception given for them; the order book is `order_book`.
+    """
+
+    def __init__(self, answer_order=None, failures=None, order_book=None):
+        self.answer_order = list(answer_order or [])
+        self.failures = failures or {}
+        self.order_book = order_book or []
+        self.lock = threading.Condition()
+        self.requests = []
+        self.answered = []
+        self.inflight = self.peak = 0
+
+    def request(self, method, url, query_params=None, headers=None, body=None, endpoint=None):
+        key = (body or {}).get("ts") or (body or {}).get("on")
+        with self.lock:
+            self.requests.append((endpoint, key))
+            self.inflight += 1
+            self.peak = max(self.peak, self.inflight)
+            while key in self.answer_order and self.answer_order[0] != key:
+                if not self.lock.wait(5):
+                    break
+        try:
+            if key in self.failures:
+                raise self.failures[key]
+            if endpoint == "order_book":
+                return StubResponse({"stat": "Ok", "stCode": 200, "data": self.order_book})
+            with self.lock:
+                self.answered.append(key)
+                if key in self.answer_order:
+                    self.answer_order.remove(key)
+                    self.lock.notify_all()
+            if endpoint == "place_order":
+                return StubResponse({"stat": "Ok", "stCode": 200, "nOrdNo": "order-" + key})
+            return StubResponse({"stat": "Ok", "stCode": 200, "result": key})
+        finally:
+            with self.lock:
+                self.inflight -= 1
+
+    def sent(self, endpoint):
+        return [key for sent_endpoint, key in self.requests if sent_endpoint == endpoint]
+
+
+def client(transport):
+    neo_api = NeoAPI(environment="prod", access_token="token")
+    configuration = neo_api.configuration
+    configuration.base_url = "https://localhost/"
+    configuration.edit_token = "edit-token"
+    configuration.edit_sid = "edit-sid"
+    configuration.serverId = "server"
+    configuration.rate_limit_enabled = False
+    neo_api.api_client.rest_client = transport
+    return neo_api
+
+
+def leg(trading_symbol, **spec):
+    order = {"exchange_segment": "nse_fo", "product": "NRML", "price": "0", "order_type": "MKT", "quantity": "50",
+             "validity": "DAY", "trading_symbol": trading_symbol, "transaction_type": "B"}
+    order.update(spec)
+    return order
+
+
+SYMBOLS = ["NIFTY%d" % index for index in range(6)]
+
+
+def test_place_orders_rejects_the_basket_when_any_leg_is_invalid():
+    transport = StubTransport()
+    neo_api = client(transport)
+
+    result = neo_api.place_orders([leg(SYMBOLS[0]), leg(SYMBOLS[1], order_type="XYZ"), leg(SYMBOLS[2]),
+                                   leg(SYMBOLS[3], limit="1")])
+
+    assert [error["leg"] for error in result["Error"]] == [1, 3]
+    assert str(result["Error"][0]["Error"]).startswith("Invalid order type")
+    assert "Unknown order parameters: limit" in str(result["Error"][1]["Error"])
+    assert transport.requests == []
+    assert neo_api.place_orders([]) == {"Error": "order_specs must contain at least one order"}
+
+
+def test_place_orders_returns_the_legs_in_input_order():
+    # The first legs answer last, once every leg is in flight
+    transport = StubTransport(answer_order=SYMBOLS[::-1])
+
+    result = client(transport).place_orders([leg(symbol) for symbol in SYMBOLS], max_workers=len(SYMBOLS))
+
+    assert transport.answered == SYMBOLS[::-1] and transport.peak == len(SYMBOLS)
+    assert [entry["leg"] for entry in result["data"]] == list(range(len(SYMBOLS)))
+    assert [entry["response"]["nOrdNo"] for entry in result["data"]] == ["order-" + symbol for symbol in SYMBOLS]
+    assert all(entry["elapsed_ms"] > 0 for entry in result["data"])
+
+
+def test_place_orders_reports_failed_legs_and_sends_the_others():
+    rejected = ApiException(status=400, reason="Bad Request")
+    transport = StubTransport(failures={SYMBOLS[1]: rejected, SYMBOLS[4]: ConnectionError("reset")})
+
+    result = client(transport).place_orders([leg(symbol) for symbol in SYMBOLS], max_workers=2)
+
+    legs = result["data"]
+    assert sorted(transport.sent("place_order")) == SYMBOLS
+    assert legs[1]["response"] == {"error": rejected}
+    assert isinstance(legs[4]["Error"], ConnectionError) and "response" not in legs[4]
+    assert [legs[index]["response"]["nOrdNo"] for index in (0, 2, 3, 5)] == \
+           ["order-" + SYMBOLS[index] for index in (0, 2, 3, 5)]
+
+
+def test_cancel_orders_validates_every_id_before_sending():
+    transport = StubTransport()
+
+    result = client(transport).cancel_orders(["1", " ", "3", 4])
+
+    assert [error["leg"] for error in result["Error"]] == [1, 3]
+    assert transport.requests == []
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_cancel_orders_verifies_against_one_order_book(max_workers):
+    order_book = [{"nOrdNo": "2", "ordSt": "complete", "rejRsn": ""},
+                  {"nOrdNo": "3", "ordSt": "open", "rejRsn": ""},
+                  {"nOrdNo": "4", "ordSt": "rejected", "rejRsn": "RMS"}]
+    transport = StubTransport(failures={"5": ConnectionError("reset")}, order_book=order_book)
+
+    result = client(transport).cancel_orders(["1", "2", "3", "4", "5"], isVerify=True, max_workers=max_workers)
+
+    legs = result["data"]
+    assert transport.sent("order_book") == [None]
+    assert sorted(transport.sent("cancel_order")) == ["1", "3", "5"]
+    assert [entry["leg"] for entry in legs] == [0, 1, 2, 3, 4]
+    assert legs[0]["response"]["result"] == "1" and legs[2]["response"]["result"] == "3"
+    assert legs[1]["response"] == {"Error": "The Given Order Status is Traded", "Reason": ""}
+    assert legs[3]["response"] == {"Error": "The Given Order Status is rejected", "Reason": "RMS"}
+    assert isinstance(legs[4]["Error"], ConnectionError)
@@ -0,0 +1,76 @@
+"""ChannelAllocator.plan_rebalance moves and swaps, and NeoWebSocket.rebalance_channels applying them."""
+from neo_api_client.channel_allocator import ChannelAllocator
+from neo_api_client.subscription_registry import SubscriptionRegistry
+
+from tests import data
+from tests.stand_in import connected_websocket
+
+
+def registry(allocator, rates, channels=(2, 3), channel_capacity=3):
+    """Registry of one "mws" subscription per rate, tokens alternating between `channels` (no rates are known yet)."""
+    subscriptions = SubscriptionRegistry(channels=channels, channel_capacity=channel_capacity, allocator=allocator)
+    tokens = [str(token["instrument_token"]) for token in data.instrument_tokens(len(rates))]
+    keys = [subscriptions.add("nse_fo", token, "mws") for token in tokens]
+    subscriptions.allocate(keys)
+    allocator.rates = dict(zip(tokens, rates))
+    # As the next rate update would
+    allocator.channel_rates = channel_loads(allocator, subscriptions)
+    return subscriptions, keys
+
+
+def channel_loads(allocator, subscriptions):
+    return {channel: sum(allocator.rates[key[1]] for key in entries)
+            for channel, entries in subscriptions.channel_entries.items()}
+
+
+def test_plan_moves_a_token_to_a_channel_with_room():
+    allocator = ChannelAllocator()
+    subscriptions, keys = registry(allocator, [8.0, 1.0, 1.0, 1.0, 2.0], channel_capacity=4)
+    assert [subscriptions.channel_of(key) for key in keys] == [2, 3, 2, 3, 2]
+
+    moves = allocator.plan_rebalance(subscriptions)
+
+    # The token closest to half the gap each time: 2.0 of a gap of 9, then 1.0 of a gap of 5
+    assert moves == [(keys[4], 2, 3), (keys[2], 2, 3)]
+    for key, _, target in moves:
+        subscriptions.move(key, target)
+    assert channel_loads(allocator, subscriptions) == {2: 8.0, 3: 5.0}
+    # 8 against 5 is still more than 25% of the mean apart, but moving the 8.0 would only widen the gap
+    assert allocator.plan_rebalance(subscriptions) == []
+
+
+def test_plan_swaps_tokens_when_the_target_channel_is_full():
+    allocator = ChannelAllocator()
+    subscriptions, keys = registry(allocator, [6.0, 1.0, 3.0, 2.0, 1.0, 2.0])
+
+    moves = allocator.plan_rebalance(subscriptions)
+
+    assert sorted(moves) == sorted([(keys[2], 2, 3), (keys[1], 3, 2)])
+    for key, _, target in moves:
+        subscriptions.move(key, target)
+    assert channel_loads(allocator, subscriptions) == {2: 8.0, 3: 7.0}
+    assert all(len(entries) == 3 for entries in subscriptions.channel_entries.values())
+    assert allocator.plan_rebalance(subscriptions) == []
+
+
+def test_rebalancing_full_channels_never_puts_one_over_capacity():
+    websocket = connected_websocket()
+    allocator = websocket.channel_allocator
+    websocket.subscriptions, keys = registry(allocator, [6.0, 1.0, 3.0, 2.0, 1.0, 2.0])
+    held = {channel: len(entries) for channel, entries in websocket.subscriptions.channel_entries.items()}
+    socket = websocket.hsWebsocket
+
+    moves = websocket.rebalance_channels()
+
+    assert len(moves) == 2
+    requests = socket.requests
+    assert requests[0] == {"type": "cp", "channelnums": [2, 3]} and requests[-1] == {"type": "cr", "channelnums": [2, 3]}
+    # Replay the requests against the channel capacity of the server
+    for request in requests[1:-1]:
+        held[request["channelnum"]] += len(request["scrips"].split("&")) * (1 if request["type"] == "mws" else -1)
+        assert 0 <= held[request["channelnum"]] <= 3
+    assert [request["type"] for request in requests[1:-1]] == ["mwu", "mwu", "mws", "mws"]
+    assert held == {2: 3, 3: 3} and len(websocket.un_sub_pending) == 2
+    assert {key: websocket.subscriptions.channel_of(key) for key, _, _ in moves} == \
+           {key: target for key, _, target in moves}
+    assert allocator.metrics(websocket.subscriptions) == {2: {"tokens": 3, "rate": 8.0}, 3: {"tokens": 3, "rate": 7.0}}
@@ -0,0 +1,69 @@
+"""JSON codec: the "auto" backend falling back when orjson or ujson is missing, and every backend decoding alike."""
+import importlib
+import sys
+
+import pytest
+
+from neo_api_client import codec
+
+AVAILABLE = [name for name, (_, module) in codec.BACKENDS.items() if module is not None]
+
+
+@pytest.fixture
+def without(monkeypatch):
+    """Reload the codec as if the given modules were not installed; the real codec is restored afterwards."""
+
+    def reload(*modules):
+        for module in modules:
+            monkeypatch.setitem(sys.modules, module, None)
+        return importlib.reload(codec)
+
+    yield reload
+    monkeypatch.undo()
+    importlib.reload(codec)
+
+
+def test_auto_falls_back_to_the_standard_library(without):
+    without("orjson", "ujson")
+
+    assert codec.backend.name == "json" and [codec.orjson, codec.ujson] == [None, None]
+    assert codec.loads(codec.dumpb({"tk": "11536", "ltp": 1.5})) == {"tk": "11536", "ltp": 1.5}
+    assert codec.dumps({"a": [1, None]}) == '{"a":[1,null]}'
+    for name in ("orjson", "ujson"):
+        with pytest.raises(ImportError, match="The %s JSON codec is not installed" % name):
+            codec.get_backend(name)
+
+
+def test_auto_prefers_ujson_without_orjson(without):
+    pytest.importorskip("ujson")
+    without("orjson")
+
+    assert codec.backend.name == "ujson"
+
+
+def test_auto_prefers_orjson_without_ujson(without):
+    pytest.importorskip("orjson")
+    without("ujson")
+
+    assert codec.backend.name == "orjson" and codec.get_backend("json").name == "json"
+
+
+def test_an_unknown_codec_is_rejected():
+    with pytest.raises(ValueError, match="Invalid JSON codec 'simdjson'"):
+        codec.get_backend("simdjson")
+
+
+@pytest.mark.parametrize("name", AVAILABLE)
+def test_every_backend_decodes_the_same(name):
+    backend = codec.get_backend(name)
+    value = {"stat": "Ok", "data": [{"nOrdNo": "2401", "qty": 50, "prc": 101.25, "rejRsn": None}], "url": "a/b",
+             "name": "\u20b9"}
+
+    text = backend.dumps(value)
+    assert isinstance(text, str) and "a/b" in text and backend.loads(text) == value
+    for data in (backend.dumpb(value), bytearray(backend.dumpb(value)), memoryview(backend.dumpb(value))):
+        assert backend.loads(data) == value
+    # Integers beyond 64 bits are encoded by the standard library when the backend refuses them
+    assert backend.dumps({"big": 2 ** 70}) == '{"big":%d}' % 2 ** 70
+    with pytest.raises(codec.JSONDecodeError):
+        backend.loads(b'{"stat": ')
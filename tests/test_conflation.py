@@ -0,0 +1,52 @@
+"""NeoAPI conflation forgets the snapshots of unsubscribed tokens."""
+from neo_api_client import NeoAPI
+from neo_api_client.NeoWebSocket import NeoWebSocket
+
+from tests.stand_in import RecordingSocket, acknowledge_unsubscriptions
+
+
+def scrip_tick(token, ltp):
+    return {"tk": token, "e": "nse_cm", "name": "sf", "ltp": ltp}
+
+
+def conflating_client():
+    client = NeoAPI(environment="prod", access_token="token")
+    client.configuration.edit_token = "edit-token"
+    client.configuration.edit_sid = "edit-sid"
+    client.configuration.serverId = "server"
+    websocket = client.NeoWebSocket = NeoWebSocket("edit-sid", "edit-token", "server", None)
+    client.set_neowebsocket_callbacks()
+    websocket.hsWebsocket = RecordingSocket()
+    websocket.is_hsw_open = 1
+    client.messages = []
+    client.on_message = client.messages.append
+    client.enable_conflation(interval=0)
+    return client, websocket
+
+
+def test_unsubscribed_token_is_no_longer_delivered():
+    client, websocket = conflating_client()
+    tokens = [{"instrument_token": token, "exchange_segment": "nse_cm"} for token in ("11536", "1594")]
+    websocket.get_live_feed(tokens, False, False)
+    websocket.on_message({"type": "stock_feed", "data": [scrip_tick("11536", "100.5"), scrip_tick("1594", "1500")]})
+
+    client.un_subscribe(instrument_tokens=tokens[:1])
+    acknowledge_unsubscriptions(websocket)
+    client.conflater.drain()
+
+    assert set(client.conflater.snapshots) == {("nse_cm", "1594")}
+    assert [tick["tk"] for message in client.messages if isinstance(message, dict)
+            for tick in message["data"]] == ["1594"]
+
+
+def test_token_still_subscribed_as_depth_keeps_its_snapshot():
+    client, websocket = conflating_client()
+    tokens = [{"instrument_token": "11536", "exchange_segment": "nse_cm"}]
+    websocket.get_live_feed(tokens, False, False)
+    websocket.get_live_feed(tokens, False, True)
+    websocket.on_message({"type": "stock_feed", "data": [scrip_tick("11536", "100.5")]})
+
+    client.un_subscribe(instrument_tokens=tokens)
+    acknowledge_unsubscriptions(websocket)
+
+    assert set(client.conflater.snapshots) == {("nse_cm", "11536")}
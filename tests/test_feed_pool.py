@@ -0,0 +1,122 @@
+"""FeedPool sharding and failover, against recording sessions and a local HSM stand-in holding 3,000 tokens each."""
+import pytest
+
+import neo_api_client
+from neo_api_client import settings
+from neo_api_client.NeoWebSocket import NeoWebSocket
+from neo_api_client.feed_pool import FeedPool
+from neo_api_client.settings import ReqTypeValues
+
+from tests import data
+from tests.stand_in import HsmServer, wait_for
+
+
+class RecordingSocket(object):
+    """Stands in for a connected HSWebSocket, keeping the requests sent."""
+
+    def __init__(self):
+        self.requests = []
+
+    def hs_send(self, request):
+        self.requests.append(request)
+
+    def close(self):
+        pass
+
+    def scrips(self, request_type):
+        return {scrip for request in self.requests if request["type"] == request_type
+                for scrip in request["scrips"].split("&")}
+
+
+def connected_session():
+    session = NeoWebSocket("sid", "token", "server", None)
+    session.hsWebsocket = RecordingSocket()
+    session.is_hsw_open = 1
+    return session
+
+
+def scrips(tokens):
+    return {"nse_fo|%s" % token["instrument_token"] for token in tokens}
+
+
+def test_feed_pool_moves_the_tokens_of_a_dropped_session():
+    pool = FeedPool("sid", "token", "server", max_tokens=100, session_factory=connected_session)
+    pool.on_error = lambda error: None
+    tokens = data.instrument_tokens(250)
+    pool.subscribe(tokens)
+    first, second, third = pool.sessions
+    lost = first.hsWebsocket.scrips(ReqTypeValues["SCRIP_SUBS"])
+
+    first.on_error(ConnectionError("dropped"))
+
+    # The 50 free slots of the third session are filled first, then a new session takes the rest
+    assert pool.sessions[:2] == [second, third] and len(pool.sessions) == 3 and pool.failovers == 1
+    subscribed = set()
+    for session in pool.sessions:
+        subscribed |= session.hsWebsocket.scrips(ReqTypeValues["SCRIP_SUBS"])
+        assert len(session.subscriptions) <= 100
+    assert lost <= subscribed
+    assert subscribed == scrips(tokens)
+    assert len(pool.key_sessions) == len(tokens) and first not in pool.key_sessions.values()
+
+
+def test_feed_pool_passes_on_errors_that_are_not_connection_failures():
+    pool = FeedPool("sid", "token", "server", max_tokens=100, session_factory=connected_session)
+    errors = []
+    pool.on_error = errors.append
+    pool.subscribe(data.instrument_tokens(150))
+    sessions = list(pool.sessions)
+
+    sessions[0].get_live_feed([{"instrument_token": "1"}], False, False)
+    sessions[1].on_error(Exception("Subscription limit of 3000 tokens reached, 1 tokens not subscribed"))
+
+    assert [str(error) for error in errors] == [
+        "Invalid Inputs", "Subscription limit of 3000 tokens reached, 1 tokens not subscribed"]
+    assert pool.sessions == sessions and pool.failovers == 0
+    assert all(session.on_error is not None for session in sessions)
+
+    sessions[0].on_close()
+    assert sessions[0] not in pool.sessions and pool.sessions[0] is sessions[1] and pool.failovers == 1
+
+
+@pytest.fixture
+def hsm(monkeypatch):
+    monkeypatch.setattr(settings, "HSM_RECONNECT_DELAY", 0.01)
+    hsm = HsmServer(limit=3000)
+    monkeypatch.setattr(neo_api_client, "WEBSOCKET_URL", hsm.url)
+    yield hsm
+    hsm.close()
+
+
+def test_feed_pool_keeps_every_connection_within_the_server_limit(hsm):
+    pool = FeedPool("sid", "token", "server")
+    errors = []
+    pool.on_error = errors.append
+    tokens = data.instrument_tokens(7000)
+    sessions = []
+    pool.session_factory = lambda: sessions.append(NeoWebSocket("sid", "token", "server", None)) or sessions[-1]
+    try:
+        pool.subscribe(tokens)
+
+        def subscribed():
+            return set().union(*hsm.subscribed())
+
+        assert wait_for(lambda: subscribed() == {"sf|" + scrip for scrip in scrips(tokens)})
+        assert sorted(len(connection) for connection in hsm.subscribed()) == [1000, 3000, 3000]
+        assert not hsm.rejected and not errors
+
+        # A dropped connection moves its 3,000 tokens: 2,000 to the third session, 1,000 to a new one
+        full = [connection for connection in hsm.connections if len(connection.subscribed) == 3000][0]
+        full.drop()
+        assert wait_for(lambda: pool.failovers == 1 and len(hsm.subscribed()) == 3
+                        and subscribed() == {"sf|" + scrip for scrip in scrips(tokens)})
+        assert sorted(len(connection) for connection in hsm.subscribed()) == [1000, 3000, 3000]
+        assert not hsm.rejected
+        assert pool.metrics()["tokens_per_session"] == [3000, 3000, 1000]
+    finally:
+        pool.close()
+        for session in sessions:
+            if session.hsWebsocket:
+                session.hsWebsocket.close()
+            if session.hsw_thread is not None:
+                session.hsw_thread.join(5)
@@ -0,0 +1,101 @@
+"""FeedRecorder, FeedReader and FeedReplayServer: a live session recorded and played back to the same ticks."""
+import threading
+
+import pytest
+
+from neo_api_client.feed_recorder import (FILE_MAGIC, OPCODE_BINARY, OPCODE_TEXT, RECORD_HEADER, FeedReader,
+                                          FeedRecorder, FeedReplayServer)
+from neo_api_client.HSWebSocketLib import HSWebSocket
+
+from tests import data
+from tests.stand_in import StandInServer, wait_for
+
+
+def session(url, recorder=None):
+    """Connect an HSWebSocket to `url`; returns it and the list its messages are appended to."""
+    websocket = HSWebSocket()
+    websocket.recorder = recorder
+    messages = []
+    threading.Thread(target=websocket.open_connection, daemon=True, kwargs={
+        "url": url, "token": "token", "sid": "sid", "on_open": lambda: None,
+        "on_message": lambda message: messages.append(message if isinstance(message, str) else
+                                                      [dict(tick) for tick in message]),
+        "on_error": print, "on_close": lambda: None}).start()
+    return websocket, messages
+
+
+def test_a_recorded_session_replays_to_the_same_messages(tmp_path):
+    path = str(tmp_path / "feed.rec")
+    frames = [data.snap_frame(topics=20)] + data.update_frames(count=200, topics=20)
+    frames.insert(100, '[{"type": "cn", "stat": "Ok"}]')
+    server, recorder = StandInServer(), FeedRecorder(path)
+    websocket, recorded = session(server.url, recorder)
+    try:
+        assert wait_for(lambda: server.connections)
+        for frame in frames:
+            if isinstance(frame, str):
+                server.connections[0].send(frame.encode(), OPCODE_TEXT)
+            else:
+                server.connections[0].send(frame)
+        assert wait_for(lambda: len(recorded) == len(frames))
+    finally:
+        websocket.close()
+        server.close()
+        recorder.close()
+
+    assert recorder.frames == len(frames) and FeedReader(path).frames() == frames
+    times = [received_at for received_at, _, _ in FeedReader(path)]
+    assert times == sorted(times)
+    assert recorded[100] == frames[100] and len(recorded[0]) == 20
+
+    replay = FeedReplayServer(path, speed=0, wait_for_request=False).start()
+    websocket, replayed = session(replay.url)
+    try:
+        assert replay.wait(10) and wait_for(lambda: len(replayed) == len(frames))
+    finally:
+        websocket.close()
+        replay.stop()
+    assert replayed == recorded
+    assert replay.metrics()["sent"] == len(frames)
+
+
+def test_replay_keeps_the_recorded_pace():
+    frames = [data.snap_frame()] + data.update_frames(count=5)
+    records = [(index * 100000000, OPCODE_BINARY, frame) for index, frame in enumerate(frames)]
+    replay = FeedReplayServer(records=records, speed=2, wait_for_request=False).start()
+    websocket, replayed = session(replay.url)
+    try:
+        assert replay.wait(10) and wait_for(lambda: len(replayed) == len(records))
+    finally:
+        websocket.close()
+        replay.stop()
+    # 0.5 s of recording at twice the speed
+    assert 0.25 <= replay.elapsed < 1.0
+
+
+def test_a_file_cut_short_reads_up_to_its_last_complete_record(tmp_path):
+    path = str(tmp_path / "feed.rec")
+    recorder = FeedRecorder(path)
+    recorder.record(b"\x00\x05\x02abc", received_at=1)
+    recorder.record("text", received_at=2)
+    recorder.close()
+    recorder.record(b"after close")
+    # Appending to the file does not write the header again
+    recorder = FeedRecorder(path)
+    recorder.record(b"third", received_at=3)
+    recorder.close()
+    with open(path, "rb") as f:
+        content = f.read()
+    assert content.count(FILE_MAGIC) == 1
+
+    records = [(1, OPCODE_BINARY, b"\x00\x05\x02abc"), (2, OPCODE_TEXT, b"text"), (3, OPCODE_BINARY, b"third")]
+    assert list(FeedReader(path)) == records
+    for size in (len(content) - 1, len(content) - len(b"third"), len(content) - len(b"third") - RECORD_HEADER.size):
+        with open(path, "wb") as f:
+            f.write(content[:size])
+        assert list(FeedReader(path)) == records[:2]
+
+    with open(path, "wb") as f:
+        f.write(b"NOTAFEED")
+    with pytest.raises(ValueError):
+        list(FeedReader(path))
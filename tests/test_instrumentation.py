@@ -0,0 +1,104 @@
+"""Latency histograms: bucket bounds, percentiles, per-thread shards and the Prometheus export."""
+import threading
+
+import pytest
+
+from neo_api_client.instrumentation import BUCKETS, Histogram, Instrumentation, bucket_bound
+
+
+def test_percentiles_are_the_upper_bounds_of_their_buckets():
+    metrics = Instrumentation(enabled=True)
+    for ns in [1000] * 90 + [1000000] * 9 + [5 * 10 ** 9]:
+        metrics.observe("api_call", "quotes", ns)
+
+    report = metrics.to_json()["api_call"]["quotes"]
+
+    # 1,000 ns is in [512, 1024), 1 ms in [2 ** 19, 2 ** 20) ns
+    assert report["p50"] == report["p90"] == 1.024e-6
+    assert report["p99"] == pytest.approx(2 ** 20 / 1e9)
+    assert report["count"] == 100 and report["max"] == 5.0
+    assert report["mean"] == pytest.approx((90 * 1000 + 9 * 10 ** 6 + 5 * 10 ** 9) / 100 / 1e9)
+
+
+def test_bucket_bounds_are_inclusive():
+    metrics = Instrumentation(enabled=True)
+    for label, ns in (("below", 1023), ("at", 1024), ("above", 1025), ("one", 1), ("huge", 2 ** 50)):
+        metrics.observe("hsm_parse", label, ns)
+
+    report = metrics.to_json()["hsm_parse"]
+    assert report["below"]["p50"] == report["at"]["p50"] == bucket_bound(10) == 1.024e-6
+    assert report["above"]["p50"] == bucket_bound(11)
+    assert report["one"]["p99"] == bucket_bound(0)
+    # Past the last bound everything lands in the last bucket, reported as +Inf by Prometheus
+    assert report["huge"]["p50"] == bucket_bound(BUCKETS) and report["huge"]["max"] == 2 ** 50 / 1e9
+    assert metrics.to_json().keys() == {"hsm_parse"}
+
+
+def test_threads_record_into_their_own_shards_without_losing_counts():
+    histogram = Histogram()
+    start = threading.Barrier(4)
+
+    def observe(ns):
+        start.wait()
+        for _ in range(10000):
+            histogram.observe(ns)
+
+    threads = [threading.Thread(target=observe, args=(ns,)) for ns in (1, 100, 10000, 1000000)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    snapshot = histogram.snapshot()
+    assert sum(snapshot[:BUCKETS + 1]) == 40000 and snapshot[BUCKETS + 1] == 10000 * 1010101
+    assert snapshot[BUCKETS + 2] == 1000000
+    assert [snapshot[(ns - 1).bit_length()] for ns in (1, 100, 10000, 1000000)] == [10000] * 4
+
+
+def test_the_shards_of_ended_threads_are_folded():
+    histogram = Histogram()
+    histogram.observe(5)
+    for ns in range(1, 201):
+        # A new pool thread per call, as dispatch and the quotes engine use
+        thread = threading.Thread(target=histogram.observe, args=(ns,))
+        thread.start()
+        thread.join()
+        assert len(histogram.shards) <= 2
+
+    snapshot = histogram.snapshot()
+    assert histogram.shards == [(threading.current_thread(), histogram.local.shard)]
+    assert sum(snapshot[:BUCKETS + 1]) == 201 and snapshot[BUCKETS + 1] == 5 + 200 * 201 // 2
+    assert snapshot[BUCKETS + 2] == 200 and histogram.base[BUCKETS + 2] == 200
+    histogram.observe(300)
+    assert histogram.snapshot()[BUCKETS + 2] == 300
+
+
+def test_prometheus_buckets_are_cumulative():
+    metrics = Instrumentation(enabled=True)
+    for ns in (100, 1000, 1000, 2 ** 50):
+        metrics.observe("rest_request", 'say "hi"', ns)
+
+    lines = metrics.prometheus().splitlines()
+
+    assert lines[0].startswith("# HELP neo_rest_request_seconds HTTP round trip")
+    assert lines[1] == "# TYPE neo_rest_request_seconds histogram"
+    buckets = [int(line.rsplit(" ", 1)[1]) for line in lines if "_bucket" in line]
+    assert len(buckets) == BUCKETS + 1 and buckets == sorted(buckets)
+    assert buckets[6] == 0 and buckets[7] == 1 and buckets[10] == 3 and buckets[BUCKETS - 1] == 3
+    assert lines[-3] == 'neo_rest_request_seconds_bucket{endpoint="say \\"hi\\"",le="+Inf"} 4'
+    assert lines[-1] == 'neo_rest_request_seconds_count{endpoint="say \\"hi\\""} 4'
+
+
+def test_timed_records_only_while_enabled():
+    metrics = Instrumentation(enabled=False)
+
+    @metrics.timed("callback", "sf")
+    def callback(value):
+        return value * 2
+
+    assert callback(1) == 2 and metrics.histograms == {}
+    metrics.enable()
+    assert callback(2) == 4 and callback(3) == 6
+    assert metrics.to_json()["callback"]["sf"]["count"] == 2
+    metrics.reset()
+    assert metrics.to_json() == {}
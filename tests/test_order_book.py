@@ -0,0 +1,86 @@
+"""OrderBook and OrderBooks: depth updates merged in place, cumulative depth, diff listeners, dict and typed ticks."""
+import pytest
+
+from neo_api_client.HSWebSocketLib import HSWrapper
+from neo_api_client.order_book import OrderBook, OrderBooks
+
+from tests import data
+
+
+def snap():
+    tick = {"name": "dp", "tk": "11536", "e": "nse_cm", "mul": "1", "prec": "2"}
+    for level, suffix in enumerate(["", "1", "2", "3", "4"]):
+        tick.update({"bp" + suffix: "%.2f" % (100 - level), "sp" + suffix: "%.2f" % (101 + level),
+                     "bq" + suffix: str(10 * (level + 1)), "bs" + suffix: str(20 * (level + 1)),
+                     "bno%d" % (level + 1): "1", "sno%d" % (level + 1): "2"})
+    return tick
+
+
+def test_updates_change_only_the_fields_they_carry():
+    book = OrderBook("11536", "nse_cm")
+    assert book.apply(snap())
+    depth, updates = book.data, book.updates
+
+    assert book.apply({"name": "dp", "tk": "11536", "bp1": "99.50", "bq1": "5"})
+    assert book.data is depth and book.updates == updates + 1
+    assert book.bids()[:3] == [(100.0, 10, 1), (99.5, 5, 1), (98.0, 30, 1)]
+    assert book.asks()[0] == (101.0, 20, 2)
+    assert not book.apply({"name": "dp", "tk": "11536", "bp1": "99.50", "ltp": "1"})
+    assert book.updates == updates + 1
+
+
+def test_derived_values_follow_the_quantities():
+    book = OrderBook()
+    book.apply(snap())
+    assert (book.best_bid, book.best_ask, book.spread, book.mid) == (100.0, 101.0, 1.0, 100.5)
+    assert book.depth("bid") == 150 and book.depth("ask", 2) == 60
+    assert book.microprice == (100 * 20 + 101 * 10) / 30
+    assert book.imbalance() == (10 - 20) / 30
+
+    book.apply({"bs": "0", "sp": "0", "bq2": "50"})
+    assert book.best_ask is None and book.spread is None and book.microprice is None
+    assert book.depth("bid", 3) == 10 + 20 + 50 and book.depth("ask") == 280
+    assert book.imbalance() == 1.0
+
+
+def test_listeners_receive_the_changed_levels():
+    books, received = OrderBooks(), []
+    books.add_listener(lambda book, changes: received.append((book.token, changes)))
+    books.on_ticks([snap(), {"name": "sf", "tk": "11536", "e": "nse_cm", "ltp": "1"}])
+    assert len(received) == 1 and len(received[0][1]) == 10
+
+    books.on_ticks([{"name": "dp", "tk": "11536", "e": "nse_cm", "bq3": "0", "sno2": "7", "sp4": "110.00"}])
+    assert received[1] == ("11536", [("bid", 3, 97.0, 0, 1), ("ask", 1, 102.0, 40, 7), ("ask", 4, 110.0, 100, 2)])
+    books.on_ticks([{"name": "dp", "tk": "11536", "e": "nse_cm", "bq3": "0"}])
+    assert len(received) == 2
+    assert books.snapshot("11536")["sell"][1] == {"price": 102.0, "quantity": 40, "orders": 7}
+    assert books.book(1) is None and books.tokens() == ["11536"]
+
+
+def test_the_same_token_in_two_segments_has_two_books():
+    books = OrderBooks()
+    books.on_ticks([snap(), dict(snap(), e="bse_cm", bp="90.00")])
+    books.on_ticks([{"name": "dp", "tk": "11536", "e": "bse_cm", "sp": "95.00"}])
+
+    assert books.book("11536", "nse_cm").best_bid == 100.0 and books.book("11536", "nse_cm").best_ask == 101.0
+    assert (books.book("11536", "bse_cm").best_bid, books.book("11536", "bse_cm").best_ask) == (90.0, 95.0)
+    assert books.snapshot("11536", "bse_cm")["sell"][0]["price"] == 95.0 and books.book("11536", "nse_fo") is None
+    assert books.tokens() == ["11536"] and books.keys() == [("nse_cm", "11536"), ("bse_cm", "11536")]
+    with pytest.raises(ValueError, match="Token 11536 is in several exchange segments"):
+        books.snapshot("11536")
+
+
+def test_typed_ticks_build_the_same_books_as_the_dict_feed():
+    kinds = ["dp"] * 10
+    frames = [data.snap_frame(kinds=kinds)] + data.update_frames(count=500, kinds=kinds)
+    books = {}
+    for typed_ticks in (False, True):
+        wrapper, books[typed_ticks] = HSWrapper(typed_ticks=typed_ticks), OrderBooks()
+        for frame in frames:
+            books[typed_ticks].on_ticks(wrapper.parseData(frame))
+
+    assert sorted(books[False].keys()) == sorted(books[True].keys()) and len(books[False].keys()) == 10
+    for segment, token in books[False].keys():
+        dict_book, typed_book = books[False].book(token, segment), books[True].book(token, segment)
+        assert dict_book.data == typed_book.data and dict_book.updates == typed_book.updates > 1
+        assert dict_book.cum_bid == typed_book.cum_bid and dict_book.cum_ask == typed_book.cum_ask
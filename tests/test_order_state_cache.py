@@ -0,0 +1,133 @@
+"""OrderStateCache: status waits driven by the order feed, timeouts, and reconciliation off the HSI receive thread."""
+import json
+import sys
+import threading
+import time
+
+import pytest
+
+from neo_api_client import settings
+from neo_api_client.NeoWebSocket import NeoWebSocket
+from neo_api_client.order_state_cache import OrderStateCache
+
+from tests.stand_in import HsiServer, wait_for
+
+
+class OrderBook(object):
+    """Stands in for NeoAPI.order_report, counting the calls and the threads they were made on."""
+
+    def __init__(self, *orders):
+        self.orders = list(orders)
+        self.threads = []
+        # Cleared to hold the calls until it is set again
+        self.released = threading.Event()
+        self.released.set()
+
+    def __call__(self):
+        self.threads.append(threading.current_thread().name)
+        assert self.released.wait(10)
+        return {"stat": "Ok", "data": [dict(order) for order in self.orders]}
+
+
+def order_message(order_no, status, **fields):
+    return json.dumps({"type": "order", "data": dict(fields, nOrdNo=order_no, ordSt=status)})
+
+
+def waiting(cache, *args, **kwargs):
+    """Start `cache.wait_for_status(*args)` on a thread; returns the list its result is appended to."""
+    result = []
+    threading.Thread(target=lambda: result.append(cache.wait_for_status(*args, **kwargs)), daemon=True).start()
+    return result
+
+
+def connected(cache):
+    cache.on_connected()
+    assert wait_for(lambda: cache.reconcile_thread is None and not cache.stale)
+
+
+def test_wait_for_status_returns_once_the_feed_delivers_the_status():
+    book = OrderBook({"nOrdNo": "1", "ordSt": "open", "qty": 50})
+    cache = OrderStateCache(book)
+    connected(cache)
+    result = waiting(cache, "1", {"Complete", "rejected"}, timeout=10)
+
+    cache.on_order_feed(order_message("1", "trigger pending"))
+    cache.on_order_feed(order_message("2", "complete"))
+    cache.on_order_feed("not json")
+    assert not wait_for(lambda: result, 0.2)
+    cache.on_order_feed(order_message("1", "complete", fldQty=50))
+
+    assert wait_for(lambda: result)
+    assert result == [{"nOrdNo": "1", "ordSt": "complete", "qty": 50, "fldQty": 50}]
+    assert cache.status("2") == "complete" and len(book.threads) == 1
+
+
+def test_wait_for_status_times_out_without_a_matching_update():
+    book = OrderBook({"nOrdNo": "1", "ordSt": "open"})
+    cache = OrderStateCache(book)
+    connected(cache)
+    started = time.monotonic()
+
+    assert cache.wait_for_status("1", {"complete"}, timeout=0.2) is None
+    assert time.monotonic() - started >= 0.2
+    # An order the cache has never seen times out too, and the book is not fetched again while the feed is up
+    assert cache.wait_for_status("9", {"complete"}, timeout=0.05) is None
+    assert len(book.threads) == 1
+
+
+def test_a_wait_during_a_feed_gap_reconciles_once():
+    book = OrderBook({"nOrdNo": "1", "ordSt": "open"})
+    cache = OrderStateCache(book)
+    connected(cache)
+    cache.on_disconnected()
+    book.orders = [{"nOrdNo": "1", "ordSt": "complete"}]
+
+    assert cache.wait_for_status("1", {"complete"}, timeout=1) == {"nOrdNo": "1", "ordSt": "complete"}
+    assert cache.wait_for_status("1", {"rejected"}, timeout=0.05) is None
+    assert len(book.threads) == 2 and cache.reconciliations == 2
+
+
+@pytest.fixture
+def hsi(monkeypatch):
+    monkeypatch.setattr(settings, "HSI_RECONNECT_DELAY", 0.01)
+    hsi = HsiServer()
+    monkeypatch.setattr(sys.modules["neo_api_client.NeoWebSocket"], "ORDER_FEED_URL", hsi.url)
+    yield hsi
+    hsi.close()
+
+
+def test_reconciliation_does_not_hold_up_the_order_feed(hsi):
+    book = OrderBook({"nOrdNo": "1", "ordSt": "open"}, {"nOrdNo": "2", "ordSt": "open"})
+    book.released.clear()
+    cache = OrderStateCache(book)
+    websocket = NeoWebSocket("sid", "token", "server", None)
+    websocket.on_error = lambda error: None
+    websocket.order_state_cache = cache
+    try:
+        websocket.get_order_feed()
+        # The order book fetch started on 'cn' is still blocked when the feed delivers an update
+        assert wait_for(lambda: book.threads == ["neo-order-reconcile"])
+        result = waiting(cache, "1", {"complete"}, timeout=10)
+        hsi.connections[-1].send(order_message("1", "complete").encode(), 1)
+        assert wait_for(lambda: result) and result[0]["ordSt"] == "complete"
+
+        book.released.set()
+        assert wait_for(lambda: cache.reconcile_thread is None and cache.reconciliations == 1)
+        # The book, requested before the feed's update, does not overwrite it
+        assert cache.status("1") == "complete" and cache.status("2") == "open"
+
+        # A reconnection during a fetch makes the worker fetch once more
+        book.released.clear()
+        hsi.connections[-1].drop()
+        assert wait_for(lambda: len(hsi.connections) == 2 and len(book.threads) == 2)
+        hsi.connections[-1].drop()
+        assert wait_for(lambda: len(hsi.connections) == 3 and cache.reconcile_pending)
+        book.released.set()
+        assert wait_for(lambda: cache.reconcile_thread is None and cache.reconciliations == 3)
+        assert book.threads == ["neo-order-reconcile"] * 3 and websocket.is_hsi_open
+    finally:
+        book.released.set()
+        if websocket.hsiWebsocket:
+            websocket.hsiWebsocket.close()
+        if websocket.hsi_thread is not None:
+            websocket.hsi_thread.join(5)
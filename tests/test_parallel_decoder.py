@@ -0,0 +1,116 @@
+"""ParallelDecoder: packets split by topic between the workers, and workers that block while there are no frames."""
+import random
+
+import pytest
+
+from neo_api_client.HSWebSocketLib import HSWrapper, INT32, ResponseTypes
+from neo_api_client.parallel_decoder import CPU_INDEX, WAITING_INDEX, ParallelDecoder, split_packets
+
+from tests import data
+from tests.stand_in import wait_for
+
+# Frames of the benchmark data have no message number: the packet count follows the length and the frame type
+POS = 3
+
+
+def frames(topics=60, count=200):
+    rng = random.Random(1)
+    kinds = data.topic_types(topics)
+    result = [data.snap_frame(topics=topics, kinds=kinds)]
+    for _ in range(count):
+        packets = [rng.randrange(topics) for _ in range(10)]
+        result.append(data.data_frame([data.update_packet(topic + 1, data.update_longs(rng, kinds[topic]))
+                                       for topic in packets]))
+    return result
+
+
+def by_topic(messages):
+    ticks = {}
+    for message in messages:
+        for tick in message:
+            ticks.setdefault((tick["e"], tick["tk"]), []).append(tick)
+    return ticks
+
+
+def packets(frame):
+    view = memoryview(frame)
+    return [bytes(packet) for packet in packets_between(view, POS + 2, len(view))]
+
+
+def packets_between(view, start, end):
+    result = []
+    while start < end:
+        length = 2 + int.from_bytes(view[start:start + 2], "big")
+        assert view[start + 2] in (ResponseTypes["SNAP"], ResponseTypes["UPDATE"])
+        result.append(view[start:start + length])
+        start += length
+    return result
+
+
+@pytest.fixture
+def decoder():
+    decoders = []
+
+    def start(workers):
+        decoder = ParallelDecoder(workers)
+        messages = []
+        decoder.start(messages.append)
+        decoders.append(decoder)
+        return decoder, messages
+
+    yield start
+    for decoder in decoders:
+        decoder.close()
+
+
+def test_split_packets_gives_each_topic_to_one_decoder():
+    snap, update = frames(count=1)
+    view = memoryview(data.data_frame(packets(snap) + packets(update)))
+
+    counts, spans = split_packets(view, POS, 3)
+
+    assert sum(counts) == 60 + 10
+    for shard, shard_spans in enumerate(spans):
+        walked = [packet for start, end in shard_spans for packet in packets_between(view, start, end)]
+        assert len(walked) == counts[shard]
+        assert all(INT32.unpack_from(packet, 3)[0] % 3 == shard for packet in walked)
+        # Adjacent packets of one decoder are copied as one span
+        assert all(previous[1] < following[0] for previous, following in zip(shard_spans, shard_spans[1:]))
+
+
+def test_workers_deliver_the_ticks_of_each_topic_in_order(decoder):
+    decoder, messages = decoder(3)
+    expected = []
+    wrapper = HSWrapper()
+    for frame in frames():
+        expected.append(wrapper.parseData(frame))
+        decoder.submit(frame, POS)
+
+    total = sum(len(ticks) for ticks in expected)
+    assert wait_for(lambda: sum(len(ticks) for ticks in messages) == total)
+    assert by_topic(messages) == by_topic(expected)
+    # A frame reaches only the workers decoding its topics
+    reached = sum(sum(1 for count in split_packets(memoryview(frame), POS, 3)[0] if count) for frame in frames())
+    assert decoder.metrics()["frames"] == len(expected) and len(messages) == reached < 3 * len(expected)
+
+
+def test_idle_workers_block_until_a_frame_arrives(decoder):
+    decoder, messages = decoder(2)
+    snap, update = frames(count=1)
+    decoder.submit(snap, POS)
+    assert wait_for(lambda: sum(len(ticks) for ticks in messages) == 60)
+
+    def blocked():
+        return all(ring.index[WAITING_INDEX] for ring in decoder.inboxes + decoder.outboxes)
+
+    assert wait_for(blocked)
+    cpu = [ring.index[CPU_INDEX] for ring in decoder.inboxes]
+    # Blocked workers neither wake up nor use CPU until the next frame
+    assert not wait_for(lambda: not blocked(), 0.5)
+    assert [ring.index[CPU_INDEX] for ring in decoder.inboxes] == cpu
+
+    decoder.submit(update, POS)
+    assert wait_for(lambda: sum(len(ticks) for ticks in messages) == 70)
+    processes = list(decoder.processes)
+    decoder.close()
+    assert [process.wait(5) for process in processes] == [0, 0]
@@ -0,0 +1,124 @@
+"""QuotesEngine: chunks sized by token count and URL length, quotes merged in token order, and TTL cache expiry."""
+import json
+import threading
+import urllib.parse
+
+from neo_api_client.api_client import ApiClient
+from neo_api_client.neo_utility import NeoUtility
+from neo_api_client.quotes_engine import QuotesEngine
+
+
+class StubResponse(object):
+    def __init__(self, body):
+        self.status_code = 200
+        self.content = json.dumps(body).encode()
+        self.headers = {}
+
+
+class StubTransport(object):
+    """
+    Stands in for RESTClientObject, answering each quotes request with one quote per token in reverse order, plus
+    `extra` quotes. With `answer_order`, requests keyed by their first token are answered in that order.
+    """
+
+    def __init__(self, answer_order=None, extra=()):
+        self.answer_order = list(answer_order or [])
+        self.extra = list(extra)
+        self.lock = threading.Condition()
+        self.requests = []
+        self.answered = []
+
+    def request(self, method, url, query_params=None, headers=None, body=None, endpoint=None):
+        symbols = urllib.parse.unquote(url.rstrip("/").split("/")[-2]).split(",")
+        tokens = [symbol.split("|")[1] for symbol in symbols]
+        with self.lock:
+            self.requests.append(tokens)
+            while tokens[0] in self.answer_order and self.answer_order[0] != tokens[0]:
+                if not self.lock.wait(5):
+                    break
+            self.answered.append(tokens[0])
+            if tokens[0] in self.answer_order:
+                self.answer_order.remove(tokens[0])
+                self.lock.notify_all()
+        quotes = [{"exchange": symbol.split("|")[0], "exchange_token": symbol.split("|")[1], "ltp": "1.00"}
+                  for symbol in reversed(symbols)]
+        return StubResponse(quotes + self.extra)
+
+
+def engine(transport, **kwargs):
+    configuration = NeoUtility(host="prod")
+    configuration.base_url = "https://localhost/"
+    configuration.rate_limit_enabled = False
+    api_client = ApiClient(configuration)
+    api_client.rest_client = transport
+    return QuotesEngine(api_client, **kwargs)
+
+
+def instruments(*tokens):
+    return [{"exchange_segment": "nse_fo", "instrument_token": token} for token in tokens]
+
+
+TOKENS = [str(token) for token in range(40000, 40007)]
+
+
+def test_chunks_are_bounded_by_token_count_and_url_length():
+    quotes = engine(StubTransport(), chunk_size=3)
+    keys = [("nse_fo", token, "ltp") for token in TOKENS]
+
+    assert [len(chunk) for chunk in quotes.chunks(keys, "ltp")] == [3, 3, 1]
+    url = len(quotes.api_client.configuration.get_url_details("quotes_neo_symbol"))
+    # "nse_fo%7C40000" and its "%2C" separator are 17 characters
+    quotes.max_url_length = url + len("ltp") + 2 * 17
+    assert [len(chunk) for chunk in quotes.chunks(keys, "ltp")] == [2, 2, 2, 1]
+    # A symbol that needs escaping is counted encoded: 25 characters
+    odd = ("nse_fo", "a b c d", "ltp")
+    assert quotes.chunks([odd] + keys[:1], "ltp") == [[odd], keys[:1]]
+
+
+def test_quotes_follow_the_token_order_whatever_order_the_chunks_answer_in():
+    unknown = {"exchange": "bse_cm", "exchange_token": "1"}
+    # The last chunk answers first, once every chunk is in flight
+    transport = StubTransport(answer_order=["40006", "40003", "40000"], extra=[unknown])
+    quotes = engine(transport, chunk_size=3, max_workers=3)
+
+    result = quotes.get_quotes(instruments(*TOKENS + ["40001"]), "ltp")
+
+    assert transport.answered == ["40006", "40003", "40000"]
+    assert [quote["exchange_token"] for quote in result] == TOKENS + ["1"] * 3
+    assert quotes.metrics()["requests"] == 3 and quotes.metrics()["calls"] == 1
+
+
+def test_a_single_request_returns_its_response_unchanged():
+    transport = StubTransport(extra=[{"stat": "Ok"}])
+
+    result = engine(transport).get_quotes(instruments(*TOKENS[:2]))
+
+    assert [quote.get("exchange_token") for quote in result] == ["40001", "40000", None]
+
+
+def test_cached_quotes_expire_after_the_ttl():
+    now = [100.0]
+    transport = StubTransport()
+    quotes = engine(transport, chunk_size=3, ttl=5, clock=lambda: now[0])
+    quotes.get_quotes(instruments(*TOKENS[:3]), "ltp")
+
+    now[0] = 104.9
+    result = quotes.get_quotes(instruments(*TOKENS[1:5]), "ltp")
+    assert [quote["exchange_token"] for quote in result] == TOKENS[1:5]
+    assert transport.requests == [TOKENS[:3], TOKENS[3:5]]
+    assert quotes.metrics()["cache_hits"] == 2
+
+    # The first three expire at 105.0, the next two at 109.9; an expired quote is dropped by the next request
+    now[0] = 105.0
+    quotes.get_quotes(instruments(TOKENS[0], TOKENS[3]), "ltp")
+    assert transport.requests[2:] == [[TOKENS[0]]]
+    assert quotes.metrics()["cache_hits"] == 3 and quotes.metrics()["cached"] == 3
+    # The quote type is part of the key
+    quotes.get_quotes(instruments(TOKENS[3]), "depth")
+    assert transport.requests[3:] == [[TOKENS[3]]]
+
+    now[0] = 200.0
+    quotes.get_quotes(instruments(TOKENS[3]), "ltp")
+    quotes.clear()
+    quotes.get_quotes(instruments(TOKENS[3]), "ltp")
+    assert transport.requests[4:] == [[TOKENS[3]]] * 2 and quotes.metrics()["cache_hits"] == 3
@@ -0,0 +1,88 @@
+"""RequestScheduler.acquire on simulated time: lane budgets, priority for the shared budget and its fallback."""
+import threading
+
+from neo_api_client.rate_limiter import RequestScheduler
+
+from tests.simulated_time import SimulatedTime
+
+ENDPOINT_LANES = {"place_order": "orders", "order_book": "reports"}
+
+
+def scheduler(lanes, global_limit=None, threads=1):
+    clock = SimulatedTime(threads)
+    scheduler = RequestScheduler(lanes, ENDPOINT_LANES, global_limit=global_limit, clock=clock)
+    scheduler._cond = clock
+    return scheduler, clock
+
+
+def run(clock, *callers):
+    """Run each caller in a simulated thread of `clock` until all of them return."""
+
+    def simulated(caller):
+        try:
+            caller()
+        finally:
+            clock.exit()
+
+    threads = [threading.Thread(target=simulated, args=(caller,)) for caller in callers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+        assert not thread.is_alive()
+
+
+def test_acquire_waits_for_the_lane_budget_only():
+    limiter, clock = scheduler({"orders": {"rate": 2, "burst": 2, "priority": 0}})
+
+    waits = [limiter.acquire("place_order") for _ in range(4)]
+
+    assert waits == [0.0, 0.0, 0.5, 0.5] and clock() == 1.0
+    # Endpoints without a lane are never throttled
+    assert limiter.acquire("order_book") == 0.0 and clock() == 1.0
+    metrics = limiter.metrics()["orders"]
+    assert metrics["requests"] == 4 and metrics["throttled"] == 2 and metrics["max_wait_ms"] == 500.0
+
+
+def test_higher_priority_lane_gets_the_next_shared_token():
+    limiter, clock = scheduler({"orders": {"rate": 10, "burst": 10, "priority": 0},
+                                "reports": {"rate": 10, "burst": 10, "priority": 3}},
+                               global_limit={"rate": 1, "burst": 1}, threads=2)
+    # The report lane takes the only shared token, then both lanes wait for the next one
+    limiter.acquire("order_book")
+    served = []
+
+    def acquire(endpoint):
+        def caller():
+            waited = limiter.acquire(endpoint)
+            served.append((endpoint, clock(), waited))
+        return caller
+
+    run(clock, acquire("order_book"), acquire("place_order"))
+
+    assert served == [("place_order", 1.0, 1.0), ("order_book", 2.0, 2.0)]
+    assert limiter.metrics()["reports"]["throttled"] == 1 and limiter.metrics()["reports"]["max_queue_depth"] == 1
+
+
+def test_lower_lane_takes_shared_tokens_a_throttled_higher_lane_cannot():
+    limiter, clock = scheduler({"orders": {"rate": 1, "burst": 1, "priority": 0},
+                                "reports": {"rate": 10, "burst": 10, "priority": 3}},
+                               global_limit={"rate": 10, "burst": 10}, threads=2)
+    limiter.acquire("place_order")
+    served = []
+
+    def place():
+        # Waits for its own lane until 1.0, with shared tokens to spare
+        limiter.acquire("place_order")
+        served.append(("place_order", clock()))
+
+    def poll():
+        clock.sleep(0.5)
+        for _ in range(5):
+            waited = limiter.acquire("order_book")
+            served.append(("order_book", clock(), waited))
+
+    run(clock, place, poll)
+
+    assert served == [("order_book", 0.5, 0.0)] * 5 + [("place_order", 1.0)]
+    assert limiter.metrics()["reports"]["throttled"] == 0
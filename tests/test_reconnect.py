@@ -0,0 +1,87 @@
+"""Heartbeats and reconnects of the HSM and HSI sockets against local stand-in servers."""
+import sys
+
+import pytest
+
+import neo_api_client
+from neo_api_client import settings
+from neo_api_client.NeoWebSocket import NeoWebSocket
+from neo_api_client.heartbeat import HEARTBEAT
+
+from tests import data
+from tests.stand_in import HsiServer, HsmServer, client_threads, wait_for
+
+
+@pytest.fixture
+def servers(monkeypatch):
+    monkeypatch.setattr(settings, "HSM_RECONNECT_DELAY", 0.01)
+    monkeypatch.setattr(settings, "HSI_RECONNECT_DELAY", 0.01)
+    hsm, hsi = HsmServer(), HsiServer()
+    monkeypatch.setattr(neo_api_client, "WEBSOCKET_URL", hsm.url)
+    monkeypatch.setattr(sys.modules["neo_api_client.NeoWebSocket"], "ORDER_FEED_URL", hsi.url)
+    yield hsm, hsi
+    hsm.close()
+    hsi.close()
+
+
+@pytest.fixture
+def websocket(servers):
+    websocket = NeoWebSocket("sid", "token", "server", None)
+    websocket.errors = []
+    websocket.on_error = websocket.errors.append
+    yield websocket
+    if websocket.hsWebsocket:
+        websocket.hsWebsocket.close()
+    if websocket.hsiWebsocket:
+        websocket.hsiWebsocket.close()
+    for thread in (websocket.hsw_thread, websocket.hsi_thread):
+        if thread is not None:
+            thread.join(5)
+
+
+def reconnect(server, websocket, connected):
+    previous = server.connections[-1]
+    previous.drop()
+    assert wait_for(lambda: server.connections[-1] is not previous and connected())
+
+
+def test_reconnecting_100_times_does_not_add_threads(servers, websocket):
+    hsm, hsi = servers
+    websocket.get_live_feed(data.instrument_tokens(50), False, False)
+    websocket.get_order_feed()
+    assert wait_for(lambda: websocket.is_hsw_open and websocket.is_hsi_open)
+    threads = len(client_threads())
+
+    counts = []
+    for _ in range(100):
+        reconnect(hsm, websocket, lambda: websocket.is_hsw_open)
+        reconnect(hsi, websocket, lambda: websocket.is_hsi_open)
+        counts.append(len(client_threads()))
+
+    assert websocket.reconnect_manager.reconnects == 100
+    assert max(counts) <= threads
+    assert wait_for(lambda: len(client_threads()) == threads)
+
+
+def test_heartbeats_keep_both_sockets_alive_and_replace_a_frozen_one(monkeypatch, servers, websocket):
+    monkeypatch.setattr(settings, "HEARTBEAT_INTERVAL", 0.05)
+    monkeypatch.setattr(settings, "HEARTBEAT_TIMEOUT", 0.2)
+    monkeypatch.setattr(settings, "HSI_HEARTBEAT_INTERVAL", 0.05)
+    hsm, hsi = servers
+    websocket.get_live_feed(data.instrument_tokens(50), False, False)
+    websocket.get_order_feed()
+    assert wait_for(lambda: websocket.is_hsw_open and websocket.is_hsi_open)
+    dead = HEARTBEAT.metrics()["dead"]
+
+    # Answered pings keep the connections, and the order feed gets its "HB" messages too
+    assert wait_for(lambda: hsm.connections[-1].pings >= 5 and hsi.connections[-1].pings >= 5)
+    assert wait_for(lambda: hsi.connections[-1].requests.count(b"{type:hb}") >= 5)
+    assert len(hsm.connections) == 1 and len(hsi.connections) == 1
+    assert {"hsm": 1, "hsi": 1, "hsi_hb": 1}.items() <= HEARTBEAT.metrics()["by_name"].items()
+
+    frozen = hsm.connections[-1]
+    frozen.frozen = True
+    assert wait_for(lambda: hsm.connections[-1] is not frozen and websocket.is_hsw_open)
+    assert HEARTBEAT.metrics()["dead"] == dead + 1
+    assert len(hsi.connections) == 1
+    assert wait_for(lambda: hsm.connections[-1].pings >= 2)
@@ -0,0 +1,105 @@
+"""ReconnectManager restoring the live feed after the connection to a local HSM stand-in is killed."""
+import pytest
+
+import neo_api_client
+from neo_api_client import settings
+from neo_api_client.HSWebSocketLib import MAX_SCRIPS
+from neo_api_client.NeoWebSocket import NeoWebSocket
+from neo_api_client.reconnect import ReconnectManager
+
+from tests import data
+from tests.stand_in import SNAPSHOT, SUBSCRIBE, TickingHsmServer, wait_for
+
+# Server cost of one request in the before/after comparison; the stand-in ticks every scrip every 0.5 s
+REQUEST_SECONDS = 0.0005
+
+
+class BlindResend(ReconnectManager):
+    """What the 'cn' handler did before ReconnectManager: one subscribe request per token and no snapshots."""
+
+    def __init__(self, websocket):
+        super(BlindResend, self).__init__(websocket, snapshots=False)
+
+    def requests(self, registry):
+        return [(channel, entry["subscription_type"], entry["exchange_segment"] + "|" + str(entry["instrument_token"]))
+                for channel, entries in registry.channel_map().items() for entry in entries]
+
+
+def start(monkeypatch, request_seconds=0.0):
+    monkeypatch.setattr(settings, "HSM_RECONNECT_DELAY", 0.01)
+    hsm = TickingHsmServer(request_seconds)
+    monkeypatch.setattr(neo_api_client, "WEBSOCKET_URL", hsm.url)
+    return hsm
+
+
+@pytest.fixture
+def stop():
+    servers, websockets = [], []
+    yield servers, websockets
+    for websocket in websockets:
+        if websocket.hsWebsocket:
+            websocket.hsWebsocket.close()
+        if websocket.hsw_thread is not None:
+            websocket.hsw_thread.join(5)
+    for server in servers:
+        server.close()
+
+
+def subscribed_websocket(hsm, stop, tokens, manager=None):
+    websocket = NeoWebSocket("sid", "token", "server", None)
+    websocket.on_error = lambda error: None
+    if manager is not None:
+        websocket.reconnect_manager = manager(websocket)
+    stop[0].append(hsm)
+    stop[1].append(websocket)
+    websocket.get_live_feed(tokens, False, False)
+    assert wait_for(lambda: websocket.is_hsw_open and len(websocket.reconnect_manager.last_tick) == len(tokens))
+    return websocket
+
+
+def kill(hsm, websocket):
+    """Kill the connection and wait until every token ticked again on the new one."""
+    previous = hsm.connections[-1]
+    previous.drop()
+    manager = websocket.reconnect_manager
+    assert wait_for(lambda: manager.reconnects == 1 and manager.connections == 2 and not manager.pending, 30)
+    return manager.metrics()
+
+
+def test_reconnect_subscribes_again_and_requests_snapshots(monkeypatch, stop):
+    hsm = start(monkeypatch)
+    tokens = data.instrument_tokens(MAX_SCRIPS + 20)
+    scrips = {"sf|nse_fo|%s" % token["instrument_token"] for token in tokens}
+    websocket = subscribed_websocket(hsm, stop, tokens)
+
+    metrics = kill(hsm, websocket)
+    requests = hsm.connections[-1].requests
+
+    def sent(request_type):
+        return [scrips_ for kind, scrips_ in requests if kind == request_type]
+
+    assert {scrip for request in sent(SNAPSHOT) for scrip in request} == scrips
+    subscribed = sent(SUBSCRIBE)
+    assert {scrip for request in subscribed for scrip in request} == scrips
+    # One request per channel rather than one per token
+    assert len(subscribed) == len(websocket.subscriptions.channel_map())
+    assert all(len(request) <= MAX_SCRIPS for request in subscribed)
+    assert metrics["reconnects"] == 1 and metrics["disconnects"] == 1
+    assert metrics["subscribe_requests"] == 2 * len(subscribed) and metrics["snapshot_requests"] == len(subscribed)
+    assert set(websocket.reconnect_manager.gaps()) == {token["instrument_token"] for token in tokens}
+
+
+def test_first_tick_comes_sooner_than_with_a_blind_resend(monkeypatch, stop):
+    tokens = data.instrument_tokens(3000)
+    results = {}
+    for name, manager in (("blind", BlindResend), ("batched", None)):
+        hsm = start(monkeypatch, REQUEST_SECONDS)
+        websocket = subscribed_websocket(hsm, stop, tokens, manager)
+        results[name] = kill(hsm, websocket)
+
+    blind, batched = results["blind"], results["batched"]
+    assert blind["subscribe_requests"] == 2 * 3000 and blind["snapshot_requests"] == 0
+    assert batched["subscribe_requests"] == 2 * batched["snapshot_requests"] <= 2 * 3000 // MAX_SCRIPS + 2 * 10
+    # Measured: first tick after 0.52 s blind against 0.06 s batched, every token back after 2.7 s against 0.8 s
+    assert batched["time_to_first_tick"] * 2 < blind["time_to_first_tick"]
+    assert batched["max_gap"] * 2 < blind["max_gap"]
@@ -0,0 +1,125 @@
+"""ScripSearch served by ScripMasterStore, over a generated nse_fo scrip master stored for today."""
+import sys
+import threading
+
+import pytest
+
+from neo_api_client.api.scrip_search import ScripSearch
+
+from tests import data
+from tests.data import stored_master
+
+NO_DATA = {"message": "No data found with the given search information.Please try with other combinations."}
+
+
+@pytest.fixture
+def master(tmp_path):
+    frame = data.scrip_master(underlyings=5, expiries=2, strikes=10)
+    api_client = stored_master(str(tmp_path), frame)
+    return api_client.get_scrip_master_store(), ScripSearch(api_client), frame
+
+
+def search(scrip_search, symbol="nifty", expiry=None, option_type=None, strike_price=None):
+    return scrip_search.scrip_search(symbol, "nse_fo", expiry, option_type, strike_price, False)
+
+
+def test_search_filters_and_sorts_by_strike(master):
+    store, scrip_search, frame = master
+    expiry = data.expiry_days(2)[0].strftime("%d%b%Y").upper()
+
+    lowest = frame.loc[frame["pSymbolName"] == "NIFTY", "dStrikePrice;"].min() / 100
+    rows = search(scrip_search, expiry=expiry, option_type="CE", strike_price="%d-%d" % (lowest + 100, lowest + 200))
+
+    assert [row["dStrikePrice;"] for row in rows] == sorted(row["dStrikePrice;"] for row in rows)
+    assert len(rows) == 3
+    assert all(row["pSymbolName"] == "NIFTY" and row["pOptionType"] == "ce" and row["pExpiryDate"] == "26Dec2024"
+               for row in rows)
+    assert len(search(scrip_search)) == 2 * 10 * 2
+    assert len(search(scrip_search, option_type="ce,pe", strike_price=">0")) == 2 * 10 * 2
+    assert search(scrip_search, symbol="missing") == NO_DATA
+
+
+def test_search_rejects_malformed_filters(master):
+    _, scrip_search, _ = master
+
+    assert search(scrip_search, expiry="01-02-03")["error"][0]["message"].startswith("Format of expiry date")
+    assert search(scrip_search, strike_price="200-100")["error"][0]["code"] == "10300"
+    assert search(scrip_search, strike_price="0")["error"][0]["message"].startswith("Strike price cannot")
+
+
+def test_results_are_new_rows_and_the_frame_is_not_copied(master):
+    store, scrip_search, _ = master
+
+    rows = search(scrip_search, option_type="PE")
+    rows[0]["pOptionType"] = "changed"
+
+    assert store.frame("nse_fo") is store.frame("nse_fo")
+    assert (store.frame("nse_fo")["pOptionType"] != "changed").all()
+    assert search(scrip_search, option_type="PE")[0]["pOptionType"] == "pe"
+    token = rows[1]["pSymbol"]
+    assert store.lookup("nse_fo", instrument_token=token)[0]["pTrdSymbol"] == rows[1]["pTrdSymbol"]
+
+
+def test_concurrent_searches_share_the_symbol_cache(master, monkeypatch):
+    store, _, frame = master
+    # Every few searches clear the cache while other threads fill it
+    monkeypatch.setattr(sys.modules["neo_api_client.scrip_master_store"], "SYMBOL_CACHE_SIZE", 2)
+    names = sorted(frame["pSymbolName"].str.lower().unique())
+    expected = {name: len(store.search("nse_fo", name)) for name in names}
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    errors = []
+
+    def searches(offset):
+        try:
+            for index in range(200):
+                name = names[(offset + index) % len(names)]
+                assert len(store.search("nse_fo", name)) == expected[name]
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=searches, args=(offset,)) for offset in range(4)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    assert not errors and len(store.segments["nse_fo"]["symbols"]) <= 2
+
+
+class CsvResponse(object):
+    def __init__(self, content):
+        self.status_code = 200
+        self.content = content
+        self.headers = {"ETag": "v1"}
+
+
+class CsvTransport(object):
+    """Stands in for RESTClientObject, serving one scrip master file."""
+
+    def __init__(self, content):
+        self.content = content
+        self.requests = []
+
+    def request(self, url, method, headers=None, **kwargs):
+        self.requests.append(headers)
+        return CsvResponse(self.content)
+
+
+def test_downloaded_segments_are_stored_without_indexes(master):
+    store, scrip_search, frame = master
+    store.rest_client = CsvTransport(frame.to_csv(index=False).encode())
+    connection = store._connect()
+    try:
+        store._download(connection, "nse_fo", "https://localhost/scrip_master/nse_fo.csv")
+        indexes = connection.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'scrips_nse_fo'").fetchall()
+        stored = connection.execute('SELECT COUNT(*) FROM "scrips_nse_fo"').fetchone()[0]
+    finally:
+        connection.close()
+
+    assert indexes == [] and stored == len(frame)
+    store.clear()
+    assert len(search(scrip_search)) == 2 * 10 * 2
@@ -0,0 +1,51 @@
+"""NeoWebSocket.get_live_feed at the 3,000 subscription limit."""
+from tests import data
+from tests.stand_in import acknowledge_unsubscriptions, connected_websocket
+
+
+def subscribed_tokens(websocket):
+    return {scrip for request in websocket.hsWebsocket.sent("mws") for scrip in request["scrips"].split("&")}
+
+
+def test_new_tokens_past_the_limit_are_subscribed_once_channels_free_up():
+    websocket = connected_websocket()
+    old = data.instrument_tokens(3000)
+    new = data.instrument_tokens(500, start=90000)
+    websocket.get_live_feed(old, False, False)
+    websocket.hsWebsocket.requests = []
+
+    assert websocket.get_live_feed(new, False, False) is None
+    assert websocket.subscriptions.pending()
+    acknowledge_unsubscriptions(websocket)
+
+    assert not websocket.subscriptions.pending()
+    assert len(websocket.subscriptions) == 500
+    assert subscribed_tokens(websocket) == {"nse_fo|%s" % token["instrument_token"] for token in new}
+    assert not websocket.errors
+
+
+def test_tokens_beyond_the_limit_are_rejected():
+    websocket = connected_websocket()
+    tokens = data.instrument_tokens(3100)
+
+    result = websocket.get_live_feed(tokens, False, False)
+
+    assert len(websocket.subscriptions) == 3000
+    assert [entry["instrument_token"] for entry in result["instrument_tokens"]] == [
+        token["instrument_token"] for token in tokens[3000:]]
+    assert str(websocket.errors[0]) == result["Error"]
+    acknowledge_unsubscriptions(websocket)
+    assert len(websocket.subscriptions) == 3000 and not websocket.subscriptions.pending()
+
+
+def test_tokens_asked_for_again_past_the_limit_stay_subscribed():
+    websocket = connected_websocket()
+    old = data.instrument_tokens(3000)
+    websocket.get_live_feed(old, False, False)
+
+    websocket.get_live_feed(old[:10] + data.instrument_tokens(100, start=90000), False, False)
+    acknowledge_unsubscriptions(websocket)
+
+    assert len(websocket.subscriptions) == 110
+    for token in old[:10]:
+        assert websocket.subscriptions.key("nse_fo", token["instrument_token"], "mws") in websocket.subscriptions
@@ -0,0 +1,83 @@
+"""Feed messages handled on another thread (decode workers) while subscriptions change on the calling thread."""
+import sys
+import threading
+
+from neo_api_client import NeoAPI
+from neo_api_client.NeoWebSocket import NeoWebSocket
+
+from tests import data
+from tests.stand_in import RecordingSocket, acknowledge_unsubscriptions
+
+
+def test_rebalancing_on_the_collector_thread_keeps_the_registry_consistent():
+    switch_interval = sys.getswitchinterval()
+    websocket = NeoWebSocket("sid", "token", "server", None)
+    websocket.hsWebsocket = RecordingSocket()
+    websocket.is_hsw_open = 1
+    allocator = websocket.channel_allocator
+    allocator.sample_interval = 0
+    allocator.rebalance_due = lambda: True
+    # Rates spread unevenly over the channels, so that every feed message moves subscriptions
+    hot = data.instrument_tokens(600, exchange_segment="nse_cm")
+    websocket.get_live_feed(hot, False, False)
+    allocator.rates = {token["instrument_token"]: float(index % 7 + 1) for index, token in enumerate(hot)}
+    ticks = [{"tk": token["instrument_token"], "e": "nse_cm", "ltp": "1"} for token in hot]
+    errors = []
+    stop = threading.Event()
+
+    def collector():
+        try:
+            while not stop.is_set():
+                websocket.on_hsm_message(ticks)
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=collector)
+    sys.setswitchinterval(1e-6)
+    thread.start()
+    try:
+        for start in range(0, 600, 50):
+            tokens = data.instrument_tokens(50, start=60000 + start)
+            websocket.get_live_feed(tokens, False, False)
+            websocket.un_subscribe_list(tokens)
+            with websocket.subscriptions_lock:
+                acknowledge_unsubscriptions(websocket)
+    finally:
+        stop.set()
+        thread.join()
+        sys.setswitchinterval(switch_interval)
+
+    assert not errors
+    registry = websocket.subscriptions
+    assert len(registry) == 600
+    assert sum(len(entries) for entries in registry.channel_entries.values()) == 600
+    assert {key: channel for key, channel in registry.entry_channels.items()} == {
+        key: channel for channel, entries in registry.channel_entries.items() for key in entries}
+    assert sum(sum(channels.values()) for channels in allocator.token_channels.values()) == 600
+
+
+def test_a_manual_rebalance_waits_for_the_collector():
+    client = NeoAPI(environment="prod", access_token="token")
+    websocket = client.NeoWebSocket = NeoWebSocket("sid", "token", "server", None)
+    websocket.hsWebsocket = RecordingSocket()
+    websocket.is_hsw_open = 1
+    hot = data.instrument_tokens(400, exchange_segment="nse_cm")
+    websocket.get_live_feed(hot, False, False)
+    # The tokens of channel 2 are ten times as busy as the others
+    busy = {key[1] for key in websocket.subscriptions.channel_entries[2]}
+    websocket.channel_allocator.rates = {token["instrument_token"]: 10.0 if token["instrument_token"] in busy else 1.0
+                                         for token in hot}
+    result = []
+    rebalance = threading.Thread(target=lambda: result.append(client.rebalance_channels()))
+
+    # The collector thread holds the lock while it handles a message
+    with websocket.subscriptions_lock:
+        rebalance.start()
+        rebalance.join(0.2)
+        assert rebalance.is_alive() and not result
+        sent = len(websocket.hsWebsocket.requests)
+    rebalance.join(5)
+
+    assert result[0]["moves"] > 0 and len(websocket.hsWebsocket.requests) > sent
+    channels = result[0]["channels"]
+    assert sum(channel["tokens"] for channel in channels.values()) == 400
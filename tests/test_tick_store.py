@@ -0,0 +1,91 @@
+"""TickStore and TickRing: wraparound of the ring, window views, and rows filled forward from dict and typed ticks."""
+import numpy as np
+import pytest
+
+from neo_api_client.HSWebSocketLib import HSWrapper
+from neo_api_client.tick_store import TICK_COLUMNS, TickRing, TickStore
+
+from tests import data
+
+
+def row(value):
+    return [value] * len(TICK_COLUMNS)
+
+
+def test_ring_keeps_the_latest_rows_in_order_across_wraparound():
+    ring = TickRing(4, slack=2)
+    for value in range(20):
+        ring.append(row(value))
+        expected = list(range(max(0, value - 3), value + 1))
+        assert ring.window()["ltp"].tolist() == expected
+        assert ring.window(2)["volume"].tolist() == expected[-2:]
+        assert ring.end <= 6
+
+    assert len(ring) == 4 and ring.total == 20
+    assert ring.window(10)["ltq"].tolist() == [16, 17, 18, 19]
+    assert ring.nbytes == 6 * 64
+
+
+def test_windows_are_views_into_the_ring():
+    store = TickStore(capacity=8)
+    for value in range(5):
+        store.append("11536", ltp=100.0 + value, ltq=value, ts=value, exchange_segment="nse_cm")
+
+    window = store.window("11536", n=3)
+    ring = store.rings[("nse_cm", "11536")]
+
+    assert window["ltp"].tolist() == [102.0, 103.0, 104.0]
+    assert all(np.shares_memory(window[name], ring.columns[name]) for name in window)
+    ring.columns["ltp"][ring.end - 1] = 0.0
+    assert window["ltp"][-1] == 0.0
+    assert store.column("11536", "ltq").tolist() == [0, 1, 2, 3, 4]
+    missing = store.window("1")
+    assert len(missing["ltp"]) == 0 and missing["ltt"].dtype == np.int64
+
+
+def test_ticks_fill_forward_the_fields_they_do_not_carry():
+    store = TickStore(capacity=8)
+    store.on_ticks([{"name": "sf", "e": "nse_cm", "tk": "11536", "ltp": "100.50", "v": "10", "bp": "100.00",
+                     "sp": "101.00", "ltt": "01/01/2024 09:15:00"},
+                    {"name": "if", "e": "nse_cm", "tk": "Nifty 50", "iv": "21000.10"}])
+    store.on_ticks([{"name": "sf", "e": "nse_cm", "tk": "11536", "ltp": "100.75"},
+                    {"name": "dp", "e": "nse_cm", "tk": "11536", "bp": "1.00"}])
+
+    window = store.window("11536")
+    assert window["ltp"].tolist() == [100.5, 100.75]
+    assert window["volume"].tolist() == [10, 10] and window["bid"].tolist() == [100.0, 100.0]
+    assert window["ltt"][0] == window["ltt"][1] > 0
+    assert store.latest("11536")["ask"] == 101.0 and store.count("11536") == 2
+    assert store.latest("Nifty 50")["ltp"] == 21000.1 and np.isnan(store.latest("Nifty 50")["bid"])
+    assert store.latest("1") is None
+
+
+def test_the_same_token_in_two_segments_has_two_histories():
+    store = TickStore(capacity=8)
+    store.on_ticks([{"name": "sf", "e": "nse_cm", "tk": "500", "ltp": "10.00", "v": "5"},
+                    {"name": "sf", "e": "bse_cm", "tk": "500", "ltp": "20.00"},
+                    {"name": "sf", "e": "nse_cm", "tk": "500", "ltp": "11.00"}])
+
+    assert store.column("500", "ltp", exchange_segment="nse_cm").tolist() == [10.0, 11.0]
+    assert store.latest("500", "bse_cm")["ltp"] == 20.0 and store.latest("500", "bse_cm")["volume"] == 0
+    assert store.count("500", "bse_cm") == 1 and store.count("500", "nse_fo") == 0
+    assert store.tokens() == ["500"] and store.keys() == [("nse_cm", "500"), ("bse_cm", "500")]
+    with pytest.raises(ValueError, match="Token 500 is in several exchange segments"):
+        store.window("500")
+
+
+def test_typed_ticks_store_the_same_rows_as_the_dict_feed():
+    frames = [data.snap_frame()] + data.update_frames(count=500)
+    stores = {}
+    for typed_ticks in (False, True):
+        wrapper, store = HSWrapper(typed_ticks=typed_ticks), TickStore(capacity=16)
+        for frame in frames:
+            store.on_ticks(wrapper.parseData(frame))
+        stores[typed_ticks] = store
+
+    assert stores[False].keys() == stores[True].keys() and stores[False].keys()
+    for segment, token in stores[False].keys():
+        assert stores[False].count(token, segment) == stores[True].count(token, segment)
+        for name, _, _ in TICK_COLUMNS[1:]:
+            assert np.allclose(stores[False].column(token, name, exchange_segment=segment),
+                               stores[True].column(token, name, exchange_segment=segment), equal_nan=True)
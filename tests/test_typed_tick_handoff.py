@@ -0,0 +1,70 @@
+"""Typed ticks handed from the websocket thread to other threads keep the values they were delivered with."""
+import pytest
+
+from neo_api_client.HSWebSocketLib import HSWrapper, TRASH_VAL
+from neo_api_client.conflation import Conflater
+from neo_api_client.event_dispatcher import EventDispatcher
+from neo_api_client.feed_pool import FeedPool
+
+from tests import data
+
+
+class Feed(object):
+    """Typed scrip ticks of one topic, its record reused by every update as on the websocket thread."""
+
+    def __init__(self):
+        self.wrapper = HSWrapper(typed_ticks=True)
+        self.wrapper.parseData(data.snap_frame(topics=1, kinds=["sf"]))
+
+    def message(self, ltp):
+        longs = [TRASH_VAL] * 6
+        longs[5] = ltp
+        return {"type": "stock_feed", "data": self.wrapper.parseData(data.data_frame([data.update_packet(1, longs)]))}
+
+
+@pytest.mark.parametrize("policy", ["block", "drop_oldest"])
+def test_event_dispatcher_queues_copies(policy):
+    feed = Feed()
+    dispatcher = EventDispatcher(lambda message: None, maxsize=10, policy=policy)
+    dispatcher.put(feed.message(1000000))
+    dispatcher.put(feed.message(1000500))
+
+    with dispatcher.condition:
+        first, second = dispatcher.take(), dispatcher.take()
+
+    assert first["data"][0].ltp == 1000000 and second["data"][0].ltp == 1000500
+
+
+def test_event_dispatcher_conflates_copies():
+    feed = Feed()
+    dispatcher = EventDispatcher(lambda message: None, maxsize=10, policy="conflate")
+    dispatcher.put(feed.message(1000000))
+    dispatcher.put(feed.message(1000500))
+    with dispatcher.condition:
+        conflated = dispatcher.take()
+    feed.message(1001000)
+
+    tick, = conflated["data"]
+    assert tick.ltp == 1000500 and tick.is_updated("ltp")
+    assert tick is not feed.wrapper.topic_list[1].tick
+
+
+def test_conflater_snapshots_before_the_record_is_reused():
+    feed = Feed()
+    delivered = []
+    conflater = Conflater(delivered.append, interval=0)
+    conflater.put(feed.message(1000500))
+    # Written by the websocket thread after the put, before the drain
+    feed.message(1001000)
+    conflater.drain()
+
+    assert delivered[0]["data"][0].ltp == 1000500
+
+
+def test_feed_pool_queue_holds_copies():
+    feed = Feed()
+    pool = FeedPool("sid", "token", "server", use_queue=True, session_factory=lambda: None)
+    pool._dispatch(None, feed.message(1000000))
+    pool._dispatch(None, feed.message(1000500))
+
+    assert [pool.queue.get()[1]["data"][0].ltp for _ in range(2)] == [1000000, 1000500]
@@ -0,0 +1,55 @@
+"""Typed tick decoding of HSWrapper.parseData."""
+import random
+
+from neo_api_client.HSWebSocketLib import HSWrapper, TRASH_VAL
+
+from tests import data
+
+
+def scrip_wrapper():
+    wrapper = HSWrapper(typed_ticks=True)
+    wrapper.parseData(data.snap_frame(topics=1, kinds=["sf"]))
+    return wrapper
+
+
+def ltp_update(ltp):
+    longs = [TRASH_VAL] * 6
+    longs[5] = ltp
+    return longs
+
+
+def test_topic_repeated_in_a_frame_keeps_each_packet():
+    wrapper = scrip_wrapper()
+    frame = data.data_frame([data.update_packet(1, ltp_update(1000000)), data.update_packet(1, ltp_update(1000500))])
+
+    first, second = wrapper.parseData(frame)
+
+    assert first is not second
+    assert first.ltp == 1000000 and second.ltp == 1000500
+    assert first.is_updated("ltp") and second.is_updated("ltp")
+    # The last packet of the topic is the live record, updated by later frames
+    assert second is wrapper.topic_list[1].tick
+
+
+def test_snap_and_update_of_a_topic_in_one_frame():
+    wrapper = HSWrapper(typed_ticks=True)
+    snap = data.snap_frame(topics=1, kinds=["sf"])
+    # The SNAP packet of snap_frame follows its 2 byte frame length, type and 2 byte packet count
+    frame = data.data_frame([snap[5:], data.update_packet(1, ltp_update(1000500))])
+
+    snapped, updated = wrapper.parseData(frame)
+
+    assert snapped.request_type == "SNAP" and updated.request_type == "SUB"
+    assert snapped.ltp != 1000500 and updated.ltp == 1000500
+
+
+def test_distinct_topics_are_not_copied():
+    wrapper = HSWrapper(typed_ticks=True)
+    wrapper.parseData(data.snap_frame(topics=2, kinds=["sf", "sf"]))
+    rng = random.Random(1)
+    frame = data.data_frame([data.update_packet(1, data.update_longs(rng, "sf")),
+                             data.update_packet(2, data.update_longs(rng, "sf"))])
+
+    first, second = wrapper.parseData(frame)
+
+    assert first is wrapper.topic_list[1].tick and second is wrapper.topic_list[2].tick